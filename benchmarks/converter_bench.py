@@ -0,0 +1,305 @@
+"""
+Benchmarks Converter.convert_media on synthetic media.
+
+    python -m benchmarks.converter_bench                     # quick profile, compare to baseline
+    python -m benchmarks.converter_bench --profile full --output results.json
+    python -m benchmarks.converter_bench --save-baseline     # record the current numbers
+
+Every case runs in its own Python process, so the CPU time and peak RSS reported are
+those of the ffmpeg (and ffprobe) processes of that case alone. The exit status is 1
+when a case regressed against the baseline, 2 when a case failed.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.media import SOURCES, DEFAULT_MEDIA_DIR, ensure_source
+
+try:
+    import resource # POSIX only; CPU time and peak RSS are not measured elsewhere
+except ImportError:
+    resource = None
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# A metric regresses when it grows by more than the threshold AND by more than its noise floor.
+DEFAULT_THRESHOLD = 0.10
+NOISE_FLOORS = {'wall_seconds': 0.05, 'cpu_seconds': 0.05, 'peak_rss_kb': 5 * 1024}
+TRIM = ("00:00:01", "00:00:04")
+GIF_FPS = 10
+
+# Matrix per profile: sources, presets and threads (0 = ffmpeg decides).
+PROFILES = {
+    'quick': {'sources': ['360p-10s'], 'presets': ['ultrafast'], 'threads': [1, 0]},
+    'full': {'sources': list(SOURCES), 'presets': ['ultrafast', 'veryfast', 'medium'], 'threads': [1, 2, 0]},
+}
+
+
+class BenchmarkError(Exception):
+    """Raised when a benchmark case cannot be run or measured."""
+    pass
+
+
+def build_cases(profile: str = 'quick', sources: list = None) -> list:
+    """
+    Returns the benchmark cases of a profile.
+
+    Presets only change libx264 encodes, so they are varied for MP4 only; formats
+    whose encoder ignores presets (webm, gif) vary threads, and audio extraction,
+    remuxes and trims run once per source.
+
+    Returns:
+        Dicts with 'name', 'source', 'output_format', 'preset', 'threads' and optionally
+        'start_time', 'end_time', 'allow_stream_copy' (default False) and 'smart_cut'.
+    """
+    matrix = PROFILES[profile]
+    cases = []
+    for source in sources or matrix['sources']:
+        def add(label, output_format, preset=matrix['presets'][0], threads=matrix['threads'][0], **options):
+            cases.append({'name': f"{source}/{label}", 'source': source, 'output_format': output_format, 'preset': preset, 'threads': threads, **options})
+        for preset in matrix['presets']:
+            for threads in matrix['threads']:
+                add(f"mp4/{preset}/t{threads}", 'mp4', preset, threads)
+        for threads in matrix['threads']:
+            add(f"webm/t{threads}", 'webm', threads=threads)
+            add(f"gif/t{threads}", 'gif', threads=threads)
+        add("mp3", 'mp3')
+        add("mov/remux", 'mov', allow_stream_copy=True)
+        add("mp4/trim", 'mp4', start_time=TRIM[0], end_time=TRIM[1])
+        add("mp4/trim-smart-cut", 'mp4', start_time=TRIM[0], end_time=TRIM[1], allow_stream_copy=True, smart_cut=True)
+    return cases
+
+
+def _media_seconds(case: dict) -> float:
+    duration = SOURCES[case['source']]['duration']
+    if case.get('start_time') or case.get('end_time'):
+        from src.core.converter import parse_timestamp
+        start = parse_timestamp(case['start_time']) if case.get('start_time') else 0.0
+        end = parse_timestamp(case['end_time']) if case.get('end_time') else duration
+        return max(0.0, min(end, duration) - start)
+    return float(duration)
+
+
+def _children_usage() -> tuple:
+    """Returns (CPU seconds, peak RSS in KiB) of the waited-for child processes so far."""
+    if resource is None:
+        return None, None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    peak_rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss # macOS reports bytes
+    return usage.ru_utime + usage.ru_stime, peak_rss_kb
+
+
+def run_case(case: dict, media_dir: str = DEFAULT_MEDIA_DIR, work_dir: str = None) -> dict:
+    """
+    Runs one case in this process and measures it.
+
+    Peak RSS is the largest of any child process this Python process ever waited for, so
+    call this in a fresh process (see run_isolated) for a per-case number.
+
+    Returns:
+        The case with 'status' ('ok'), 'mode', 'wall_seconds', 'cpu_seconds', 'peak_rss_kb',
+        'media_seconds', 'speed' (media seconds per wall second) and 'fps' (output video
+        frames per wall second, None for audio).
+
+    Raises:
+        BenchmarkError: If the source cannot be generated or the conversion fails.
+    """
+    from src.core.converter import Converter
+    from src.core.gif_engine import GifEngine
+    from src.core.media_probe import ProbeCache
+    from src.core.resource_governor import ResourceGovernor
+
+    try:
+        input_file_path = ensure_source(case['source'], media_dir)
+    except Exception as e:
+        raise BenchmarkError(str(e))
+    own_work_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="mediadl-bench-")
+    output_file_path = os.path.join(work_dir, f"{case['name'].replace('/', '_')}.{case['output_format']}")
+    # A private in-memory probe cache, a per-case palette directory and a governor sized to
+    # the machine keep the user's caches and settings out of the measurement; there is no
+    # result cache.
+    probe_cache = ProbeCache(db_path=None)
+    palette_dir = tempfile.mkdtemp(prefix="mediadl-bench-palettes-")
+    converter = Converter(probe_cache=probe_cache, governor=ResourceGovernor(),
+                          gif_engine=GifEngine(palette_dir=palette_dir, probe_cache=probe_cache))
+    try:
+        cpu_before, _ = _children_usage()
+        started = time.perf_counter()
+        converter.convert_media(input_file_path, output_file_path, case['output_format'], threads=case['threads'], preset=case['preset'],
+                                start_time=case.get('start_time'), end_time=case.get('end_time'), gif_fps=GIF_FPS,
+                                allow_stream_copy=case.get('allow_stream_copy', False), smart_cut=case.get('smart_cut', False))
+        wall_seconds = time.perf_counter() - started
+        cpu_after, peak_rss_kb = _children_usage()
+    except Exception as e:
+        raise BenchmarkError(f"{case['name']}: {e}")
+    finally:
+        shutil.rmtree(palette_dir, ignore_errors=True)
+        if own_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    media_seconds = _media_seconds(case)
+    if case['output_format'] == 'gif':
+        frames = media_seconds * GIF_FPS
+    elif case['output_format'] == 'mp3':
+        frames = None
+    else:
+        frames = media_seconds * SOURCES[case['source']]['rate']
+    return dict(case, status='ok', mode=(converter.last_conversion or {}).get('mode'), wall_seconds=round(wall_seconds, 4),
+                cpu_seconds=None if cpu_before is None else round(cpu_after - cpu_before, 4), peak_rss_kb=peak_rss_kb,
+                media_seconds=media_seconds, speed=round(media_seconds / wall_seconds, 3) if wall_seconds else None,
+                fps=round(frames / wall_seconds, 2) if frames and wall_seconds else None)
+
+
+def run_isolated(case: dict, media_dir: str = DEFAULT_MEDIA_DIR) -> dict:
+    """Runs one case in a fresh Python process; failures come back with status 'error'."""
+    handle, result_path = tempfile.mkstemp(prefix="mediadl-bench-", suffix=".json")
+    os.close(handle)
+    try:
+        cmd = [sys.executable, '-m', 'benchmarks.converter_bench', '--worker', json.dumps(case), '--result', result_path, '--media-dir', media_dir]
+        process = subprocess.run(cmd, cwd=project_root, capture_output=True, text=True)
+        try:
+            with open(result_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return dict(case, status='error', error=f"Worker exited with code {process.returncode}: {process.stderr[-2000:]}")
+    finally:
+        os.remove(result_path)
+
+
+def measure(case: dict, media_dir: str = DEFAULT_MEDIA_DIR, repeat: int = 1) -> dict:
+    """Runs a case `repeat` times and returns the run with the median wall time."""
+    runs = [run_isolated(case, media_dir) for _ in range(max(1, repeat))]
+    ok = [run for run in runs if run['status'] == 'ok']
+    if not ok:
+        return runs[-1]
+    ok.sort(key=lambda run: run['wall_seconds'])
+    result = dict(ok[(len(ok) - 1) // 2])
+    result['runs'] = len(ok)
+    if len(ok) > 1:
+        result['wall_seconds_stdev'] = round(statistics.stdev(run['wall_seconds'] for run in ok), 4)
+    return result
+
+
+def ffmpeg_version() -> str:
+    try:
+        output = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True).stdout
+    except OSError:
+        return None
+    return output.splitlines()[0] if output else None
+
+
+def machine_info() -> dict:
+    return {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count(), 'ffmpeg': ffmpeg_version()}
+
+
+def compare_results(results: list, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compares results with a baseline report (matched by case name).
+
+    Returns:
+        Regression dicts with 'name', 'metric', 'baseline' and 'current' (and 'change', the
+        relative growth). A case that worked in the baseline and fails now is reported
+        with metric 'status'. Cases missing from either side are ignored.
+    """
+    baseline_cases = {result['name']: result for result in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        base = baseline_cases.get(result['name'])
+        if base is None or base.get('status') != 'ok':
+            continue
+        if result.get('status') != 'ok':
+            regressions.append({'name': result['name'], 'metric': 'status', 'baseline': 'ok', 'current': result.get('status')})
+            continue
+        for metric, floor in NOISE_FLOORS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            if new > old * (1 + threshold) and new - old > floor:
+                regressions.append({'name': result['name'], 'metric': metric, 'baseline': old, 'current': new, 'change': round(new / old - 1, 3)})
+    return regressions
+
+
+def _format_row(result: dict) -> str:
+    if result['status'] != 'ok':
+        return f"{result['name']:<40} ERROR {result.get('error', '')[:80]}"
+    fps = f"{result['fps']:>8.1f}" if result.get('fps') else f"{'-':>8}"
+    cpu = f"{result['cpu_seconds']:>8.2f}" if result.get('cpu_seconds') is not None else f"{'-':>8}"
+    rss = f"{result['peak_rss_kb'] // 1024:>7}M" if result.get('peak_rss_kb') else f"{'-':>8}"
+    return f"{result['name']:<40} {result['wall_seconds']:>8.2f} {fps} {cpu} {rss} {result.get('mode') or '':>9}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Converter.convert_media on synthetic lavfi media.")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='quick')
+    parser.add_argument('--source', action='append', choices=sorted(SOURCES), help="Only these sources (repeatable).")
+    parser.add_argument('--filter', help="Only cases whose name contains this text.")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per case; the median is reported.")
+    parser.add_argument('--media-dir', default=DEFAULT_MEDIA_DIR, help="Where generated sources are kept.")
+    parser.add_argument('--output', help="Write the report as JSON to this file.")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help="Baseline report to compare with.")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the baseline.")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Relative growth flagged as a regression.")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        case = json.loads(args.worker)
+        try:
+            result = run_case(case, args.media_dir)
+        except BenchmarkError as e:
+            result = dict(case, status='error', error=str(e))
+        with open(args.result, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return 0
+
+    cases = build_cases(args.profile, args.source)
+    if args.filter:
+        cases = [case for case in cases if args.filter in case['name']]
+    print(f"{'case':<40} {'wall s':>8} {'fps':>8} {'cpu s':>8} {'rss':>8} {'mode':>9}")
+    results = []
+    for case in cases:
+        result = measure(case, args.media_dir, args.repeat)
+        print(_format_row(result), flush=True)
+        results.append(result)
+    report = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'profile': args.profile, 'machine': machine_info(), 'results': results}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    failed = [result for result in results if result['status'] != 'ok']
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('machine', {}).get('cpus') != report['machine']['cpus'] or baseline.get('machine', {}).get('ffmpeg') != report['machine']['ffmpeg']:
+            print("Warning: The baseline was recorded on a different machine or ffmpeg build.")
+        regressions = compare_results(results, baseline, args.threshold)
+        for regression in regressions:
+            change = f" (+{regression['change']:.0%})" if 'change' in regression else ""
+            print(f"REGRESSION {regression['name']} {regression['metric']}: {regression['baseline']} -> {regression['current']}{change}")
+        if not regressions:
+            print("No regressions against the baseline.")
+    if failed:
+        return 2
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import os
+import sys
+import subprocess
+
+# Synthetic sources: testsrc2 video with a sine tone, encoded as H.264/AAC in MP4
+# (what most downloads are). Name -> width, height, frame rate, duration in seconds.
+SOURCES = {
+    '360p-10s': {'width': 640, 'height': 360, 'rate': 30, 'duration': 10},
+    '360p-60s': {'width': 640, 'height': 360, 'rate': 30, 'duration': 60},
+    '720p-10s': {'width': 1280, 'height': 720, 'rate': 30, 'duration': 10},
+    '1080p-5s': {'width': 1920, 'height': 1080, 'rate': 30, 'duration': 5},
+}
+DEFAULT_MEDIA_DIR = os.path.join(os.path.expanduser("~"), ".mediadl", "benchmarks", "media")
+
+
+class MediaGenerationError(Exception):
+    """Raised when ffmpeg cannot generate a benchmark source."""
+    pass
+
+
+def source_command(output_file_path: str, width: int, height: int, rate: int, duration: float) -> list:
+    """
+    Builds the ffmpeg command that renders a synthetic source offline.
+
+    The encode is single-threaded and bit-exact, so the same ffmpeg build always
+    produces the same file and every benchmark run starts from identical input.
+    """
+    return ['ffmpeg', '-y', '-v', 'error',
+            '-f', 'lavfi', '-i', f"testsrc2=size={width}x{height}:rate={rate}:duration={duration}",
+            '-f', 'lavfi', '-i', f"sine=frequency=440:beep_factor=4:sample_rate=48000:duration={duration}",
+            '-map', '0:v:0', '-map', '1:a:0',
+            '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p', '-g', str(rate * 2),
+            '-c:a', 'aac', '-b:a', '128k', '-threads', '1',
+            '-fflags', '+bitexact', '-flags:v', '+bitexact', '-flags:a', '+bitexact',
+            '-shortest', output_file_path]
+
+
+def source_path(name: str, media_dir: str = DEFAULT_MEDIA_DIR) -> str:
+    spec = SOURCES[name]
+    return os.path.join(media_dir, f"{name}_{spec['width']}x{spec['height']}_{spec['rate']}fps_{spec['duration']}s.mp4")
+
+
+def ensure_source(name: str, media_dir: str = DEFAULT_MEDIA_DIR) -> str:
+    """
+    Returns the path of a synthetic source, rendering it first if it does not exist yet.
+
+    Raises:
+        KeyError: If `name` is not in SOURCES.
+        MediaGenerationError: If ffmpeg fails.
+    """
+    path = source_path(name, media_dir)
+    if os.path.exists(path):
+        return path
+    os.makedirs(media_dir, exist_ok=True)
+    spec = SOURCES[name]
+    temp_path = path + ".part.mp4"
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    try:
+        result = subprocess.run(source_command(temp_path, spec['width'], spec['height'], spec['rate'], spec['duration']),
+                                capture_output=True, creationflags=creationflags)
+    except OSError as e:
+        raise MediaGenerationError(f"Could not start ffmpeg: {e}")
+    if result.returncode != 0:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise MediaGenerationError(f"ffmpeg could not render '{name}': {result.stderr.decode('utf-8', 'replace')[-2000:]}")
+    os.replace(temp_path, path) # Only complete files ever appear under the final name
+    return path
@@ -0,0 +1,156 @@
+"""
+Headless entry point for single and batch runs: python -m src.cli [options] [URL or file ...]
+
+Downloads and/or converts each job through a JobQueue without importing the GUI (no Tk,
+VLC or PIL), and prints one JSON object per line for every progress update.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+if __name__ == "__main__" and __package__ is None: # Run as a script: python src/cli.py
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.job_queue import JobQueue, JobQueueError, JobRunner, download_convert_payload
+
+DEFAULT_PARALLEL_JOBS = 2
+_POLL_SECONDS = 0.2
+
+
+def read_jobs(path: str, jsonl: bool) -> list:
+    """
+    Reads a URL list (one URL or file path per line, '#' starts a comment) or a JSONL job
+    file ('-' reads standard input).
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If a JSONL line is not valid JSON.
+    """
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    jobs = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if jsonl:
+            try:
+                jobs.append(json.loads(line))
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: {e}")
+        else:
+            jobs.append(line)
+    return jobs
+
+
+class JsonLinesReporter:
+    """JobRunner progress callback that writes each update as one JSON line."""
+    def __init__(self, stream):
+        self.stream = stream
+        self.finished = {} # job id -> 'done', 'failed' or 'cancelled'
+        self._lock = threading.Lock()
+
+    def write(self, data: dict):
+        line = json.dumps(dict(data, time=round(time.time(), 3)), default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def __call__(self, job, data):
+        status = data.get('status')
+        if status == 'job_done':
+            self.finished[job['id']] = 'done'
+        elif status == 'job_failed' and not data.get('will_retry'):
+            self.finished[job['id']] = 'failed'
+        elif status == 'job_cancelled':
+            self.finished[job['id']] = 'cancelled'
+        payload = job['payload']
+        self.write(dict(data, job=job['id'], source=payload.get('url') or payload.get('input_file_path')))
+
+    def summary(self) -> dict:
+        states = list(self.finished.values())
+        return {'status': 'summary', 'done': states.count('done'), 'failed': states.count('failed'), 'cancelled': states.count('cancelled')}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Download and/or convert media without the GUI. Prints JSON progress lines.")
+    parser.add_argument('sources', nargs='*', help="URLs to download or local files to convert")
+    parser.add_argument('--urls', metavar='FILE', help="File with one URL or file path per line ('-' for stdin)")
+    parser.add_argument('--jobs', metavar='FILE', help="JSONL job file ('-' for stdin); each line holds 'url' or 'input_file_path' and optional settings")
+    parser.add_argument('-f', '--format', dest='output_format', help="Convert to this format (mp4, webm, mp3, gif, ...); without it URLs are only downloaded")
+    parser.add_argument('-o', '--output-dir', help="Where downloads and converted files go (default: current directory for downloads, next to the input for conversions)")
+    parser.add_argument('--preset', help="Encoder preset, e.g. 'fast'")
+    parser.add_argument('--threads', type=int, help="ffmpeg threads per conversion")
+    parser.add_argument('-j', '--parallel', type=int, default=DEFAULT_PARALLEL_JOBS, help="Jobs run at once")
+    parser.add_argument('--attempts', type=int, default=1, help="Times a failing job is tried")
+    parser.add_argument('--queue', metavar='PATH', help="Persistent job queue file; jobs left there by an interrupted run are picked up too")
+    return parser
+
+
+def main(argv=None) -> int:
+    """
+    Runs the CLI. Returns the exit code: 0 when every job succeeded, 1 when any failed,
+    2 for usage errors and 130 when interrupted.
+    """
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    sys.stdout = sys.stderr # Library messages must not mix with the JSON lines
+    try:
+        return _run(args, JsonLinesReporter(out))
+    finally:
+        sys.stdout = out
+
+
+def _run(args, reporter) -> int:
+    defaults = {'output_format': args.output_format, 'output_dir': args.output_dir, 'preset': args.preset, 'threads': args.threads}
+    try:
+        items = list(args.sources)
+        if args.urls:
+            items += read_jobs(args.urls, jsonl=False)
+        if args.jobs:
+            items += read_jobs(args.jobs, jsonl=True)
+        payloads = [download_convert_payload(item, defaults) for item in items]
+    except (OSError, ValueError, JobQueueError) as e:
+        reporter.write({'status': 'error', 'message': str(e)})
+        return 2
+    if not payloads and not args.queue:
+        reporter.write({'status': 'error', 'message': "No jobs given (pass URLs or files, --urls or --jobs)."})
+        return 2
+
+    try:
+        job_queue = JobQueue(db_path=args.queue or ":memory:", max_attempts=max(1, args.attempts))
+        job_ids = job_queue.submit_many([{'kind': 'download_convert', 'payload': payload} for payload in payloads])
+    except JobQueueError as e:
+        reporter.write({'status': 'error', 'message': str(e)})
+        return 2
+    reporter.write({'status': 'queued', 'jobs': job_ids})
+
+    runner = JobRunner(job_queue, workers=args.parallel, progress_callback=reporter, poll_interval=_POLL_SECONDS, name="cli")
+    runner.start()
+    try:
+        while True:
+            counts = job_queue.counts()
+            if not counts['queued'] and not counts['running']:
+                break
+            time.sleep(_POLL_SECONDS)
+    except KeyboardInterrupt:
+        runner.stop() # Running jobs go back to the queue
+        reporter.write(dict(reporter.summary(), status='interrupted'))
+        return 130
+    runner.stop()
+    job_queue.close()
+    summary = reporter.summary()
+    reporter.write(summary)
+    return 1 if summary['failed'] or summary['cancelled'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
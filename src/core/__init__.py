@@ -1,3 +1,75 @@
 # This file makes 'core' a package.
 from .downloader import Downloader, DownloadError
 from .converter import Converter, ConversionError
+import importlib
+
+# The other modules load on first use (`from src.core import JobServer` still works), so
+# importing one module of the package does not pull in the HTTP server, the folder
+# watcher, asyncio and the rest with it.
+_LAZY_EXPORTS = {
+    'ConverterPool': 'converter_pool',
+    'ConversionHandle': 'converter_pool',
+    'ProbeCache': 'media_probe',
+    'get_probe_cache': 'media_probe',
+    'inspect_media': 'media_probe',
+    'inspect_media_async': 'media_probe',
+    'SegmentedEncoder': 'segmented_encoder',
+    'GifEngine': 'gif_engine',
+    'AutoTuner': 'auto_tune',
+    'build_multi_output_command': 'multi_output',
+    'StreamingPipeline': 'streaming_pipeline',
+    'ResultCache': 'result_cache',
+    'get_result_cache': 'result_cache',
+    'AsyncConverter': 'async_converter',
+    'probe_media': 'async_converter',
+    'SmartCutter': 'smart_cut',
+    'KeyframeIndex': 'keyframe_index',
+    'KeyframeIndexError': 'keyframe_index',
+    'get_keyframe_index': 'keyframe_index',
+    'ScrubPreviewEngine': 'scrub_preview',
+    'ScrubPreviewError': 'scrub_preview',
+    'SpriteSheet': 'scrub_preview',
+    'RawFrame': 'frame_grab',
+    'FrameGrabError': 'frame_grab',
+    'grab_frame': 'frame_grab',
+    'JobQueue': 'job_queue',
+    'JobQueueError': 'job_queue',
+    'JobRunner': 'job_queue',
+    'JobContext': 'job_queue',
+    'ResourceGovernor': 'resource_governor',
+    'get_resource_governor': 'resource_governor',
+    'set_resource_governor': 'resource_governor',
+    'AudioExtractor': 'audio_pipeline',
+    'AUDIO_FORMATS': 'audio_pipeline',
+    'build_audio_command': 'audio_pipeline',
+    'DEFAULT_LADDER': 'abr_ladder',
+    'plan_ladder': 'abr_ladder',
+    'build_ladder_command': 'abr_ladder',
+    'CostModel': 'cost_model',
+    'CostModelError': 'cost_model',
+    'get_cost_model': 'cost_model',
+    'FFmpegCapabilities': 'ffmpeg_capabilities',
+    'FFmpegCapabilitiesError': 'ffmpeg_capabilities',
+    'detect_capabilities': 'ffmpeg_capabilities',
+    'get_ffmpeg_capabilities': 'ffmpeg_capabilities',
+    'WatchFolder': 'watch_folder',
+    'WatchFolderError': 'watch_folder',
+    'WatchCheckpoint': 'watch_folder',
+    'JobServer': 'job_server',
+    'JobServerError': 'job_server',
+}
+
+__all__ = ['Downloader', 'DownloadError', 'Converter', 'ConversionError'] + list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
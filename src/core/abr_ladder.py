@@ -0,0 +1,212 @@
+import os
+import glob
+import math
+import statistics
+
+from src.core.converter import ConversionError
+from src.core.frame_grab import display_size
+
+# Renditions by output height, best first: video bitrate, and the peak rate the encoder may
+# reach (maxrate; the buffer is twice the bitrate).
+DEFAULT_LADDER = [
+    {'height': 1080, 'video_bitrate': '5000k', 'max_bitrate': '5350k'},
+    {'height': 720, 'video_bitrate': '2800k', 'max_bitrate': '2996k'},
+    {'height': 480, 'video_bitrate': '1400k', 'max_bitrate': '1498k'},
+    {'height': 360, 'video_bitrate': '800k', 'max_bitrate': '856k'},
+]
+ABR_FORMATS = ('hls', 'dash')
+DEFAULT_SEGMENT_SECONDS = 4.0
+DEFAULT_AUDIO_BITRATE = '128k'
+# Codecs a copied top rung may use: both HLS (fMP4) and DASH players take H.264.
+COPY_VIDEO_CODECS = ('h264',)
+# Encoders of the encoded rungs and of the shared audio rendition.
+VIDEO_ENCODER = 'libx264'
+AUDIO_ENCODER = 'aac'
+# Keyframe intervals may drift this much (seconds) and still count as a fixed GOP.
+GOP_TOLERANCE = 0.02
+HLS_MASTER_NAME = 'master.m3u8'
+DASH_MANIFEST_NAME = 'manifest.mpd'
+
+
+_BITRATE_UNITS = {'': 1, 'k': 1000, 'm': 1000000}
+
+
+def parse_bitrate(value) -> float:
+    """
+    Returns a bitrate in bits per second from ffmpeg's notation: a plain number or one
+    with a k or M suffix, decimals allowed (800000, "1500.5k", "2.5M").
+
+    Raises:
+        ConversionError: If the value is not a positive bitrate.
+    """
+    text = str(value).strip()
+    unit = text[-1:].lower() if text[-1:].isalpha() else ''
+    try:
+        bits = float(text[:len(text) - len(unit)]) * _BITRATE_UNITS[unit]
+    except (KeyError, ValueError):
+        bits = None
+    if bits is None or not math.isfinite(bits) or bits <= 0:
+        raise ConversionError(f"Invalid bitrate '{value}' in the adaptive-bitrate ladder.")
+    return bits
+
+
+def fixed_gop_interval(keyframes: list):
+    """Returns the source's keyframe interval in seconds if it is constant, otherwise None."""
+    intervals = [b - a for a, b in zip(keyframes, keyframes[1:])]
+    if not intervals:
+        return None
+    interval = statistics.median(intervals)
+    if interval <= 0 or any(abs(d - interval) > GOP_TOLERANCE for d in intervals):
+        return None
+    return interval
+
+
+def plan_ladder(media_info: dict, ladder: list = None, keyframes: list = None, segment_seconds: float = DEFAULT_SEGMENT_SECONDS, trimmed: bool = False, allow_stream_copy: bool = True) -> tuple:
+    """
+    Decides which rungs are produced, and how.
+
+    Rungs taller than the source are dropped (a source smaller than every rung gets one
+    rung at its own height). The top rung is stream-copied when the source already is
+    H.264 at exactly that height with a fixed GOP: the encoded rungs then put their
+    keyframes on the source's, and segments span whole GOPs, so every rung switches at
+    the same instants.
+
+    Args:
+        media_info: Result of inspect_media() for the input.
+        ladder: Rung dicts with 'height', 'video_bitrate' and optionally 'max_bitrate'.
+        keyframes: Keyframe times of the source (KeyframeIndex.times); needed for copying.
+        segment_seconds: Wanted segment duration.
+
+    Returns:
+        A (rungs, segment_seconds, keyframe_interval) tuple. Each rung is a copy of its
+        ladder entry with 'index' and 'mode' ('copy' or 'transcode') added.
+
+    Raises:
+        ConversionError: If the input has no video stream.
+    """
+    video_stream = (media_info or {}).get('video_stream')
+    if not video_stream:
+        raise ConversionError("Input has no video stream for adaptive-bitrate output.")
+    ladder = sorted(ladder or DEFAULT_LADDER, key=lambda rung: rung['height'], reverse=True)
+    _, source_height = display_size(media_info)
+    rungs = [dict(rung) for rung in ladder if not source_height or rung['height'] <= source_height]
+    if not rungs:
+        rungs = [dict(ladder[-1], height=source_height)]
+
+    keyframe_interval = None
+    if allow_stream_copy and not trimmed and video_stream.get('codec_name') in COPY_VIDEO_CODECS and rungs[0]['height'] == source_height:
+        keyframe_interval = fixed_gop_interval(keyframes or [])
+    for index, rung in enumerate(rungs):
+        rung['index'] = index
+        rung['mode'] = 'copy' if index == 0 and keyframe_interval else 'transcode'
+    if keyframe_interval:
+        segment_seconds = keyframe_interval * max(1, round(segment_seconds / keyframe_interval))
+    return rungs, segment_seconds, keyframe_interval or segment_seconds
+
+
+def audio_codec(media_info: dict, trimmed: bool = False, allow_stream_copy: bool = True):
+    """Returns 'copy' or the encoder of the ladder's shared audio rendition, or None without audio."""
+    audio_stream = (media_info or {}).get('audio_stream')
+    if not audio_stream:
+        return None
+    if allow_stream_copy and not trimmed and audio_stream.get('codec_name') == 'aac':
+        return 'copy'
+    return AUDIO_ENCODER
+
+
+def build_ladder_command(input_file_path: str, output_dir: str, rungs: list, media_info: dict, formats=('hls',), segment_seconds: float = DEFAULT_SEGMENT_SECONDS, keyframe_interval: float = None, threads: int = 8, preset: str = 'ultrafast', start_time: str = None, end_time: str = None, audio_bitrate: str = DEFAULT_AUDIO_BITRATE, allow_stream_copy: bool = True) -> list:
+    """
+    Builds one ffmpeg command that decodes the input once and writes every rung.
+
+    Decoded video is fanned out with `split` and scaled per rung; every encoded rung gets
+    keyframes forced on the same timestamps (and no scene-cut keyframes), so segment
+    boundaries line up across rungs. The audio is encoded (or copied) once and shared.
+    DASH output also writes HLS playlists for the same fMP4 segments when both formats
+    are wanted.
+
+    Args:
+        rungs, segment_seconds, keyframe_interval: As returned by plan_ladder.
+        formats: 'hls' and/or 'dash'.
+        Other arguments are the same as for Converter.convert_abr.
+
+    Returns:
+        The argument list for subprocess.
+
+    Raises:
+        ConversionError: If a format is unknown or a rung's bitrate is invalid.
+    """
+    formats = [fmt.lower() for fmt in formats]
+    if not formats or any(fmt not in ABR_FORMATS for fmt in formats):
+        raise ConversionError(f"Unsupported adaptive-bitrate format(s): {', '.join(formats) or 'none'}")
+    audio_stream = (media_info or {}).get('audio_stream')
+    keyframe_interval = keyframe_interval or segment_seconds
+
+    cmd = ['ffmpeg', '-y']
+    if start_time:
+        cmd += ['-ss', str(start_time)]
+    if end_time:
+        cmd += ['-to', str(end_time)]
+    cmd += ['-i', input_file_path]
+    encoded = [rung for rung in rungs if rung['mode'] != 'copy']
+    if encoded:
+        graph = [f"[0:v:0]split={len(encoded)}" + "".join(f"[s{rung['index']}]" for rung in encoded)]
+        graph += [f"[s{rung['index']}]scale=-2:{rung['height']}[v{rung['index']}]" for rung in encoded]
+        cmd += ['-filter_complex', ";".join(graph)]
+
+    for rung in rungs:
+        i = rung['index']
+        if rung['mode'] == 'copy':
+            cmd += ['-map', '0:v:0', f'-c:v:{i}', 'copy']
+            continue
+        bitrate = rung['video_bitrate']
+        max_bitrate = rung.get('max_bitrate', bitrate)
+        parse_bitrate(max_bitrate)
+        buffer_size = f"{max(1, round(parse_bitrate(bitrate) * 2 / 1000))}k"
+        cmd += ['-map', f"[v{i}]", f'-c:v:{i}', VIDEO_ENCODER, f'-b:v:{i}', bitrate, f'-maxrate:v:{i}', max_bitrate, f'-bufsize:v:{i}', buffer_size,
+                f'-force_key_frames:v:{i}', f"expr:gte(t,n_forced*{keyframe_interval:g})"]
+    if encoded:
+        cmd += ['-preset', preset, '-sc_threshold', '0', '-pix_fmt', 'yuv420p']
+    acodec = audio_codec(media_info, trimmed=bool(start_time or end_time), allow_stream_copy=allow_stream_copy)
+    if acodec:
+        cmd += ['-map', '0:a:0', '-c:a', 'copy'] if acodec == 'copy' else ['-map', '0:a:0', '-c:a', acodec, '-b:a', audio_bitrate, '-ac', '2']
+    if threads is not None:
+        cmd += ['-threads', str(threads)]
+
+    if 'dash' in formats:
+        cmd += ['-f', 'dash', '-seg_duration', f"{segment_seconds:g}", '-use_template', '1', '-use_timeline', '1',
+                '-adaptation_sets', "id=0,streams=v id=1,streams=a" if audio_stream else "id=0,streams=v"]
+        if 'hls' in formats:
+            cmd += ['-hls_playlist', '1', '-hls_master_name', HLS_MASTER_NAME]
+        cmd.append(os.path.join(output_dir, DASH_MANIFEST_NAME))
+    else:
+        variants = [f"v:{rung['index']},agroup:audio" if audio_stream else f"v:{rung['index']}" for rung in rungs]
+        if audio_stream:
+            variants.append("a:0,agroup:audio,default:yes")
+        cmd += ['-f', 'hls', '-hls_time', f"{segment_seconds:g}", '-hls_playlist_type', 'vod', '-hls_segment_type', 'fmp4',
+                '-hls_fmp4_init_filename', 'init.mp4', '-hls_segment_filename', os.path.join(output_dir, 'stream_%v', 'segment_%05d.m4s'),
+                '-master_pl_name', HLS_MASTER_NAME, '-var_stream_map', " ".join(variants),
+                os.path.join(output_dir, 'stream_%v', 'playlist.m3u8')]
+    return cmd
+
+
+def manifest_paths(output_dir: str, formats) -> dict:
+    """Returns the manifest path per format ('hls' -> master playlist, 'dash' -> MPD)."""
+    formats = [fmt.lower() for fmt in formats]
+    paths = {}
+    if 'hls' in formats:
+        paths['hls'] = os.path.join(output_dir, HLS_MASTER_NAME)
+    if 'dash' in formats:
+        paths['dash'] = os.path.join(output_dir, DASH_MANIFEST_NAME)
+    return paths
+
+
+def rung_segment_counts(output_dir: str, rungs: list, formats) -> list:
+    """Returns the number of media segments written so far for every rung."""
+    counts = []
+    for rung in rungs:
+        if 'dash' in [fmt.lower() for fmt in formats]:
+            pattern = os.path.join(output_dir, f"chunk-stream{rung['index']}-*")
+        else:
+            pattern = os.path.join(output_dir, f"stream_{rung['index']}", "segment_*")
+        counts.append(len(glob.glob(pattern)))
+    return counts
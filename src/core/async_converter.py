@@ -0,0 +1,202 @@
+import os
+import json
+import asyncio
+import collections
+
+from src.core.converter import (Converter, ConversionError, DEFAULT_STATS_PERIOD, STDERR_TAIL_LINES, AUTO_PRESET, DEFAULT_PRESET,
+                                parse_progress_block, progress_command)
+from src.core.media_probe import get_probe_cache, summarize_probe
+
+DEFAULT_MAX_CONCURRENT = 4
+
+
+async def probe_media(path: str, cache=None) -> dict:
+    """
+    Async counterpart of inspect_media: runs ffprobe as an asyncio subprocess.
+
+    Results go through the same ProbeCache as inspect_media.
+
+    Raises:
+        ConversionError: If ffprobe fails.
+        FileNotFoundError: If the file does not exist.
+    """
+    cache = cache or get_probe_cache()
+    probe = cache.get(path)
+    if probe is not None:
+        cache.hits += 1
+        return summarize_probe(path, probe)
+    cache.misses += 1
+    try:
+        process = await asyncio.create_subprocess_exec('ffprobe', '-show_format', '-show_streams', '-of', 'json', path,
+                                                       stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    except OSError as e:
+        raise ConversionError(f"Could not start ffprobe: {e}")
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise ConversionError(f"ffprobe error (return code {process.returncode}): {stderr.decode('utf-8', 'replace')[-2000:]}")
+    probe = json.loads(stdout.decode('utf-8', 'replace'))
+    cache.put(path, probe)
+    return summarize_probe(path, probe)
+
+
+class AsyncConverter:
+    """
+    Runs conversions as asyncio subprocesses, so one event loop can supervise many ffmpeg
+    processes without a thread per job.
+
+    Commands come from Converter.build_command, so stream-copy planning and codec choices
+    match convert_media. A semaphore bounds how many ffmpeg processes run at once.
+    Cancelling the awaiting task (or an asyncio timeout) kills ffmpeg and removes the
+    partial output.
+    """
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT, stats_period: float = DEFAULT_STATS_PERIOD, stderr_tail_lines: int = STDERR_TAIL_LINES, probe_cache=None):
+        """
+        Args:
+            max_concurrent: Number of ffmpeg processes allowed to run at once.
+            stats_period: Seconds between progress updates from ffmpeg.
+            stderr_tail_lines: Number of ffmpeg stderr lines kept for error messages.
+            probe_cache: ProbeCache used for ffprobe results. Defaults to the shared cache.
+        """
+        self.max_concurrent = max_concurrent
+        self.stats_period = stats_period
+        self.stderr_tail_lines = stderr_tail_lines
+        self.probe_cache = probe_cache
+        self.converter = Converter(stats_period=stats_period, stderr_tail_lines=stderr_tail_lines, probe_cache=probe_cache)
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def convert(self, input_file_path: str, output_file_path: str, output_format: str, threads: int = 8, preset: str = 'ultrafast', progress_callback=None, start_time: str = None, end_time: str = None, gif_fps: int = 10, gif_scale_width: int = 480, allow_stream_copy: bool = True, timeout: float = None) -> str:
+        """
+        Converts a media file; the async counterpart of Converter.convert_media.
+
+        Args:
+            timeout: Seconds the whole job (including waiting for a free slot) may take.
+                None waits indefinitely.
+            progress_callback: Called on the event loop with the same updates convert_media
+                sends. Must not block.
+            Other arguments are the same as for Converter.convert_media. GIFs are rendered
+            with build_command's single-process palette graph, and preset 'auto' falls
+            back to the default preset.
+
+        Returns:
+            The full path to the converted file.
+
+        Raises:
+            ConversionError: If ffmpeg fails or the timeout expires.
+            FileNotFoundError: If the input file does not exist.
+            asyncio.CancelledError: If the task is cancelled.
+        """
+        if not os.path.exists(input_file_path):
+            raise FileNotFoundError(f"Input file not found: {input_file_path}")
+        job = self._convert(input_file_path, output_file_path, output_format, threads, preset, progress_callback,
+                            start_time, end_time, gif_fps, gif_scale_width, allow_stream_copy)
+        if timeout is None:
+            return await job
+        try:
+            return await asyncio.wait_for(job, timeout)
+        except asyncio.TimeoutError:
+            raise ConversionError(f"Conversion timed out after {timeout} seconds.")
+
+    async def _convert(self, input_file_path, output_file_path, output_format, threads, preset, progress_callback, start_time, end_time, gif_fps, gif_scale_width, allow_stream_copy):
+        output_dir = os.path.dirname(output_file_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        media_info = None
+        try:
+            media_info = await probe_media(input_file_path, cache=self.probe_cache)
+        except ConversionError as e:
+            print(f"Warning: Could not probe input file: {e}")
+        if preset == AUTO_PRESET:
+            preset = DEFAULT_PRESET # Auto-tuning runs blocking trial encodes
+
+        cmd, plan = self.converter.build_command(input_file_path, output_file_path, output_format, threads=threads, preset=preset,
+                                                 start_time=start_time, end_time=end_time, gif_fps=gif_fps, gif_scale_width=gif_scale_width,
+                                                 media_info=media_info, allow_stream_copy=allow_stream_copy)
+        total_duration_seconds = self.converter._get_output_duration(media_info, start_time, end_time)
+
+        async with self._semaphore:
+            await self._run_ffmpeg(cmd, output_file_path, progress_callback, total_duration_seconds)
+
+        if progress_callback:
+            progress_callback({'status': 'finished_conversion', 'filename': output_file_path, 'mode': plan['mode']})
+        return output_file_path
+
+    async def _run_ffmpeg(self, cmd, output_file_path, progress_callback, total_duration_seconds):
+        try:
+            process = await asyncio.create_subprocess_exec(*progress_command(cmd, self.stats_period), stdin=asyncio.subprocess.DEVNULL,
+                                                           stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        except OSError as e:
+            raise ConversionError(f"Could not start ffmpeg: {e}")
+
+        stderr_tail = collections.deque(maxlen=self.stderr_tail_lines)
+
+        async def drain_stderr():
+            async for line in process.stderr:
+                stderr_tail.append(line.decode('utf-8', 'replace'))
+
+        stderr_task = asyncio.ensure_future(drain_stderr())
+        try:
+            block = {}
+            async for raw_line in process.stdout:
+                key, sep, value = raw_line.decode('utf-8', 'replace').strip().partition("=")
+                if not sep:
+                    continue
+                block[key] = value.strip()
+                if key == "progress": # Last key of every block
+                    if progress_callback:
+                        progress_callback(parse_progress_block(block, total_duration_seconds))
+                    block = {}
+            await process.wait()
+            await stderr_task
+        except BaseException: # Cancelled or timed out: never leave ffmpeg or a partial output behind
+            if process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+            stderr_task.cancel()
+            if os.path.exists(output_file_path):
+                os.remove(output_file_path)
+            raise
+
+        if process.returncode != 0:
+            raise ConversionError(f"ffmpeg error (return code {process.returncode}): {''.join(stderr_tail)}")
+
+    async def iter_progress(self, input_file_path: str, output_file_path: str, output_format: str, **options):
+        """
+        Runs a conversion and yields its progress updates as they arrive.
+
+        Takes the same arguments as convert(). The last update has status
+        'finished_conversion'; a failed job raises its exception from the iterator.
+        Leaving the `async for` early cancels the conversion.
+        """
+        queue = asyncio.Queue()
+        task = asyncio.ensure_future(self.convert(input_file_path, output_file_path, output_format, progress_callback=queue.put_nowait, **options))
+        task.add_done_callback(lambda _: queue.put_nowait(None)) # Wakes the iterator when the job ends
+        try:
+            while True:
+                update = await queue.get()
+                if update is None:
+                    break
+                yield update
+            task.result() # Re-raises the job's error, if any
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+    async def convert_many(self, jobs: list, return_exceptions: bool = True) -> list:
+        """
+        Runs many conversions concurrently (bounded by max_concurrent).
+
+        Args:
+            jobs: Dicts of keyword arguments for convert().
+            return_exceptions: Return failures in the result list instead of raising the first.
+
+        Returns:
+            One output path (or exception) per job, in job order.
+        """
+        return await asyncio.gather(*(self.convert(**job) for job in jobs), return_exceptions=return_exceptions)
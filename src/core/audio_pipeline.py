@@ -0,0 +1,281 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.converter import ConversionError, FFmpegProcess, DEFAULT_STATS_PERIOD, STDERR_TAIL_LINES, parse_timestamp
+from src.core.media_probe import inspect_media
+
+# Audio targets: ffmpeg muxer, encoder, and the source codecs (ffprobe codec_name) the
+# container takes as-is, so they are stream-copied instead of re-encoded.
+AUDIO_FORMATS = {
+    'mp3': {'muxer': 'mp3', 'encoder': 'libmp3lame', 'copy_codecs': {'mp3'}},
+    'm4a': {'muxer': 'ipod', 'encoder': 'aac', 'copy_codecs': {'aac', 'alac'}},
+    'aac': {'muxer': 'adts', 'encoder': 'aac', 'copy_codecs': {'aac'}},
+    'opus': {'muxer': 'opus', 'encoder': 'libopus', 'copy_codecs': {'opus'}},
+    'ogg': {'muxer': 'ogg', 'encoder': 'libvorbis', 'copy_codecs': {'vorbis', 'opus', 'flac'}},
+    'flac': {'muxer': 'flac', 'encoder': 'flac', 'copy_codecs': {'flac'}},
+    'wav': {'muxer': 'wav', 'encoder': 'pcm_s16le', 'copy_codecs': {'pcm_s16le'}},
+}
+# Containers that carry cover art as an attached picture stream.
+COVER_ART_FORMATS = ('mp3', 'm4a', 'flac')
+# Audio encoders are (nearly) single-threaded; one thread per process lets the pool fill the CPUs.
+AUDIO_THREADS = 1
+
+
+def plan_audio(audio_stream: dict, output_format: str, trimmed: bool = False, allow_stream_copy: bool = True) -> dict:
+    """
+    Decides whether an audio stream is copied or encoded for output_format.
+
+    Returns:
+        A dict with 'mode' ('remux' or 'transcode') and 'acodec' ('copy' or the encoder).
+    """
+    spec = AUDIO_FORMATS[output_format]
+    if allow_stream_copy and not trimmed and audio_stream and audio_stream.get('codec_name') in spec['copy_codecs']:
+        return {'mode': 'remux', 'acodec': 'copy'}
+    return {'mode': 'transcode', 'acodec': spec['encoder']}
+
+
+def build_audio_command(input_file_path: str, output_file_path: str, output_format: str, media_info: dict, bitrate: str = None, start_time: str = None, end_time: str = None, allow_stream_copy: bool = True, keep_cover_art: bool = True) -> tuple:
+    """
+    Builds an ffmpeg command that extracts the first audio stream without touching video.
+
+    Only the audio stream (and, if wanted, an attached cover picture, which is a single
+    packet) is mapped, so the demuxer discards every video packet and nothing is decoded
+    unless the audio itself has to be re-encoded.
+
+    Args:
+        media_info: Result of inspect_media() for the input.
+        bitrate: Encoder bitrate (e.g., "192k"); ignored for stream copies and lossless targets.
+        keep_cover_art: Copy an attached cover picture into containers that support one.
+        Other arguments are the same as for AudioExtractor.extract.
+
+    Returns:
+        A (cmd, plan) tuple; see plan_audio.
+
+    Raises:
+        ConversionError: If the format is unsupported or the input has no audio.
+    """
+    fmt = output_format.lower()
+    if fmt not in AUDIO_FORMATS:
+        raise ConversionError(f"Unsupported audio format: {output_format}")
+    audio_stream = (media_info or {}).get('audio_stream')
+    if media_info and not audio_stream:
+        raise ConversionError(f"Input has no audio stream: {input_file_path}")
+    plan = plan_audio(audio_stream, fmt, trimmed=bool(start_time or end_time), allow_stream_copy=allow_stream_copy)
+
+    cmd = ['ffmpeg', '-y']
+    if start_time:
+        cmd += ['-ss', start_time]
+    if end_time:
+        cmd += ['-to', end_time]
+    cmd += ['-i', input_file_path, '-map', '0:a:0', '-map_metadata', '0', '-c:a', plan['acodec']]
+    if bitrate and plan['acodec'] != 'copy' and fmt not in ('flac', 'wav'):
+        cmd += ['-b:a', bitrate]
+    video_stream = (media_info or {}).get('video_stream')
+    if keep_cover_art and fmt in COVER_ART_FORMATS and video_stream and (video_stream.get('disposition') or {}).get('attached_pic'):
+        cmd += ['-map', '0:v:0', '-c:v', 'copy', '-disposition:v:0', 'attached_pic']
+    else:
+        cmd += ['-vn']
+    cmd += ['-sn', '-dn', '-threads', str(AUDIO_THREADS), '-f', AUDIO_FORMATS[fmt]['muxer'], output_file_path]
+    return cmd, plan
+
+
+class AudioExtractor:
+    """
+    Extracts audio tracks, one at a time or as a large batch.
+
+    Every file is probed through the shared ProbeCache (so a re-run of an archive job
+    does not probe again), audio that the target container already takes is
+    stream-copied, and batches run on a bounded pool of single-threaded ffmpeg
+    processes.
+    """
+    def __init__(self, max_workers: int = None, probe_cache=None, governor=None, stats_period: float = DEFAULT_STATS_PERIOD, stderr_tail_lines: int = STDERR_TAIL_LINES):
+        """
+        Args:
+            max_workers: ffmpeg processes run at once by extract_many. Defaults to the CPU count.
+            probe_cache: ProbeCache used for ffprobe results. Defaults to the shared cache.
+            governor: ResourceGovernor the ffmpeg runs take their threads from. Defaults to the shared one.
+            stats_period: Seconds between progress updates from ffmpeg.
+            stderr_tail_lines: Number of ffmpeg stderr lines kept for error messages.
+        """
+        self.max_workers = max_workers if max_workers and max_workers > 0 else (os.cpu_count() or 1)
+        self.probe_cache = probe_cache
+        self.governor = governor
+        self.stats_period = stats_period
+        self.stderr_tail_lines = stderr_tail_lines
+        self._stop_flag = threading.Event()
+        self._processes = set()
+        self._lock = threading.Lock()
+
+    def stop(self):
+        """Stops the running extraction(s); batch jobs that have not started are skipped."""
+        self._stop_flag.set()
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            process.kill()
+
+    def reset_stop(self, stop_event: threading.Event = None):
+        """
+        Clears the stop flag for a new run. A stop_event owned by the caller that is already
+        set keeps the run stopped, so a stop requested just before the run began is not lost.
+        """
+        self._stop_flag.clear()
+        if stop_event is not None and stop_event.is_set():
+            self._stop_flag.set()
+
+    def extract(self, input_file_path: str, output_file_path: str, output_format: str = 'mp3', bitrate: str = None, start_time: str = None, end_time: str = None, allow_stream_copy: bool = True, keep_cover_art: bool = True, progress_callback=None, stop_event: threading.Event = None) -> str:
+        """
+        Extracts the audio of one file.
+
+        Args:
+            input_file_path: Path to the input media file.
+            output_file_path: Path of the audio file to write.
+            output_format: One of AUDIO_FORMATS.
+            bitrate: Encoder bitrate (e.g., "192k"). None uses the encoder's default.
+            start_time, end_time: Optional trim (e.g., "00:01:10"); trimmed audio is re-encoded.
+            allow_stream_copy: False forces a re-encode.
+            keep_cover_art: Carry an attached cover picture over where the container allows.
+            progress_callback: Receives 'converting' updates and a final 'finished_conversion'
+                with the 'mode' ('remux' or 'transcode').
+            stop_event: The caller's cancel flag. If it is set, the extraction stops even when
+                it was set before the extraction started.
+
+        Returns:
+            The full path to the audio file.
+
+        Raises:
+            ConversionError: If probing or ffmpeg fails, the input has no audio, or the
+                extraction is stopped.
+            FileNotFoundError: If the input file does not exist.
+        """
+        self.reset_stop(stop_event)
+        return self._extract(input_file_path, output_file_path, output_format, bitrate=bitrate, start_time=start_time, end_time=end_time,
+                             allow_stream_copy=allow_stream_copy, keep_cover_art=keep_cover_art, progress_callback=progress_callback)
+
+    def _extract(self, input_file_path, output_file_path, output_format, bitrate=None, start_time=None, end_time=None, allow_stream_copy=True, keep_cover_art=True, progress_callback=None):
+        # extract() without resetting the stop flag, so extract_many's workers honour a batch-wide stop
+        if not os.path.exists(input_file_path):
+            raise FileNotFoundError(f"Input file not found: {input_file_path}")
+        try:
+            media_info = inspect_media(input_file_path, cache=self.probe_cache)
+        except Exception as e:
+            raise ConversionError(f"Could not probe input file: {e}")
+        # ffmpeg writes to a .part file that only replaces the output once it is complete, so an
+        # interrupted run never leaves a truncated track for skip_existing to keep.
+        part_path = output_file_path + ".part"
+        cmd, plan = build_audio_command(input_file_path, part_path, output_format, media_info, bitrate=bitrate, start_time=start_time,
+                                        end_time=end_time, allow_stream_copy=allow_stream_copy, keep_cover_art=keep_cover_art)
+        output_dir = os.path.dirname(output_file_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        start_seconds = parse_timestamp(start_time) if start_time else 0.0
+        end_seconds = parse_timestamp(end_time) if end_time else media_info['duration']
+        if self._stop_flag.is_set():
+            raise ConversionError("Conversion stopped by user.")
+        process = FFmpegProcess(cmd, stop_flag=self._stop_flag, stats_period=self.stats_period, stderr_tail_lines=self.stderr_tail_lines, governor=self.governor)
+        with self._lock:
+            self._processes.add(process)
+        try:
+            process.run(progress_callback=progress_callback, total_duration_seconds=max(0.0, end_seconds - start_seconds))
+            os.replace(part_path, output_file_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path) # Never leave a truncated track behind
+            raise
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+        if progress_callback:
+            progress_callback({'status': 'finished_conversion', 'filename': output_file_path, 'mode': plan['mode']})
+        return output_file_path
+
+    @staticmethod
+    def output_path_for(input_file_path: str, output_dir: str, output_format: str, source_root: str = None) -> str:
+        """
+        Returns <output_dir>/<input name>.<format>, or with source_root given,
+        <output_dir>/<input directory relative to source_root>/<input name>.<format>.
+        """
+        base = os.path.splitext(os.path.basename(input_file_path))[0]
+        if source_root:
+            relative_dir = os.path.relpath(os.path.dirname(os.path.abspath(input_file_path)), source_root)
+            if relative_dir != os.curdir and not relative_dir.startswith(os.pardir):
+                output_dir = os.path.join(output_dir, relative_dir)
+        return os.path.join(output_dir, f"{base}.{output_format.lower()}")
+
+    @classmethod
+    def output_paths_for(cls, input_file_paths: list, output_dir: str, output_format: str) -> list:
+        """
+        Returns one output path per input for a batch. The inputs' directories are mirrored
+        below output_dir (relative to the deepest directory they share), and inputs that
+        would still land on the same path (01.flac and 01.wav) get _1, _2, ... in input
+        order, so no two inputs write the same file.
+        """
+        directories = [os.path.dirname(os.path.abspath(path)) for path in input_file_paths]
+        try:
+            source_root = os.path.commonpath(directories) if directories else None
+        except ValueError: # Different drives
+            source_root = None
+        taken, paths = set(), []
+        for input_file_path in input_file_paths:
+            path = cls.output_path_for(input_file_path, output_dir, output_format, source_root)
+            stem, extension = os.path.splitext(path)
+            counter = 1
+            while os.path.normcase(path) in taken:
+                path = f"{stem}_{counter}{extension}"
+                counter += 1
+            taken.add(os.path.normcase(path))
+            paths.append(path)
+        return paths
+
+    def extract_many(self, input_file_paths, output_dir: str, output_format: str = 'mp3', skip_existing: bool = True, progress_callback=None, stop_event: threading.Event = None, **options) -> list:
+        """
+        Extracts the audio of many files on a bounded worker pool.
+
+        Args:
+            input_file_paths: Paths of the input files.
+            output_dir: Directory the tracks are written to (see output_paths_for).
+            output_format: One of AUDIO_FORMATS.
+            skip_existing: Skip inputs whose output exists and is newer than the input, so an
+                interrupted archive job picks up where it stopped.
+            progress_callback: Receives every file's updates with 'index', 'input_file_path' and
+                'total' added; skipped files report status 'skipped'.
+            stop_event: The caller's cancel flag (see extract).
+            options: Passed on to extract (bitrate, allow_stream_copy, keep_cover_art, ...).
+
+        Returns:
+            One (input path, output path or exception) tuple per input, in input order.
+            A failed file does not stop the batch.
+        """
+        input_file_paths = list(input_file_paths)
+        total = len(input_file_paths)
+        output_file_paths = self.output_paths_for(input_file_paths, output_dir, output_format)
+        self.reset_stop(stop_event)
+
+        def job(index, input_file_path):
+            def callback(data):
+                if progress_callback:
+                    progress_callback(dict(data, index=index, input_file_path=input_file_path, total=total))
+            output_file_path = output_file_paths[index]
+            if self._stop_flag.is_set():
+                raise ConversionError("Conversion stopped by user.")
+            if skip_existing and os.path.exists(output_file_path) and os.path.exists(input_file_path) \
+                    and os.path.getmtime(output_file_path) >= os.path.getmtime(input_file_path):
+                callback({'status': 'skipped', 'filename': output_file_path})
+                return output_file_path
+            try:
+                return self._extract(input_file_path, output_file_path, output_format, progress_callback=callback, **options)
+            except Exception as e:
+                callback({'status': 'error', 'message': str(e)})
+                raise
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, total)), thread_name_prefix="audio-extract") as executor:
+            futures = [executor.submit(job, index, path) for index, path in enumerate(input_file_paths)]
+        results = []
+        for path, future in zip(input_file_paths, futures):
+            try:
+                results.append((path, future.result()))
+            except Exception as e:
+                results.append((path, e))
+        return results
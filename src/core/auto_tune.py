@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import time
+import shutil
+import platform
+import tempfile
+import threading
+
+from src.core.converter import ConversionError, FFmpegProcess, FORMAT_ENCODERS
+from src.core.media_probe import inspect_media
+
+DEFAULT_TUNE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".mediadl", "auto_tune.json")
+DEFAULT_PRESETS = ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium')
+# Encoders whose speed/quality trade-off is controlled by -preset.
+PRESET_ENCODERS = {'libx264'}
+DEFAULT_TARGET_SSIM = 0.97
+
+_SSIM_RE = re.compile(r"SSIM .*All:([0-9.]+)")
+
+
+def machine_key() -> str:
+    """Identifies this machine for cached tuning decisions."""
+    return f"{platform.node()}|{platform.machine()}|{os.cpu_count() or 1}cpu"
+
+
+class AutoTuner:
+    """
+    Picks the encoder preset and thread count for a job from measured throughput.
+
+    A few short samples of the input are encoded at each candidate preset/threads
+    combination. The fastest candidate that meets the quality target (SSIM against the
+    source, from ffmpeg's ssim filter) and the optional bitrate cap wins. Decisions are
+    cached per machine, encoder, resolution and target, so later jobs skip the trials.
+    """
+    def __init__(self, cache_path: str = DEFAULT_TUNE_CACHE_PATH, sample_count: int = 2, sample_seconds: float = 3.0, candidate_presets=DEFAULT_PRESETS, candidate_threads=None, probe_cache=None):
+        """
+        Args:
+            cache_path: JSON file holding cached decisions. None disables persistence.
+            sample_count: Number of samples taken from evenly spaced points of the input.
+            sample_seconds: Length of each sample.
+            candidate_presets: Presets tried for encoders that support -preset.
+            candidate_threads: Thread counts tried. Defaults to a quarter, half and all CPUs.
+            probe_cache: ProbeCache used for ffprobe results. Defaults to the shared cache.
+        """
+        cpu_count = os.cpu_count() or 1
+        self.cache_path = cache_path
+        self.sample_count = sample_count
+        self.sample_seconds = sample_seconds
+        self.candidate_presets = tuple(candidate_presets)
+        self.candidate_threads = tuple(candidate_threads) if candidate_threads else tuple(sorted({max(1, cpu_count // 4), max(1, cpu_count // 2), cpu_count}))
+        self.probe_cache = probe_cache
+        self._lock = threading.Lock()
+        self._decisions = self._load_cache()
+
+    def _load_cache(self) -> dict:
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError): # Missing, unreadable or corrupt: measure again
+            return {}
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            cache_dir = os.path.dirname(self.cache_path)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok=True)
+            with open(self.cache_path, 'w') as f:
+                json.dump(self._decisions, f, indent=4)
+        except IOError as e:
+            print(f"Warning: Could not save auto-tune cache: {e}")
+
+    @staticmethod
+    def _height_bucket(media_info: dict) -> str:
+        height = ((media_info or {}).get('video_stream') or {}).get('height') or 0
+        for bucket in (360, 480, 720, 1080, 1440, 2160):
+            if height <= bucket:
+                return f"{bucket}p"
+        return "4320p"
+
+    def decision_key(self, encoder: str, media_info: dict, target_ssim: float, max_kbps: float) -> str:
+        return "|".join([machine_key(), encoder, self._height_bucket(media_info), f"ssim>={target_ssim}", f"kbps<={max_kbps}"])
+
+    def tune(self, input_file_path: str, output_format: str, target_ssim: float = DEFAULT_TARGET_SSIM, max_kbps: float = None, force: bool = False, encoder: str = None) -> dict:
+        """
+        Returns the tuned settings for converting input_file_path to output_format.
+
+        Args:
+            input_file_path: Path to the input media file.
+            output_format: The target format (e.g., "mp4").
+            target_ssim: Minimum SSIM (0-1) a candidate must reach. None skips the quality check.
+            max_kbps: Optional video bitrate cap a candidate must stay under.
+            force: Re-run the trials even if a cached decision exists.
+            encoder: The video encoder the conversion will use (see Converter.encoders_for).
+                Defaults to the format's FORMAT_ENCODERS entry.
+
+        Returns:
+            A dict with 'preset', 'threads', 'fps', 'ssim', 'kbps' and 'from_cache'.
+
+        Raises:
+            ConversionError: If the format has no video encoder or every trial fails.
+        """
+        encoder = encoder or FORMAT_ENCODERS.get(output_format.lower(), (None, None))[0]
+        if not encoder:
+            raise ConversionError(f"Auto-tune needs a video format, got '{output_format}'.")
+        media_info = inspect_media(input_file_path, cache=self.probe_cache)
+        key = self.decision_key(encoder, media_info, target_ssim, max_kbps)
+
+        with self._lock:
+            cached = self._decisions.get(key)
+        if cached and not force:
+            return {**cached, 'from_cache': True}
+
+        results = self.run_trials(input_file_path, encoder, media_info, measure_ssim=target_ssim is not None)
+        decision = self.choose(results, target_ssim, max_kbps)
+        with self._lock:
+            self._decisions[key] = decision
+            self._save_cache()
+        return {**decision, 'from_cache': False}
+
+    def _sample_starts(self, duration: float) -> list:
+        if duration <= self.sample_seconds:
+            return [0.0]
+        usable = duration - self.sample_seconds
+        return [usable * (i + 1) / (self.sample_count + 1) for i in range(self.sample_count)]
+
+    def run_trials(self, input_file_path: str, encoder: str, media_info: dict, measure_ssim: bool = True) -> list:
+        """
+        Encodes every sample with every candidate.
+
+        Returns:
+            One dict per candidate with 'preset', 'threads', 'fps' (encoded frames per
+            second of wall time), 'kbps' and 'ssim' (None if not measured), averaged over samples.
+        """
+        presets = self.candidate_presets if encoder in PRESET_ENCODERS else (None,)
+        starts = self._sample_starts(media_info['duration'])
+        work_dir = tempfile.mkdtemp(prefix="mediadl_tune_")
+        results = []
+        try:
+            for preset in presets:
+                for threads in self.candidate_threads:
+                    measurements = [self._measure(input_file_path, encoder, preset, threads, start, work_dir, measure_ssim) for start in starts]
+                    measurements = [m for m in measurements if m]
+                    if not measurements:
+                        continue
+                    ssims = [m['ssim'] for m in measurements if m['ssim'] is not None]
+                    results.append({
+                        'preset': preset,
+                        'threads': threads,
+                        'fps': sum(m['fps'] for m in measurements) / len(measurements),
+                        'kbps': sum(m['kbps'] for m in measurements) / len(measurements),
+                        'ssim': min(ssims) if ssims else None,
+                    })
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        if not results:
+            raise ConversionError("Auto-tune failed: no candidate could encode the samples.")
+        return results
+
+    def _measure(self, input_file_path, encoder, preset, threads, start, work_dir, measure_ssim):
+        sample_path = os.path.join(work_dir, "sample.mkv")
+        cmd = ['ffmpeg', '-y', '-ss', f"{start:.3f}", '-t', str(self.sample_seconds), '-i', input_file_path,
+               '-map', '0:v:0', '-an', '-sn', '-c:v', encoder]
+        if preset:
+            cmd += ['-preset', preset]
+        cmd += ['-threads', str(threads), sample_path]
+
+        last_progress = {}
+        started = time.monotonic()
+        try:
+            FFmpegProcess(cmd, exact_threads=True).run(progress_callback=last_progress.update) # Trials must run at the thread count they measure
+        except ConversionError as e:
+            print(f"Warning: Auto-tune trial {encoder}/{preset}/{threads} failed: {e}")
+            return None
+        elapsed = max(time.monotonic() - started, 1e-6)
+
+        frames = last_progress.get('frame') or 0
+        size_bytes = os.path.getsize(sample_path) if os.path.exists(sample_path) else 0
+        ssim = self._measure_ssim(input_file_path, sample_path, start) if measure_ssim else None
+        return {'fps': frames / elapsed, 'kbps': size_bytes * 8 / 1000 / self.sample_seconds, 'ssim': ssim}
+
+    def _measure_ssim(self, input_file_path, sample_path, start):
+        # The encoded sample is compared with the same span of the source.
+        cmd = ['ffmpeg', '-ss', f"{start:.3f}", '-t', str(self.sample_seconds), '-i', input_file_path, '-i', sample_path,
+               '-lavfi', "[1:v][0:v]ssim", '-f', 'null', '-']
+        process = FFmpegProcess(cmd)
+        try:
+            process.run()
+        except ConversionError:
+            return None
+        match = _SSIM_RE.search(process.stderr_tail)
+        return float(match.group(1)) if match else None
+
+    @staticmethod
+    def choose(results: list, target_ssim: float = DEFAULT_TARGET_SSIM, max_kbps: float = None) -> dict:
+        """
+        Picks the fastest candidate meeting the targets.
+
+        If none meets them, the candidate closest to the targets (highest SSIM, then
+        lowest bitrate) is returned so the job still runs.
+        """
+        def meets(result):
+            if target_ssim is not None and (result['ssim'] is None or result['ssim'] < target_ssim):
+                return False
+            if max_kbps is not None and result['kbps'] > max_kbps:
+                return False
+            return True
+
+        passing = [r for r in results if meets(r)]
+        if passing:
+            best = max(passing, key=lambda r: r['fps'])
+        else:
+            best = max(results, key=lambda r: (r['ssim'] or 0, -r['kbps']))
+        return {'preset': best['preset'], 'threads': best['threads'], 'fps': best['fps'], 'ssim': best['ssim'], 'kbps': best['kbps']}
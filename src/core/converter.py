@@ -3,7 +3,7 @@ import os
 import sys
 import threading
 import subprocess
-import signal
+import collections
 
 # Add src directory to sys.path to allow direct import of Downloader
 # This is for the __main__ block and might need adjustment based on final project structure
@@ -17,84 +17,633 @@ if __name__ == "__main__":
         sys.path.insert(0, project_root)
 
 from src.core.downloader import Downloader, DownloadError
+from src.core.media_probe import inspect_media
+from src.core.resource_governor import get_resource_governor, is_copy_command, limit_threads, requested_threads
+from src.core.ffmpeg_capabilities import get_ffmpeg_capabilities, translate_preset
 
 class ConversionError(Exception):
     """Custom exception for conversion errors."""
     pass
 
+# How often (in seconds) ffmpeg writes a block to its -progress channel.
+# Needs ffmpeg 4.4+ for -stats_period.
+DEFAULT_STATS_PERIOD = 0.5
+# Number of stderr lines kept for error reports.
+STDERR_TAIL_LINES = 200
+
+# Encoders convert_media uses per target format: (video encoder, audio encoder).
+FORMAT_ENCODERS = {
+    'mp4': ('libx264', 'aac'),
+    'mov': ('libx264', 'aac'),
+    'avi': ('mpeg4', 'mp3'),
+    'webm': ('libvpx-vp9', 'libopus'),
+    'mp3': (None, 'libmp3lame'),
+}
+# Codecs behind FORMAT_ENCODERS, for picking another encoder when ffmpeg lacks the default
+# (see ffmpeg_capabilities.ENCODER_PREFERENCES).
+FORMAT_CODECS = {
+    'mp4': ('h264', 'aac'),
+    'mov': ('h264', 'aac'),
+    'avi': ('mpeg4', 'mp3'),
+    'webm': ('vp9', 'opus'),
+    'mp3': (None, 'mp3'),
+}
+# ffmpeg muxer each target format is written with.
+FORMAT_MUXERS = {'mp4': 'mp4', 'mov': 'mov', 'avi': 'avi', 'webm': 'webm', 'mp3': 'mp3', 'gif': 'gif', 'hls': 'hls', 'dash': 'dash'}
+GIF_FILTERS = ('fps', 'scale', 'split', 'palettegen', 'paletteuse')
+
+DEFAULT_PRESET = 'ultrafast'
+# Passing this as the preset lets AutoTuner pick the preset and threads.
+AUTO_PRESET = 'auto'
+
+# Source codecs (ffprobe codec_name) each target can stream-copy: (video codecs, audio codecs).
+COPYABLE_CODECS = {
+    'mp4': ({'h264'}, {'aac', 'mp3'}),
+    'mov': ({'h264'}, {'aac', 'mp3'}),
+    'avi': ({'mpeg4'}, {'mp3'}),
+    'webm': ({'vp8', 'vp9', 'av1'}, {'opus', 'vorbis'}),
+    'mp3': (set(), {'mp3'}),
+}
+
+def parse_timestamp(value) -> float:
+    """
+    Converts "HH:MM:SS(.ms)", "MM:SS" or plain seconds to seconds.
+
+    Raises:
+        ValueError: If the value cannot be parsed.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    seconds = 0.0
+    for part in str(value).strip().split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_progress_block(block: dict, total_duration_seconds: float = 0) -> dict:
+    """
+    Turns one block of ffmpeg's -progress key=value output into a progress dict.
+
+    Example block (values are strings, one key per line on the pipe):
+        frame=137 fps=25.00 total_size=442368 out_time_us=5480000
+        out_time=00:00:05.480000 speed=1.01x progress=continue
+    """
+    progress = {'status': 'converting'}
+    progress['frame'] = _to_int(block.get('frame'))
+    progress['fps'] = _to_float(block.get('fps'))
+    progress['total_size'] = _to_int(block.get('total_size'))
+    # Older ffmpeg builds only emit out_time_ms, which despite its name is in microseconds too.
+    out_time_us = _to_int(block.get('out_time_us', block.get('out_time_ms')))
+    progress['out_time_us'] = out_time_us
+    speed = block.get('speed', '').strip()
+    progress['speed'] = _to_float(speed[:-1] if speed.endswith('x') else speed)
+    bitrate = block.get('bitrate', '').strip()
+    progress['bitrate_kbits'] = _to_float(bitrate[:-len('kbits/s')] if bitrate.endswith('kbits/s') else None)
+    progress['progress'] = block.get('progress')
+
+    # Keep the fields the GUI already understands.
+    if out_time_us is not None and out_time_us >= 0:
+        progress['time_seconds'] = out_time_us / 1_000_000
+        progress['time_str'] = block.get('out_time', '').split('.')[0] or None
+        if total_duration_seconds > 0:
+            progress['percentage'] = min(100.0, (progress['time_seconds'] / total_duration_seconds) * 100)
+        else:
+            progress['percentage'] = None # Indeterminate if no duration
+    else:
+        progress['percentage'] = None
+    return progress
+
+def write_concat_list(list_path: str, file_paths) -> str:
+    """Writes a concat demuxer list (for `ffmpeg -f concat -safe 0 -i list_path`) and returns its path."""
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in file_paths:
+            # The concat demuxer reads single-quoted paths; a quote is written as '\''
+            f.write("file '" + os.path.abspath(path).replace("'", "'\\''") + "'\n")
+    return list_path
+
+def progress_command(cmd: list, stats_period: float = DEFAULT_STATS_PERIOD, uses_stdin: bool = False) -> list:
+    """Returns `cmd` with the options that make ffmpeg report progress on stdout."""
+    stdin_args = [] if uses_stdin else ['-nostdin']
+    return [cmd[0]] + stdin_args + ['-nostats', '-progress', 'pipe:1', '-stats_period', str(stats_period)] + list(cmd[1:])
+
+class FFmpegProcess:
+    """
+    Runs one ffmpeg command and reports progress from its -progress channel.
+
+    ffmpeg writes machine-readable key=value blocks to stdout (so the command must not
+    write its output to stdout), while stderr is drained on a helper thread into a
+    bounded ring buffer that is only used for error reports.
+
+    Before starting, the run takes thread tokens from a ResourceGovernor (and a disk slot
+    for stream-copy-only commands) and lowers the command's -threads to what was granted.
+    """
+    def __init__(self, cmd: list, stop_flag: threading.Event = None, stats_period: float = DEFAULT_STATS_PERIOD, stderr_tail_lines: int = STDERR_TAIL_LINES, stdin_source=None, governor=None, exact_threads: bool = False):
+        """
+        Args:
+            cmd: The ffmpeg argument list (first item is the ffmpeg executable).
+            stop_flag: Event that stops the run when set.
+            stats_period: Seconds between progress blocks.
+            stderr_tail_lines: Number of stderr lines kept for error reports.
+            stdin_source: Optional iterable of bytes chunks written to ffmpeg's stdin (for
+                'pipe:0' inputs). An exception raised by the iterable kills ffmpeg and is
+                re-raised from run().
+            governor: ResourceGovernor to take tokens from. Defaults to the shared one.
+            exact_threads: Wait for the full -threads instead of starting with fewer
+                (for measurements such as auto-tune trials).
+        """
+        self.cmd = progress_command(cmd, stats_period, uses_stdin=stdin_source is not None)
+        self.governor = governor
+        self.exact_threads = exact_threads
+        self.stop_flag = stop_flag or threading.Event()
+        self.stdin_source = stdin_source
+        self.process = None
+        self._stderr_tail = collections.deque(maxlen=stderr_tail_lines)
+        self._stdin_error = None
+
+    @property
+    def stderr_tail(self) -> str:
+        return "".join(self._stderr_tail)
+
+    def kill(self):
+        """Forcefully terminates the ffmpeg process if it is still running."""
+        if self.process is not None and self.process.poll() is None:
+            try:
+                self.process.kill()
+            except OSError:
+                pass # Process might have already exited
+
+    def _drain_stderr(self):
+        for line in iter(self.process.stderr.readline, ""):
+            self._stderr_tail.append(line)
+
+    def _feed_stdin(self):
+        stdin = self.process.stdin.buffer # Text-mode pipe; write the raw bytes underneath
+        chunks = iter(self.stdin_source)
+        try:
+            for chunk in chunks:
+                if self.stop_flag.is_set():
+                    break
+                stdin.write(chunk)
+        except (BrokenPipeError, ValueError):
+            pass # ffmpeg exited (or was killed) before reading everything; run() reports why
+        except Exception as e:
+            self._stdin_error = e
+            self.kill() # Never let ffmpeg finish a truncated input as if it were complete
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close() # Lets a generator source clean up (e.g. close its connection)
+            try:
+                stdin.close() # EOF tells ffmpeg the input is complete
+            except (BrokenPipeError, ValueError, OSError):
+                pass
+
+    def _wait_for(self, acquire):
+        # Polls so a stop request is noticed while waiting for the governor.
+        while True:
+            result = acquire(0.5)
+            if result:
+                return result
+            if self.stop_flag.is_set():
+                raise ConversionError("Conversion stopped by user.")
+
+    def run(self, progress_callback=None, total_duration_seconds: float = 0) -> int:
+        """
+        Waits for the governor's tokens, then starts ffmpeg and blocks until it exits.
+
+        Raises:
+            ConversionError: If ffmpeg fails or the stop flag is set.
+        """
+        governor = self.governor or get_resource_governor()
+        disk = is_copy_command(self.cmd)
+        if disk:
+            self._wait_for(lambda timeout: governor.acquire_disk(timeout=timeout))
+        granted = 0
+        try:
+            requested = 1 if disk else requested_threads(self.cmd, governor.total_threads)
+            minimum = requested if self.exact_threads else 1
+            granted = self._wait_for(lambda timeout: governor.acquire_threads(requested, minimum, timeout=timeout))
+            if granted < requested and not disk:
+                self.cmd = limit_threads(self.cmd, granted)
+            return self._run_process(progress_callback, total_duration_seconds, governor)
+        finally:
+            if granted:
+                governor.release_threads(granted)
+            if disk:
+                governor.release_disk()
+
+    def _run_process(self, progress_callback, total_duration_seconds, governor):
+        # Use creationflags for Windows to ensure child processes are terminated
+        creationflags = 0
+        if sys.platform == "win32":
+            creationflags = subprocess.CREATE_NEW_PROCESS_GROUP
+
+        try:
+            stdin = subprocess.PIPE if self.stdin_source is not None else subprocess.DEVNULL
+            self.process = subprocess.Popen(self.cmd, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, encoding='utf-8', errors='replace', creationflags=creationflags)
+        except OSError as e:
+            raise ConversionError(f"Could not start ffmpeg: {e}")
+        governor.apply_to_process(self.process.pid)
+
+        stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        stderr_thread.start()
+        stdin_thread = None
+        if self.stdin_source is not None:
+            stdin_thread = threading.Thread(target=self._feed_stdin, daemon=True)
+            stdin_thread.start()
+        try:
+            block = {}
+            for line in iter(self.process.stdout.readline, ""):
+                if self.stop_flag.is_set():
+                    break
+                key, sep, value = line.strip().partition("=")
+                if not sep:
+                    continue
+                block[key] = value.strip()
+                if key == "progress": # Last key of every block
+                    if progress_callback:
+                        progress_callback(parse_progress_block(block, total_duration_seconds))
+                    block = {}
+        finally:
+            if self.stop_flag.is_set():
+                self.kill()
+            self.process.wait()
+            stderr_thread.join(timeout=5)
+            if stdin_thread is not None:
+                stdin_thread.join(timeout=5)
+
+        if self._stdin_error is not None:
+            raise self._stdin_error
+        if self.stop_flag.is_set():
+            raise ConversionError("Conversion stopped by user.")
+        if self.process.returncode != 0:
+            raise ConversionError(f"ffmpeg error (return code {self.process.returncode}): {self.stderr_tail}")
+        return self.process.returncode
+
 class Converter:
-    def __init__(self):
+    def __init__(self, stats_period: float = DEFAULT_STATS_PERIOD, stderr_tail_lines: int = STDERR_TAIL_LINES, probe_cache=None, result_cache=None, governor=None, capabilities=None, hardware_encoders: bool = False, gif_engine=None):
+        """
+        Args:
+            stats_period: Seconds between progress updates from ffmpeg.
+            stderr_tail_lines: Number of ffmpeg stderr lines kept for error messages.
+            probe_cache: ProbeCache used for ffprobe results. Defaults to the shared cache.
+            result_cache: ResultCache that lets repeated conversions skip ffmpeg. None disables it.
+            governor: ResourceGovernor every ffmpeg run takes its threads from. Defaults to the shared one.
+            capabilities: FFmpegCapabilities of the ffmpeg in use. Defaults to the ffmpeg on PATH,
+                detected on first use.
+            hardware_encoders: Prefer hardware encoders (NVENC, Quick Sync, VideoToolbox, AMF)
+                that passed their test encode.
+            gif_engine: GifEngine used for GIF output. Defaults to one created on first use that
+                caches palettes in the user's palette directory.
+        """
         self._stop_flag = threading.Event()
-        self._ffmpeg_process = None # To hold the subprocess object
+        self._ffmpeg_process = None # The FFmpegProcess of the running conversion
+        self.stats_period = stats_period
+        self.stderr_tail_lines = stderr_tail_lines
+        self.probe_cache = probe_cache # None means the shared cache from get_probe_cache()
+        self.last_conversion = None # Output path and stream plan of the last successful conversion
+        self._gif_engine = gif_engine
+        self._auto_tuner = None
+        self._smart_cutter = None
+        self.result_cache = result_cache
+        self.governor = governor
+        self.capabilities = capabilities # None means the shared detection from get_ffmpeg_capabilities()
+        self.hardware_encoders = hardware_encoders
 
     def stop_conversion(self):
         """Signals the current conversion to stop."""
         self._stop_flag.set()
         if self._ffmpeg_process:
            self._ffmpeg_process.kill() # Forcefully terminate the FFmpeg process
+        if self._gif_engine:
+            self._gif_engine.stop()
+        if self._smart_cutter:
+            self._smart_cutter.stop()
+
+    @property
+    def stop_flag(self) -> threading.Event:
+        """The Event stop_conversion() sets; ffmpeg processes started for this converter watch it."""
+        return self._stop_flag
+
+    def is_stopped(self) -> bool:
+        """Returns True when stop_conversion() was called since the last reset_stop()."""
+        return self._stop_flag.is_set()
+
+    def reset_stop(self, stop_event: threading.Event = None):
+        """
+        Clears the stop flag for a new run. A stop_event owned by the caller that is already
+        set keeps the run stopped, so a stop requested just before the run began is not lost.
+        """
+        self._stop_flag.clear()
+        if stop_event is not None and stop_event.is_set():
+            self._stop_flag.set()
+
+    def get_gif_engine(self):
+        """Returns the GifEngine used for GIF output, creating it on first use."""
+        if self._gif_engine is None:
+            from src.core.gif_engine import GifEngine # Imported here, gif_engine builds on this module
+            self._gif_engine = GifEngine(probe_cache=self.probe_cache, stats_period=self.stats_period)
+        return self._gif_engine
+
+    def get_smart_cutter(self):
+        """Returns the SmartCutter used for smart_cut trims, creating it on first use."""
+        if self._smart_cutter is None:
+            from src.core.smart_cut import SmartCutter # Imported here, smart_cut builds on this module
+            self._smart_cutter = SmartCutter(probe_cache=self.probe_cache, stats_period=self.stats_period)
+        return self._smart_cutter
+
+    def get_capabilities(self):
+        """Returns the FFmpegCapabilities in use, or None if ffmpeg could not be queried."""
+        return self.capabilities or get_ffmpeg_capabilities()
+
+    def encoders_for(self, output_format: str) -> tuple:
+        """
+        Returns the (video encoder, audio encoder) used for a target format.
+
+        The fastest encoder the installed ffmpeg has for each codec is picked (see
+        ffmpeg_capabilities.ENCODER_PREFERENCES); without capability data, or when no
+        encoder is available, the FORMAT_ENCODERS defaults are returned.
+        """
+        fmt = output_format.lower()
+        defaults = FORMAT_ENCODERS.get(fmt, (None, None))
+        capabilities = self.get_capabilities()
+        if capabilities is None or fmt not in FORMAT_CODECS:
+            return defaults
+        return tuple(capabilities.choose_encoder(codec, hardware=self.hardware_encoders) or default if codec else default
+                     for codec, default in zip(FORMAT_CODECS[fmt], defaults))
+
+    def check_target(self, output_format: str, plan: dict = None):
+        """
+        Rejects a conversion the installed ffmpeg cannot do, before any process is started.
+
+        Args:
+            output_format: The target format; its muxer (and for GIFs, the palette filters)
+                must exist.
+            plan: A plan_streams() result whose encoders must exist.
+
+        Raises:
+            ConversionError: If something is missing. Nothing is checked when ffmpeg's
+                capabilities are unknown.
+        """
+        capabilities = self.get_capabilities()
+        if capabilities is None:
+            return
+        fmt = output_format.lower()
+        muxer = FORMAT_MUXERS.get(fmt)
+        if muxer and not capabilities.has_muxer(muxer):
+            raise ConversionError(f"This ffmpeg ({capabilities.ffmpeg_path}) cannot write {fmt} files (no '{muxer}' muxer).")
+        if fmt == 'gif':
+            missing = [name for name in GIF_FILTERS if not capabilities.has_filter(name)]
+            if missing or not capabilities.has_encoder('gif'):
+                raise ConversionError(f"This ffmpeg ({capabilities.ffmpeg_path}) cannot make GIFs (missing: {', '.join(missing or ['gif encoder'])}).")
+        for encoder in ((plan or {}).get('vcodec'), (plan or {}).get('acodec')):
+            if encoder and encoder != 'copy' and not capabilities.has_encoder(encoder):
+                raise ConversionError(f"This ffmpeg ({capabilities.ffmpeg_path}) has no encoder for {fmt} output (needs '{encoder}' or an alternative).")
+
+    def plan_streams(self, media_info: dict, output_format: str, trimmed: bool = False, allow_stream_copy: bool = True) -> dict:
+        """
+        Decides per stream whether convert_media can stream-copy (remux) or has to re-encode.
+
+        A stream is copied when the target container takes its codec as-is (see COPYABLE_CODECS).
+        Trimmed conversions are always re-encoded, because stream copy can only cut on keyframes.
+
+        Args:
+            media_info: Result of inspect_media() for the input, or None if probing failed.
+            output_format: The target format (e.g., "mp4").
+            trimmed: Whether start_time/end_time are used.
+            allow_stream_copy: False forces a full re-encode.
+
+        Returns:
+            A dict with 'mode' ('remux', 'partial_remux' or 'transcode'), 'vcodec' and 'acodec'
+            (encoder names, 'copy', or None when the stream is dropped/absent/left to ffmpeg).
+        """
+        fmt = output_format.lower()
+        vencoder, aencoder = self.encoders_for(fmt)
+        plan = {'mode': 'transcode', 'vcodec': vencoder, 'acodec': aencoder}
+        if fmt not in COPYABLE_CODECS or not media_info or trimmed or not allow_stream_copy:
+            return plan
+
+        copy_video_codecs, copy_audio_codecs = COPYABLE_CODECS[fmt]
+        video_stream, audio_stream = media_info.get('video_stream'), media_info.get('audio_stream')
+        if video_stream and (video_stream.get('disposition') or {}).get('attached_pic'):
+            video_stream = None # Cover art is not a real video stream
+        if fmt == 'mp3':
+            video_stream = None # Video is dropped with -vn
+
+        copied, encoded = 0, 0
+        if video_stream:
+            if video_stream.get('codec_name') in copy_video_codecs:
+                plan['vcodec'] = 'copy'; copied += 1
+            else:
+                encoded += 1
+        if audio_stream:
+            if audio_stream.get('codec_name') in copy_audio_codecs:
+                plan['acodec'] = 'copy'; copied += 1
+            else:
+                encoded += 1
+
+        if copied and not encoded:
+            plan['mode'] = 'remux'
+        elif copied:
+            plan['mode'] = 'partial_remux'
+        return plan
+
+    def get_auto_tuner(self):
+        """Returns the AutoTuner used for preset='auto', creating it on first use."""
+        if self._auto_tuner is None:
+            from src.core.auto_tune import AutoTuner # Imported here, auto_tune builds on this module
+            self._auto_tuner = AutoTuner(probe_cache=self.probe_cache)
+        return self._auto_tuner
+
+    def _auto_tune(self, input_file_path, output_format, media_info, threads, start_time, end_time, allow_stream_copy, progress_callback):
+        """Resolves preset='auto' into a concrete (preset, threads) pair."""
+        plan = self.plan_streams(media_info, output_format, trimmed=bool(start_time or end_time), allow_stream_copy=allow_stream_copy)
+        if plan['vcodec'] in (None, 'copy') or not media_info:
+            return DEFAULT_PRESET, threads # Nothing to tune when video is not encoded
+        if progress_callback:
+            progress_callback({'status': 'tuning', 'message': "Auto-tuning encoder settings..."})
+        try:
+            decision = self.get_auto_tuner().tune(input_file_path, output_format, encoder=plan['vcodec'])
+        except Exception as e:
+            print(f"Warning: Auto-tune failed, using preset '{DEFAULT_PRESET}': {e}")
+            return DEFAULT_PRESET, threads
+        if progress_callback:
+            source = "cached" if decision['from_cache'] else "measured"
+            progress_callback({'status': 'tuning', 'message': f"Auto-tune ({source}): preset={decision['preset']}, threads={decision['threads']}"})
+        return decision['preset'] or DEFAULT_PRESET, decision['threads']
+
+    def build_command(self, input_file_path: str, output_file_path: str, output_format: str, threads: int = 8, preset: str = 'ultrafast', start_time: str = None, end_time: str = None, gif_fps: int = 10, gif_scale_width: int = 480, media_info: dict = None, allow_stream_copy: bool = True) -> tuple:
+        """
+        Builds the ffmpeg command line convert_media runs, without running it.
+
+        GIF output is built as a single-process split/palettegen/paletteuse graph here;
+        convert_media itself renders GIFs through GifEngine instead.
+
+        Args:
+            media_info: Result of inspect_media() for the input, used to plan stream copies.
+            allow_stream_copy: False forces a full re-encode.
+            Other arguments are the same as for convert_media.
+
+        Returns:
+            A (cmd, plan) tuple: the argument list for subprocess and the plan_streams() result.
+        """
+        input_options = {}
+        if start_time:
+            input_options['ss'] = start_time
+        if end_time:
+            # If using 'to' with 'ss', 'to' is an absolute timestamp.
+            # If 'ss' is before 'to', it effectively sets a duration from 'ss'.
+            # For simplicity, if both are provided, 'to' acts as the endpoint.
+            # ffmpeg-python's 'to' parameter corresponds to ffmpeg's -to option.
+            input_options['to'] = end_time
+
+        stream = ffmpeg.input(input_file_path, **input_options)
+
+        # Common options
+        ffmpeg_options = {'y': None} # Overwrite output file if it exists
+
+        # Add threads option if specified
+        if threads is not None:
+             ffmpeg_options['threads'] = threads
+
+        fmt = output_format.lower()
+        plan = self.plan_streams(media_info, fmt, trimmed=bool(start_time or end_time), allow_stream_copy=allow_stream_copy)
+
+        if fmt == "mp3":
+            # Mapping only the audio stream lets the demuxer discard video packets (see also audio_pipeline).
+            stream = ffmpeg.output(stream['a:0'], output_file_path, acodec=plan['acodec'], vn=None, **ffmpeg_options)
+        elif fmt == "gif":
+            # For GIF, we use a filter_complex for palette generation and usage
+            # This improves GIF quality significantly.
+            # Example: ffmpeg -i input.mp4 -vf "fps=10,scale=320:-1:flags=lanczos,split[s0][s1];[s0]palettegen[p];[s1][p]paletteuse" output.gif
+            processed_stream = stream.filter('fps', fps=gif_fps)
+            processed_stream = processed_stream.filter('scale', width=gif_scale_width, height=-1, flags='lanczos')
+
+            # Split the stream for palette generation and main processing
+            split_streams = processed_stream.split()
+            stream_for_palette = split_streams[0]
+            stream_for_use = split_streams[1]
+
+            # Generate palette from one part of the split stream
+            # stats_mode='single' can be more efficient for animated GIFs
+            palette_stream = stream_for_palette.filter('palettegen', stats_mode='single')
+
+            # Use the generated palette with the other part of the split stream
+            processed_gif_stream = ffmpeg.filter([stream_for_use, palette_stream], 'paletteuse', dither='sierra2_4a')
+            stream = ffmpeg.output(processed_gif_stream, output_file_path, **ffmpeg_options)
+        elif fmt in FORMAT_ENCODERS:
+            codec_options = {'vcodec': plan['vcodec'], 'acodec': plan['acodec']}
+            encoder_preset = translate_preset(plan['vcodec'], preset) if plan['vcodec'] != 'copy' else None
+            if encoder_preset:
+                # The preset only applies to the video encoder
+                codec_options['preset'] = encoder_preset
+            stream = ffmpeg.output(stream, output_file_path, **codec_options, **ffmpeg_options)
+        else:
+            # Default case for other formats
+            stream = ffmpeg.output(stream, output_file_path, **ffmpeg_options)
+
+        # For debugging, print the command:
+        # print("FFmpeg command:", stream.compile())
+        return stream.compile(), plan
+
+    def _get_output_duration(self, media_info: dict, start_time: str = None, end_time: str = None) -> float:
+        """Returns the expected output duration in seconds (0 if unknown) for progress percentages."""
+        file_duration = media_info['duration'] if media_info else 0.0
+        if not (start_time or end_time):
+            return file_duration
+
+        s_time, e_time = 0.0, file_duration
+        if start_time:
+            try:
+                s_time = parse_timestamp(start_time)
+            except ValueError:
+                print(f"Warning: Could not parse start_time '{start_time}' for duration calculation.")
+        if end_time:
+            try:
+                e_time = parse_timestamp(end_time)
+            except ValueError:
+                print(f"Warning: Could not parse end_time '{end_time}' for duration calculation.")
+
+        total_duration_seconds = max(0, e_time - s_time)
+        if total_duration_seconds == 0 and file_duration > 0: # if parsing failed or times were identical
+            total_duration_seconds = file_duration # fallback to full duration if trim calculation is problematic
+        return total_duration_seconds
+
+    def _result_cache_key(self, input_file_path: str, cmd: list, output_file_path: str):
+        """Returns the result cache key of a conversion, or None if caching is off or fails."""
+        if self.result_cache is None:
+            return None
+        try:
+            return self.result_cache.make_key(input_file_path, cmd, output_file_path)
+        except Exception as e:
+            print(f"Warning: Result cache lookup failed: {e}")
+            return None
+
+    def _finish_from_cache(self, key: str, output_file_path: str, plan: dict, progress_callback=None) -> bool:
+        """Places a cached result at output_file_path. Returns False on a cache miss."""
+        if key is None:
+            return False
+        try:
+            method = self.result_cache.fetch(key, output_file_path)
+        except Exception as e:
+            print(f"Warning: Could not reuse cached conversion result: {e}")
+            return False
+        if method is None:
+            return False
+        self.last_conversion = {'output_file_path': output_file_path, **plan, 'mode': 'cached', 'cache_method': method}
+        if progress_callback:
+            progress_callback({'status': 'finished_conversion', 'filename': output_file_path, 'mode': 'cached'})
+        return True
+
+    def _store_result(self, key: str, output_file_path: str, cmd: list):
+        if key is None:
+            return
+        try:
+            self.result_cache.store(key, output_file_path, cmd)
+        except Exception as e:
+            print(f"Warning: Could not store conversion result in cache: {e}")
 
-    def _parse_ffmpeg_progress(self, line):
-        """Parses a line of FFmpeg stderr output to extract progress information."""
-        # Example FFmpeg progress line:
-        # frame=  137 fps= 25 q=28.0 size=     432kB time=00:00:05.48 bitrate= 645.0kbits/s speed=1.01x
-        progress = {}
-        if line.startswith("frame="):
-            parts = line.split()
-            for part in parts:
-                if "=" in part:
-                    key, value = part.split("=", 1)
-                    if key == "frame" and value.strip():
-                        try:
-                            progress['frame'] = int(value)
-                        except ValueError:
-                            pass # Ignore if value is not a valid int
-                    elif key == "fps" and value.strip():
-                        try:
-                            progress['fps'] = float(value)
-                        except ValueError:
-                            pass # Ignore if value is not a valid float
-                    elif key == "size":
-                        # Handle size like 432kB, 10MB
-                        if 'kB' in value.lower():
-                            progress['size_kb'] = float(value.lower().replace('kb', ''))
-                        elif 'mb' in value.lower():
-                            progress['size_mb'] = float(value.lower().replace('mb', ''))
-                    elif key == "time": # HH:MM:SS.ms
-                        progress['time_str'] = value
-                        try:
-                            h, m, s_ms = value.split(':')
-                            s_val, ms_val = s_ms.split('.')
-                            if h.strip() and m.strip() and s_val.strip() and ms_val.strip():
-                                progress['time_seconds'] = int(h) * 3600 + int(m) * 60 + float(s_val) + (float(ms_val) / 100.0)
-                        except ValueError:
-                            pass 
-                    elif key == "bitrate" and value.strip().lower().replace('kbits/s', '').replace('.', '', 1).isdigit():
-                        try:
-                            progress['bitrate_kbits'] = float(value.lower().replace('kbits/s', ''))
-                        except ValueError:
-                            pass
-                    elif key == "speed" and value.strip():
-                        progress['speed'] = value
-        return progress
-
-    def convert_media(self, input_file_path: str, output_file_path: str, output_format: str, threads: int = 8, preset: str = 'ultrafast', progress_callback=None, start_time: str = None, end_time: str = None, gif_fps: int = 10, gif_scale_width: int = 480) -> str:
+    def convert_media(self, input_file_path: str, output_file_path: str, output_format: str, threads: int = 8, preset: str = 'ultrafast', progress_callback=None, start_time: str = None, end_time: str = None, gif_fps: int = 10, gif_scale_width: int = 480, allow_stream_copy: bool = True, smart_cut: bool = False, stop_event: threading.Event = None) -> str:
         """
         Converts a media file to the specified output format, with optional trimming and GIF specific settings.
 
+        When the source streams already use codecs the target container accepts, they are
+        stream-copied instead of re-encoded (see plan_streams). How the job was done is
+        reported as 'mode' in the final 'finished_conversion' progress update and in
+        self.last_conversion.
+
         Args:
             input_file_path: Path to the input media file.
             output_file_path: Desired path for the converted media file (including new extension).
             output_format: The target format (e.g., "mp3", "mp4", "avi", "mov", "gif").
             threads: Number of threads to use for conversion. 0 means auto-detect.
             preset: FFmpeg preset for video encoding (e.g., 'ultrafast', 'fast', 'medium', 'slow').
+                'auto' measures a few samples and picks the preset and threads (see AutoTuner).
             progress_callback: Callback function for progress updates.
             start_time: Start time for trimming (e.g., "00:00:10").
             end_time: End time for trimming (e.g., "00:00:20").
             gif_fps: FPS for GIF conversion.
             gif_scale_width: Width to scale GIF to (height is auto, -1).
+            allow_stream_copy: Set to False to always re-encode.
+            smart_cut: For trims, re-encode only the partial GOPs at the clip boundaries and
+                stream-copy the rest (see SmartCutter). Sources that cannot be copied into the
+                target are converted normally.
+            stop_event: The caller's cancel flag. If it is set, the conversion stops even when
+                the stop came before this run started (stop_conversion alone would be reset).
 
         Returns:
-            The full path to the converted file.
+            The full path to the converted file. With a result_cache, a repeated conversion
+            is served from the cache and reported with mode 'cached'.
 
         Raises:
             ConversionError: If any error occurs during the conversion.
@@ -102,6 +651,12 @@ class Converter:
         """
         if not os.path.exists(input_file_path):
             raise FileNotFoundError(f"Input file not found: {input_file_path}")
+        self.check_target(output_format)
+
+        # Clear the stop flag up front so a stop requested while we are still
+        # probing/building the command is not lost.
+        self.reset_stop(stop_event)
+        self.last_conversion = None
 
         # Ensure output directory exists
         output_dir = os.path.dirname(output_file_path)
@@ -109,185 +664,63 @@ class Converter:
             os.makedirs(output_dir, exist_ok=True)
 
         try:
-            input_options = {}
-            if start_time:
-                input_options['ss'] = start_time
-            if end_time:
-                # If using 'to' with 'ss', 'to' is an absolute timestamp.
-                # If 'ss' is before 'to', it effectively sets a duration from 'ss'.
-                # For simplicity, if both are provided, 'to' acts as the endpoint.
-                # ffmpeg-python's 'to' parameter corresponds to ffmpeg's -to option.
-                input_options['to'] = end_time
-            
-            stream = ffmpeg.input(input_file_path, **input_options)
-            
-            # Common options
-            ffmpeg_options = {'y': None} # Overwrite output file if it exists
-
-            # Add threads option if specified
-            if threads is not None:
-                 ffmpeg_options['threads'] = threads
-
-            if output_format.lower() == "mp3":
-                stream = ffmpeg.output(stream, output_file_path, acodec='libmp3lame', vn=None, **ffmpeg_options)
-            elif output_format.lower() == "gif":
-                # For GIF, we use a filter_complex for palette generation and usage
-                # This improves GIF quality significantly.
-                # Example: ffmpeg -i input.mp4 -vf "fps=10,scale=320:-1:flags=lanczos,split[s0][s1];[s0]palettegen[p];[s1][p]paletteuse" output.gif
-                
-                # For GIF, use a filter_complex for palette generation and usage for better quality.
-                # The filter string combines scaling, FPS adjustment, splitting for palette generation,
-                # generating the palette, and then using that palette.
-                # [0:v] refers to the first video stream from the input.
-                filter_graph_str = (
-                    f"[0:v]fps={gif_fps},scale={gif_scale_width}:-1:flags=lanczos,"
-                    f"split[s0][s1];[s0]palettegen[p];[s1][p]paletteuse"
-                )
-                
-                # Apply the complex filter graph to the input stream
-                # Apply initial filters (fps, scale)
-                processed_stream = stream.filter('fps', fps=gif_fps)
-                processed_stream = processed_stream.filter('scale', width=gif_scale_width, height=-1, flags='lanczos')
-
-                # Split the stream for palette generation and main processing
-                split_streams = processed_stream.split()
-                
-                stream_for_palette = split_streams[0]
-                stream_for_use = split_streams[1]
-
-                # Generate palette from one part of the split stream
-                # stats_mode='single' can be more efficient for animated GIFs
-                palette_stream = stream_for_palette.filter('palettegen', stats_mode='single')
-
-                # Use the generated palette with the other part of the split stream
-                # The ffmpeg.filter function takes a list of input streams
-                processed_gif_stream = ffmpeg.filter([stream_for_use, palette_stream], 'paletteuse', dither='sierra2_4a')
-                
-                # Output the final processed stream
-                stream = ffmpeg.output(processed_gif_stream, output_file_path, **ffmpeg_options)
-
-            elif output_format.lower() in ["mp4", "mov", "avi", "webm"]:
-                 # Add preset for video formats
-                 video_options = {'preset': preset}
-                 # Merge video options with common options
-                 merged_options = {**ffmpeg_options, **video_options}
-
-                 if output_format.lower() == "mp4":
-                     stream = ffmpeg.output(stream, output_file_path, vcodec='libx264', acodec='aac', **merged_options)
-                 elif output_format.lower() == "mov":
-                     stream = ffmpeg.output(stream, output_file_path, vcodec='libx264', acodec='aac', **merged_options)
-                 elif output_format.lower() == "avi":
-                     stream = ffmpeg.output(stream, output_file_path, vcodec='mpeg4', acodec='mp3', **merged_options)
-                 elif output_format.lower() == "webm":
-                     stream = ffmpeg.output(stream, output_file_path, vcodec='libvpx-vp9', acodec='libopus', **merged_options)
-            else:
-                # Default case for other formats
-                stream = ffmpeg.output(stream, output_file_path, **ffmpeg_options)
-
-            # For debugging, print the command:
-            # print("FFmpeg command:", stream.compile())
+            if output_format.lower() == "gif":
+                # GIFs go through the dedicated engine (cached palettes, parallel chunks).
+                gif_plan = {'mode': 'transcode', 'vcodec': 'gif', 'acodec': None}
+                # GifEngine runs several commands; its settings stand in for the ffmpeg plan.
+                key_cmd = ['gif_engine', '-i', input_file_path, '-ss', str(start_time or ''), '-to', str(end_time or ''),
+                           '-r', str(gif_fps), '-width', str(gif_scale_width), output_file_path]
+                cache_key = self._result_cache_key(input_file_path, key_cmd, output_file_path)
+                if self._finish_from_cache(cache_key, output_file_path, gif_plan, progress_callback):
+                    return output_file_path
+                if self._stop_flag.is_set():
+                    raise ConversionError("Conversion stopped by user.")
+                self.get_gif_engine().render(input_file_path, output_file_path, fps=gif_fps, scale_width=gif_scale_width,
+                                             start_time=start_time, end_time=end_time, threads=threads, progress_callback=progress_callback)
+                self._store_result(cache_key, output_file_path, key_cmd)
+                self.last_conversion = {'output_file_path': output_file_path, **gif_plan}
+                return output_file_path
 
-            # Get total duration of input file for percentage calculation
-            # If start_time and end_time are provided, the effective duration changes.
-            total_duration_seconds = 0
+            if smart_cut and allow_stream_copy and (start_time or end_time):
+                if self._stop_flag.is_set():
+                    raise ConversionError("Conversion stopped by user.")
+                cutter = self.get_smart_cutter()
+                cutter.cut(input_file_path, output_file_path, output_format, start_time=start_time, end_time=end_time,
+                           threads=threads, preset=DEFAULT_PRESET if preset == AUTO_PRESET else preset, progress_callback=progress_callback)
+                self.last_conversion = cutter.converter.last_conversion
+                return output_file_path
+
+            # Probe the original file (through the shared probe cache). The result drives
+            # both the stream-copy plan and the duration used for progress percentages.
+            media_info = None
             try:
-                probe_input_options = {}
-                # Probing should be on the original file for full duration,
-                # or on the trimmed segment if we want progress relative to trimmed part.
-                # For now, let's get original duration and adjust if trimmed.
-                probe = ffmpeg.probe(input_file_path) # Probe original file
-                
-                file_duration = 0
-                video_stream_info = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
-                if video_stream_info and 'duration' in video_stream_info:
-                    file_duration = float(video_stream_info['duration'])
-                elif 'format' in probe and 'duration' in probe['format']:
-                    file_duration = float(probe['format']['duration'])
-
-                if start_time or end_time:
-                    s_time = 0.0
-                    e_time = file_duration
-
-                    if start_time:
-                        try:
-                            h, m, s = map(float, start_time.split(':'))
-                            s_time = h * 3600 + m * 60 + s
-                        except ValueError:
-                            print(f"Warning: Could not parse start_time '{start_time}' for duration calculation.")
-                            s_time = 0.0
-                    
-                    if end_time:
-                        try:
-                            h, m, s = map(float, end_time.split(':'))
-                            e_time = h * 3600 + m * 60 + s
-                        except ValueError:
-                            print(f"Warning: Could not parse end_time '{end_time}' for duration calculation.")
-                            e_time = file_duration
-                    
-                    total_duration_seconds = max(0, e_time - s_time)
-                    if total_duration_seconds == 0 and file_duration > 0 : # if parsing failed or times were identical
-                        total_duration_seconds = file_duration # fallback to full duration if trim calculation is problematic
-                else:
-                    total_duration_seconds = file_duration
-
+                media_info = inspect_media(input_file_path, cache=self.probe_cache)
             except ffmpeg.Error as e_probe:
-                print(f"Warning: Could not probe input file duration: {e_probe.stderr.decode('utf8') if e_probe.stderr else str(e_probe)}")
+                print(f"Warning: Could not probe input file: {e_probe.stderr.decode('utf8') if e_probe.stderr else str(e_probe)}")
 
+            if preset == AUTO_PRESET:
+                preset, threads = self._auto_tune(input_file_path, output_format, media_info, threads, start_time, end_time, allow_stream_copy, progress_callback)
 
+            cmd, plan = self.build_command(input_file_path, output_file_path, output_format, threads=threads, preset=preset,
+                                           start_time=start_time, end_time=end_time, gif_fps=gif_fps, gif_scale_width=gif_scale_width,
+                                           media_info=media_info, allow_stream_copy=allow_stream_copy)
+            self.check_target(output_format, plan)
+            total_duration_seconds = self._get_output_duration(media_info, start_time, end_time)
 
-            cmd = stream.compile()
-            # Explicitly set encoding to utf-8 and handle errors
-            
-            # Use creationflags for Windows to ensure child processes are terminated
-            creationflags = 0
-            if sys.platform == "win32":
-                creationflags = subprocess.CREATE_NEW_PROCESS_GROUP
+            cache_key = self._result_cache_key(input_file_path, cmd, output_file_path)
+            if self._finish_from_cache(cache_key, output_file_path, plan, progress_callback):
+                return output_file_path
 
-            self._ffmpeg_process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, encoding='utf-8', errors='replace', creationflags=creationflags)
-            self._stop_flag.clear() # Clear the stop flag for a new conversion
-
-            stderr_output = ""
-            for line in iter(self._ffmpeg_process.stderr.readline, ""):
-                stderr_output += line
-                if self._stop_flag.is_set():
-                    # If stop is requested, terminate FFmpeg and raise an error
-                    # Use os.kill on Windows to terminate the process group
-                    if sys.platform == "win32":
-                        # Use SIGTERM first, then SIGKILL if needed
-                        try:
-                            os.kill(self._ffmpeg_process.pid, signal.SIGTERM)
-                        except OSError:
-                            pass # Process might have already exited
-                        # Give it a moment, then kill if still alive
-                        self._ffmpeg_process.poll()
-                        if self._ffmpeg_process.returncode is None:
-                             try:
-                                 os.kill(self._ffmpeg_process.pid, signal.SIGKILL)
-                             except OSError:
-                                 pass # Process might have already exited
-                    else:
-                        # Use terminate() or kill() on other platforms
-                        self._ffmpeg_process.kill() # Use kill for consistency with stop_conversion
-
-                    raise ConversionError("Conversion stopped by user.")
+            if self._stop_flag.is_set():
+                raise ConversionError("Conversion stopped by user.")
 
-                if progress_callback:
-                    progress_data = self._parse_ffmpeg_progress(line.strip())
-                    if progress_data:
-                        progress_data['status'] = 'converting'
-                        if total_duration_seconds > 0 and 'time_seconds' in progress_data:
-                            progress_data['percentage'] = (progress_data['time_seconds'] / total_duration_seconds) * 100
-                        else:
-                            progress_data['percentage'] = None # Indeterminate if no duration
-                        progress_callback(progress_data)
-            
-            self._ffmpeg_process.wait() # Wait for the process to complete
-
-            if self._ffmpeg_process.returncode != 0:
-                raise ConversionError(f"ffmpeg error (return code {self._ffmpeg_process.returncode}): {stderr_output}")
+            self._ffmpeg_process = FFmpegProcess(cmd, stop_flag=self._stop_flag, stats_period=self.stats_period, stderr_tail_lines=self.stderr_tail_lines, governor=self.governor)
+            self._ffmpeg_process.run(progress_callback=progress_callback, total_duration_seconds=total_duration_seconds)
+            self._store_result(cache_key, output_file_path, cmd)
 
+            self.last_conversion = {'output_file_path': output_file_path, **plan}
             if progress_callback:
-                progress_callback({'status': 'finished_conversion', 'filename': output_file_path})
+                progress_callback({'status': 'finished_conversion', 'filename': output_file_path, 'mode': plan['mode']})
 
             return output_file_path
 
@@ -301,6 +734,172 @@ class Converter:
         finally:
             self._ffmpeg_process = None # Clear reference after process finishes or errors
 
+    def convert_multi(self, input_file_path: str, targets: list, threads: int = 8, preset: str = 'ultrafast', progress_callback=None, start_time: str = None, end_time: str = None, allow_stream_copy: bool = True, stop_event: threading.Event = None) -> list:
+        """
+        Converts one input to several outputs (e.g. mp4 + mp3 + gif) with a single decode.
+
+        Args:
+            input_file_path: Path to the input media file.
+            targets: Dicts with 'output_file_path' and 'output_format', optionally 'preset',
+                'gif_fps' and 'gif_scale_width'.
+            threads: Number of encoder threads per output. 0 means auto-detect.
+            preset: FFmpeg preset for video encoding, unless a target sets its own.
+            progress_callback: Receives 'converting' updates with the combined 'percentage'
+                and an 'outputs' list (path, format, bytes written so far and percentage per
+                output; GIF outputs are only written once the whole input was read), then a
+                'finished_conversion' update with all 'filenames'.
+            start_time: Start time for trimming (e.g., "00:00:10").
+            end_time: End time for trimming (e.g., "00:00:20").
+            allow_stream_copy: Set to False to always re-encode.
+            stop_event: The caller's cancel flag (see convert_media).
+
+        Returns:
+            The output paths, in target order.
+
+        Raises:
+            ConversionError: If any error occurs during the conversion.
+            FileNotFoundError: If the input file does not exist.
+        """
+        from src.core.multi_output import build_multi_output_command, output_sizes # multi_output builds on this module
+
+        if not os.path.exists(input_file_path):
+            raise FileNotFoundError(f"Input file not found: {input_file_path}")
+        if not targets:
+            raise ConversionError("No output targets given.")
+        self.reset_stop(stop_event)
+        self.last_conversion = None
+        for target in targets:
+            output_dir = os.path.dirname(target['output_file_path'])
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+
+        try:
+            media_info = inspect_media(input_file_path, cache=self.probe_cache)
+        except Exception as e:
+            raise ConversionError(f"Could not probe input file: {e}")
+        cmd, plans = build_multi_output_command(self, input_file_path, targets, media_info, threads=threads, preset=preset,
+                                                start_time=start_time, end_time=end_time, allow_stream_copy=allow_stream_copy)
+        for target, plan in zip(targets, plans):
+            self.check_target(target['output_format'], plan)
+        total_duration_seconds = self._get_output_duration(media_info, start_time, end_time)
+
+        def multi_progress(data):
+            combined = data.get('percentage')
+            data['outputs'] = [
+                {'output_file_path': target['output_file_path'], 'output_format': target['output_format'], 'size_bytes': size,
+                 'percentage': None if plan['vcodec'] == 'gif' and data.get('progress') != 'end' else combined}
+                for target, plan, size in zip(targets, plans, output_sizes(targets))
+            ]
+            progress_callback(data)
+
+        if self._stop_flag.is_set():
+            raise ConversionError("Conversion stopped by user.")
+        try:
+            self._ffmpeg_process = FFmpegProcess(cmd, stop_flag=self._stop_flag, stats_period=self.stats_period, stderr_tail_lines=self.stderr_tail_lines, governor=self.governor)
+            self._ffmpeg_process.run(progress_callback=multi_progress if progress_callback else None, total_duration_seconds=total_duration_seconds)
+        finally:
+            self._ffmpeg_process = None
+
+        output_paths = [target['output_file_path'] for target in targets]
+        self.last_conversion = {'output_file_paths': output_paths, 'plans': plans}
+        if progress_callback:
+            progress_callback({'status': 'finished_conversion', 'filename': output_paths[0], 'filenames': output_paths,
+                               'modes': [plan['mode'] for plan in plans]})
+        return output_paths
+
+    def convert_abr(self, input_file_path: str, output_dir: str, ladder: list = None, formats=('hls',), segment_seconds: float = None, threads: int = 8, preset: str = 'ultrafast', progress_callback=None, start_time: str = None, end_time: str = None, audio_bitrate: str = None, allow_stream_copy: bool = True, stop_event: threading.Event = None) -> dict:
+        """
+        Packages one input as an adaptive-bitrate ladder (HLS and/or DASH) with a single decode.
+
+        Every rung is scaled from the same decoded frames and encoded with keyframes on the
+        same timestamps, so players can switch rungs at any segment boundary. The top rung
+        is stream-copied when the source already is H.264 at that height with a fixed GOP
+        (see abr_ladder.plan_ladder).
+
+        Args:
+            input_file_path: Path to the input media file.
+            output_dir: Directory for the manifests and segments (HLS: master.m3u8 and
+                stream_<rung>/; DASH: manifest.mpd, plus HLS playlists if both are wanted).
+            ladder: Rung dicts with 'height', 'video_bitrate' and optionally 'max_bitrate'.
+                Defaults to 1080/720/480/360 (abr_ladder.DEFAULT_LADDER).
+            formats: 'hls' and/or 'dash'.
+            segment_seconds: Segment duration. Defaults to 4 seconds (rounded to whole
+                source GOPs when the top rung is copied).
+            threads: Number of encoder threads. 0 means auto-detect.
+            preset: FFmpeg preset for the encoded rungs.
+            progress_callback: Receives 'converting' updates with a 'rungs' list (height, mode,
+                segments written so far and percentage per rung), then a
+                'finished_conversion' update with the 'manifests'.
+            start_time: Start time for trimming (e.g., "00:00:10").
+            end_time: End time for trimming (e.g., "00:00:20").
+            audio_bitrate: AAC bitrate of the shared audio rendition. Defaults to 128k.
+            allow_stream_copy: Set to False to always re-encode.
+            stop_event: The caller's cancel flag (see convert_media).
+
+        Returns:
+            The manifest path per format, e.g. {'hls': '.../master.m3u8'}.
+
+        Raises:
+            ConversionError: If any error occurs during the conversion.
+            FileNotFoundError: If the input file does not exist.
+        """
+        from src.core import abr_ladder # abr_ladder builds on this module
+        from src.core.keyframe_index import KeyframeIndexError, get_keyframe_index
+
+        if not os.path.exists(input_file_path):
+            raise FileNotFoundError(f"Input file not found: {input_file_path}")
+        self.reset_stop(stop_event)
+        self.last_conversion = None
+        try:
+            media_info = inspect_media(input_file_path, cache=self.probe_cache)
+        except Exception as e:
+            raise ConversionError(f"Could not probe input file: {e}")
+
+        trimmed = bool(start_time or end_time)
+        keyframes = None
+        if allow_stream_copy and not trimmed and (media_info.get('video_stream') or {}).get('codec_name') in abr_ladder.COPY_VIDEO_CODECS:
+            try:
+                keyframes = get_keyframe_index(input_file_path, cache=self.probe_cache).times
+            except KeyframeIndexError as e:
+                print(f"Warning: Could not index keyframes, encoding every rung: {e}")
+        rungs, segment_seconds, keyframe_interval = abr_ladder.plan_ladder(media_info, ladder, keyframes, segment_seconds or abr_ladder.DEFAULT_SEGMENT_SECONDS,
+                                                                           trimmed=trimmed, allow_stream_copy=allow_stream_copy)
+        cmd = abr_ladder.build_ladder_command(input_file_path, output_dir, rungs, media_info, formats=formats, segment_seconds=segment_seconds,
+                                              keyframe_interval=keyframe_interval, threads=threads, preset=preset, start_time=start_time, end_time=end_time,
+                                              audio_bitrate=audio_bitrate or abr_ladder.DEFAULT_AUDIO_BITRATE, allow_stream_copy=allow_stream_copy)
+        acodec = abr_ladder.audio_codec(media_info, trimmed=trimmed, allow_stream_copy=allow_stream_copy)
+        for fmt in formats:
+            for rung in rungs:
+                self.check_target(fmt, {'vcodec': 'copy' if rung['mode'] == 'copy' else abr_ladder.VIDEO_ENCODER, 'acodec': acodec})
+        os.makedirs(output_dir, exist_ok=True)
+        if 'dash' not in [fmt.lower() for fmt in formats]:
+            for index in range(len(rungs) + 1): # One directory per HLS variant, audio last
+                os.makedirs(os.path.join(output_dir, f"stream_{index}"), exist_ok=True)
+        total_duration_seconds = self._get_output_duration(media_info, start_time, end_time)
+
+        def ladder_progress(data):
+            # All rungs come out of one filter graph, so they advance together.
+            data['rungs'] = [
+                {'height': rung['height'], 'mode': rung['mode'], 'segments': segments, 'percentage': data.get('percentage')}
+                for rung, segments in zip(rungs, abr_ladder.rung_segment_counts(output_dir, rungs, formats))
+            ]
+            progress_callback(data)
+
+        if self._stop_flag.is_set():
+            raise ConversionError("Conversion stopped by user.")
+        try:
+            self._ffmpeg_process = FFmpegProcess(cmd, stop_flag=self._stop_flag, stats_period=self.stats_period, stderr_tail_lines=self.stderr_tail_lines, governor=self.governor)
+            self._ffmpeg_process.run(progress_callback=ladder_progress if progress_callback else None, total_duration_seconds=total_duration_seconds)
+        finally:
+            self._ffmpeg_process = None
+
+        manifests = abr_ladder.manifest_paths(output_dir, formats)
+        self.last_conversion = {'output_dir': output_dir, 'manifests': manifests, 'rungs': rungs, 'segment_seconds': segment_seconds}
+        if progress_callback:
+            progress_callback({'status': 'finished_conversion', 'filename': next(iter(manifests.values())), 'manifests': manifests,
+                               'modes': [rung['mode'] for rung in rungs]})
+        return manifests
+
 if __name__ == "__main__":
     converter = Converter()
     downloader = Downloader()
@@ -0,0 +1,186 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+from src.core.converter import Converter, ConversionError
+
+# Progress statuses after which a job will not emit anything else.
+TERMINAL_STATUSES = ('finished_conversion', 'error', 'cancelled')
+
+
+class ConversionHandle:
+    """
+    Tracks one job submitted to a ConverterPool.
+
+    Every handle owns its own Converter (a Converter can only drive one ffmpeg
+    process at a time), so cancelling a handle never touches the other jobs.
+    """
+    def __init__(self, job: dict, progress_callback=None):
+        self.job = job
+        self.converter = Converter()
+        self.latest_progress = None
+        self._progress_queue = queue.Queue()
+        self._progress_callback = progress_callback
+        self._cancel_flag = threading.Event()
+        self._future = None
+
+    def cancel(self):
+        """Cancels the job. Pending jobs never start, running jobs have their ffmpeg process killed."""
+        self._cancel_flag.set()
+        if self._future is not None and self._future.cancel():
+            self._emit({'status': 'cancelled', 'message': 'Conversion cancelled before it started.'})
+            return
+        self.converter.stop_conversion()
+
+    def cancelled(self) -> bool:
+        return self._cancel_flag.is_set()
+
+    def done(self) -> bool:
+        return self._future is not None and self._future.done()
+
+    def result(self, timeout=None) -> str:
+        """
+        Waits for the job and returns the converted file path.
+
+        Raises:
+            ConversionError: If the conversion failed or was cancelled.
+        """
+        try:
+            return self._future.result(timeout=timeout)
+        except CancelledError:
+            raise ConversionError("Conversion cancelled before it started.")
+
+    def exception(self, timeout=None):
+        """Returns the exception raised by the job, or None if it succeeded."""
+        try:
+            self.result(timeout=timeout)
+        except Exception as e:
+            return e
+        return None
+
+    def iter_progress(self, timeout=None):
+        """
+        Yields the job's progress dicts in order until it reaches a terminal status.
+
+        Args:
+            timeout: Seconds to wait for each update. None waits forever.
+        """
+        while True:
+            try:
+                data = self._progress_queue.get(timeout=timeout)
+            except queue.Empty:
+                return
+            yield data
+            if data.get('status') in TERMINAL_STATUSES:
+                return
+
+    def _emit(self, data):
+        self.latest_progress = data
+        self._progress_queue.put(data)
+        job_callback = self.job.get('progress_callback')
+        if job_callback:
+            job_callback(data)
+        if self._progress_callback:
+            self._progress_callback(self, data)
+
+    def _run(self, threads: int) -> str:
+        if self._cancel_flag.is_set():
+            self._emit({'status': 'cancelled', 'message': 'Conversion cancelled before it started.'})
+            raise ConversionError("Conversion stopped by user.")
+
+        kwargs = {k: v for k, v in self.job.items() if k != 'progress_callback'}
+        if kwargs.get('threads') is None:
+            kwargs['threads'] = threads
+        try:
+            # The cancel flag goes in too: a cancel() between the check above and the start of
+            # the run would otherwise be reset with the converter's stop flag.
+            output_path = self.converter.convert_media(progress_callback=self._emit, stop_event=self._cancel_flag, **kwargs)
+        except Exception as e:
+            status = 'cancelled' if self._cancel_flag.is_set() else 'error'
+            self._emit({'status': status, 'message': str(e)})
+            raise
+        return output_path
+
+
+class ConverterPool:
+    """
+    Runs many Converter.convert_media jobs concurrently.
+
+    Jobs are plain dicts holding the keyword arguments of convert_media
+    ('input_file_path', 'output_file_path', 'output_format', and optionally
+    'preset', 'start_time', ... and a per-job 'progress_callback').
+    The total ffmpeg thread budget is split across the worker slots, so jobs that
+    don't set 'threads' themselves get total_threads // max_workers each.
+    """
+    def __init__(self, max_workers: int = None, total_threads: int = None, progress_callback=None):
+        """
+        Args:
+            max_workers: Number of ffmpeg processes to run at once. Defaults to a
+                quarter of the CPU count (at least 1).
+            total_threads: Thread budget shared by all running jobs. Defaults to the CPU count.
+            progress_callback: Optional callback(handle, progress_data) called for every job.
+        """
+        cpu_count = os.cpu_count() or 1
+        self.total_threads = total_threads if total_threads and total_threads > 0 else cpu_count
+        self.max_workers = max_workers if max_workers and max_workers > 0 else max(1, cpu_count // 4)
+        self.progress_callback = progress_callback
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="converter-pool")
+        self._handles = []
+        self._lock = threading.Lock()
+
+    @property
+    def threads_per_job(self) -> int:
+        return max(1, self.total_threads // self.max_workers)
+
+    def submit(self, job: dict) -> ConversionHandle:
+        """Queues a single conversion job and returns its handle."""
+        for key in ('input_file_path', 'output_file_path', 'output_format'):
+            if not job.get(key):
+                raise ValueError(f"Conversion job is missing '{key}'.")
+        handle = ConversionHandle(job, progress_callback=self.progress_callback)
+        with self._lock:
+            handle._future = self._executor.submit(handle._run, self.threads_per_job)
+            self._handles.append(handle)
+        return handle
+
+    def submit_batch(self, jobs) -> list:
+        """Queues every job in `jobs` and returns their handles in the same order."""
+        return [self.submit(job) for job in jobs]
+
+    def run_batch(self, jobs) -> list:
+        """
+        Runs every job and waits for all of them.
+
+        Returns:
+            A list of (handle, output_path_or_exception) tuples in job order.
+            Failed jobs do not stop the rest of the batch.
+        """
+        handles = self.submit_batch(jobs)
+        results = []
+        for handle in handles:
+            try:
+                results.append((handle, handle.result()))
+            except Exception as e:
+                results.append((handle, e))
+        return results
+
+    def cancel_all(self):
+        """Cancels every pending and running job of this pool."""
+        with self._lock:
+            handles = list(self._handles)
+        for handle in handles:
+            if not handle.done():
+                handle.cancel()
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        if cancel_pending:
+            self.cancel_all()
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=True, cancel_pending=exc_type is not None)
+        return False
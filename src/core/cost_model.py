@@ -0,0 +1,236 @@
+import os
+import math
+import time
+import sqlite3
+import threading
+
+from src.core.converter import Converter, parse_timestamp
+from src.core.frame_grab import display_size
+from src.core.media_probe import inspect_media
+
+DEFAULT_COST_MODEL_PATH = os.path.join(os.path.expanduser("~"), ".mediadl", "cost_model.sqlite3")
+# Weight of a new run in a profile's running average once it has this many samples
+# (earlier runs are averaged evenly), so the model follows hardware or ffmpeg changes.
+LEARNING_RATE = 0.2
+# Priors, used until a profile has been measured on this machine.
+# Encode seconds per megapixel of output video (frames * width * height / 1e6) at preset 'ultrafast'.
+SECONDS_PER_MEGAPIXEL = {'libx264': 0.004, 'mpeg4': 0.002, 'libvpx-vp9': 0.04, 'gif': 0.01}
+# Output bytes per megapixel of encoded video.
+BYTES_PER_MEGAPIXEL = {'libx264': 15000, 'mpeg4': 20000, 'libvpx-vp9': 6000, 'gif': 60000}
+PRESET_SPEED_FACTORS = {'ultrafast': 1.0, 'superfast': 1.5, 'veryfast': 2.0, 'faster': 3.0, 'fast': 4.0, 'medium': 5.0,
+                        'slow': 8.0, 'slower': 15.0, 'veryslow': 30.0, 'placebo': 60.0}
+AUDIO_ENCODE_SECONDS_PER_SECOND = 0.01 # Per second of output audio
+COPY_SECONDS_PER_SECOND = 0.002 # Stream copies are bound by disk speed
+AUDIO_BYTES_PER_SECOND = 16000 # ffmpeg's default 128 kbit/s
+DEFAULT_FRAME_RATE = 30.0
+
+
+class CostModelError(Exception):
+    """Raised when the cost model database cannot be used or a job cannot be estimated."""
+    pass
+
+
+def _frame_rate(video_stream: dict) -> float:
+    for key in ('avg_frame_rate', 'r_frame_rate'):
+        value = str(video_stream.get(key) or '')
+        numerator, _, denominator = value.partition('/')
+        try:
+            rate = float(numerator) / float(denominator or 1)
+        except (ValueError, ZeroDivisionError):
+            continue
+        if rate > 0:
+            return rate
+    return DEFAULT_FRAME_RATE
+
+
+def _source_bytes_per_second(media_info: dict) -> float:
+    probe_format = (media_info.get('probe') or {}).get('format') or {}
+    try:
+        return float(probe_format['bit_rate']) / 8
+    except (KeyError, TypeError, ValueError):
+        pass
+    try:
+        return os.path.getsize(media_info['path']) / media_info['duration']
+    except (KeyError, TypeError, OSError, ZeroDivisionError):
+        return AUDIO_BYTES_PER_SECOND
+
+
+class CostModel:
+    """
+    Predicts how long a conversion takes and how large its output gets.
+
+    A prior estimate is computed from the probe data (output duration, resolution, frame
+    rate, source bitrate) and the convert_media settings (format, preset, stream plan).
+    Finished runs are recorded per profile (format, mode, video encoder and preset), and
+    the running average of measured/prior ratios of a profile corrects later estimates,
+    so predictions converge on this machine's real speed. Safe to use from several threads.
+    """
+    def __init__(self, db_path: str = DEFAULT_COST_MODEL_PATH, converter: Converter = None):
+        """
+        Args:
+            db_path: SQLite file the learned corrections are kept in. None keeps them in memory.
+            converter: Converter whose stream planner decides copy vs. encode.
+
+        Raises:
+            CostModelError: If the database cannot be opened.
+        """
+        self.db_path = db_path
+        self.converter = converter or Converter()
+        self._lock = threading.Lock()
+        try:
+            if db_path and os.path.dirname(db_path):
+                os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._db = sqlite3.connect(db_path or ":memory:", timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                " key TEXT PRIMARY KEY, samples INTEGER NOT NULL,"
+                " log_time_ratio REAL NOT NULL, log_size_ratio REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        except (sqlite3.Error, OSError) as e:
+            raise CostModelError(f"Could not open cost model at {db_path}: {e}")
+
+    def features(self, media_info: dict, settings: dict) -> dict:
+        """
+        Describes the work a conversion does.
+
+        Args:
+            media_info: Result of inspect_media() for the input.
+            settings: convert_media keyword arguments ('output_format', 'preset',
+                'start_time', 'end_time', 'gif_fps', 'gif_scale_width', 'allow_stream_copy',
+                'smart_cut'); paths and callbacks are ignored.
+
+        Returns:
+            A dict with 'key' (the profile), 'mode', 'vcodec', 'acodec', 'output_seconds'
+            and 'megapixels' (encoded video, 0 if none).
+        """
+        fmt = settings['output_format'].lower()
+        trimmed = bool(settings.get('start_time') or settings.get('end_time'))
+        duration = media_info.get('duration') or 0.0
+        start = parse_timestamp(settings['start_time']) if settings.get('start_time') else 0.0
+        end = parse_timestamp(settings['end_time']) if settings.get('end_time') else duration
+        output_seconds = max(0.0, (min(end, duration) if duration else end) - start)
+
+        video_stream = media_info.get('video_stream') or {}
+        if fmt == 'gif':
+            plan = {'mode': 'transcode', 'vcodec': 'gif', 'acodec': None}
+        else:
+            plan = self.converter.plan_streams(media_info, fmt, trimmed=trimmed, allow_stream_copy=settings.get('allow_stream_copy', True))
+            if not video_stream or fmt == 'mp3':
+                plan = dict(plan, vcodec=None)
+            if not media_info.get('audio_stream'):
+                plan = dict(plan, acodec=None)
+        mode = 'smart_cut' if trimmed and settings.get('smart_cut') else plan['mode']
+
+        megapixels = 0.0
+        width, height = display_size(media_info)
+        if plan['vcodec'] not in (None, 'copy') and width and height:
+            if fmt == 'gif':
+                gif_width = settings.get('gif_scale_width') or 480
+                megapixels = (settings.get('gif_fps') or 10) * output_seconds * gif_width * (gif_width * height / width) / 1e6
+            else:
+                megapixels = _frame_rate(video_stream) * output_seconds * width * height / 1e6
+        preset = settings.get('preset') or 'ultrafast'
+        key = f"{fmt}:{mode}:{plan['vcodec'] or '-'}:{preset if plan['vcodec'] not in (None, 'copy', 'gif') else '-'}"
+        return {'key': key, 'mode': mode, 'vcodec': plan['vcodec'], 'acodec': plan['acodec'], 'preset': preset,
+                'output_seconds': output_seconds, 'megapixels': megapixels}
+
+    def prior(self, media_info: dict, features: dict) -> tuple:
+        """Returns the (seconds, output bytes) a conversion takes before anything was learned."""
+        vcodec, acodec, output_seconds = features['vcodec'], features['acodec'], features['output_seconds']
+        seconds, size = 0.0, 0.0
+        if vcodec == 'copy':
+            seconds += COPY_SECONDS_PER_SECOND * output_seconds
+            size += _source_bytes_per_second(media_info) * output_seconds # Includes the source audio
+        elif vcodec:
+            factor = 1.0 if vcodec == 'gif' else PRESET_SPEED_FACTORS.get(features['preset'], PRESET_SPEED_FACTORS['medium'])
+            seconds += SECONDS_PER_MEGAPIXEL.get(vcodec, SECONDS_PER_MEGAPIXEL['libx264']) * factor * features['megapixels']
+            size += BYTES_PER_MEGAPIXEL.get(vcodec, BYTES_PER_MEGAPIXEL['libx264']) * features['megapixels']
+        if acodec == 'copy' and vcodec != 'copy':
+            seconds += COPY_SECONDS_PER_SECOND * output_seconds
+            size += (_source_bytes_per_second(media_info) if not vcodec else AUDIO_BYTES_PER_SECOND) * output_seconds
+        elif acodec and acodec != 'copy':
+            seconds += AUDIO_ENCODE_SECONDS_PER_SECOND * output_seconds
+            size += AUDIO_BYTES_PER_SECOND * output_seconds
+        if features['mode'] == 'smart_cut':
+            seconds = COPY_SECONDS_PER_SECOND * output_seconds + seconds * 0.1 # Only the boundary GOPs are encoded
+            size = _source_bytes_per_second(media_info) * output_seconds
+        return max(seconds, 0.1), max(size, 1.0)
+
+    def _profile(self, key: str):
+        with self._lock:
+            return self._db.execute("SELECT samples, log_time_ratio, log_size_ratio FROM profiles WHERE key=?", (key,)).fetchone()
+
+    def estimate(self, media_info: dict, settings: dict) -> dict:
+        """
+        Predicts a conversion.
+
+        Args:
+            media_info, settings: See features().
+
+        Returns:
+            A dict with 'seconds', 'output_bytes', 'key', 'samples' (runs of this profile
+            measured so far) and 'source' ('learned' or 'prior').
+        """
+        features = self.features(media_info, settings)
+        seconds, size = self.prior(media_info, features)
+        row = self._profile(features['key'])
+        if row:
+            samples, log_time_ratio, log_size_ratio = row
+            seconds, size = seconds * math.exp(log_time_ratio), size * math.exp(log_size_ratio)
+        return {'seconds': seconds, 'output_bytes': int(size), 'key': features['key'], 'samples': row[0] if row else 0,
+                'source': 'learned' if row else 'prior'}
+
+    def estimate_file(self, input_file_path: str, settings: dict, probe_cache=None) -> dict:
+        """
+        estimate() for a file, probing it through the (shared) ProbeCache.
+
+        Raises:
+            CostModelError: If the file cannot be probed.
+        """
+        try:
+            media_info = inspect_media(input_file_path, cache=probe_cache)
+        except Exception as e:
+            raise CostModelError(f"Could not probe {input_file_path}: {e}")
+        return self.estimate(media_info, settings)
+
+    def record(self, media_info: dict, settings: dict, elapsed_seconds: float, output_bytes: int):
+        """Learns from a finished conversion: its wall time and the size of its output."""
+        features = self.features(media_info, settings)
+        seconds, size = self.prior(media_info, features)
+        time_ratio = math.log(max(elapsed_seconds, 0.01) / seconds)
+        size_ratio = math.log(max(output_bytes, 1) / size)
+        with self._lock:
+            row = self._db.execute("SELECT samples, log_time_ratio, log_size_ratio FROM profiles WHERE key=?", (features['key'],)).fetchone()
+            if row:
+                samples, old_time, old_size = row
+                weight = max(1.0 / (samples + 1), LEARNING_RATE)
+                time_ratio = old_time + weight * (time_ratio - old_time)
+                size_ratio = old_size + weight * (size_ratio - old_size)
+            self._db.execute("INSERT OR REPLACE INTO profiles (key, samples, log_time_ratio, log_size_ratio, updated_at) VALUES (?, ?, ?, ?, ?)",
+                             (features['key'], (row[0] if row else 0) + 1, time_ratio, size_ratio, time.time()))
+            self._db.commit()
+
+    def profiles(self) -> list:
+        """Returns every learned profile with its speed and size correction factors."""
+        with self._lock:
+            rows = self._db.execute("SELECT key, samples, log_time_ratio, log_size_ratio, updated_at FROM profiles ORDER BY key").fetchall()
+        return [{'key': key, 'samples': samples, 'time_factor': math.exp(t), 'size_factor': math.exp(s), 'updated_at': updated_at}
+                for key, samples, t, s, updated_at in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default_model = None
+_default_model_lock = threading.Lock()
+
+def get_cost_model() -> CostModel:
+    """Returns the process-wide CostModel, creating it on first use."""
+    global _default_model
+    with _default_model_lock:
+        if _default_model is None:
+            _default_model = CostModel()
+        return _default_model
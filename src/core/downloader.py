@@ -4,21 +4,73 @@ import requests # For direct image downloads
 import threading
 from urllib.parse import urlparse # For parsing URL to get filename
 import re # For parsing Content-Disposition header
+import sys
+
+if __name__ == "__main__": # Let the __main__ block below import the core package
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.resource_governor import get_resource_governor
 
 class DownloadError(Exception):
     """Custom exception for download errors."""
     pass
 
 class Downloader:
-    def __init__(self):
+    def __init__(self, governor=None):
+        """
+        Args:
+            governor: ResourceGovernor that yt-dlp's ffmpeg postprocessors (merges, audio
+                extraction) take their thread token and disk slot from. Defaults to the shared one.
+        """
         self.progress_callback = None
         self.last_ydl_opts = None # For testing/inspection
         self._stop_flag = threading.Event() # Event to signal stopping
+        self.governor = governor
+        self._governor_held = [] # (governor, threads) of running postprocessors
 
     def stop_download(self):
         """Signals the current download to stop."""
         self._stop_flag.set()
 
+    def is_stopped(self) -> bool:
+        """Returns True when stop_download() was called since the last reset_stop()."""
+        return self._stop_flag.is_set()
+
+    def reset_stop(self, stop_event: threading.Event = None):
+        """
+        Clears the stop flag for a new download. A stop_event owned by the caller that is already
+        set keeps the download stopped, so a stop requested just before it began is not lost.
+        """
+        self._stop_flag.clear()
+        if stop_event is not None and stop_event.is_set():
+            self._stop_flag.set()
+
+    def _postprocessor_hook(self, d):
+        name = d.get('postprocessor') or ''
+        if name != 'Merger' and not name.startswith('FFmpeg'):
+            return # Not an ffmpeg child process
+        if d.get('status') == 'started':
+            governor = self.governor or get_resource_governor()
+            while not governor.acquire_disk(timeout=0.5):
+                if self._stop_flag.is_set():
+                    raise yt_dlp.utils.DownloadError("Download stopped by user.")
+            threads = 0
+            while not threads:
+                if self._stop_flag.is_set():
+                    governor.release_disk()
+                    raise yt_dlp.utils.DownloadError("Download stopped by user.")
+                threads = governor.acquire_threads(1, timeout=0.5)
+            self._governor_held.append((governor, threads))
+        elif d.get('status') == 'finished' and self._governor_held:
+            self._release_governor(*self._governor_held.pop())
+
+    @staticmethod
+    def _release_governor(governor, threads):
+        governor.release_threads(threads)
+        governor.release_disk()
+
     def _progress_hook(self, d):
         if self._stop_flag.is_set():
             # If stop is requested, raise an exception to stop yt-dlp
@@ -191,13 +243,28 @@ class Downloader:
             raise DownloadError(f"Unexpected error fetching formats: {type(e).__name__} - {str(e)}")
         return resolutions
 
-    def download_media(self, url: str, download_path: str, preferred_format_info=None, progress_callback=None) -> str:
+    def download_media(self, url: str, download_path: str, preferred_format_info=None, progress_callback=None, stop_event: threading.Event = None) -> str:
+        """
+        Downloads url into download_path and returns the downloaded file's path.
+
+        Args:
+            url: The media or direct image URL.
+            download_path: Directory the file is written to (created if missing).
+            preferred_format_info: Optional dict with 'format_id' and 'format_code' to pick a stream.
+            progress_callback: Optional callable receiving progress dicts.
+            stop_event: The caller's cancel flag. If it is already set, the download is not
+                started and DownloadError is raised.
+
+        Raises:
+            DownloadError: If the download fails or is stopped.
+        """
         self.progress_callback = progress_callback
         os.makedirs(download_path, exist_ok=True)
 
         ydl_opts = {
             'outtmpl': os.path.join(download_path, '%(title)s.%(ext)s'),
             'progress_hooks': [self._progress_hook],
+            'postprocessor_hooks': [self._postprocessor_hook],
             'nocheckcertificate': True,
             'quiet': True, 
             'no_warnings': True,
@@ -269,7 +336,9 @@ class Downloader:
             ydl_opts['quiet'] = False 
         
         self.last_ydl_opts = ydl_opts.copy()
-        self._stop_flag.clear() # Clear the flag for a new download
+        self.reset_stop(stop_event)
+        if self._stop_flag.is_set():
+            raise DownloadError("Download stopped by user.")
 
         if self._is_direct_image_url(url) and not p_format_code_stream: # Only use direct image download if no specific stream is chosen
             if self.progress_callback:
@@ -403,6 +472,9 @@ class Downloader:
                 raise DownloadError(f"yt-dlp download error: {e}")
             except Exception as e:
                 raise DownloadError(f"Unexpected error in downloader: {type(e).__name__} - {e}")
+            finally:
+                while self._governor_held: # A postprocessor that failed never reports 'finished'
+                    self._release_governor(*self._governor_held.pop())
 
 if __name__ == "__main__":
     downloader = Downloader()
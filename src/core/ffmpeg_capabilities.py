@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import shutil
+import threading
+import subprocess
+
+DEFAULT_CAPABILITIES_PATH = os.path.join(os.path.expanduser("~"), ".mediadl", "ffmpeg_capabilities.json")
+# Encoders per codec, fastest first. Hardware encoders are only used when asked for and
+# after a test encode showed the device is really there (builds often include them anyway).
+ENCODER_PREFERENCES = {
+    'h264': ['h264_nvenc', 'h264_qsv', 'h264_videotoolbox', 'h264_amf', 'libx264', 'libopenh264'],
+    'vp9': ['vp9_qsv', 'libvpx-vp9', 'libvpx'], # libvpx (VP8) still fits a WebM target
+    'mpeg4': ['mpeg4', 'libxvid'],
+    'aac': ['aac_at', 'aac', 'libfdk_aac'],
+    'opus': ['libopus', 'libvorbis'], # The native 'opus' encoder is experimental
+    'mp3': ['libmp3lame', 'libshine'],
+}
+HARDWARE_ENCODERS = ('h264_nvenc', 'h264_qsv', 'h264_videotoolbox', 'h264_amf', 'vp9_qsv', 'aac_at')
+# libx264 preset names mapped onto hardware encoders' own presets.
+_NVENC_PRESETS = {'ultrafast': 'p1', 'superfast': 'p1', 'veryfast': 'p2', 'faster': 'p3', 'fast': 'p4', 'medium': 'p5', 'slow': 'p6', 'slower': 'p7', 'veryslow': 'p7'}
+_QSV_PRESETS = {'ultrafast': 'veryfast', 'superfast': 'veryfast', 'placebo': 'veryslow'}
+
+
+class FFmpegCapabilitiesError(Exception):
+    """Raised when the ffmpeg binary cannot be found or queried."""
+    pass
+
+
+class FFmpegCapabilities:
+    """What one ffmpeg build can do: its version, encoders, filters and muxers."""
+    def __init__(self, ffmpeg_path: str, version: str = None, ffprobe_version: str = None, encoders: dict = None, filters=(), muxers=(), working_hardware=()):
+        """
+        Args:
+            ffmpeg_path: Resolved path of the ffmpeg binary.
+            version, ffprobe_version: Version strings (e.g. "6.1.1").
+            encoders: Encoder name -> type ('V', 'A' or 'S').
+            filters, muxers: Names of the available filters and muxers.
+            working_hardware: Hardware encoders that passed a test encode.
+        """
+        self.ffmpeg_path = ffmpeg_path
+        self.version = version
+        self.ffprobe_version = ffprobe_version
+        self.encoders = dict(encoders or {})
+        self.filters = set(filters)
+        self.muxers = set(muxers)
+        self.working_hardware = set(working_hardware)
+
+    def has_encoder(self, name: str) -> bool:
+        return name in self.encoders
+
+    def has_filter(self, name: str) -> bool:
+        return name in self.filters
+
+    def has_muxer(self, name: str) -> bool:
+        return name in self.muxers
+
+    def choose_encoder(self, codec: str, hardware: bool = False):
+        """
+        Returns the fastest usable encoder for a codec (see ENCODER_PREFERENCES), or None.
+
+        Args:
+            hardware: Consider hardware encoders that passed their test encode.
+        """
+        for name in ENCODER_PREFERENCES.get(codec, [codec]):
+            if name in HARDWARE_ENCODERS and not (hardware and name in self.working_hardware):
+                continue
+            if self.has_encoder(name):
+                return name
+        return None
+
+    def to_dict(self) -> dict:
+        return {'ffmpeg_path': self.ffmpeg_path, 'version': self.version, 'ffprobe_version': self.ffprobe_version, 'encoders': self.encoders,
+                'filters': sorted(self.filters), 'muxers': sorted(self.muxers), 'working_hardware': sorted(self.working_hardware)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'FFmpegCapabilities':
+        return cls(data['ffmpeg_path'], data.get('version'), data.get('ffprobe_version'), data.get('encoders'),
+                   data.get('filters', ()), data.get('muxers', ()), data.get('working_hardware', ()))
+
+
+def translate_preset(encoder: str, preset: str):
+    """
+    Maps a libx264 preset name onto what `encoder` accepts; None means pass no -preset.
+
+    Software encoders get the name unchanged (as before; ffmpeg ignores it where unused).
+    """
+    if not preset or not encoder:
+        return preset
+    if encoder.endswith('_nvenc'):
+        return _NVENC_PRESETS.get(preset, preset if preset.startswith('p') else None)
+    if encoder.endswith('_qsv'):
+        return _QSV_PRESETS.get(preset, preset)
+    if encoder.endswith(('_videotoolbox', '_amf')):
+        return None # No -preset option
+    return preset
+
+
+def _run(cmd: list) -> str:
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, errors='replace', creationflags=creationflags)
+    except OSError as e:
+        raise FFmpegCapabilitiesError(f"Could not run {cmd[0]}: {e}")
+    if result.returncode != 0 or not isinstance(result.stdout, str):
+        raise FFmpegCapabilitiesError(f"{' '.join(cmd[:2])} failed (return code {result.returncode}).")
+    return result.stdout
+
+
+def _listing(output: str) -> list:
+    """Returns the rows of an -encoders/-filters/-muxers listing (the part after the legend)."""
+    lines = output.splitlines()
+    for i, line in enumerate(lines):
+        if line.strip().startswith('---'):
+            return [line.split() for line in lines[i + 1:] if line.strip()]
+    return [line.split() for line in lines if line.strip()]
+
+
+def parse_encoders(output: str) -> dict:
+    """Parses `ffmpeg -encoders`: ' V....D libx264   libx264 H.264 ...' -> {'libx264': 'V'}."""
+    return {row[1]: row[0][0] for row in _listing(output) if len(row) >= 2 and row[0][0] in 'VAS'}
+
+
+def parse_filters(output: str) -> set:
+    """Parses `ffmpeg -filters`: ' TSC scale   V->V   Scale the input video ...' -> {'scale'}."""
+    filters = set()
+    for row in _listing(output):
+        if len(row) >= 3 and '->' in row[2]:
+            filters.add(row[1])
+        elif len(row) >= 2 and '->' in row[1]:
+            filters.add(row[0]) # Builds without the flag column
+    return filters
+
+
+def parse_muxers(output: str) -> set:
+    """Parses `ffmpeg -muxers`: ' E  mp4   MP4 (MPEG-4 Part 14)' -> {'mp4'}."""
+    muxers = set()
+    for row in _listing(output):
+        if len(row) >= 2 and 'E' in row[0]:
+            muxers.update(row[1].split(','))
+    return muxers
+
+
+def parse_version(output: str):
+    """Returns '6.1.1' from 'ffmpeg version 6.1.1 Copyright ...' (None if unrecognised)."""
+    parts = (output.splitlines() or [''])[0].split()
+    return parts[2] if len(parts) > 2 and parts[1] == 'version' else None
+
+
+def hardware_encoder_works(ffmpeg_path: str, encoder: str) -> bool:
+    """Encodes a moment of synthetic input with `encoder`; False if the device is missing."""
+    if encoder == 'aac_at':
+        source, options = 'anullsrc=d=0.1', ['-c:a', encoder]
+    else:
+        source, options = 'color=c=black:s=256x256:d=0.1', ['-frames:v', '1', '-c:v', encoder]
+    try:
+        _run([ffmpeg_path, '-hide_banner', '-v', 'error', '-f', 'lavfi', '-i', source] + options + ['-f', 'null', '-'])
+    except FFmpegCapabilitiesError:
+        return False
+    return True
+
+
+def probe_capabilities(ffmpeg_path: str, ffprobe_path: str = None) -> FFmpegCapabilities:
+    """
+    Queries an ffmpeg binary (-version, -encoders, -filters, -muxers) and test-encodes
+    with its hardware encoders.
+
+    Raises:
+        FFmpegCapabilitiesError: If ffmpeg cannot be run or lists no encoders.
+    """
+    version = parse_version(_run([ffmpeg_path, '-version']))
+    encoders = parse_encoders(_run([ffmpeg_path, '-hide_banner', '-encoders']))
+    if not encoders:
+        raise FFmpegCapabilitiesError(f"{ffmpeg_path} lists no encoders.")
+    filters = parse_filters(_run([ffmpeg_path, '-hide_banner', '-filters']))
+    muxers = parse_muxers(_run([ffmpeg_path, '-hide_banner', '-muxers']))
+    ffprobe_version = None
+    if ffprobe_path:
+        try:
+            ffprobe_version = parse_version(_run([ffprobe_path, '-version']))
+        except FFmpegCapabilitiesError:
+            pass
+    working = [name for name in HARDWARE_ENCODERS if name in encoders and hardware_encoder_works(ffmpeg_path, name)]
+    return FFmpegCapabilities(ffmpeg_path, version, ffprobe_version, encoders, filters, muxers, working)
+
+
+def _binary_key(path: str) -> str:
+    stat = os.stat(path)
+    return f"{path}|{stat.st_mtime_ns}|{stat.st_size}"
+
+
+def detect_capabilities(ffmpeg_path: str = 'ffmpeg', ffprobe_path: str = 'ffprobe', cache_path: str = DEFAULT_CAPABILITIES_PATH) -> FFmpegCapabilities:
+    """
+    Returns the capabilities of the ffmpeg on PATH (or at ffmpeg_path).
+
+    Results are cached in a JSON file keyed by the binaries' resolved paths, mtimes and
+    sizes, so ffmpeg is only queried again after it was replaced or upgraded.
+
+    Args:
+        cache_path: JSON cache file. None always queries ffmpeg.
+
+    Raises:
+        FFmpegCapabilitiesError: If ffmpeg is not found or cannot be queried.
+    """
+    resolved = shutil.which(ffmpeg_path)
+    if not resolved:
+        raise FFmpegCapabilitiesError(f"ffmpeg not found: {ffmpeg_path}")
+    resolved = os.path.realpath(resolved)
+    resolved_probe = shutil.which(ffprobe_path) if ffprobe_path else None
+    resolved_probe = os.path.realpath(resolved_probe) if resolved_probe else None
+    key = _binary_key(resolved) + (f"|{_binary_key(resolved_probe)}" if resolved_probe else "")
+
+    cache = {}
+    if cache_path:
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if key in cache:
+                return FFmpegCapabilities.from_dict(cache[key])
+        except (OSError, ValueError, KeyError, TypeError):
+            cache = {}
+    capabilities = probe_capabilities(resolved, resolved_probe)
+    if cache_path:
+        cache = {k: v for k, v in cache.items() if not k.startswith(resolved + "|")} # Drop entries of older builds
+        cache[key] = capabilities.to_dict()
+        try:
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            temp_path = cache_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not cache ffmpeg capabilities: {e}")
+    return capabilities
+
+
+_default_capabilities = None
+_default_detected = False
+_default_lock = threading.Lock()
+
+def get_ffmpeg_capabilities():
+    """
+    Returns the capabilities of the ffmpeg on PATH, detected once per process.
+
+    Returns:
+        FFmpegCapabilities, or None if ffmpeg could not be queried (callers then skip
+        their checks and let ffmpeg report problems itself).
+    """
+    global _default_capabilities, _default_detected
+    with _default_lock:
+        if not _default_detected:
+            _default_detected = True
+            try:
+                _default_capabilities = detect_capabilities()
+            except FFmpegCapabilitiesError as e:
+                print(f"Warning: Could not detect ffmpeg capabilities: {e}")
+        return _default_capabilities
+
+
+def set_ffmpeg_capabilities(capabilities):
+    """Replaces the process-wide capabilities (e.g. after pointing the app at another ffmpeg)."""
+    global _default_capabilities, _default_detected
+    with _default_lock:
+        _default_capabilities = capabilities
+        _default_detected = True
@@ -0,0 +1,180 @@
+import sys
+import subprocess
+
+from src.core.media_probe import inspect_media
+
+# Bytes per pixel of the raw pixel formats frames can be grabbed in.
+PIXEL_FORMATS = {'rgb24': 3, 'rgba': 4, 'gray': 1}
+# PIL modes matching PIXEL_FORMATS, for Image.frombuffer.
+_PIL_MODES = {'rgb24': 'RGB', 'rgba': 'RGBA', 'gray': 'L'}
+
+
+class FrameGrabError(Exception):
+    """Raised when a raw frame cannot be grabbed."""
+    pass
+
+
+class RawFrame:
+    """
+    One decoded frame as packed raw pixels, exactly as ffmpeg wrote them.
+
+    to_image() and to_array() wrap the same buffer without copying it, so a frame is
+    decoded once by ffmpeg and never re-encoded or re-decoded in Python.
+    """
+    def __init__(self, data, width: int, height: int, pixel_format: str = 'rgb24'):
+        """
+        Args:
+            data: width * height * bytes-per-pixel bytes (bytes, bytearray or memoryview).
+            width, height: Frame size in pixels.
+            pixel_format: One of PIXEL_FORMATS.
+        """
+        if pixel_format not in PIXEL_FORMATS:
+            raise FrameGrabError(f"Unsupported pixel format: {pixel_format}")
+        if len(data) != width * height * PIXEL_FORMATS[pixel_format]:
+            raise FrameGrabError(f"Frame buffer holds {len(data)} bytes, expected {width * height * PIXEL_FORMATS[pixel_format]}.")
+        self.data = data
+        self.width = width
+        self.height = height
+        self.pixel_format = pixel_format
+
+    @property
+    def size(self) -> tuple:
+        return self.width, self.height
+
+    def to_image(self):
+        """Returns a PIL Image sharing this frame's buffer (requires Pillow)."""
+        from PIL import Image # Optional dependency; only the GUI ships it
+        mode = _PIL_MODES[self.pixel_format]
+        return Image.frombuffer(mode, self.size, self.data, 'raw', mode, 0, 1)
+
+    def to_array(self):
+        """Returns a (height, width, channels) uint8 NumPy view of the buffer (requires numpy)."""
+        import numpy # Optional dependency, only needed for frame analysis
+        array = numpy.frombuffer(self.data, dtype=numpy.uint8)
+        return array.reshape(self.height, self.width, PIXEL_FORMATS[self.pixel_format])
+
+
+def display_size(media_info: dict) -> tuple:
+    """
+    Returns the (width, height) a file's video displays at, or (None, None) if unknown.
+
+    Accounts for rotation metadata, which ffmpeg applies when decoding.
+    """
+    video_stream = (media_info or {}).get('video_stream') or {}
+    width, height = video_stream.get('width'), video_stream.get('height')
+    if not width or not height:
+        return None, None
+    rotation = (video_stream.get('tags') or {}).get('rotate')
+    for side_data in video_stream.get('side_data_list') or []:
+        rotation = side_data.get('rotation', rotation)
+    try:
+        if abs(int(float(rotation or 0))) % 180 == 90:
+            width, height = height, width
+    except (TypeError, ValueError):
+        pass
+    return width, height
+
+
+def scaled_size(media_info: dict, width: int) -> tuple:
+    """Returns (width, even height) keeping the video's aspect ratio (16:9 if unknown)."""
+    source_width, source_height = display_size(media_info)
+    if source_width and source_height:
+        height = int(round(width * source_height / source_width / 2)) * 2
+    else:
+        height = width * 9 // 16
+    return width, max(2, height)
+
+
+def read_raw_output(cmd: list, frame_bytes: int, process_holder: dict = None) -> bytearray:
+    """
+    Runs an ffmpeg command that writes rawvideo to stdout and reads exactly frame_bytes.
+
+    stdout is read straight into one preallocated buffer (no per-chunk copies), and
+    anything ffmpeg writes after it is discarded.
+
+    Args:
+        cmd: ffmpeg argument list ending in a rawvideo 'pipe:1' output. Run it with
+            '-v error' so stderr stays small while stdout is read.
+        frame_bytes: Number of bytes to read.
+        process_holder: Optional dict; the Popen object is stored under 'process' while it
+            runs, so another thread can kill it.
+
+    Raises:
+        FrameGrabError: If ffmpeg fails or writes fewer than frame_bytes bytes.
+    """
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    try:
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, creationflags=creationflags)
+    except OSError as e:
+        raise FrameGrabError(f"Could not start ffmpeg: {e}")
+    if process_holder is not None:
+        process_holder['process'] = process
+    buffer = bytearray(frame_bytes)
+    view = memoryview(buffer)
+    filled = 0
+    try:
+        while filled < frame_bytes:
+            count = process.stdout.readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+        _, err = process.communicate()
+    finally:
+        view.release()
+        if process_holder is not None:
+            process_holder['process'] = None
+    if filled < frame_bytes:
+        if process.returncode != 0:
+            raise FrameGrabError(f"ffmpeg error (return code {process.returncode}): {err.decode('utf-8', 'replace')[-2000:]}")
+        raise FrameGrabError(f"ffmpeg returned {filled} of {frame_bytes} expected bytes.")
+    return buffer
+
+
+def frame_command(input_file_path: str, seek_seconds: float, width: int, height: int, pixel_format: str = 'rgb24', accurate: bool = True) -> list:
+    """
+    Builds the ffmpeg command that writes one raw frame of width x height to stdout.
+
+    Args:
+        accurate: Decode up to the exact time. False shows the keyframe at or before it,
+            which decodes a single frame.
+    """
+    cmd = ['ffmpeg', '-v', 'error']
+    if not accurate:
+        cmd += ['-skip_frame', 'nokey']
+    cmd += ['-ss', f"{max(0.0, seek_seconds):.3f}", '-i', input_file_path, '-an', '-sn', '-vf', f"scale={width}:{height}",
+            '-frames:v', '1', '-f', 'rawvideo', '-pix_fmt', pixel_format, 'pipe:1']
+    return cmd
+
+
+def grab_frame(input_file_path: str, seek_seconds: float, width: int = 240, pixel_format: str = 'rgb24', accurate: bool = True, media_info: dict = None, process_holder: dict = None) -> RawFrame:
+    """
+    Decodes one frame as raw pixels scaled to `width` (height keeps the aspect ratio).
+
+    Args:
+        input_file_path: Path to the media file.
+        seek_seconds: Time of the frame.
+        width: Output width in pixels.
+        pixel_format: One of PIXEL_FORMATS.
+        accurate: See frame_command.
+        media_info: inspect_media() result, if the caller already has it.
+        process_holder: See read_raw_output.
+
+    Returns:
+        A RawFrame.
+
+    Raises:
+        FrameGrabError: If the file cannot be probed or ffmpeg fails.
+    """
+    if pixel_format not in PIXEL_FORMATS:
+        raise FrameGrabError(f"Unsupported pixel format: {pixel_format}")
+    if media_info is None:
+        try:
+            media_info = inspect_media(input_file_path)
+        except Exception as e:
+            raise FrameGrabError(f"Could not probe input file: {e}")
+    if not media_info.get('video_stream'):
+        raise FrameGrabError("No video stream to grab a frame from.")
+    frame_width, frame_height = scaled_size(media_info, width)
+    cmd = frame_command(input_file_path, seek_seconds, frame_width, frame_height, pixel_format, accurate)
+    data = read_raw_output(cmd, frame_width * frame_height * PIXEL_FORMATS[pixel_format], process_holder)
+    return RawFrame(data, frame_width, frame_height, pixel_format)
@@ -0,0 +1,256 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.converter import ConversionError, FFmpegProcess, DEFAULT_STATS_PERIOD, parse_timestamp, write_concat_list
+from src.core.media_probe import ProbeCache, inspect_media
+
+DEFAULT_PALETTE_DIR = os.path.join(os.path.expanduser("~"), ".mediadl", "palettes")
+MAX_CACHED_PALETTES = 500
+# Frames wider than this, or with more pixels than this, are scaled down to keep
+# ffmpeg's per-frame buffers (and the resulting GIF) within reasonable memory.
+DEFAULT_MAX_WIDTH = 1280
+DEFAULT_MAX_PIXELS = 1280 * 720
+# Clips longer than two chunks are rendered in parallel time chunks.
+DEFAULT_CHUNK_SECONDS = 20.0
+
+
+class GifEngine:
+    """
+    Renders GIFs in two passes with a cached palette.
+
+    Pass one (palettegen) runs once per (input fingerprint, trim, fps, scale) and its palette
+    is kept on disk, so re-exporting with another dither only runs pass two (paletteuse).
+    Long clips are rendered in parallel time chunks that all use the same global palette
+    and are then joined with the concat demuxer without re-encoding.
+    """
+    def __init__(self, palette_dir: str = DEFAULT_PALETTE_DIR, max_width: int = DEFAULT_MAX_WIDTH, max_pixels: int = DEFAULT_MAX_PIXELS, chunk_seconds: float = DEFAULT_CHUNK_SECONDS, max_workers: int = None, probe_cache=None, stats_period: float = DEFAULT_STATS_PERIOD):
+        """
+        Args:
+            palette_dir: Directory for cached palette PNGs.
+            max_width: Largest output width; wider requests are scaled down.
+            max_pixels: Largest output frame area (width * height).
+            chunk_seconds: Chunk length for parallel rendering. 0 disables chunking.
+            max_workers: Number of chunks rendered at once. Defaults to the CPU count.
+            probe_cache: ProbeCache used for ffprobe results. Defaults to the shared cache.
+            stats_period: Seconds between progress updates from ffmpeg.
+        """
+        self.palette_dir = palette_dir
+        self.max_width = max_width
+        self.max_pixels = max_pixels
+        self.chunk_seconds = chunk_seconds
+        self.max_workers = max_workers if max_workers and max_workers > 0 else (os.cpu_count() or 1)
+        self.probe_cache = probe_cache
+        self.stats_period = stats_period
+        self.palette_hits = 0
+        self.palette_misses = 0
+        self._stop_flag = threading.Event()
+        self._processes = []
+        self._lock = threading.Lock()
+
+    def stop(self):
+        """Stops every ffmpeg process this engine is running."""
+        self._stop_flag.set()
+        with self._lock:
+            for process in self._processes:
+                process.kill()
+
+    def _run_ffmpeg(self, cmd, progress_callback=None, total_duration_seconds=0):
+        process = FFmpegProcess(cmd, stop_flag=self._stop_flag, stats_period=self.stats_period)
+        with self._lock:
+            self._processes.append(process)
+        try:
+            process.run(progress_callback=progress_callback, total_duration_seconds=total_duration_seconds)
+        finally:
+            with self._lock:
+                self._processes.remove(process)
+
+    def limit_width(self, scale_width: int, media_info: dict = None) -> int:
+        """
+        Returns the output width to use, honouring max_width and max_pixels.
+
+        A scale_width of -1 means "source width".
+        """
+        video_stream = (media_info or {}).get('video_stream') or {}
+        source_width, source_height = video_stream.get('width'), video_stream.get('height')
+        width = source_width if scale_width in (None, -1) else scale_width
+        if not width:
+            width = self.max_width
+        width = min(width, self.max_width)
+        if source_width and source_height and self.max_pixels:
+            height = width * source_height / source_width
+            if width * height > self.max_pixels:
+                width = int((self.max_pixels * source_width / source_height) ** 0.5)
+        return max(2, int(width) // 2 * 2) # Even widths keep every scaler happy
+
+    def palette_key(self, input_file_path: str, start_time=None, end_time=None, fps: int = 10, width: int = 480) -> str:
+        """Returns the cache key of the palette for this input fingerprint, trim, fps and scale."""
+        fingerprint = ProbeCache.file_key(input_file_path)
+        raw = repr((fingerprint, str(start_time or ''), str(end_time or ''), fps, width))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _trim_args(start_time=None, end_time=None) -> list:
+        args = []
+        if start_time:
+            args += ['-ss', str(start_time)]
+        if end_time:
+            args += ['-to', str(end_time)]
+        return args
+
+    def get_palette(self, input_file_path: str, start_time=None, end_time=None, fps: int = 10, width: int = 480, progress_callback=None) -> str:
+        """
+        Returns the path of the palette PNG for these settings, generating it if it isn't cached.
+
+        Raises:
+            ConversionError: If palettegen fails or the engine is stopped.
+        """
+        os.makedirs(self.palette_dir, exist_ok=True)
+        palette_path = os.path.join(self.palette_dir, self.palette_key(input_file_path, start_time, end_time, fps, width) + ".png")
+        if os.path.exists(palette_path):
+            self.palette_hits += 1
+            os.utime(palette_path) # Mark as recently used for pruning
+            return palette_path
+
+        self.palette_misses += 1
+        # Write to a temporary name first so a cancelled run never leaves a half-written palette.
+        fd, temp_path = tempfile.mkstemp(suffix=".png", dir=self.palette_dir)
+        os.close(fd)
+        try:
+            cmd = ['ffmpeg', '-y'] + self._trim_args(start_time, end_time) + ['-i', input_file_path,
+                   '-vf', f"fps={fps},scale={width}:-1:flags=lanczos,palettegen=stats_mode=full", '-frames:v', '1', temp_path]
+            self._run_ffmpeg(cmd, progress_callback=progress_callback)
+            os.replace(temp_path, palette_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._prune_palettes()
+        return palette_path
+
+    def _prune_palettes(self):
+        try:
+            entries = [os.path.join(self.palette_dir, name) for name in os.listdir(self.palette_dir) if name.endswith(".png")]
+            if len(entries) <= MAX_CACHED_PALETTES:
+                return
+            entries.sort(key=os.path.getmtime)
+            for path in entries[:len(entries) - MAX_CACHED_PALETTES]:
+                os.remove(path)
+        except OSError:
+            pass # Pruning is best effort
+
+    def _paletteuse_cmd(self, input_file_path, palette_path, output_path, start_time, end_time, fps, width, dither, threads):
+        cmd = ['ffmpeg', '-y'] + self._trim_args(start_time, end_time) + ['-i', input_file_path, '-i', palette_path,
+               '-lavfi', f"fps={fps},scale={width}:-1:flags=lanczos[x];[x][1:v]paletteuse=dither={dither}"]
+        if threads is not None:
+            cmd += ['-threads', str(threads)]
+        return cmd + [output_path]
+
+    def render(self, input_file_path: str, output_file_path: str, fps: int = 10, scale_width: int = 480, start_time=None, end_time=None, dither: str = 'sierra2_4a', threads: int = None, parallel_chunks: bool = True, progress_callback=None) -> str:
+        """
+        Renders a GIF.
+
+        Args:
+            input_file_path: Path to the input media file.
+            output_file_path: Path of the GIF to write.
+            fps: Frame rate of the GIF.
+            scale_width: Output width (height keeps the aspect ratio). -1 keeps the source width.
+                The width is capped by max_width/max_pixels.
+            start_time: Start time for trimming (e.g., "00:00:10").
+            end_time: End time for trimming (e.g., "00:00:20").
+            dither: paletteuse dither mode (e.g., 'sierra2_4a', 'bayer', 'none').
+            threads: ffmpeg -threads for each render process.
+            parallel_chunks: Render long clips in parallel time chunks.
+            progress_callback: Receives 'converting' updates (with 'phase' 'palette' or 'render').
+
+        Returns:
+            The full path to the GIF.
+
+        Raises:
+            ConversionError: If any ffmpeg step fails or the engine is stopped.
+            FileNotFoundError: If the input file does not exist.
+        """
+        if not os.path.exists(input_file_path):
+            raise FileNotFoundError(f"Input file not found: {input_file_path}")
+        self._stop_flag.clear()
+        output_dir = os.path.dirname(output_file_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        media_info = None
+        try:
+            media_info = inspect_media(input_file_path, cache=self.probe_cache)
+        except Exception as e:
+            print(f"Warning: Could not probe input file: {e}")
+        width = self.limit_width(scale_width, media_info)
+
+        start_seconds = parse_timestamp(start_time) if start_time else 0.0
+        end_seconds = parse_timestamp(end_time) if end_time else (media_info['duration'] if media_info else 0.0)
+        clip_duration = max(0.0, end_seconds - start_seconds)
+
+        def phase_callback(phase):
+            if not progress_callback:
+                return None
+            def callback(data):
+                data['phase'] = phase
+                progress_callback(data)
+            return callback
+
+        palette_path = self.get_palette(input_file_path, start_time, end_time, fps, width, progress_callback=phase_callback('palette'))
+
+        chunk_count = int(clip_duration // self.chunk_seconds) if self.chunk_seconds and parallel_chunks else 0
+        if chunk_count < 2:
+            cmd = self._paletteuse_cmd(input_file_path, palette_path, output_file_path, start_time, end_time, fps, width, dither, threads)
+            self._run_ffmpeg(cmd, progress_callback=phase_callback('render'), total_duration_seconds=clip_duration)
+        else:
+            self._render_chunks(input_file_path, palette_path, output_file_path, start_seconds, clip_duration, chunk_count, fps, width, dither, threads, phase_callback('render'))
+
+        if progress_callback:
+            progress_callback({'status': 'finished_conversion', 'filename': output_file_path, 'mode': 'transcode'})
+        return output_file_path
+
+    def _render_chunks(self, input_file_path, palette_path, output_file_path, start_seconds, clip_duration, chunk_count, fps, width, dither, threads, progress_callback):
+        chunk_length = clip_duration / chunk_count
+        work_dir = tempfile.mkdtemp(prefix=".gif_chunks_", dir=os.path.dirname(output_file_path) or None)
+        done_seconds = [0.0] * chunk_count
+        progress_lock = threading.Lock()
+
+        def chunk_progress(index, data):
+            if not progress_callback or data.get('time_seconds') is None:
+                return
+            with progress_lock:
+                done_seconds[index] = min(data['time_seconds'], chunk_length)
+                merged = sum(done_seconds)
+                progress_callback({'status': 'converting', 'percentage': min(100.0, merged / clip_duration * 100),
+                                   'time_seconds': merged, 'speed': data.get('speed'), 'chunk': index, 'chunk_count': chunk_count})
+
+        chunk_paths = [os.path.join(work_dir, f"chunk_{i:04d}.gif") for i in range(chunk_count)]
+
+        def render_chunk(index):
+            chunk_start = start_seconds + index * chunk_length
+            cmd = self._paletteuse_cmd(input_file_path, palette_path, chunk_paths[index], f"{chunk_start:.6f}",
+                                       f"{chunk_start + chunk_length:.6f}", fps, width, dither, threads)
+            self._run_ffmpeg(cmd, progress_callback=lambda data: chunk_progress(index, data))
+
+        try:
+            errors = []
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gif-chunk") as executor:
+                for future in [executor.submit(render_chunk, i) for i in range(chunk_count)]:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        self.stop()
+            if errors:
+                first = next((e for e in errors if "stopped by user" not in str(e)), errors[0])
+                raise first if isinstance(first, ConversionError) else ConversionError(f"GIF chunk render failed: {first}")
+
+            list_path = os.path.join(work_dir, "chunks.txt")
+            write_concat_list(list_path, chunk_paths)
+            # Every chunk was quantised against the same global palette, so the GIF
+            # packets can be joined as-is.
+            self._run_ffmpeg(['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path, '-c', 'copy', output_file_path])
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
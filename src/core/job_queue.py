@@ -0,0 +1,706 @@
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import sqlite3
+import threading
+
+from src.core.downloader import Downloader
+from src.core.converter import Converter
+from src.core.media_probe import inspect_media
+from src.core.cost_model import CostModelError, get_cost_model
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.expanduser("~"), ".mediadl", "jobs.sqlite3")
+DEFAULT_LEASE_SECONDS = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+# Delay before a failed job is retried: RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), capped.
+RETRY_BACKOFF_SECONDS = 5.0
+MAX_RETRY_BACKOFF_SECONDS = 300.0
+
+JOB_STATES = ('queued', 'running', 'done', 'failed', 'cancelled')
+FINISHED_STATES = ('done', 'failed', 'cancelled')
+# Lifecycle updates a JobRunner sends to its progress callback besides the jobs' own progress.
+JOB_EVENT_STATUSES = ('job_started', 'job_done', 'job_failed', 'job_cancelled', 'job_released')
+# Claim order: 'fifo' (submission order), 'sjf' (shortest estimated job first) or 'deadline'
+# (least slack first: deadline minus estimated run time; jobs without a deadline follow, shortest first).
+SCHEDULING_POLICIES = ('fifo', 'sjf', 'deadline')
+# Under 'sjf', a job's estimate shrinks by this many seconds per second it has waited, so
+# long jobs are not starved by a steady stream of short ones.
+DEFAULT_AGING = 1.0
+# Free disk space a convert job needs: its predicted output times this factor.
+DISK_SPACE_FACTOR = 1.2
+_JOB_COLUMNS = ('id', 'kind', 'payload', 'state', 'priority', 'attempts', 'max_attempts', 'worker', 'lease_expires',
+                'not_before', 'created_at', 'updated_at', 'finished_at', 'result', 'error', 'estimated_seconds', 'estimated_bytes', 'deadline')
+
+
+class JobQueueError(Exception):
+    """Raised when a job cannot be submitted or the queue database cannot be used."""
+    pass
+
+
+def _process_alive(pid: int) -> bool:
+    if sys.platform == "win32":
+        return True # os.kill(pid, 0) would send CTRL_C_EVENT; leases expire instead
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass # Exists but belongs to another user
+    return True
+
+
+class JobQueue:
+    """
+    Persistent queue of download and convert jobs, journalled in SQLite (WAL).
+
+    Jobs are plain dicts: 'kind' ('download', 'convert', ...) plus a JSON 'payload' of the
+    arguments for that kind. A worker claims a job with a lease that it renews with
+    heartbeat(); a job whose lease runs out (its worker hung or died) is picked up again,
+    and jobs left running by a process that no longer exists are requeued when the queue
+    is opened. Failed jobs are retried with exponential backoff until max_attempts.
+    Jobs can carry a cost estimate and a deadline that the scheduling policy orders them
+    by (see submit_convert). Several threads and processes can share one queue file.
+    """
+    def __init__(self, db_path: str = DEFAULT_QUEUE_PATH, lease_seconds: float = DEFAULT_LEASE_SECONDS, max_attempts: int = DEFAULT_MAX_ATTEMPTS, recover: bool = True, policy: str = 'fifo', aging: float = DEFAULT_AGING):
+        """
+        Args:
+            db_path: SQLite file holding the journal.
+            lease_seconds: How long a claimed job stays with its worker without a heartbeat.
+            max_attempts: Default number of times a job is tried before it is marked failed.
+            recover: Requeue jobs left running by dead processes right away.
+            policy: One of SCHEDULING_POLICIES. Priorities always come first.
+            aging: See DEFAULT_AGING.
+
+        Raises:
+            JobQueueError: If the database cannot be opened or the policy is unknown.
+        """
+        if policy not in SCHEDULING_POLICIES:
+            raise JobQueueError(f"Unknown scheduling policy: {policy}")
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.policy = policy
+        self.aging = aging
+        self._lock = threading.RLock()
+        try:
+            db_dir = os.path.dirname(db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            # Autocommit mode; claims use explicit BEGIN IMMEDIATE so two processes never take the same job.
+            self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+                " state TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0,"
+                " attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL,"
+                " worker TEXT, lease_expires REAL, not_before REAL NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL, updated_at REAL NOT NULL, finished_at REAL,"
+                " result TEXT, error TEXT, estimated_seconds REAL, estimated_bytes INTEGER, deadline REAL)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (('estimated_seconds', 'REAL'), ('estimated_bytes', 'INTEGER'), ('deadline', 'REAL')):
+                if column not in columns: # Queue files from before cost estimates
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_pickup ON jobs (state, priority, id)")
+        except (sqlite3.Error, OSError) as e:
+            raise JobQueueError(f"Could not open job queue at {db_path}: {e}")
+        if recover:
+            self.recover()
+
+    @staticmethod
+    def _row_to_job(row) -> dict:
+        job = dict(zip(_JOB_COLUMNS, row))
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    # --- Submitting ---
+
+    def submit(self, kind: str, payload: dict, priority: int = 0, max_attempts: int = None, estimated_seconds: float = None, estimated_bytes: int = None, deadline: float = None) -> int:
+        """
+        Adds a job and returns its id.
+
+        Args:
+            kind: Job kind; a JobRunner needs a handler for it.
+            payload: JSON-serialisable arguments of the job.
+            priority: Higher runs first; equal priorities are ordered by the policy.
+            max_attempts: Overrides the queue's default.
+            estimated_seconds, estimated_bytes: Predicted run time and output size, if known.
+            deadline: Time (as time.time()) the job should be done by.
+        """
+        return self.submit_many([{'kind': kind, 'payload': payload, 'priority': priority, 'max_attempts': max_attempts,
+                                  'estimated_seconds': estimated_seconds, 'estimated_bytes': estimated_bytes, 'deadline': deadline}])[0]
+
+    def submit_convert(self, payload: dict, priority: int = 0, deadline: float = None, max_attempts: int = None, cost_model=None, check_disk_space: bool = True) -> int:
+        """
+        Adds a 'convert' job with a cost estimate, refusing it if its output would not fit.
+
+        Args:
+            payload: Keyword arguments of Converter.convert_media.
+            priority, deadline, max_attempts: As for submit.
+            cost_model: CostModel used for the estimate. Defaults to the shared one.
+            check_disk_space: Refuse the job when the free space at its output, minus the
+                predicted output of every unfinished job, is less than DISK_SPACE_FACTOR
+                times its predicted output.
+
+        Returns:
+            The new job id. A job whose input cannot be probed is queued without an estimate.
+
+        Raises:
+            JobQueueError: If the predicted output does not fit on the disk.
+        """
+        estimate = None
+        try:
+            estimate = (cost_model or get_cost_model()).estimate_file(payload['input_file_path'], payload)
+        except (CostModelError, KeyError, ValueError) as e:
+            print(f"Warning: Could not estimate convert job: {e}")
+        if estimate and check_disk_space:
+            output_dir = os.path.dirname(os.path.abspath(payload['output_file_path']))
+            while not os.path.isdir(output_dir) and os.path.dirname(output_dir) != output_dir:
+                output_dir = os.path.dirname(output_dir) # Measure the disk the directory will be created on
+            free = shutil.disk_usage(output_dir).free - self.reserved_bytes()
+            needed = int(estimate['output_bytes'] * DISK_SPACE_FACTOR)
+            if needed > free:
+                raise JobQueueError(f"Not enough free disk space for {os.path.basename(payload['output_file_path'])}: "
+                                    f"about {needed / 2**20:.0f} MiB needed, {max(0, free) / 2**20:.0f} MiB available.")
+        return self.submit('convert', payload, priority=priority, max_attempts=max_attempts, deadline=deadline,
+                           estimated_seconds=estimate['seconds'] if estimate else None, estimated_bytes=estimate['output_bytes'] if estimate else None)
+
+    def reserved_bytes(self) -> int:
+        """Returns the predicted output size of all queued and running jobs."""
+        with self._lock:
+            row = self._db.execute("SELECT SUM(estimated_bytes) FROM jobs WHERE state IN ('queued', 'running')").fetchone()
+        return row[0] or 0
+
+    def submit_many(self, jobs) -> list:
+        """
+        Adds many jobs in one transaction (so a batch of thousands is journalled at once).
+
+        Args:
+            jobs: Dicts with 'kind', 'payload' and optionally 'priority', 'max_attempts',
+                'estimated_seconds', 'estimated_bytes' and 'deadline' (see submit).
+
+        Returns:
+            The new job ids, in order.
+        """
+        now = time.time()
+        rows = []
+        for job in jobs:
+            if not job.get('kind'):
+                raise JobQueueError("Job is missing 'kind'.")
+            try:
+                payload = json.dumps(job.get('payload') or {})
+            except (TypeError, ValueError) as e:
+                raise JobQueueError(f"Job payload is not JSON-serialisable: {e}")
+            rows.append((job['kind'], payload, job.get('priority') or 0, job.get('max_attempts') or self.max_attempts, now, now,
+                         job.get('estimated_seconds'), job.get('estimated_bytes'), job.get('deadline')))
+        ids = []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for row in rows:
+                    cursor = self._db.execute("INSERT INTO jobs (kind, payload, state, priority, max_attempts, created_at, updated_at,"
+                                              " estimated_seconds, estimated_bytes, deadline) VALUES (?, ?, 'queued', ?, ?, ?, ?, ?, ?, ?)", row)
+                    ids.append(cursor.lastrowid)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return ids
+
+    # --- Workers ---
+
+    @staticmethod
+    def make_worker_id(name: str = "worker") -> str:
+        """Returns a worker id that recover() can trace back to this process."""
+        return f"{socket.gethostname()}:{os.getpid()}:{name}"
+
+    def claim(self, worker_id: str, kinds=None):
+        """
+        Leases the next runnable job to worker_id.
+
+        Jobs whose lease expired are returned to the queue (or failed, once out of
+        attempts) first, so a hung worker's job is picked up again. Among runnable jobs
+        the highest priority wins, then the queue's scheduling policy decides.
+
+        Args:
+            worker_id: Id of the claiming worker (see make_worker_id).
+            kinds: Only claim jobs of these kinds. None claims any kind.
+
+        Returns:
+            The job dict, or None if nothing is runnable.
+        """
+        now = time.time()
+        kind_filter, params = "", [now]
+        if kinds:
+            kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})"
+            params += list(kinds)
+        order = "priority DESC, id"
+        if self.policy == 'sjf':
+            order = "priority DESC, COALESCE(estimated_seconds, 0) - (? - created_at) * ?, id"
+            params += [now, self.aging]
+        elif self.policy == 'deadline':
+            order = "priority DESC, deadline IS NULL, deadline - COALESCE(estimated_seconds, 0), COALESCE(estimated_seconds, 0), id"
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_where("state='running' AND lease_expires < ?", (now,), "Lease expired.", now)
+                row = self._db.execute("SELECT id FROM jobs WHERE state='queued' AND not_before <= ?" + kind_filter +
+                                       " ORDER BY " + order + " LIMIT 1", params).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE jobs SET state='running', attempts=attempts+1, worker=?, lease_expires=?, updated_at=?, error=NULL"
+                                     " WHERE id=?", (worker_id, now + self.lease_seconds, now, row[0]))
+                    row = self._db.execute("SELECT * FROM jobs WHERE id=?", (row[0],)).fetchone()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return self._row_to_job(row) if row is not None else None
+
+    def _requeue_where(self, condition: str, params: tuple, error: str, now: float) -> int:
+        # Jobs out of attempts fail instead of looping forever (e.g. a job that crashes the app).
+        cursor = self._db.execute(
+            "UPDATE jobs SET state=CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,"
+            " finished_at=CASE WHEN attempts >= max_attempts THEN ? ELSE NULL END,"
+            " worker=NULL, lease_expires=NULL, updated_at=?, error=? WHERE " + condition, (now, now, error) + tuple(params))
+        return cursor.rowcount
+
+    def recover(self) -> int:
+        """
+        Requeues jobs left running by processes on this host that no longer exist.
+
+        Jobs of other hosts (or of live processes) are left to their lease.
+
+        Returns:
+            Number of jobs requeued or failed.
+        """
+        host = socket.gethostname()
+        orphaned = []
+        with self._lock:
+            for job_id, worker in self._db.execute("SELECT id, worker FROM jobs WHERE state='running'").fetchall():
+                worker_host, _, rest = (worker or "").partition(":")
+                pid = rest.partition(":")[0]
+                if worker_host == host and pid.isdigit() and int(pid) != os.getpid() and not _process_alive(int(pid)):
+                    orphaned.append(job_id)
+            if not orphaned:
+                return 0
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                count = self._requeue_where(f"state='running' AND id IN ({','.join('?' * len(orphaned))})", orphaned,
+                                            "Worker process exited while the job was running.", time.time())
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return count
+
+    def _update_leased(self, job_id: int, worker_id: str, assignments: str, params: tuple) -> bool:
+        with self._lock:
+            cursor = self._db.execute(f"UPDATE jobs SET {assignments}, updated_at=? WHERE id=? AND worker=? AND state='running'",
+                                      tuple(params) + (time.time(), job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Renews a lease. False means the job is no longer this worker's (cancelled or reclaimed)."""
+        return self._update_leased(job_id, worker_id, "lease_expires=?", (time.time() + self.lease_seconds,))
+
+    def complete(self, job_id: int, worker_id: str, result: dict = None) -> bool:
+        """Marks a leased job done. Returns False if the worker no longer held the lease."""
+        return self._update_leased(job_id, worker_id, "state='done', lease_expires=NULL, finished_at=?, result=?",
+                                   (time.time(), json.dumps(result) if result is not None else None))
+
+    def fail(self, job_id: int, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Records a failed attempt of a leased job.
+
+        The job is queued again after a backoff while it has attempts left (and retry is
+        True), otherwise it is marked failed.
+
+        Returns:
+            True if the job will be retried.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT attempts, max_attempts FROM jobs WHERE id=? AND worker=? AND state='running'", (job_id, worker_id)).fetchone()
+            if row is None:
+                return False
+            attempts, max_attempts = row
+            now = time.time()
+            if retry and attempts < max_attempts:
+                delay = min(MAX_RETRY_BACKOFF_SECONDS, RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1))
+                self._update_leased(job_id, worker_id, "state='queued', worker=NULL, lease_expires=NULL, not_before=?, error=?", (now + delay, str(error)))
+                return True
+            self._update_leased(job_id, worker_id, "state='failed', lease_expires=NULL, finished_at=?, error=?", (now, str(error)))
+            return False
+
+    def release(self, job_id: int, worker_id: str) -> bool:
+        """Hands a leased job back without counting the attempt (e.g. on shutdown)."""
+        return self._update_leased(job_id, worker_id, "state='queued', worker=NULL, lease_expires=NULL, attempts=MAX(0, attempts - 1)", ())
+
+    # --- Managing jobs ---
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Cancels a queued or running job. A running job's worker finds out at its next
+        heartbeat (JobRunner.cancel also stops it at once).
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute("UPDATE jobs SET state='cancelled', lease_expires=NULL, finished_at=?, updated_at=?"
+                                      " WHERE id=? AND state IN ('queued', 'running')", (now, now, job_id))
+        return cursor.rowcount == 1
+
+    def retry(self, job_id: int) -> bool:
+        """Queues a failed or cancelled job again with a fresh attempt count."""
+        with self._lock:
+            cursor = self._db.execute("UPDATE jobs SET state='queued', attempts=0, worker=NULL, not_before=0, finished_at=NULL, updated_at=?"
+                                      " WHERE id=? AND state IN ('failed', 'cancelled')", (time.time(), job_id))
+        return cursor.rowcount == 1
+
+    def get(self, job_id: int):
+        """Returns a job dict, or None if there is no such job."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def list_jobs(self, state: str = None, limit: int = 100, offset: int = 0) -> list:
+        """Returns jobs (optionally only those in `state`) in submission order."""
+        with self._lock:
+            if state:
+                rows = self._db.execute("SELECT * FROM jobs WHERE state=? ORDER BY id LIMIT ? OFFSET ?", (state, limit, offset)).fetchall()
+            else:
+                rows = self._db.execute("SELECT * FROM jobs ORDER BY id LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def counts(self, kinds=None) -> dict:
+        """Returns the number of jobs in every state, counting only jobs of `kinds` if given."""
+        counts = dict.fromkeys(JOB_STATES, 0)
+        kind_filter, params = "", []
+        if kinds:
+            kind_filter = f" WHERE kind IN ({','.join('?' * len(kinds))})"
+            params = list(kinds)
+        with self._lock:
+            counts.update(self._db.execute(f"SELECT state, COUNT(*) FROM jobs{kind_filter} GROUP BY state", params).fetchall())
+        return counts
+
+    def purge(self, states=('done', 'cancelled'), older_than: float = None) -> int:
+        """
+        Deletes finished jobs.
+
+        Args:
+            states: Which finished states to delete.
+            older_than: Only delete jobs finished more than this many seconds ago.
+
+        Returns:
+            Number of deleted jobs.
+        """
+        states = [s for s in states if s in FINISHED_STATES]
+        if not states:
+            return 0
+        cutoff = time.time() - older_than if older_than is not None else time.time() + 1
+        with self._lock:
+            cursor = self._db.execute(f"DELETE FROM jobs WHERE state IN ({','.join('?' * len(states))}) AND finished_at < ?", tuple(states) + (cutoff,))
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class JobContext:
+    """What a job handler gets: the job, a progress callback and a way to learn it must stop."""
+    def __init__(self, job: dict, progress_callback=None):
+        self.job = job
+        self.stop_event = threading.Event()
+        self._progress_callback = progress_callback
+        self._stop_hooks = []
+        self._lock = threading.Lock()
+
+    @property
+    def payload(self) -> dict:
+        return self.job['payload']
+
+    def progress(self, data: dict):
+        """Forwards a progress dict (the same ones Downloader/Converter send) to the runner."""
+        if self._progress_callback:
+            self._progress_callback(self.job, data)
+
+    def on_stop(self, hook):
+        """Registers hook() to run when the job must stop; runs it at once if it already must."""
+        with self._lock:
+            if not self.stop_event.is_set():
+                self._stop_hooks.append(hook)
+                return
+        hook()
+
+    def stop(self):
+        with self._lock:
+            if self.stop_event.is_set():
+                return
+            self.stop_event.set()
+            hooks, self._stop_hooks = self._stop_hooks, []
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                print(f"Warning: Stop hook of job {self.job['id']} failed: {e}")
+
+    def stopped(self) -> bool:
+        return self.stop_event.is_set()
+
+
+def run_download_job(context: JobContext) -> dict:
+    """Handler for 'download' jobs: payload holds url, download_path and optionally preferred_format_info."""
+    payload = context.payload
+    downloader = Downloader()
+    context.on_stop(downloader.stop_download)
+    path = downloader.download_media(payload['url'], payload['download_path'], preferred_format_info=payload.get('preferred_format_info'),
+                                     progress_callback=context.progress, stop_event=context.stop_event)
+    return {'output_file_path': path}
+
+
+def convert_for_job(converter: Converter, context: JobContext, cost_model=None, payload: dict = None) -> dict:
+    """
+    Runs a 'convert' job's conversion on `converter` and teaches the cost model how long
+    it took and how large the output got (conversions served from the result cache are
+    not recorded).
+
+    Args:
+        cost_model: CostModel to record the run in. Defaults to the shared one.
+        payload: convert_media keyword arguments. Defaults to the job's payload.
+    """
+    payload = payload or context.payload
+    context.on_stop(converter.stop_conversion)
+    started = time.monotonic()
+    # The context's stop event goes in too: convert_media resets the converter's own flag,
+    # which would drop a stop that arrived between on_stop and the start of the run.
+    path = converter.convert_media(progress_callback=context.progress, stop_event=context.stop_event, **payload)
+    elapsed = time.monotonic() - started
+    if (converter.last_conversion or {}).get('mode') != 'cached':
+        try:
+            media_info = inspect_media(payload['input_file_path'], cache=converter.probe_cache)
+            (cost_model or get_cost_model()).record(media_info, payload, elapsed, os.path.getsize(path))
+        except Exception as e:
+            print(f"Warning: Could not record conversion cost: {e}")
+    return {'output_file_path': path}
+
+
+def run_convert_job(context: JobContext) -> dict:
+    """Handler for 'convert' jobs: payload holds the keyword arguments of Converter.convert_media."""
+    return convert_for_job(Converter(), context)
+
+
+def converted_output_path(input_file_path: str, output_format: str, output_dir: str = None) -> str:
+    """Returns <output_dir>/<input name>.<output_format>, never the input file itself."""
+    base = os.path.splitext(os.path.basename(input_file_path))[0]
+    output_dir = output_dir or os.path.dirname(os.path.abspath(input_file_path))
+    path = os.path.join(output_dir, f"{base}.{output_format.lower()}")
+    if os.path.abspath(path) == os.path.abspath(input_file_path):
+        path = os.path.join(output_dir, f"{base}_converted.{output_format.lower()}")
+    return path
+
+
+def download_convert_payload(item, defaults: dict = None) -> dict:
+    """
+    Turns one job (a URL, a file path or a dict) into a 'download_convert' payload.
+
+    Dicts hold 'url' or 'input_file_path' plus optional 'output_format', 'output_dir',
+    'output_file_path' and other convert_media keyword arguments; `defaults` fills the
+    settings a job leaves out.
+
+    Raises:
+        JobQueueError: If the job names neither a URL nor an input file.
+    """
+    if isinstance(item, str):
+        item = {'url': item} if '://' in item else {'input_file_path': item}
+    if not isinstance(item, dict) or not (item.get('url') or item.get('input_file_path')):
+        raise JobQueueError(f"A job needs a 'url' or an 'input_file_path': {item!r}")
+    payload = {key: value for key, value in (defaults or {}).items() if value is not None}
+    payload.update(item)
+    if payload.get('input_file_path'):
+        payload['input_file_path'] = os.path.abspath(payload['input_file_path'])
+    return payload
+
+
+def run_download_convert_job(context: JobContext) -> dict:
+    """
+    Handler for 'download_convert' jobs: downloads payload['url'] (if given), then converts
+    the download (or payload['input_file_path']) when the payload has an 'output_format'.
+
+    Besides run_download_job's keys, the payload may hold 'output_file_path' or 'output_dir'
+    (defaults to the input's directory) and any other convert_media keyword arguments.
+    """
+    payload = dict(context.payload)
+    output_dir = payload.pop('output_dir', None)
+    result = {}
+    if payload.get('url'):
+        downloader = Downloader()
+        context.on_stop(downloader.stop_download)
+        payload['input_file_path'] = downloader.download_media(payload.pop('url'), payload.pop('download_path', None) or output_dir or os.getcwd(),
+                                                               preferred_format_info=payload.pop('preferred_format_info', None), progress_callback=context.progress,
+                                                               stop_event=context.stop_event)
+        result['downloaded_file_path'] = payload['input_file_path']
+    if not payload.get('output_format'):
+        return dict(result, output_file_path=payload.get('input_file_path'))
+    if context.stopped():
+        raise JobQueueError("Job was stopped before its conversion started.")
+    if not payload.get('output_file_path'):
+        payload['output_file_path'] = converted_output_path(payload['input_file_path'], payload['output_format'], output_dir)
+    os.makedirs(os.path.dirname(os.path.abspath(payload['output_file_path'])), exist_ok=True)
+    return dict(result, **convert_for_job(Converter(), context, payload=payload))
+
+
+DEFAULT_HANDLERS = {'download': run_download_job, 'convert': run_convert_job, 'download_convert': run_download_convert_job}
+
+
+class JobRunner:
+    """
+    Works through a JobQueue with a fixed number of worker threads.
+
+    Each running job gets a heartbeat thread that renews its lease; if the lease is lost
+    (the job was cancelled, or it was reclaimed after a stall) the job is stopped.
+    Handlers are callables handler(context) -> result dict, keyed by job kind.
+    """
+    def __init__(self, job_queue: JobQueue, workers: int = 1, handlers: dict = None, progress_callback=None, poll_interval: float = 1.0, name: str = "runner", kinds=None):
+        """
+        Args:
+            job_queue: The queue to work on.
+            workers: Number of jobs run at once.
+            handlers: Extra or replacement handlers by kind (see DEFAULT_HANDLERS).
+            progress_callback: Optional callback(job, data) receiving the jobs' progress dicts
+                and the lifecycle updates in JOB_EVENT_STATUSES. Called from worker threads.
+            poll_interval: Seconds an idle worker waits before looking for work again.
+            name: Prefix of the worker ids.
+            kinds: Only run jobs of these kinds (e.g. one runner per kind, so a slow kind
+                never holds up another). None runs every kind that has a handler.
+        """
+        self.job_queue = job_queue
+        self.workers = max(1, workers)
+        self.handlers = dict(DEFAULT_HANDLERS, **(handlers or {}))
+        self.progress_callback = progress_callback
+        self.poll_interval = poll_interval
+        self.name = name
+        self.kinds = list(kinds) if kinds else list(self.handlers)
+        self._stop_flag = threading.Event()
+        self._threads = []
+        self._active = {} # job id -> JobContext
+        self._lock = threading.Lock()
+
+    def _emit(self, job, data):
+        if self.progress_callback:
+            self.progress_callback(job, data)
+
+    def start(self):
+        """Starts the worker threads."""
+        self._stop_flag.clear()
+        for i in range(self.workers):
+            worker_id = JobQueue.make_worker_id(f"{self.name}-{i}")
+            thread = threading.Thread(target=self._worker_loop, args=(worker_id,), daemon=True, name=f"job-{self.name}-{i}")
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, wait: bool = True, stop_running: bool = True):
+        """
+        Stops the workers. Running jobs are stopped and handed back to the queue (without
+        counting the attempt) unless stop_running is False, in which case they finish first.
+        """
+        self._stop_flag.set()
+        if stop_running:
+            with self._lock:
+                contexts = list(self._active.values())
+            for context in contexts:
+                context.stop()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancels a job in the queue and stops it now if this runner is running it."""
+        cancelled = self.job_queue.cancel(job_id)
+        with self._lock:
+            context = self._active.get(job_id)
+        if context:
+            context.stop()
+        return cancelled
+
+    def running_jobs(self) -> list:
+        with self._lock:
+            return [context.job for context in self._active.values()]
+
+    def run_until_empty(self) -> int:
+        """
+        Runs jobs on the calling thread until none are queued (waiting out retry backoffs).
+        Meant for headless batch runs.
+
+        Returns:
+            Number of jobs run.
+        """
+        worker_id = JobQueue.make_worker_id(f"{self.name}-main")
+        count = 0
+        while not self._stop_flag.is_set():
+            job = self.job_queue.claim(worker_id, kinds=self.kinds)
+            if job is None:
+                if not self.job_queue.counts(kinds=self.kinds)['queued']: # Jobs it cannot claim are not its to wait for
+                    break
+                self._stop_flag.wait(self.poll_interval)
+                continue
+            self._run_job(job, worker_id)
+            count += 1
+        return count
+
+    def _worker_loop(self, worker_id):
+        while not self._stop_flag.is_set():
+            try:
+                job = self.job_queue.claim(worker_id, kinds=self.kinds)
+            except sqlite3.Error as e:
+                print(f"Warning: Could not claim a job: {e}")
+                job = None
+            if job is None:
+                self._stop_flag.wait(self.poll_interval)
+                continue
+            self._run_job(job, worker_id)
+
+    def _heartbeat(self, context, worker_id, done):
+        interval = max(0.1, self.job_queue.lease_seconds / 3)
+        while not done.wait(interval):
+            try:
+                held = self.job_queue.heartbeat(context.job['id'], worker_id)
+            except sqlite3.Error:
+                continue # Try again; the lease has time left
+            if not held:
+                context.stop()
+                return
+
+    def _run_job(self, job, worker_id):
+        context = JobContext(job, progress_callback=self._emit)
+        with self._lock:
+            self._active[job['id']] = context
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(context, worker_id, done), daemon=True)
+        heartbeat.start()
+        self._emit(job, {'status': 'job_started', 'attempt': job['attempts']})
+        try:
+            result = self.handlers[job['kind']](context)
+        except Exception as e:
+            if context.stopped():
+                # Cancelled (release is then a no-op), lease lost, or runner shutting down.
+                if self.job_queue.release(job['id'], worker_id):
+                    self._emit(job, {'status': 'job_released', 'message': str(e)})
+                else:
+                    self._emit(job, {'status': 'job_cancelled', 'message': str(e)})
+            else:
+                will_retry = self.job_queue.fail(job['id'], worker_id, f"{type(e).__name__}: {e}")
+                self._emit(job, {'status': 'job_failed', 'message': str(e), 'will_retry': will_retry})
+        else:
+            if self.job_queue.complete(job['id'], worker_id, result):
+                self._emit(job, {'status': 'job_done', 'result': result})
+            else:
+                self._emit(job, {'status': 'job_cancelled', 'message': "Job was cancelled or reclaimed before it finished."})
+        finally:
+            done.set()
+            with self._lock:
+                self._active.pop(job['id'], None)
@@ -0,0 +1,403 @@
+import os
+import sys
+import json
+import queue
+import threading
+import ipaddress
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+if __name__ == "__main__": # Let the __main__ block below import the core package
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.job_queue import JobQueue, JobQueueError, JobRunner, JOB_STATES, download_convert_payload
+
+DEFAULT_HOST = "127.0.0.1" # Local only: the API has no authentication
+# Host names a loopback server answers to. Requests naming any other host are refused, so
+# a web page whose domain was rebound to 127.0.0.1 cannot reach the API.
+LOOPBACK_HOSTS = ('localhost', '127.0.0.1', '::1')
+DEFAULT_PORT = 8765
+DEFAULT_SERVER_QUEUE_PATH = os.path.join(os.path.expanduser("~"), ".mediadl", "server_jobs.sqlite3")
+DEFAULT_CONCURRENCY = 2
+MAX_BODY_BYTES = 1 << 20
+# An idle event stream sends a comment this often, so dead clients are noticed.
+KEEPALIVE_SECONDS = 15.0
+# Updates buffered per event stream; a client that falls further behind loses the oldest ones.
+SUBSCRIBER_BUFFER = 1000
+
+
+class JobServerError(Exception):
+    """Raised when the job server cannot start."""
+    pass
+
+
+def is_final_event(data: dict) -> bool:
+    """True for the last update a job sends: done, cancelled, or failed without a retry."""
+    status = data.get('status')
+    return status in ('job_done', 'job_cancelled') or (status == 'job_failed' and not data.get('will_retry'))
+
+
+class EventHub:
+    """Fans progress updates out to the open event streams. Safe to use from several threads."""
+    def __init__(self, buffer: int = SUBSCRIBER_BUFFER):
+        self.buffer = buffer
+        self._subscribers = {} # queue -> job id it follows (None for all jobs)
+        self._lock = threading.Lock()
+
+    def subscribe(self, job_id: int = None) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=self.buffer)
+        with self._lock:
+            self._subscribers[subscriber] = job_id
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            self._subscribers.pop(subscriber, None)
+
+    def publish(self, data: dict):
+        """Queues an update (a progress dict with its 'job' id) for every matching stream."""
+        with self._lock:
+            subscribers = [s for s, job_id in self._subscribers.items() if job_id is None or job_id == data.get('job')]
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait(data)
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait() # Drop the oldest update; the newest matters most
+                    except queue.Empty:
+                        pass
+
+    def close(self):
+        """Ends every open stream."""
+        with self._lock:
+            subscribers, self._subscribers = list(self._subscribers), {}
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(None)
+            except queue.Full:
+                subscriber.get_nowait()
+                subscriber.put_nowait(None)
+
+
+class JobServer:
+    """
+    Local HTTP API for download and convert jobs.
+
+    Jobs are 'download_convert' jobs in a JobQueue (see download_convert_payload for what
+    a job may hold), run by a JobRunner with `concurrency` workers.
+
+        POST   /jobs                 Submit a job object or a list of them -> 201 {"ids": [...]}
+        GET    /jobs[?state=&limit=] List jobs and the number in each state
+        GET    /jobs/<id>            A job with its latest progress update
+        POST   /jobs/<id>/cancel     Cancel a job (DELETE /jobs/<id> does the same)
+        GET    /jobs/<id>/events     Server-Sent Events of one job, ending with its last update
+        GET    /events               Server-Sent Events of all jobs
+
+    Events carry the progress dicts Downloader and Converter send to their progress
+    callbacks, and the JobRunner's lifecycle updates, each with the 'job' id added.
+
+    Since the API has no authentication, requests must name this server in their Host
+    header (403 otherwise), must not come from another site's page (a foreign Origin
+    header gets 403), and POSTs must send Content-Type: application/json (415 otherwise),
+    which browsers cannot do cross-site without asking first.
+    """
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, concurrency: int = DEFAULT_CONCURRENCY, queue_path: str = DEFAULT_SERVER_QUEUE_PATH,
+                 max_attempts: int = 1, handlers: dict = None, allowed_hosts=()):
+        """
+        Args:
+            host, port: Address to listen on; port 0 picks a free port.
+            concurrency: Jobs run at once.
+            queue_path: SQLite file of the job queue, so queued jobs survive a restart.
+                None keeps the queue in memory.
+            max_attempts: Times a failing job is tried.
+            handlers: Extra or replacement job handlers (see JobRunner).
+            allowed_hosts: Host names the API answers to besides the listening address
+                (and localhost when that is a loopback address), e.g. the machine's name.
+
+        Raises:
+            JobServerError: If the queue cannot be opened or the address cannot be bound.
+        """
+        try:
+            self.job_queue = JobQueue(queue_path or ":memory:", max_attempts=max(1, max_attempts))
+        except JobQueueError as e:
+            raise JobServerError(str(e))
+        self.events = EventHub()
+        self.runner = JobRunner(self.job_queue, workers=concurrency, handlers=handlers, progress_callback=self._on_progress, name="server")
+        self._latest = {} # job id -> latest progress update
+        self._lock = threading.Lock()
+        self._thread = None
+        try:
+            self._httpd = ThreadingHTTPServer((host, port), _JobRequestHandler)
+        except OSError as e:
+            self.job_queue.close()
+            raise JobServerError(f"Could not listen on {host}:{port}: {e}")
+        self._httpd.daemon_threads = True
+        self._httpd.job_server = self
+        self.allowed_hosts = {host.lower().strip('[]')} | {name.lower() for name in allowed_hosts}
+        if self.allowed_hosts & set(LOOPBACK_HOSTS):
+            self.allowed_hosts |= set(LOOPBACK_HOSTS)
+
+    @property
+    def address(self) -> tuple:
+        return self._httpd.server_address[:2]
+
+    def is_own_address(self, netloc: str) -> bool:
+        """True if a Host header (or an Origin's host:port) names this server."""
+        try:
+            url = urlsplit("//" + netloc)
+            hostname, port = url.hostname, url.port or 80
+        except ValueError:
+            return False
+        if not hostname or port != self.address[1]:
+            return False
+        if hostname in self.allowed_hosts:
+            return True
+        try:
+            return ipaddress.ip_address(hostname).is_loopback and bool(self.allowed_hosts & set(LOOPBACK_HOSTS))
+        except ValueError:
+            return False
+
+    @property
+    def url(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}"
+
+    def _on_progress(self, job, data):
+        update = dict(data, job=job['id'])
+        with self._lock:
+            self._latest[job['id']] = update
+        self.events.publish(update)
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Starts the workers and serves requests on a background thread."""
+        self.runner.start()
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="job-server")
+        self._thread.start()
+
+    def stop(self):
+        """Stops serving, ends the event streams and hands running jobs back to the queue."""
+        if self._thread:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.events.close()
+        self.runner.stop()
+        self._httpd.server_close()
+        self.job_queue.close()
+
+    def serve_forever(self):
+        """Runs until interrupted (Ctrl+C)."""
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    # --- Jobs ---
+
+    def submit(self, items) -> list:
+        """
+        Adds jobs (a job dict, a URL or file path, or a list of them). A job's 'priority'
+        key sets its queue priority.
+
+        Raises:
+            JobQueueError: If a job is invalid.
+        """
+        jobs = []
+        for item in items if isinstance(items, list) else [items]:
+            priority = item.pop('priority', 0) if isinstance(item, dict) else 0
+            if not isinstance(priority, int):
+                raise JobQueueError(f"priority must be an integer: {priority!r}")
+            jobs.append({'kind': 'download_convert', 'payload': download_convert_payload(item), 'priority': priority})
+        return self.job_queue.submit_many(jobs)
+
+    def status(self, job_id: int):
+        """Returns the job with its latest progress update under 'progress', or None."""
+        job = self.job_queue.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            job['progress'] = self._latest.get(job_id)
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancels a queued or running job. Returns False if it had already finished."""
+        job = self.job_queue.get(job_id)
+        cancelled = self.runner.cancel(job_id)
+        if cancelled and job['state'] == 'queued':
+            self._on_progress(job, {'status': 'job_cancelled'}) # A running job reports this itself once stopped
+        return cancelled
+
+
+class _JobRequestHandler(BaseHTTPRequestHandler):
+    server_version = "MediaDL"
+
+    def log_message(self, format, *args):
+        pass # Quiet; errors are returned to the client
+
+    @property
+    def job_server(self) -> JobServer:
+        return self.server.job_server
+
+    def _send_json(self, status: int, body):
+        data = json.dumps(body, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str):
+        self._send_json(status, {'error': message})
+
+    def _refuse(self) -> bool:
+        """Answers requests that may come from another site (see JobServer). Returns True if refused."""
+        if not self.job_server.is_own_address(self.headers.get('Host') or ''):
+            self._send_error(403, "Unknown Host header")
+            return True
+        origin = self.headers.get('Origin')
+        if origin is not None:
+            url = urlsplit(origin)
+            if url.scheme != 'http' or not self.job_server.is_own_address(url.netloc):
+                self._send_error(403, f"Cross-origin requests are not allowed: {origin}")
+                return True
+        if self.command == 'POST':
+            content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+            if content_type != 'application/json':
+                self._send_error(415, "Content-Type must be application/json")
+                return True
+        return False
+
+    def _route(self):
+        """Returns (path parts, query) with the job id parsed, e.g. (['jobs', 3, 'events'], {})."""
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        if len(parts) > 1 and parts[0] == 'jobs':
+            try:
+                parts[1] = int(parts[1])
+            except ValueError:
+                pass
+        return parts, parse_qs(url.query)
+
+    def do_GET(self):
+        if self._refuse():
+            return
+        parts, query = self._route()
+        if parts == ['jobs']:
+            state = query.get('state', [None])[0]
+            if state and state not in JOB_STATES:
+                return self._send_error(400, f"Unknown state: {state}")
+            try:
+                limit = int(query.get('limit', ['100'])[0])
+            except ValueError:
+                return self._send_error(400, "limit must be a number")
+            jobs = self.job_server.job_queue.list_jobs(state=state, limit=limit)
+            return self._send_json(200, {'jobs': jobs, 'counts': self.job_server.job_queue.counts()})
+        if len(parts) == 2 and parts[0] == 'jobs' and isinstance(parts[1], int):
+            job = self.job_server.status(parts[1])
+            return self._send_json(200, job) if job else self._send_error(404, f"No job {parts[1]}")
+        if len(parts) == 3 and parts[0] == 'jobs' and isinstance(parts[1], int) and parts[2] == 'events':
+            return self._stream_events(parts[1])
+        if parts == ['events']:
+            return self._stream_events(None)
+        self._send_error(404, f"Not found: {self.path}")
+
+    def do_POST(self):
+        if self._refuse():
+            return
+        parts, _ = self._route()
+        if len(parts) == 3 and parts[0] == 'jobs' and isinstance(parts[1], int) and parts[2] == 'cancel':
+            return self._cancel(parts[1])
+        if parts != ['jobs']:
+            return self._send_error(404, f"Not found: {self.path}")
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            return self._send_error(400, "Bad Content-Length")
+        if length > MAX_BODY_BYTES:
+            return self._send_error(413, f"Request body is larger than {MAX_BODY_BYTES} bytes")
+        try:
+            body = json.loads(self.rfile.read(length) or b'null')
+            ids = self.job_server.submit(body)
+        except ValueError as e:
+            return self._send_error(400, f"Body is not valid JSON: {e}")
+        except JobQueueError as e:
+            return self._send_error(400, str(e))
+        self._send_json(201, {'ids': ids})
+
+    def do_DELETE(self):
+        if self._refuse():
+            return
+        parts, _ = self._route()
+        if len(parts) == 2 and parts[0] == 'jobs' and isinstance(parts[1], int):
+            return self._cancel(parts[1])
+        self._send_error(404, f"Not found: {self.path}")
+
+    def _cancel(self, job_id: int):
+        if self.job_server.job_queue.get(job_id) is None:
+            return self._send_error(404, f"No job {job_id}")
+        self._send_json(200, {'id': job_id, 'cancelled': self.job_server.cancel(job_id)})
+
+    def _write_event(self, data: dict):
+        self.wfile.write(f"event: progress\ndata: {json.dumps(data, default=str)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def _stream_events(self, job_id):
+        hub = self.job_server.events
+        subscriber = hub.subscribe(job_id) # Before looking at the job, so no update is missed
+        try:
+            job = self.job_server.status(job_id) if job_id is not None else None
+            if job_id is not None and job is None:
+                return self._send_error(404, f"No job {job_id}")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            if job and job['state'] in ('done', 'failed', 'cancelled') and (job['progress'] is None or is_final_event(job['progress'])):
+                # Already over (a job cancelled while running still reports its end below).
+                return self._write_event(job['progress'] or {'status': f"job_{job['state']}", 'job': job_id})
+            while True:
+                try:
+                    data = subscriber.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+                    continue
+                if data is None: # Server is stopping
+                    return
+                self._write_event(data)
+                if job_id is not None and is_final_event(data):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            pass # Client went away
+        finally:
+            hub.unsubscribe(subscriber)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local HTTP API for MediaDL download and convert jobs.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="Address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="Port to listen on")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Jobs run at once")
+    parser.add_argument('--queue', default=DEFAULT_SERVER_QUEUE_PATH, help="Job queue file")
+    parser.add_argument('--attempts', type=int, default=1, help="Times a failing job is tried")
+    parser.add_argument('--allow-host', action='append', default=[], help="Extra Host name to answer to (repeatable)")
+    args = parser.parse_args()
+
+    try:
+        server = JobServer(args.host, args.port, concurrency=args.concurrency, queue_path=args.queue, max_attempts=args.attempts,
+                           allowed_hosts=args.allow_host)
+    except JobServerError as e:
+        sys.exit(f"Error: {e}")
+    print(f"Serving jobs on {server.url} (Ctrl+C to stop)")
+    server.serve_forever()
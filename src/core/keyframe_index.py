@@ -0,0 +1,207 @@
+import os
+import sys
+import array
+import bisect
+import struct
+import subprocess
+
+from src.core.media_probe import get_probe_cache
+
+# Header of a packed index: magic, keyframe count, packet count, duration, file size.
+_HEADER = struct.Struct('<4sIIdq')
+_MAGIC = b'KFI2' # KFI1 indexes held absolute times and are rebuilt
+
+
+class KeyframeIndexError(Exception):
+    """Raised when a keyframe index cannot be built or decoded."""
+    pass
+
+
+class KeyframeIndex:
+    """
+    Keyframe times and byte positions of a file's first video stream.
+
+    Times are relative to the container's start_time, like ffmpeg's -ss/-to on an input,
+    so they can be passed to ffmpeg as they are (MPEG-TS files often start at ~1.4 s).
+
+    Built from one ffprobe packet pass and held in two flat arrays (float64 times, int64
+    byte positions), so a two-hour film takes a few kilobytes and lookups are a binary
+    search. Packs to bytes for storage next to the probe data in ProbeCache.
+    """
+    def __init__(self, times, positions, duration: float = 0.0, file_size: int = 0, packet_count: int = 0):
+        """
+        Args:
+            times: Sorted keyframe times in seconds from the start of the file.
+            positions: Byte offset of each keyframe's packet in the file (-1 if unknown).
+            duration: Duration of the file in seconds.
+            file_size: Size of the file in bytes.
+            packet_count: Number of video packets seen while building the index.
+        """
+        self.times = array.array('d', times)
+        self.positions = array.array('q', positions)
+        if len(self.times) != len(self.positions):
+            raise KeyframeIndexError("Keyframe times and positions differ in length.")
+        self.duration = duration
+        self.file_size = file_size
+        self.packet_count = packet_count
+
+    def __len__(self):
+        return len(self.times)
+
+    @classmethod
+    def from_packet_lines(cls, lines, duration: float = 0.0, file_size: int = 0, start_time: float = None) -> 'KeyframeIndex':
+        """
+        Builds an index from ffprobe 'pts_time,pos,flags' CSV lines. A line holding a single
+        number is the format's start_time (ffprobe prints it after the packets), which is
+        subtracted from every time unless start_time is given.
+        """
+        keyframes = []
+        packet_count = 0
+        last_pts = 0.0
+        format_start = 0.0
+        for line in lines:
+            fields = line.strip().split(',')
+            if len(fields) == 1:
+                try:
+                    format_start = float(fields[0])
+                except ValueError:
+                    pass # Empty, or N/A
+                continue
+            if len(fields) < 3:
+                continue
+            pts_time, pos, flags = fields[0], fields[1], fields[2]
+            try:
+                pts = float(pts_time)
+            except ValueError:
+                continue # pts_time can be N/A
+            packet_count += 1
+            last_pts = max(last_pts, pts)
+            if 'K' in flags:
+                try:
+                    keyframes.append((pts, int(pos)))
+                except ValueError:
+                    keyframes.append((pts, -1))
+        keyframes.sort()
+        offset = format_start if start_time is None else start_time
+        return cls([t - offset for t, _ in keyframes], [p for _, p in keyframes], duration=duration or max(0.0, last_pts - offset),
+                   file_size=file_size, packet_count=packet_count)
+
+    def to_bytes(self) -> bytes:
+        times, positions = array.array('d', self.times), array.array('q', self.positions)
+        if sys.byteorder != 'little':
+            times.byteswap(); positions.byteswap()
+        return _HEADER.pack(_MAGIC, len(times), self.packet_count, self.duration, self.file_size) + times.tobytes() + positions.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'KeyframeIndex':
+        try:
+            magic, count, packet_count, duration, file_size = _HEADER.unpack_from(data)
+        except struct.error as e:
+            raise KeyframeIndexError(f"Corrupt keyframe index: {e}")
+        if magic != _MAGIC or len(data) != _HEADER.size + count * 16:
+            raise KeyframeIndexError("Corrupt keyframe index.")
+        times, positions = array.array('d'), array.array('q')
+        times.frombytes(data[_HEADER.size:_HEADER.size + count * 8])
+        positions.frombytes(data[_HEADER.size + count * 8:])
+        if sys.byteorder != 'little':
+            times.byteswap(); positions.byteswap()
+        index = cls.__new__(cls)
+        index.times, index.positions = times, positions
+        index.duration, index.file_size, index.packet_count = duration, file_size, packet_count
+        return index
+
+    def keyframe_before(self, seconds: float) -> float:
+        """Returns the last keyframe time at or before `seconds` (0.0 if there is none)."""
+        i = bisect.bisect_right(self.times, seconds) - 1
+        return self.times[i] if i >= 0 else 0.0
+
+    def keyframe_after(self, seconds: float):
+        """Returns the first keyframe time at or after `seconds`, or None past the last one."""
+        i = bisect.bisect_left(self.times, seconds)
+        return self.times[i] if i < len(self.times) else None
+
+    def snap(self, seconds: float, mode: str = 'nearest') -> float:
+        """
+        Snaps a time to a keyframe.
+
+        Args:
+            seconds: The time to snap.
+            mode: 'before', 'after' or 'nearest'.
+        """
+        if not self.times:
+            return seconds
+        before, after = self.keyframe_before(seconds), self.keyframe_after(seconds)
+        if mode == 'before' or after is None:
+            return before
+        if mode == 'after':
+            return after
+        return before if seconds - before <= after - seconds else after
+
+    def gop_bounds(self, seconds: float) -> tuple:
+        """Returns (start, end) of the GOP containing `seconds`; end is the duration for the last GOP."""
+        start = self.keyframe_before(seconds)
+        end = self.keyframe_after(seconds + 1e-9)
+        return start, end if end is not None else self.duration
+
+    def byte_offset(self, seconds: float) -> int:
+        """
+        Estimates the byte offset of `seconds` in the file.
+
+        Interpolates linearly between the surrounding keyframes' packet positions (and the
+        end of the file after the last keyframe).
+        """
+        i = bisect.bisect_right(self.times, seconds) - 1
+        if i < 0 or self.positions[i] < 0:
+            # No usable keyframe position: assume a constant bitrate.
+            return int(self.file_size * min(1.0, seconds / self.duration)) if self.duration > 0 else 0
+        t0, p0 = self.times[i], self.positions[i]
+        if i + 1 < len(self.times) and self.positions[i + 1] >= 0:
+            t1, p1 = self.times[i + 1], self.positions[i + 1]
+        else:
+            t1, p1 = self.duration, self.file_size
+        if t1 <= t0:
+            return p0
+        return int(p0 + (p1 - p0) * min(1.0, (seconds - t0) / (t1 - t0)))
+
+
+def build_keyframe_index(input_file_path: str) -> KeyframeIndex:
+    """
+    Builds a KeyframeIndex with one ffprobe pass over the packets of the first video stream.
+
+    Reads packet headers only, so nothing is decoded. The format's start_time comes from
+    the same pass and makes the times relative (see KeyframeIndex).
+
+    Raises:
+        KeyframeIndexError: If ffprobe fails.
+    """
+    cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,pos,flags:format=start_time', '-of', 'csv=p=0', input_file_path]
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, creationflags=creationflags)
+    except OSError as e:
+        raise KeyframeIndexError(f"Could not start ffprobe: {e}")
+    if result.returncode != 0:
+        raise KeyframeIndexError(f"ffprobe error (return code {result.returncode}): {result.stderr[-2000:]}")
+    return KeyframeIndex.from_packet_lines(result.stdout.splitlines(), file_size=os.path.getsize(input_file_path))
+
+
+def get_keyframe_index(input_file_path: str, cache=None) -> KeyframeIndex:
+    """
+    Returns the KeyframeIndex of a file, building it only if no fresh one is stored.
+
+    Indexes are stored in the ProbeCache (memory and SQLite) under the same file key as
+    the probe results, so a modified file is indexed again.
+
+    Raises:
+        KeyframeIndexError: If ffprobe fails.
+    """
+    cache = cache or get_probe_cache()
+    data = cache.get_packet_index(input_file_path)
+    if data is not None:
+        try:
+            return KeyframeIndex.from_bytes(data)
+        except KeyframeIndexError:
+            pass # Rebuild below
+    index = build_keyframe_index(input_file_path)
+    cache.put_packet_index(input_file_path, index.to_bytes())
+    return index
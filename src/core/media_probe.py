@@ -0,0 +1,270 @@
+import ffmpeg
+import os
+import json
+import time
+import sqlite3
+import threading
+import collections
+
+# On-disk store shared by every Converter and the GUI.
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".mediadl", "probe_cache.sqlite3")
+DEFAULT_MEMORY_ENTRIES = 256
+
+
+class ProbeCache:
+    """
+    Caches ffmpeg.probe results per file.
+
+    Entries are keyed by (absolute path, size, mtime_ns, inode), so a file that is
+    replaced or modified is probed again. Recent results live in an in-memory LRU;
+    all results are also written to a SQLite database so they survive restarts.
+    Packed keyframe/packet indexes (see keyframe_index) are stored the same way.
+    Safe to use from several threads.
+    """
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH, max_memory_entries: int = DEFAULT_MEMORY_ENTRIES):
+        """
+        Args:
+            db_path: SQLite file for persistent entries. None keeps the cache in memory only.
+            max_memory_entries: Number of probe results kept in the in-memory LRU.
+        """
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self._memory = collections.OrderedDict()
+        self._indexes = collections.OrderedDict() # file key -> packed packet index bytes
+        self._lock = threading.RLock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        if db_path:
+            self._open_db()
+
+    def _open_db(self):
+        try:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir:
+                os.makedirs(db_dir, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS probes ("
+                " path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL,"
+                " data TEXT NOT NULL, probed_at REAL NOT NULL,"
+                " PRIMARY KEY (path, size, mtime_ns, inode))"
+            )
+            # Packed packet indexes (see keyframe_index.KeyframeIndex), keyed like the probes.
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS packet_indexes ("
+                " path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL,"
+                " data BLOB NOT NULL, built_at REAL NOT NULL,"
+                " PRIMARY KEY (path, size, mtime_ns, inode))"
+            )
+            self._db.commit()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Warning: Probe cache database unavailable ({e}), using memory only.")
+            self._db = None
+
+    @staticmethod
+    def file_key(path: str) -> tuple:
+        """Returns the (path, size, mtime_ns, inode) cache key of an existing file."""
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def get(self, path: str):
+        """Returns the cached probe dict for `path`, or None if it is missing or stale."""
+        key = self.file_key(path)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute(
+                    "SELECT data FROM probes WHERE path=? AND size=? AND mtime_ns=? AND inode=?", key
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+            if row is None:
+                return None
+            data = json.loads(row[0])
+            self._remember(key, data)
+            return data
+
+    def put(self, path: str, data: dict):
+        """Stores a probe result for `path` in memory and on disk."""
+        key = self.file_key(path)
+        with self._lock:
+            self._remember(key, data)
+            if self._db is None:
+                return
+            try:
+                # Only the latest version of a file is worth keeping.
+                self._db.execute("DELETE FROM probes WHERE path=?", (key[0],))
+                self._db.execute("INSERT INTO probes VALUES (?, ?, ?, ?, ?, ?)", key + (json.dumps(data), time.time()))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: Could not write probe cache entry for {key[0]}: {e}")
+
+    def _remember(self, key, data, store=None):
+        store = self._memory if store is None else store
+        store[key] = data
+        store.move_to_end(key)
+        while len(store) > self.max_memory_entries:
+            store.popitem(last=False)
+
+    def get_packet_index(self, path: str):
+        """Returns the packed packet index stored for `path`, or None if it is missing or stale."""
+        key = self.file_key(path)
+        with self._lock:
+            data = self._indexes.get(key)
+            if data is not None:
+                self._indexes.move_to_end(key)
+                return data
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute(
+                    "SELECT data FROM packet_indexes WHERE path=? AND size=? AND mtime_ns=? AND inode=?", key
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+            if row is None:
+                return None
+            data = bytes(row[0])
+            self._remember(key, data, self._indexes)
+            return data
+
+    def put_packet_index(self, path: str, data: bytes):
+        """Stores a packed packet index for `path` in memory and on disk."""
+        key = self.file_key(path)
+        with self._lock:
+            self._remember(key, data, self._indexes)
+            if self._db is None:
+                return
+            try:
+                self._db.execute("DELETE FROM packet_indexes WHERE path=?", (key[0],))
+                self._db.execute("INSERT INTO packet_indexes VALUES (?, ?, ?, ?, ?, ?)", key + (sqlite3.Binary(data), time.time()))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: Could not write packet index for {key[0]}: {e}")
+
+    def probe(self, path: str) -> dict:
+        """
+        Returns ffmpeg.probe(path), probing only when no fresh cached result exists.
+
+        Raises:
+            ffmpeg.Error: If ffprobe fails.
+            FileNotFoundError: If the file does not exist.
+        """
+        data = self.get(path)
+        if data is not None:
+            self.hits += 1
+            return data
+        self.misses += 1
+        data = ffmpeg.probe(path)
+        self.put(path, data)
+        return data
+
+    def invalidate(self, path: str):
+        abs_path = os.path.abspath(path)
+        with self._lock:
+            for store in (self._memory, self._indexes):
+                for key in [k for k in store if k[0] == abs_path]:
+                    del store[key]
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM probes WHERE path=?", (abs_path,))
+                    self._db.execute("DELETE FROM packet_indexes WHERE path=?", (abs_path,))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not remove probe cache entries for {abs_path}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._indexes.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM probes")
+                    self._db.execute("DELETE FROM packet_indexes")
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not clear probe cache: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_probe_cache() -> ProbeCache:
+    """Returns the process-wide ProbeCache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ProbeCache()
+        return _default_cache
+
+
+def inspect_media(path: str, cache: ProbeCache = None) -> dict:
+    """
+    Probes a media file (through the probe cache) and summarises what callers usually need.
+
+    Returns:
+        A dict with 'path', 'duration' (seconds, 0.0 if unknown), 'video_stream' and
+        'audio_stream' (the first stream of each type, or None) and the full 'probe' result.
+
+    Raises:
+        ffmpeg.Error: If ffprobe fails.
+        FileNotFoundError: If the file does not exist.
+    """
+    return summarize_probe(path, (cache or get_probe_cache()).probe(path))
+
+
+def summarize_probe(path: str, probe: dict) -> dict:
+    """Builds the inspect_media() summary from a raw ffprobe result."""
+    streams = probe.get('streams', [])
+    video_stream = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio_stream = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+
+    duration = 0.0
+    for source in (video_stream or {}, probe.get('format', {})):
+        try:
+            duration = float(source['duration'])
+            break
+        except (KeyError, TypeError, ValueError):
+            continue
+
+    return {
+        'path': path,
+        'duration': duration,
+        'video_stream': video_stream,
+        'audio_stream': audio_stream,
+        'probe': probe,
+    }
+
+
+def inspect_media_async(path: str, callback, error_callback=None, cache: ProbeCache = None) -> threading.Thread:
+    """
+    Runs inspect_media on a daemon thread.
+
+    `callback(info)` or `error_callback(exception)` is called from that worker thread,
+    so GUI callers should hop back to their main loop (e.g. with Tk's after()).
+    """
+    def worker():
+        try:
+            info = inspect_media(path, cache=cache)
+        except Exception as e:
+            if error_callback:
+                error_callback(e)
+            return
+        callback(info)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
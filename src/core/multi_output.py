@@ -0,0 +1,120 @@
+import os
+
+from src.core.converter import ConversionError, FORMAT_ENCODERS
+from src.core.ffmpeg_capabilities import translate_preset
+
+SUPPORTED_FORMATS = tuple(FORMAT_ENCODERS) + ('gif',)
+
+
+def build_multi_output_command(converter, input_file_path: str, targets: list, media_info: dict, threads: int = 8, preset: str = 'ultrafast', start_time: str = None, end_time: str = None, allow_stream_copy: bool = True) -> tuple:
+    """
+    Builds one ffmpeg command that decodes the input once and writes every target.
+
+    Decoded video is fanned out with `split` and decoded audio with `asplit`; each branch
+    gets its own filters and encoder. Streams a target can stream-copy (see
+    Converter.plan_streams) are mapped straight from the input instead.
+
+    Args:
+        converter: The Converter whose stream planner is used.
+        input_file_path: Path to the input media file.
+        targets: Dicts with 'output_file_path' and 'output_format', optionally 'preset',
+            'gif_fps' and 'gif_scale_width'.
+        media_info: Result of inspect_media() for the input.
+        threads, preset, start_time, end_time, allow_stream_copy: As for convert_media.
+
+    Returns:
+        A (cmd, plans) tuple: the argument list and one plan dict per target.
+
+    Raises:
+        ConversionError: If a target format is unsupported or needs a stream the input lacks.
+    """
+    has_video = bool(media_info and media_info.get('video_stream'))
+    has_audio = bool(media_info and media_info.get('audio_stream'))
+    trimmed = bool(start_time or end_time)
+
+    plans = []
+    video_branches, audio_branches = [], [] # Target indexes that need decoded video/audio
+    for index, target in enumerate(targets):
+        fmt = target['output_format'].lower()
+        if fmt not in SUPPORTED_FORMATS:
+            raise ConversionError(f"Unsupported output format for multi-output conversion: {fmt}")
+        if fmt == 'gif':
+            plan = {'mode': 'transcode', 'vcodec': 'gif', 'acodec': None}
+        else:
+            plan = converter.plan_streams(media_info, fmt, trimmed=trimmed, allow_stream_copy=allow_stream_copy)
+        if not has_video and (fmt == 'gif' or (fmt != 'mp3' and not has_audio)):
+            raise ConversionError(f"Input has no video stream for {fmt} output: {target['output_file_path']}")
+        if not has_audio and fmt == 'mp3':
+            raise ConversionError(f"Input has no audio stream for mp3 output: {target['output_file_path']}")
+        if fmt == 'mp3':
+            plan['vcodec'] = None
+        if not has_video:
+            plan['vcodec'] = None
+        if not has_audio or fmt == 'gif':
+            plan['acodec'] = None
+        if plan['vcodec'] not in (None, 'copy'):
+            video_branches.append(index)
+        if plan['acodec'] not in (None, 'copy'):
+            audio_branches.append(index)
+        plans.append(plan)
+
+    graph = []
+    video_pads, audio_pads = {}, {}
+    if video_branches:
+        pads = [f"v{i}" for i in video_branches]
+        graph.append(f"[0:v:0]split={len(pads)}" + "".join(f"[{p}]" for p in pads))
+        video_pads = dict(zip(video_branches, pads))
+    if audio_branches:
+        pads = [f"a{i}" for i in audio_branches]
+        graph.append(f"[0:a:0]asplit={len(pads)}" + "".join(f"[{p}]" for p in pads))
+        audio_pads = dict(zip(audio_branches, pads))
+
+    for index, target in enumerate(targets):
+        if target['output_format'].lower() == 'gif':
+            fps = target.get('gif_fps', 10)
+            width = target.get('gif_scale_width', 480)
+            # palettegen only emits its palette at the end of the input, so the GIF branch
+            # buffers its (already scaled-down) frames until then.
+            graph.append(f"[v{index}]fps={fps},scale={width}:-1:flags=lanczos,split[g{index}a][g{index}b];"
+                         f"[g{index}a]palettegen[p{index}];[g{index}b][p{index}]paletteuse=dither=sierra2_4a[gif{index}]")
+            video_pads[index] = f"gif{index}"
+
+    cmd = ['ffmpeg', '-y']
+    if start_time:
+        cmd += ['-ss', str(start_time)]
+    if end_time:
+        cmd += ['-to', str(end_time)]
+    cmd += ['-i', input_file_path]
+    if graph:
+        cmd += ['-filter_complex', ";".join(graph)]
+
+    for index, (target, plan) in enumerate(zip(targets, plans)):
+        fmt = target['output_format'].lower()
+        if plan['vcodec'] == 'copy':
+            cmd += ['-map', '0:v:0', '-c:v', 'copy']
+        elif plan['vcodec'] == 'gif':
+            cmd += ['-map', f"[{video_pads[index]}]"]
+        elif plan['vcodec']:
+            cmd += ['-map', f"[{video_pads[index]}]", '-c:v', plan['vcodec']]
+            encoder_preset = translate_preset(plan['vcodec'], target.get('preset', preset))
+            if encoder_preset:
+                cmd += ['-preset', encoder_preset]
+        if plan['acodec'] == 'copy':
+            cmd += ['-map', '0:a:0', '-c:a', 'copy']
+        elif plan['acodec']:
+            cmd += ['-map', f"[{audio_pads[index]}]", '-c:a', plan['acodec']]
+        if threads is not None:
+            cmd += ['-threads', str(threads)]
+        cmd.append(target['output_file_path'])
+    return cmd, plans
+
+
+def output_sizes(targets: list) -> list:
+    """Returns the current size in bytes of every target's output file (0 if not written yet)."""
+    sizes = []
+    for target in targets:
+        try:
+            sizes.append(os.path.getsize(target['output_file_path']))
+        except OSError:
+            sizes.append(0)
+    return sizes
@@ -0,0 +1,278 @@
+import os
+import sys
+import time
+import shutil
+import threading
+import subprocess
+import contextlib
+
+# Stream-copy jobs, joins and merges that may run at once; they are bound by disk I/O, not CPU.
+DEFAULT_MAX_DISK_JOBS = 2
+# Options whose value names a codec; a command whose codecs are all 'copy' only moves bytes.
+_CODEC_OPTIONS = ('-c', '-codec', '-vcodec', '-acodec', '-scodec')
+_FILTER_OPTIONS = ('-vf', '-af', '-filter', '-filter_complex', '-lavfi')
+# Options that take no value, needed to tell option values from output paths.
+_FLAG_OPTIONS = {'-y', '-n', '-nostdin', '-nostats', '-stats', '-hide_banner', '-an', '-vn', '-sn', '-dn', '-shortest',
+                 '-re', '-copyts', '-start_at_zero', '-accurate_seek', '-noaccurate_seek', '-benchmark', '-report'}
+
+
+def available_cpus() -> int:
+    """Returns the number of CPUs this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        try:
+            return max(1, len(os.sched_getaffinity(0)))
+        except OSError:
+            pass
+    return os.cpu_count() or 1
+
+
+def _output_groups(cmd: list) -> list:
+    """
+    Splits an ffmpeg command into its outputs. Returns (first, last) index pairs: the
+    options of an output run from `first` up to its path at `last`.
+    """
+    groups, first, i = [], 1, 1
+    while i < len(cmd):
+        arg = str(cmd[i])
+        if arg == '-i':
+            i += 2
+            first = i # Options before an input belong to that input
+        elif arg.startswith('-') and arg != '-':
+            i += 1 if arg in _FLAG_OPTIONS else 2
+        else:
+            groups.append((first, i))
+            i += 1
+            first = i
+    return groups
+
+
+def _thread_units(cmd: list, first: int, last: int) -> int:
+    """Encoders an output runs: its non-copy video encoders, at least 1; 0 if it only stream-copies."""
+    video, codecs = 0, []
+    for i in range(first, last - 1):
+        option = str(cmd[i]).split(':')
+        if option[0] in _CODEC_OPTIONS:
+            codecs.append(cmd[i + 1])
+            if cmd[i + 1] != 'copy' and (option[0] == '-vcodec' or option[1:2] == ['v']):
+                video += 1
+    if codecs and all(codec == 'copy' for codec in codecs):
+        return 0
+    return max(1, video)
+
+
+def _output_threads(cmd: list, first: int, last: int):
+    """Returns (index of the value, value) of an output's last -threads option, or (None, None)."""
+    found = (None, None)
+    for i in range(first, last - 1):
+        if cmd[i] == '-threads':
+            try:
+                found = (i + 1, int(cmd[i + 1]))
+            except ValueError:
+                continue
+    return found
+
+
+def requested_threads(cmd: list, default: int) -> int:
+    """
+    Returns the threads an ffmpeg command keeps busy: each output's -threads times the
+    encoders it runs (an ABR ladder encodes every rung under one -threads), summed over
+    the outputs. A missing or 0 (auto) -threads counts as `default`.
+    """
+    total = 0
+    for first, last in _output_groups(cmd):
+        units = _thread_units(cmd, first, last)
+        if units:
+            threads = _output_threads(cmd, first, last)[1]
+            total += units * (threads or default)
+    return total or default
+
+
+def limit_threads(cmd: list, threads: int) -> list:
+    """
+    Returns `cmd` with its -threads lowered so that requested_threads() stays within
+    `threads`: the grant is shared evenly between the encoders of every output (0, meaning
+    auto, is capped too). An encoding output without -threads gets one before its path.
+    """
+    cmd = list(cmd)
+    groups = _output_groups(cmd)
+    units = [_thread_units(cmd, first, last) for first, last in groups]
+    share = max(1, threads // max(1, sum(units)))
+    for (first, last), count in reversed(list(zip(groups, units))): # Inserting shifts later indexes
+        if not count:
+            continue
+        index, value = _output_threads(cmd, first, last)
+        if index is None:
+            if not any(cmd[i] == '-threads' for i in range(first, last)): # Skip a -threads with an unparsable value
+                cmd[last:last] = ['-threads', str(share)]
+        elif value == 0 or value > share:
+            cmd[index] = str(share)
+    return cmd
+
+
+def is_copy_command(cmd: list) -> bool:
+    """True if an ffmpeg command only stream-copies (no filters, every codec 'copy')."""
+    codecs = []
+    for i, arg in enumerate(cmd[:-1]):
+        option = arg.split(':', 1)[0]
+        if option in _FILTER_OPTIONS:
+            return False
+        if option in _CODEC_OPTIONS:
+            codecs.append(cmd[i + 1])
+    return bool(codecs) and all(codec == 'copy' for codec in codecs)
+
+
+class ResourceGovernor:
+    """
+    Shares the machine between concurrent ffmpeg (and yt-dlp postprocessor) jobs.
+
+    CPU work is paid for in thread tokens: a job asks for its -threads and gets at most
+    what is free (waiting while none are), so the sum of running -threads stays within
+    total_threads. Disk-bound stages (stream copies, joins, merges) also take one of
+    max_disk_jobs slots. Child processes can be reniced, given an I/O class, and pinned
+    to a set of CPUs. Safe to use from several threads.
+    """
+    def __init__(self, total_threads: int = None, max_disk_jobs: int = DEFAULT_MAX_DISK_JOBS, nice: int = None, ionice_class: int = None, ionice_level: int = None, cpu_affinity=None):
+        """
+        Args:
+            total_threads: Thread tokens to hand out. Defaults to the CPUs this process may use.
+            max_disk_jobs: Disk-bound stages allowed to run at once.
+            nice: Niceness increment applied to child processes (POSIX only). None leaves it.
+            ionice_class: I/O scheduling class for child processes (1 realtime, 2 best-effort,
+                3 idle); needs the `ionice` tool (Linux). None leaves it.
+            ionice_level: Priority within the best-effort/realtime class (0-7).
+            cpu_affinity: CPU ids child processes are pinned to (Linux only). None leaves it.
+        """
+        self.total_threads = total_threads if total_threads and total_threads > 0 else available_cpus()
+        self.max_disk_jobs = max(1, max_disk_jobs)
+        self.nice = nice
+        self.ionice_class = ionice_class
+        self.ionice_level = ionice_level
+        self.cpu_affinity = set(cpu_affinity) if cpu_affinity else None
+        self._threads_in_use = 0
+        self._disk_in_use = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+
+    # --- Tokens ---
+
+    def acquire_threads(self, requested: int, minimum: int = 1, timeout: float = None) -> int:
+        """
+        Takes up to `requested` thread tokens, waiting until at least `minimum` are free.
+
+        Args:
+            requested: Tokens wanted (capped at total_threads).
+            minimum: Fewest tokens worth starting with (capped at the request).
+            timeout: Seconds to wait. None waits indefinitely.
+
+        Returns:
+            The number of tokens granted, or 0 if the timeout expired.
+        """
+        requested = max(1, min(requested, self.total_threads))
+        minimum = max(1, min(minimum, requested))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._waiting += 1
+            try:
+                while self.total_threads - self._threads_in_use < minimum:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return 0
+                    self._condition.wait(remaining)
+                granted = min(requested, self.total_threads - self._threads_in_use)
+                self._threads_in_use += granted
+                return granted
+            finally:
+                self._waiting -= 1
+
+    def release_threads(self, count: int):
+        with self._condition:
+            self._threads_in_use = max(0, self._threads_in_use - count)
+            self._condition.notify_all()
+
+    def acquire_disk(self, timeout: float = None) -> bool:
+        """Takes a disk-stage slot, waiting for one to free up. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._disk_in_use >= self.max_disk_jobs:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self._disk_in_use += 1
+            return True
+
+    def release_disk(self):
+        with self._condition:
+            self._disk_in_use = max(0, self._disk_in_use - 1)
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def reserve(self, threads: int = 1, disk: bool = False, minimum: int = 1):
+        """
+        Holds thread tokens (and a disk slot) for the duration of a `with` block.
+
+        Yields:
+            The number of thread tokens granted.
+        """
+        if disk:
+            self.acquire_disk() # Disk first, then threads, everywhere: no lock-order cycles
+        granted = 0
+        try:
+            granted = self.acquire_threads(threads, minimum)
+            yield granted
+        finally:
+            if granted:
+                self.release_threads(granted)
+            if disk:
+                self.release_disk()
+
+    # --- Child processes ---
+
+    def apply_to_process(self, pid: int):
+        """Applies the configured niceness, I/O class and CPU affinity to a child process."""
+        if self.nice and hasattr(os, 'setpriority'):
+            try:
+                os.setpriority(os.PRIO_PROCESS, pid, os.getpriority(os.PRIO_PROCESS, pid) + self.nice)
+            except OSError as e:
+                print(f"Warning: Could not renice process {pid}: {e}")
+        if self.cpu_affinity and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(pid, self.cpu_affinity)
+            except OSError as e:
+                print(f"Warning: Could not set CPU affinity of process {pid}: {e}")
+        if self.ionice_class is not None and sys.platform.startswith("linux"):
+            ionice = shutil.which('ionice')
+            if ionice:
+                cmd = [ionice, '-c', str(self.ionice_class)]
+                if self.ionice_level is not None and self.ionice_class in (1, 2):
+                    cmd += ['-n', str(self.ionice_level)]
+                subprocess.run(cmd + ['-p', str(pid)], capture_output=True)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                'total_threads': self.total_threads,
+                'threads_in_use': self._threads_in_use,
+                'max_disk_jobs': self.max_disk_jobs,
+                'disk_jobs_in_use': self._disk_in_use,
+                'waiting': self._waiting,
+            }
+
+
+_default_governor = None
+_default_governor_lock = threading.Lock()
+
+def get_resource_governor() -> ResourceGovernor:
+    """Returns the process-wide ResourceGovernor, creating it on first use."""
+    global _default_governor
+    with _default_governor_lock:
+        if _default_governor is None:
+            _default_governor = ResourceGovernor()
+        return _default_governor
+
+
+def set_resource_governor(governor: ResourceGovernor):
+    """Replaces the process-wide ResourceGovernor (e.g. after the user changes its settings)."""
+    global _default_governor
+    with _default_governor_lock:
+        _default_governor = governor
@@ -0,0 +1,261 @@
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+from src.core.media_probe import ProbeCache
+
+DEFAULT_RESULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".mediadl", "results")
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+HASH_BLOCK_SIZE = 1024 * 1024
+# Placeholders that stand in for the input/output paths in a canonical plan.
+INPUT_PLACEHOLDER = "{input}"
+OUTPUT_PLACEHOLDER = "{output}"
+# Options that change how fast a result is produced, not what it is.
+_SPEED_ONLY_OPTIONS = {'-threads', '-stats_period'}
+_SPEED_ONLY_FLAGS = {'-y', '-nostdin', '-nostats'}
+_FICLONE = 0x40049409 # Linux ioctl that makes a copy-on-write clone (reflink)
+
+
+def content_fingerprint(path: str) -> str:
+    """Returns the BLAKE2b hex digest of a file's bytes."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def canonical_plan(cmd: list, input_file_path: str, output_file_path: str) -> list:
+    """
+    Normalises an ffmpeg argument list so equal conversions compare equal.
+
+    Input/output paths become placeholders and speed-only options (-threads, -y, ...) are
+    dropped, so the same job with another output name or thread count maps to the same key.
+    The output placeholder keeps the file extension, since ffmpeg picks the muxer from it
+    when no -f is given (the same streams in .mp4 and .mov are different files).
+    """
+    canonical, skip_value = [], False
+    for arg in list(cmd)[1:]: # The executable path does not change the result
+        if skip_value:
+            skip_value = False
+            continue
+        if arg in _SPEED_ONLY_OPTIONS:
+            skip_value = True
+            continue
+        if arg in _SPEED_ONLY_FLAGS:
+            continue
+        if arg == input_file_path:
+            arg = INPUT_PLACEHOLDER
+        elif arg == output_file_path:
+            arg = OUTPUT_PLACEHOLDER + os.path.splitext(output_file_path)[1].lower()
+        canonical.append(str(arg))
+    return canonical
+
+
+def clone_file(source: str, destination: str) -> str:
+    """
+    Materialises `source` at `destination` as cheaply as the filesystem allows.
+
+    Tries a reflink (copy-on-write clone), then a hardlink, then a plain copy.
+
+    Returns:
+        'reflink', 'hardlink' or 'copy'.
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            import fcntl
+            with open(source, 'rb') as src, open(destination, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            return 'reflink'
+        except (ImportError, OSError):
+            if os.path.exists(destination):
+                os.remove(destination)
+    try:
+        os.link(source, destination)
+        return 'hardlink'
+    except OSError:
+        shutil.copy2(source, destination)
+        return 'copy'
+
+
+class ResultCache:
+    """
+    Content-addressed cache of finished conversions.
+
+    A result is keyed by the input's content fingerprint plus a hash of the canonical ffmpeg
+    plan (see canonical_plan), so re-running the same conversion on the same bytes returns
+    the stored output by reflink/hardlink instead of running ffmpeg. Fingerprints are
+    remembered per (path, size, mtime_ns, inode), so unchanged inputs are hashed only once.
+    Stored results are evicted least-recently-used once max_bytes is exceeded.
+    Safe to use from several threads.
+    """
+    def __init__(self, cache_dir: str = DEFAULT_RESULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir: Directory holding the stored results and their SQLite index.
+            max_bytes: Total size of stored results kept before the oldest are evicted.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL,"
+            " digest TEXT NOT NULL, PRIMARY KEY (path, size, mtime_ns, inode))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, object_path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " plan TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.commit()
+
+    def fingerprint(self, path: str) -> str:
+        """Returns the content fingerprint of `path`, hashing the file only if it changed."""
+        file_key = ProbeCache.file_key(path)
+        with self._lock:
+            row = self._db.execute("SELECT digest FROM fingerprints WHERE path=? AND size=? AND mtime_ns=? AND inode=?", file_key).fetchone()
+        if row:
+            return row[0]
+        digest = content_fingerprint(path)
+        with self._lock:
+            self._db.execute("DELETE FROM fingerprints WHERE path=?", (file_key[0],))
+            self._db.execute("INSERT INTO fingerprints VALUES (?, ?, ?, ?, ?)", file_key + (digest,))
+            self._db.commit()
+        return digest
+
+    def make_key(self, input_file_path: str, cmd: list, output_file_path: str) -> str:
+        """Returns the cache key for converting input_file_path with the ffmpeg command `cmd`."""
+        plan = canonical_plan(cmd, input_file_path, output_file_path)
+        raw = json.dumps([self.fingerprint(input_file_path), plan], separators=(',', ':'))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _object_path(self, key: str, output_file_path: str) -> str:
+        ext = os.path.splitext(output_file_path)[1]
+        return os.path.join(self.objects_dir, key[:2], key + ext)
+
+    def fetch(self, key: str, output_file_path: str):
+        """
+        Places the cached result for `key` at output_file_path.
+
+        Returns:
+            How it was placed ('reflink', 'hardlink' or 'copy'), or None on a miss.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT object_path, size, mtime_ns FROM results WHERE key=?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            object_path, size, mtime_ns = row
+            try:
+                st = os.stat(object_path)
+            except OSError:
+                st = None
+            if st is None or st.st_size != size or st.st_mtime_ns != mtime_ns:
+                # The stored file vanished or was modified through a hardlink; drop it.
+                self._forget(key, object_path)
+                self.misses += 1
+                return None
+            if os.path.exists(output_file_path):
+                os.remove(output_file_path)
+            method = clone_file(object_path, output_file_path)
+            self._db.execute("UPDATE results SET last_used=?, hits=hits+1 WHERE key=?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+            return method
+
+    def store(self, key: str, output_file_path: str, cmd: list = None):
+        """Adds a finished output to the cache under `key`, then evicts old results if needed."""
+        if not os.path.isfile(output_file_path):
+            return
+        object_path = self._object_path(key, output_file_path)
+        with self._lock:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            if os.path.exists(object_path):
+                os.remove(object_path)
+            try:
+                clone_file(output_file_path, object_path)
+                st = os.stat(object_path)
+            except OSError as e:
+                print(f"Warning: Could not store conversion result in cache: {e}")
+                return
+            now = time.time()
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                             (key, object_path, st.st_size, st.st_mtime_ns, json.dumps(cmd or []), now, now))
+            self._db.commit()
+            self.stores += 1
+            self.evict()
+
+    def evict(self, max_bytes: int = None):
+        """Removes least-recently-used results until the cache holds at most max_bytes."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total <= limit:
+                return
+            for key, object_path, size in self._db.execute("SELECT key, object_path, size FROM results ORDER BY last_used").fetchall():
+                if total <= limit:
+                    break
+                self._forget(key, object_path)
+                total -= size
+                self.evictions += 1
+
+    def _forget(self, key, object_path):
+        self._db.execute("DELETE FROM results WHERE key=?", (key,))
+        self._db.commit()
+        try:
+            os.remove(object_path)
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        """Returns entry count, stored bytes and the hit/miss/store/eviction counters."""
+        with self._lock:
+            entries, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'total_bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM results")
+            self._db.commit()
+            shutil.rmtree(self.objects_dir, ignore_errors=True)
+            os.makedirs(self.objects_dir, exist_ok=True)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_result_cache() -> ResultCache:
+    """Returns the process-wide ResultCache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
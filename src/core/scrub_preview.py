@@ -0,0 +1,222 @@
+import threading
+import collections
+
+from src.core.media_probe import ProbeCache, inspect_media
+from src.core.frame_grab import FrameGrabError, RawFrame, grab_frame, read_raw_output, scaled_size
+
+DEFAULT_COLUMNS = 10
+DEFAULT_ROWS = 10
+DEFAULT_TILE_WIDTH = 160
+# Sprite sheets are raw RGB, so 64 MiB holds about fifteen 10x10 sheets of 160x90 tiles.
+DEFAULT_MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class ScrubPreviewError(Exception):
+    """Raised when a sprite sheet or preview frame cannot be produced."""
+    pass
+
+
+class SpriteSheet:
+    """Raw RGB24 grid of evenly spaced, low-resolution frames of one file."""
+    def __init__(self, data: bytes, columns: int, rows: int, tile_width: int, tile_height: int, duration: float):
+        self.data = data
+        self.columns = columns
+        self.rows = rows
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.duration = duration
+
+    @property
+    def tile_count(self) -> int:
+        return self.columns * self.rows
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.data)
+
+    def tile_index(self, seconds: float) -> int:
+        """Returns the tile showing the frame closest to `seconds`."""
+        if self.duration <= 0:
+            return 0
+        return max(0, min(self.tile_count - 1, int(seconds / self.duration * self.tile_count)))
+
+    def tile(self, index: int) -> RawFrame:
+        """Returns one tile as an rgb24 RawFrame."""
+        row, column = divmod(index, self.columns)
+        sheet_stride = self.columns * self.tile_width * 3
+        tile_stride = self.tile_width * 3
+        first = row * self.tile_height * sheet_stride + column * tile_stride
+        rows = b"".join(self.data[first + y * sheet_stride:first + y * sheet_stride + tile_stride] for y in range(self.tile_height))
+        return RawFrame(rows, self.tile_width, self.tile_height)
+
+
+class ScrubPreviewEngine:
+    """
+    Serves trim-slider previews from in-memory sprite sheets.
+
+    prepare() renders a sheet of columns x rows evenly spaced frames in one ffmpeg pass
+    (decoding keyframes only, through the fps and tile filters). preview() then crops the
+    nearest tile from memory without starting a process. request_exact() decodes the exact
+    frame on a single background worker; a newer request replaces a pending one and kills
+    a stale running decode, so only the latest slider position is ever delivered. Sheets of
+    several files are kept in an LRU bounded by max_cache_bytes.
+    """
+    def __init__(self, columns: int = DEFAULT_COLUMNS, rows: int = DEFAULT_ROWS, tile_width: int = DEFAULT_TILE_WIDTH, max_cache_bytes: int = DEFAULT_MAX_CACHE_BYTES, probe_cache=None):
+        """
+        Args:
+            columns, rows: Sprite sheet grid; columns * rows frames are sampled per file.
+            tile_width: Width of each tile in pixels (height keeps the aspect ratio).
+            max_cache_bytes: Total size of sheets kept in memory.
+            probe_cache: ProbeCache used for ffprobe results. Defaults to the shared cache.
+        """
+        self.columns = columns
+        self.rows = rows
+        self.tile_width = tile_width
+        self.max_cache_bytes = max_cache_bytes
+        self.probe_cache = probe_cache
+        self._sheets = collections.OrderedDict() # file key -> SpriteSheet
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self._pending = None # Latest exact-frame request, waiting for the worker
+        self._request_id = 0
+        self._wakeup = threading.Condition(self._lock)
+        self._worker = None
+        self._running = {'process': None}
+        self.hits = 0
+        self.misses = 0
+
+    # --- Sprite sheets ---
+
+    def get_sheet(self, input_file_path: str):
+        """Returns the cached SpriteSheet of a file, or None if it has not been prepared."""
+        key = ProbeCache.file_key(input_file_path)
+        with self._lock:
+            sheet = self._sheets.get(key)
+            if sheet is not None:
+                self._sheets.move_to_end(key)
+            return sheet
+
+    def prepare(self, input_file_path: str) -> SpriteSheet:
+        """
+        Renders (or returns the cached) sprite sheet of a file. Blocks; call it off the UI thread.
+
+        Raises:
+            ScrubPreviewError: If the file has no video or ffmpeg fails.
+        """
+        sheet = self.get_sheet(input_file_path)
+        if sheet is not None:
+            self.hits += 1
+            return sheet
+        self.misses += 1
+        try:
+            media_info = inspect_media(input_file_path, cache=self.probe_cache)
+        except Exception as e:
+            raise ScrubPreviewError(f"Could not probe input file: {e}")
+        if not media_info['video_stream'] or media_info['duration'] <= 0:
+            raise ScrubPreviewError("No video stream with a known duration to preview.")
+
+        duration = media_info['duration']
+        tile_width, tile_height = scaled_size(media_info, self.tile_width)
+        count = self.columns * self.rows
+        # Only keyframes are decoded; fps then picks the one nearest each sample point.
+        cmd = ['ffmpeg', '-v', 'error', '-skip_frame', 'nokey', '-i', input_file_path, '-an', '-sn',
+               '-vf', f"fps={count}/{duration:.6f},scale={tile_width}:{tile_height},tile={self.columns}x{self.rows}",
+               '-frames:v', '1', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1']
+        try:
+            data = read_raw_output(cmd, self.columns * tile_width * self.rows * tile_height * 3)
+        except FrameGrabError as e:
+            raise ScrubPreviewError(str(e))
+        sheet = SpriteSheet(data, self.columns, self.rows, tile_width, tile_height, duration)
+        self._remember(ProbeCache.file_key(input_file_path), sheet)
+        return sheet
+
+    def _remember(self, key, sheet):
+        with self._lock:
+            old = self._sheets.pop(key, None)
+            if old is not None:
+                self._cache_bytes -= old.size_bytes
+            self._sheets[key] = sheet
+            self._cache_bytes += sheet.size_bytes
+            while self._cache_bytes > self.max_cache_bytes and len(self._sheets) > 1:
+                _, evicted = self._sheets.popitem(last=False)
+                self._cache_bytes -= evicted.size_bytes
+
+    def preview(self, input_file_path: str, seconds: float):
+        """
+        Returns the sheet tile nearest `seconds` as a RawFrame, or None if the file's sheet
+        is not ready. Never starts a process.
+        """
+        sheet = self.get_sheet(input_file_path)
+        if sheet is None:
+            return None
+        return sheet.tile(sheet.tile_index(seconds))
+
+    # --- Exact frames (latest request wins) ---
+
+    def request_exact(self, input_file_path: str, seconds: float, callback, width: int = None, error_callback=None):
+        """
+        Asks for the exact frame at `seconds`; supersedes any earlier request.
+
+        `callback(frame)` (an rgb24 RawFrame) runs on the worker thread, and only if no newer
+        request arrived in the meantime. GUI callers should hop back to their main loop.
+        """
+        with self._lock:
+            self._request_id += 1
+            self._pending = (self._request_id, input_file_path, seconds, width or self.tile_width, callback, error_callback)
+            process = self._running['process']
+            if process is not None and process.poll() is None:
+                try:
+                    process.kill() # The running decode is stale now
+                except OSError:
+                    pass
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._exact_worker, daemon=True, name="scrub-preview")
+                self._worker.start()
+            self._wakeup.notify()
+
+    def cancel(self):
+        """Drops the pending exact-frame request and kills a running one."""
+        with self._lock:
+            self._request_id += 1
+            self._pending = None
+            process = self._running['process']
+            if process is not None and process.poll() is None:
+                try:
+                    process.kill()
+                except OSError:
+                    pass
+
+    def _exact_worker(self):
+        while True:
+            with self._lock:
+                while self._pending is None:
+                    if not self._wakeup.wait(timeout=30):
+                        self._worker = None # Idle; request_exact starts a new worker
+                        return
+                request_id, path, seconds, width, callback, error_callback = self._pending
+                self._pending = None
+            try:
+                frame = self.grab_frame(path, seconds, width, process_holder=self._running)
+            except Exception as e:
+                with self._lock:
+                    stale = request_id != self._request_id
+                if error_callback and not stale:
+                    error_callback(e)
+                continue
+            with self._lock:
+                stale = request_id != self._request_id
+            if not stale:
+                callback(frame)
+
+    def grab_frame(self, input_file_path: str, seconds: float, width: int = None, process_holder: dict = None) -> RawFrame:
+        """
+        Decodes the exact frame at `seconds`, scaled to `width`, as an rgb24 RawFrame.
+
+        Raises:
+            ScrubPreviewError: If the file cannot be probed or ffmpeg fails.
+        """
+        try:
+            media_info = inspect_media(input_file_path, cache=self.probe_cache)
+            return grab_frame(input_file_path, seconds, width or self.tile_width, media_info=media_info, process_holder=process_holder)
+        except Exception as e:
+            raise ScrubPreviewError(f"Could not grab preview frame: {e}")
@@ -0,0 +1,217 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.converter import Converter, ConversionError, FFmpegProcess, DEFAULT_STATS_PERIOD, DEFAULT_PRESET, AUTO_PRESET, write_concat_list
+from src.core.media_probe import inspect_media
+from src.core.keyframe_index import KeyframeIndexError, get_keyframe_index
+
+# Formats that can be encoded in segments and joined without re-encoding.
+SEGMENTABLE_FORMATS = ('mp4', 'mov', 'webm', 'avi')
+# Inputs shorter than this many seconds per segment are not worth splitting.
+MIN_SEGMENT_SECONDS = 30.0
+
+
+def choose_split_points(keyframes: list, duration: float, segment_count: int) -> list:
+    """
+    Picks up to segment_count - 1 keyframe times that cut `duration` into roughly equal parts.
+
+    Returns:
+        Sorted, de-duplicated split times, excluding 0 and the end of the file.
+    """
+    if segment_count < 2 or not keyframes or duration <= 0:
+        return []
+    split_points = []
+    for i in range(1, segment_count):
+        target = duration * i / segment_count
+        nearest = min(keyframes, key=lambda t: abs(t - target))
+        if 0 < nearest < duration and nearest not in split_points:
+            split_points.append(nearest)
+    return sorted(split_points)
+
+
+class SegmentedEncoder:
+    """
+    Encodes one long input by splitting it at keyframes and encoding the pieces in parallel.
+
+    Each segment runs in its own ffmpeg process with the codec settings convert_media would
+    use, the audio track is encoded once in a separate process, and the results are joined
+    with the concat demuxer using stream copy. Inputs that would not benefit (short files,
+    stream-copy remuxes, audio/GIF targets) are handed to Converter.convert_media unchanged.
+    """
+    def __init__(self, max_workers: int = None, threads_per_segment: int = None, min_segment_seconds: float = MIN_SEGMENT_SECONDS, probe_cache=None, stats_period: float = DEFAULT_STATS_PERIOD):
+        """
+        Args:
+            max_workers: Number of segment encodes to run at once. Defaults to half the CPU count.
+            threads_per_segment: ffmpeg -threads per segment. Defaults to CPU count / max_workers.
+            min_segment_seconds: Shortest segment worth splitting off.
+            probe_cache: ProbeCache used for ffprobe results. Defaults to the shared cache.
+            stats_period: Seconds between progress updates from each ffmpeg process.
+        """
+        cpu_count = os.cpu_count() or 1
+        self.max_workers = max_workers if max_workers and max_workers > 0 else max(1, cpu_count // 2)
+        self.threads_per_segment = threads_per_segment if threads_per_segment and threads_per_segment > 0 else max(1, cpu_count // self.max_workers)
+        self.min_segment_seconds = min_segment_seconds
+        self.probe_cache = probe_cache
+        self.stats_period = stats_period
+        self.converter = Converter(stats_period=stats_period, probe_cache=probe_cache)
+        self._stop_flag = threading.Event()
+        self._processes = []
+        self._processes_lock = threading.Lock()
+
+    def stop(self):
+        """Stops every running segment encode (and a delegated convert_media call)."""
+        self._stop_flag.set()
+        self.converter.stop_conversion()
+        with self._processes_lock:
+            for process in self._processes:
+                process.kill()
+
+    def _run_ffmpeg(self, cmd, progress_callback=None, total_duration_seconds=0):
+        process = FFmpegProcess(cmd, stop_flag=self._stop_flag, stats_period=self.stats_period)
+        with self._processes_lock:
+            self._processes.append(process)
+        try:
+            process.run(progress_callback=progress_callback, total_duration_seconds=total_duration_seconds)
+        finally:
+            with self._processes_lock:
+                self._processes.remove(process)
+
+    def encode(self, input_file_path: str, output_file_path: str, output_format: str, preset: str = 'ultrafast', segment_count: int = None, progress_callback=None) -> str:
+        """
+        Encodes input_file_path to output_file_path in parallel segments.
+
+        Args:
+            input_file_path: Path to the input media file.
+            output_file_path: Path of the joined output file.
+            output_format: The target format ("mp4", "mov", "webm" or "avi"; others are delegated).
+            preset: FFmpeg preset for video encoding, as for convert_media.
+            segment_count: Number of segments. Defaults to max_workers.
+            progress_callback: Receives 'converting' updates with one merged 'percentage' for
+                the whole job, then a 'finished_conversion' update.
+
+        Returns:
+            The full path to the converted file.
+
+        Raises:
+            ConversionError: If any step fails or the encode is stopped.
+            FileNotFoundError: If the input file does not exist.
+        """
+        if not os.path.exists(input_file_path):
+            raise FileNotFoundError(f"Input file not found: {input_file_path}")
+        self._stop_flag.clear()
+        fmt = output_format.lower()
+
+        try:
+            media_info = inspect_media(input_file_path, cache=self.probe_cache)
+        except Exception as e:
+            raise ConversionError(f"Could not probe input file: {e}")
+        duration = media_info['duration']
+        segment_count = segment_count or self.max_workers
+        segment_count = min(segment_count, int(duration // self.min_segment_seconds)) if duration > 0 else 1
+        plan = self.converter.plan_streams(media_info, fmt)
+
+        if fmt not in SEGMENTABLE_FORMATS or not media_info['video_stream'] or plan['vcodec'] == 'copy' or segment_count < 2:
+            return self.converter.convert_media(input_file_path, output_file_path, fmt, threads=self.threads_per_segment * self.max_workers,
+                                                preset=preset, progress_callback=progress_callback)
+
+        try:
+            keyframes = get_keyframe_index(input_file_path, cache=self.probe_cache).times
+        except KeyframeIndexError as e:
+            raise ConversionError(str(e))
+        split_points = choose_split_points(keyframes, duration, segment_count)
+        if not split_points:
+            return self.converter.convert_media(input_file_path, output_file_path, fmt, threads=self.threads_per_segment * self.max_workers,
+                                                preset=preset, progress_callback=progress_callback)
+
+        if preset == AUTO_PRESET: # ffmpeg has no 'auto' preset; the segments use the tuned one
+            try:
+                preset = self.converter.get_auto_tuner().tune(input_file_path, fmt, encoder=plan['vcodec'])['preset'] or DEFAULT_PRESET
+            except Exception as e:
+                print(f"Warning: Auto-tune failed, using preset '{DEFAULT_PRESET}': {e}")
+                preset = DEFAULT_PRESET
+
+        output_dir = os.path.dirname(output_file_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix=".segments_", dir=output_dir or None)
+        try:
+            self._encode_segments(input_file_path, output_file_path, fmt, preset, media_info, plan, split_points, work_dir, progress_callback)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if progress_callback:
+            progress_callback({'status': 'finished_conversion', 'filename': output_file_path, 'mode': 'segmented', 'segment_count': len(split_points) + 1})
+        return output_file_path
+
+    def _encode_segments(self, input_file_path, output_file_path, fmt, preset, media_info, plan, split_points, work_dir, progress_callback):
+        duration = media_info['duration']
+        bounds = [0.0] + split_points + [duration]
+        segments = [(i, bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+        done_seconds = [0.0] * len(segments)
+        progress_lock = threading.Lock()
+
+        def segment_progress(index, data):
+            if not progress_callback or data.get('time_seconds') is None:
+                return
+            with progress_lock:
+                done_seconds[index] = min(data['time_seconds'], segments[index][2] - segments[index][1])
+                merged = sum(done_seconds)
+                progress_callback({
+                    'status': 'converting',
+                    'percentage': min(100.0, merged / duration * 100) if duration > 0 else None,
+                    'time_seconds': merged,
+                    'speed': data.get('speed'),
+                    'segment': index,
+                    'segment_count': len(segments),
+                })
+
+        segment_paths = [os.path.join(work_dir, f"segment_{i:04d}.mkv") for i, _, _ in segments]
+
+        def encode_segment(segment):
+            index, start, end = segment
+            # Input seeking to a keyframe is both fast and exact; -to bounds the segment.
+            cmd = ['ffmpeg', '-y', '-ss', f"{start:.6f}"]
+            if index < len(segments) - 1:
+                cmd += ['-to', f"{end:.6f}"]
+            cmd += ['-i', input_file_path, '-map', '0:v:0', '-an', '-sn',
+                    '-c:v', plan['vcodec'], '-preset', preset, '-threads', str(self.threads_per_segment), segment_paths[index]]
+            self._run_ffmpeg(cmd, progress_callback=lambda data: segment_progress(index, data))
+
+        audio_path = None
+        jobs = list(segments)
+        if media_info['audio_stream']:
+            audio_path = os.path.join(work_dir, "audio.mka")
+            jobs.append('audio')
+
+        def run_job(job):
+            if job == 'audio':
+                self._run_ffmpeg(['ffmpeg', '-y', '-i', input_file_path, '-map', '0:a:0', '-vn', '-sn', '-c:a', plan['acodec'], audio_path])
+            else:
+                encode_segment(job)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="segment-encoder") as executor:
+            futures = [executor.submit(run_job, job) for job in jobs]
+            errors = []
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(e)
+                    self.stop() # One failed segment makes the rest useless
+        if self._stop_flag.is_set() and not errors:
+            raise ConversionError("Conversion stopped by user.")
+        if errors:
+            first = next((e for e in errors if "stopped by user" not in str(e)), errors[0])
+            raise first if isinstance(first, ConversionError) else ConversionError(f"Segment encode failed: {first}")
+
+        list_path = os.path.join(work_dir, "segments.txt")
+        write_concat_list(list_path, segment_paths)
+
+        cmd = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path]
+        if audio_path:
+            cmd += ['-i', audio_path, '-map', '0:v:0', '-map', '1:a:0']
+        cmd += ['-c', 'copy', output_file_path]
+        self._run_ffmpeg(cmd)
@@ -0,0 +1,208 @@
+import os
+import bisect
+import shutil
+import tempfile
+import threading
+
+from src.core.converter import Converter, ConversionError, FFmpegProcess, FORMAT_ENCODERS, DEFAULT_STATS_PERIOD, parse_timestamp, write_concat_list
+from src.core.media_probe import inspect_media
+from src.core.keyframe_index import KeyframeIndexError, get_keyframe_index
+
+# Source video codecs that can be smart-cut, with the encoder used for the boundary GOPs.
+SMART_CUT_ENCODERS = {'h264': 'libx264'}
+# ffprobe profile names -> libx264 -profile:v values, so re-encoded GOPs decode like the copied ones.
+X264_PROFILES = {'constrained baseline': 'baseline', 'baseline': 'baseline', 'main': 'main', 'high': 'high', 'high 10': 'high10', 'high 4:2:2': 'high422', 'high 4:4:4 predictive': 'high444'}
+# Boundary pieces shorter than this are treated as empty (the cut is already on a keyframe).
+MIN_PIECE_SECONDS = 0.001
+# Input seeking lands on the keyframe at or before the target; aiming just past a keyframe
+# time keeps rounding in pts_time from landing on the previous one.
+SEEK_EPSILON = 0.0005
+
+
+def plan_smart_cut(keyframes: list, start_seconds: float, end_seconds: float) -> list:
+    """
+    Splits [start_seconds, end_seconds) into pieces: partial GOPs at either end are
+    re-encoded and the keyframe-aligned span between them is stream-copied.
+
+    Returns:
+        A list of (kind, start, end) tuples, kind being 'encode' or 'copy'. A single
+        'encode' piece means the clip holds no complete GOP worth copying.
+    """
+    first = bisect.bisect_left(keyframes, start_seconds)
+    last = bisect.bisect_right(keyframes, end_seconds) - 1
+    if first >= len(keyframes) or last < 0 or keyframes[first] >= keyframes[last]:
+        return [('encode', start_seconds, end_seconds)]
+
+    copy_start, copy_end = keyframes[first], keyframes[last]
+    pieces = []
+    if copy_start - start_seconds > MIN_PIECE_SECONDS:
+        pieces.append(('encode', start_seconds, copy_start))
+    pieces.append(('copy', copy_start, copy_end))
+    if end_seconds - copy_end > MIN_PIECE_SECONDS:
+        pieces.append(('encode', copy_end, end_seconds))
+    return pieces
+
+
+class SmartCutter:
+    """
+    Trims a clip frame-accurately while re-encoding only the boundary GOPs.
+
+    The partial GOP before the first keyframe in the range and the one after the last are
+    re-encoded with settings matching the source stream; everything between them is
+    stream-copied. The pieces are written as MPEG-TS (which carries the codec parameters
+    in-band) and joined with the concat demuxer. The audio track of the clip is encoded
+    once on its own, since audio is cheap to encode and has no GOP structure to preserve.
+    Inputs that cannot be smart-cut are handed to Converter.convert_media.
+    """
+    def __init__(self, probe_cache=None, stats_period: float = DEFAULT_STATS_PERIOD, crf: int = 18):
+        """
+        Args:
+            probe_cache: ProbeCache used for ffprobe results. Defaults to the shared cache.
+            stats_period: Seconds between progress updates from ffmpeg.
+            crf: Quality of the re-encoded boundary GOPs (lower is closer to the source).
+        """
+        self.probe_cache = probe_cache
+        self.stats_period = stats_period
+        self.crf = crf
+        self.converter = Converter(stats_period=stats_period, probe_cache=probe_cache)
+        self._stop_flag = threading.Event()
+        self._process = None
+
+    def stop(self):
+        """Stops the running cut (and a delegated convert_media call)."""
+        self._stop_flag.set()
+        self.converter.stop_conversion()
+        if self._process:
+            self._process.kill()
+
+    def _run_ffmpeg(self, cmd, progress_callback=None, total_duration_seconds=0):
+        self._process = FFmpegProcess(cmd, stop_flag=self._stop_flag, stats_period=self.stats_period)
+        try:
+            self._process.run(progress_callback=progress_callback, total_duration_seconds=total_duration_seconds)
+        finally:
+            self._process = None
+
+    def can_smart_cut(self, media_info: dict, output_format: str) -> bool:
+        """True if the source video can be copied into output_format and re-encoded to match."""
+        fmt = output_format.lower()
+        video_stream = (media_info or {}).get('video_stream')
+        if fmt not in FORMAT_ENCODERS or fmt == 'mp3' or not video_stream:
+            return False
+        plan = self.converter.plan_streams(media_info, fmt)
+        return plan['vcodec'] == 'copy' and video_stream.get('codec_name') in SMART_CUT_ENCODERS
+
+    def _encoder_args(self, video_stream: dict, preset: str, threads) -> list:
+        args = ['-c:v', SMART_CUT_ENCODERS[video_stream['codec_name']], '-preset', preset, '-crf', str(self.crf)]
+        if video_stream.get('pix_fmt'):
+            args += ['-pix_fmt', video_stream['pix_fmt']]
+        profile = X264_PROFILES.get(str(video_stream.get('profile', '')).lower())
+        if profile:
+            args += ['-profile:v', profile]
+        if threads is not None:
+            args += ['-threads', str(threads)]
+        return args
+
+    def cut(self, input_file_path: str, output_file_path: str, output_format: str, start_time: str = None, end_time: str = None, threads: int = 8, preset: str = 'ultrafast', progress_callback=None) -> str:
+        """
+        Cuts [start_time, end_time) out of input_file_path.
+
+        Args:
+            input_file_path: Path to the input media file.
+            output_file_path: Path of the clip to write.
+            output_format: The target format; its container must take the source video as-is.
+            start_time: Start of the clip (e.g., "00:01:10"). None starts at the beginning.
+            end_time: End of the clip (e.g., "00:11:10"). None runs to the end.
+            threads: ffmpeg -threads for the boundary encodes.
+            preset: x264 preset for the boundary encodes.
+            progress_callback: Receives 'converting' updates with one merged 'percentage' and
+                the current 'phase', then a 'finished_conversion' update with mode 'smart_cut'.
+
+        Returns:
+            The full path to the clip.
+
+        Raises:
+            ConversionError: If any ffmpeg step fails or the cut is stopped.
+            FileNotFoundError: If the input file does not exist.
+        """
+        if not os.path.exists(input_file_path):
+            raise FileNotFoundError(f"Input file not found: {input_file_path}")
+        self._stop_flag.clear()
+        fmt = output_format.lower()
+
+        try:
+            media_info = inspect_media(input_file_path, cache=self.probe_cache)
+        except Exception as e:
+            raise ConversionError(f"Could not probe input file: {e}")
+        duration = media_info['duration']
+        start_seconds = parse_timestamp(start_time) if start_time else 0.0
+        end_seconds = parse_timestamp(end_time) if end_time else duration
+        if duration:
+            end_seconds = min(end_seconds, duration)
+
+        pieces = None
+        if self.can_smart_cut(media_info, fmt) and end_seconds > start_seconds:
+            try:
+                keyframes = get_keyframe_index(input_file_path, cache=self.probe_cache).times
+            except KeyframeIndexError as e:
+                raise ConversionError(str(e))
+            pieces = plan_smart_cut(keyframes, start_seconds, end_seconds)
+        if not pieces or not any(kind == 'copy' for kind, _, _ in pieces):
+            # Nothing to copy: a regular trimmed conversion is just as fast.
+            return self.converter.convert_media(input_file_path, output_file_path, fmt, threads=threads, preset=preset,
+                                                progress_callback=progress_callback, start_time=start_time, end_time=end_time)
+
+        output_dir = os.path.dirname(output_file_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix=".smart_cut_", dir=output_dir or None)
+        try:
+            self._cut_pieces(input_file_path, output_file_path, fmt, media_info, pieces, start_seconds, end_seconds, threads, preset, work_dir, progress_callback)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        self.converter.last_conversion = {'output_file_path': output_file_path, 'mode': 'smart_cut', 'vcodec': 'copy',
+                                          'acodec': FORMAT_ENCODERS[fmt][1] if media_info['audio_stream'] else None}
+        if progress_callback:
+            encoded = sum(end - start for kind, start, end in pieces if kind == 'encode')
+            progress_callback({'status': 'finished_conversion', 'filename': output_file_path, 'mode': 'smart_cut', 'encoded_seconds': encoded})
+        return output_file_path
+
+    def _cut_pieces(self, input_file_path, output_file_path, fmt, media_info, pieces, start_seconds, end_seconds, threads, preset, work_dir, progress_callback):
+        clip_duration = end_seconds - start_seconds
+        done_before = 0.0
+
+        def piece_progress(phase, offset):
+            if not progress_callback:
+                return None
+            def callback(data):
+                if data.get('time_seconds') is not None and clip_duration > 0:
+                    data['percentage'] = min(100.0, (offset + data['time_seconds']) / clip_duration * 100)
+                data['phase'] = phase
+                progress_callback(data)
+            return callback
+
+        piece_paths = []
+        for index, (kind, start, end) in enumerate(pieces):
+            piece_path = os.path.join(work_dir, f"piece_{index}.ts")
+            cmd = ['ffmpeg', '-y']
+            if kind == 'copy':
+                cmd += ['-ss', f"{start + SEEK_EPSILON:.6f}", '-i', input_file_path, '-t', f"{end - start:.6f}",
+                        '-map', '0:v:0', '-an', '-sn', '-c:v', 'copy', piece_path]
+            else:
+                cmd += ['-ss', f"{start:.6f}", '-i', input_file_path, '-t', f"{end - start:.6f}",
+                        '-map', '0:v:0', '-an', '-sn'] + self._encoder_args(media_info['video_stream'], preset, threads) + [piece_path]
+            self._run_ffmpeg(cmd, progress_callback=piece_progress(kind, done_before), total_duration_seconds=end - start)
+            done_before += end - start
+            piece_paths.append(piece_path)
+
+        list_path = os.path.join(work_dir, "pieces.txt")
+        write_concat_list(list_path, piece_paths)
+        cmd = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path]
+        if media_info['audio_stream']:
+            # The clip's audio is encoded in the same pass that joins the video pieces.
+            cmd += ['-ss', f"{start_seconds:.6f}", '-t', f"{clip_duration:.6f}", '-i', input_file_path,
+                    '-map', '0:v:0', '-map', '1:a:0', '-c:v', 'copy', '-c:a', FORMAT_ENCODERS[fmt][1]]
+        else:
+            cmd += ['-map', '0:v:0', '-c:v', 'copy']
+        cmd.append(output_file_path)
+        self._run_ffmpeg(cmd, progress_callback=piece_progress('join', 0.0), total_duration_seconds=clip_duration)
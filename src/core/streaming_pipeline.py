@@ -0,0 +1,259 @@
+import os
+import time
+
+import requests
+import yt_dlp
+
+from src.core.downloader import Downloader, DownloadError
+from src.core.converter import Converter, ConversionError, FFmpegProcess, AUTO_PRESET, DEFAULT_PRESET
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+DEFAULT_TIMEOUT = 30
+# Protocols whose bytes can be fetched with a plain HTTP request and piped into ffmpeg.
+STREAMABLE_PROTOCOLS = ('http', 'https')
+
+# yt-dlp maps codec names like 'avc1.64001F'; ffprobe calls the same codecs these names.
+_CODEC_PREFIXES = (
+    ('avc', 'h264'), ('h264', 'h264'), ('vp09', 'vp9'), ('vp9', 'vp9'), ('vp8', 'vp8'), ('av01', 'av1'),
+    ('mp4a', 'aac'), ('aac', 'aac'), ('opus', 'opus'), ('vorbis', 'vorbis'), ('mp3', 'mp3'),
+)
+
+
+def ffprobe_codec_name(ytdlp_codec: str):
+    """Translates a yt-dlp vcodec/acodec string into the ffprobe codec_name, or None."""
+    if not ytdlp_codec or ytdlp_codec == 'none':
+        return None
+    codec = ytdlp_codec.lower()
+    for prefix, name in _CODEC_PREFIXES:
+        if codec.startswith(prefix):
+            return name
+    return codec.split('.')[0]
+
+
+def media_info_from_format(info: dict) -> dict:
+    """
+    Builds an inspect_media()-shaped dict from yt-dlp metadata, so stream-copy planning and
+    progress percentages work before any byte of the file exists locally.
+    """
+    vcodec, acodec = ffprobe_codec_name(info.get('vcodec')), ffprobe_codec_name(info.get('acodec'))
+    return {
+        'path': info.get('url'),
+        'duration': float(info.get('duration') or 0.0),
+        'video_stream': {'codec_type': 'video', 'codec_name': vcodec, 'width': info.get('width'), 'height': info.get('height')} if vcodec else None,
+        'audio_stream': {'codec_type': 'audio', 'codec_name': acodec} if acodec else None,
+        'probe': {},
+    }
+
+
+class StreamingPipeline:
+    """
+    Downloads a URL and converts it at the same time.
+
+    The selected format is fetched over HTTP in chunks and written straight into ffmpeg's
+    stdin ('pipe:0'), so encoding runs while bytes are still arriving and finishes shortly
+    after the last one. The download is only written to disk when keep_download_path is
+    given. Formats that cannot be piped (separate video+audio that need merging, HLS/DASH
+    manifests) and pipe failures (e.g. MP4s whose index sits at the end) fall back to
+    Downloader.download_media followed by Converter.convert_media.
+
+    Stopping uses the existing flags: Downloader.stop_download() and
+    Converter.stop_conversion() both end the download and kill ffmpeg.
+    """
+    def __init__(self, downloader: Downloader = None, converter: Converter = None, chunk_size: int = DEFAULT_CHUNK_SIZE, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Args:
+            downloader: Downloader whose stop flag (and fallback download) is used.
+            converter: Converter whose stop flag, stream planner and settings are used.
+            chunk_size: Bytes read from the network per write into ffmpeg.
+            timeout: Network connect/read timeout in seconds.
+        """
+        self.downloader = downloader or Downloader()
+        self.converter = converter or Converter()
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+    def stop(self):
+        """Stops both the download and the conversion."""
+        self.downloader.stop_download()
+        self.converter.stop_conversion()
+
+    def _stopped(self) -> bool:
+        return self.downloader.is_stopped() or self.converter.is_stopped()
+
+    @staticmethod
+    def format_selector(output_format: str, preferred_format_info: dict = None) -> str:
+        """Returns the yt-dlp format selector for a single, directly fetchable file."""
+        code = (preferred_format_info or {}).get('format_code')
+        if code:
+            return code
+        if output_format.lower() == 'mp3':
+            return 'bestaudio[protocol^=http]/best[protocol^=http]'
+        # Matroska/WebM demux cleanly from a pipe; MP4 only does when its index comes first.
+        return 'best[ext=webm][protocol^=http]/best[vcodec!=none][acodec!=none][protocol^=http]'
+
+    def resolve(self, url: str, output_format: str, preferred_format_info: dict = None) -> dict:
+        """
+        Resolves the URL to the single format to stream, without downloading it.
+
+        Returns:
+            The yt-dlp info dict of the chosen format, or None if it cannot be piped (or has
+            no audio while the target needs it).
+
+        Raises:
+            DownloadError: If yt-dlp cannot extract the URL.
+        """
+        ydl_opts = {
+            'format': self.format_selector(output_format, preferred_format_info),
+            'quiet': True,
+            'no_warnings': True,
+            'nocheckcertificate': True,
+            'noplaylist': True,
+        }
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+        except yt_dlp.utils.DownloadError as e:
+            raise DownloadError(f"yt-dlp error resolving stream: {e}")
+        if not info or info.get('requested_formats') or not info.get('url'):
+            return None # Needs merging, or nothing directly fetchable
+        if (info.get('protocol') or '').split('+')[0] not in STREAMABLE_PROTOCOLS:
+            return None
+        if info.get('acodec') == 'none' and output_format.lower() != 'gif':
+            return None # Video-only (e.g. a DASH rendition): the output would have no sound
+        return info
+
+    def iter_download(self, info: dict, keep_download_path: str = None, progress_state: dict = None):
+        """
+        Yields the bytes of the resolved format as they arrive.
+
+        Args:
+            info: A resolve() result.
+            keep_download_path: If given, the bytes are also written to this file.
+            progress_state: Dict updated in place with 'downloaded_bytes' and 'total_bytes'.
+
+        Raises:
+            DownloadError: On network errors or when stopped.
+        """
+        state = progress_state if progress_state is not None else {}
+        part_path = keep_download_path + ".part" if keep_download_path else None
+        keep_file = None
+        try:
+            response = requests.get(info['url'], headers=info.get('http_headers') or {}, stream=True, timeout=self.timeout)
+            response.raise_for_status()
+            state['total_bytes'] = int(response.headers.get('content-length') or 0) or info.get('filesize') or info.get('filesize_approx') or 0
+            state['downloaded_bytes'] = 0
+            if part_path:
+                keep_file = open(part_path, 'wb')
+            for chunk in response.iter_content(chunk_size=self.chunk_size):
+                if self._stopped():
+                    raise DownloadError("Download stopped by user.")
+                if not chunk:
+                    continue
+                if keep_file:
+                    keep_file.write(chunk)
+                state['downloaded_bytes'] += len(chunk)
+                yield chunk
+            if keep_file:
+                keep_file.close()
+                keep_file = None
+                os.replace(part_path, keep_download_path)
+        except requests.exceptions.RequestException as e:
+            raise DownloadError(f"Error downloading stream: {e}")
+        finally:
+            if keep_file:
+                keep_file.close()
+            if part_path and os.path.exists(part_path):
+                os.remove(part_path)
+
+    def run(self, url: str, output_file_path: str, output_format: str, keep_download_path: str = None, preferred_format_info: dict = None, threads: int = 8, preset: str = 'ultrafast', progress_callback=None, start_time: str = None, end_time: str = None, gif_fps: int = 10, gif_scale_width: int = 480, allow_stream_copy: bool = True, fallback: bool = True, info: dict = None) -> str:
+        """
+        Downloads `url` and converts it to output_file_path in one overlapped pass.
+
+        Args:
+            url: Media URL (anything yt-dlp supports).
+            output_file_path: Path of the converted file.
+            output_format: The target format (e.g., "mp4", "mp3", "gif").
+            keep_download_path: Also keep the original download at this path. None keeps nothing.
+                When falling back, the download keeps yt-dlp's file name in that directory.
+            preferred_format_info: As for Downloader.download_media ('format_code' picks a stream).
+            fallback: Download first and convert afterwards when the format cannot be piped.
+            info: A resolve() result to reuse instead of resolving the URL again.
+            Other arguments are the same as for Converter.convert_media.
+
+        Returns:
+            The full path to the converted file.
+
+        Raises:
+            DownloadError: If the download fails or is stopped.
+            ConversionError: If ffmpeg fails or is stopped.
+        """
+        self.downloader.reset_stop()
+        self.converter.reset_stop()
+        output_dir = os.path.dirname(output_file_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        if info is None:
+            info = self.resolve(url, output_format, preferred_format_info)
+        if info is None:
+            if not fallback:
+                raise DownloadError("The selected format cannot be streamed into ffmpeg.")
+            return self._run_sequential(url, output_file_path, output_format, keep_download_path, preferred_format_info, threads, preset,
+                                        progress_callback, start_time, end_time, gif_fps, gif_scale_width, allow_stream_copy)
+
+        try:
+            return self._run_streaming(info, output_file_path, output_format, keep_download_path, threads, preset,
+                                       progress_callback, start_time, end_time, gif_fps, gif_scale_width, allow_stream_copy)
+        except ConversionError as e:
+            if not fallback or self._stopped():
+                raise
+            print(f"Warning: Streaming conversion failed, downloading first instead: {e}")
+            return self._run_sequential(url, output_file_path, output_format, keep_download_path, preferred_format_info, threads, preset,
+                                        progress_callback, start_time, end_time, gif_fps, gif_scale_width, allow_stream_copy)
+
+    def _run_streaming(self, info, output_file_path, output_format, keep_download_path, threads, preset, progress_callback, start_time, end_time, gif_fps, gif_scale_width, allow_stream_copy):
+        media_info = media_info_from_format(info)
+        if preset == AUTO_PRESET:
+            preset = DEFAULT_PRESET # Auto-tuning needs the whole file to sample from
+        cmd, plan = self.converter.build_command('pipe:0', output_file_path, output_format, threads=threads, preset=preset,
+                                                 start_time=start_time, end_time=end_time, gif_fps=gif_fps, gif_scale_width=gif_scale_width,
+                                                 media_info=media_info, allow_stream_copy=allow_stream_copy)
+        total_duration_seconds = self.converter._get_output_duration(media_info, start_time, end_time)
+        download_state = {'downloaded_bytes': 0, 'total_bytes': 0}
+        started = time.monotonic()
+
+        def stream_progress(data):
+            data['downloaded_bytes'] = download_state['downloaded_bytes']
+            data['total_bytes'] = download_state['total_bytes']
+            data['download_speed'] = download_state['downloaded_bytes'] / max(time.monotonic() - started, 1e-6)
+            progress_callback(data)
+
+        process = FFmpegProcess(cmd, stop_flag=self.converter.stop_flag, stats_period=self.converter.stats_period,
+                                stderr_tail_lines=self.converter.stderr_tail_lines,
+                                stdin_source=self.iter_download(info, keep_download_path, download_state), governor=self.converter.governor)
+        self.converter._ffmpeg_process = process # So Converter.stop_conversion() kills it
+        try:
+            process.run(progress_callback=stream_progress if progress_callback else None, total_duration_seconds=total_duration_seconds)
+        except BaseException: # ConversionError, DownloadError from the source, KeyboardInterrupt...
+            if os.path.exists(output_file_path):
+                os.remove(output_file_path) # Never leave a truncated output behind
+            raise
+        finally:
+            self.converter._ffmpeg_process = None
+
+        self.converter.last_conversion = {'output_file_path': output_file_path, **plan}
+        if progress_callback:
+            progress_callback({'status': 'finished_conversion', 'filename': output_file_path, 'mode': plan['mode'], 'streamed': True,
+                               'downloaded_bytes': download_state['downloaded_bytes']})
+        return output_file_path
+
+    def _run_sequential(self, url, output_file_path, output_format, keep_download_path, preferred_format_info, threads, preset, progress_callback, start_time, end_time, gif_fps, gif_scale_width, allow_stream_copy):
+        download_dir = os.path.dirname(keep_download_path) if keep_download_path else (os.path.dirname(output_file_path) or ".")
+        downloaded_file_path = self.downloader.download_media(url, download_dir, preferred_format_info=preferred_format_info, progress_callback=progress_callback)
+        try:
+            return self.converter.convert_media(downloaded_file_path, output_file_path, output_format, threads=threads, preset=preset,
+                                                progress_callback=progress_callback, start_time=start_time, end_time=end_time,
+                                                gif_fps=gif_fps, gif_scale_width=gif_scale_width, allow_stream_copy=allow_stream_copy)
+        finally:
+            if not keep_download_path and os.path.exists(downloaded_file_path):
+                os.remove(downloaded_file_path) # The intermediate file was not asked for
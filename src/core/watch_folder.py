@@ -0,0 +1,494 @@
+import os
+import re
+import sys
+import json
+import time
+import queue
+import select
+import struct
+import fnmatch
+import threading
+
+if __name__ == "__main__": # Let the __main__ block below import the core package
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import Converter
+
+# Patterns the default rule converts; anything else dropped into the folder is left alone.
+MEDIA_PATTERNS = ['*.mp4', '*.mkv', '*.webm', '*.mov', '*.avi', '*.flv', '*.m4v', '*.ts', '*.m4a', '*.mp3', '*.opus', '*.ogg', '*.wav', '*.flac']
+# Files still being written by downloaders (yt-dlp, browsers) or temp files.
+IGNORED_SUFFIXES = ('.part', '.ytdl', '.tmp', '.temp', '.crdownload', '.download', '.partial')
+_FORMAT_FRAGMENT = re.compile(r'\.f\d+\.\w+$') # yt-dlp's per-format files before they are merged
+DEFAULT_SETTLE_SECONDS = 2.0
+DEFAULT_POLL_INTERVAL = 2.0
+CHECKPOINT_NAME = ".mediadl_watch.jsonl"
+SETTINGS_FILE = "settings.json" # Shared with the GUI
+# Watcher loop tick: how often pending files are checked for stability.
+_TICK_SECONDS = 0.5
+
+# inotify(7) constants (Linux).
+_IN_MODIFY, _IN_CLOSE_WRITE, _IN_MOVED_TO, _IN_CREATE = 0x2, 0x8, 0x80, 0x100
+_IN_Q_OVERFLOW = 0x4000
+_IN_NONBLOCK, _IN_CLOEXEC = 0o4000, 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class WatchFolderError(Exception):
+    """Raised when a folder cannot be watched or the checkpoint cannot be used."""
+    pass
+
+
+def match_rule(rules: list, file_name: str):
+    """
+    Returns the first rule whose pattern matches file_name (case-insensitive), or None.
+
+    Rules are dicts with 'pattern' (a glob or list of globs) and the convert_media
+    settings to use ('output_format', optionally 'preset', 'threads', 'allow_stream_copy', ...).
+    A rule with 'skip': True leaves matching files alone.
+    """
+    name = file_name.lower()
+    for rule in rules:
+        patterns = rule['pattern'] if isinstance(rule['pattern'], (list, tuple)) else [rule['pattern']]
+        if any(fnmatch.fnmatch(name, pattern.lower()) for pattern in patterns):
+            return None if rule.get('skip') else rule
+    return None
+
+
+def is_temporary(file_name: str) -> bool:
+    """True for hidden files and files downloaders are still writing."""
+    name = file_name.lower()
+    return name.startswith('.') or name.endswith(IGNORED_SUFFIXES) or '.part-frag' in name or bool(_FORMAT_FRAGMENT.search(name))
+
+
+def load_watch_settings(settings_path: str = SETTINGS_FILE) -> dict:
+    """
+    Returns the GUI's download directory and default format as {'directory', 'output_format'}.
+
+    Falls back to the GUI's defaults when settings.json is missing or unreadable.
+    """
+    settings = {}
+    try:
+        with open(settings_path, 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read {settings_path}, using defaults: {e}")
+    return {'directory': settings.get('video_download_directory') or os.path.join(os.path.expanduser("~"), "Videos", "MediaDL"),
+            'output_format': settings.get('default_media_format') or 'mp4'}
+
+
+def file_signature(path: str):
+    """Returns (size, mtime_ns) of a regular file, or None if it is gone or not a file."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if not os.path.isfile(path):
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class WatchCheckpoint:
+    """
+    Append-only JSON-lines record of the files a watch folder has finished.
+
+    A file is only converted again once its size or mtime changed, so restarts skip
+    everything already done (or already failed). Safe to use from several threads.
+    """
+    def __init__(self, path: str):
+        """
+        Raises:
+            WatchFolderError: If the checkpoint file cannot be read or created.
+        """
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        lines = 0
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue # A line cut short by a crash
+                        self._entries[entry['path']] = entry
+                        lines += 1
+            if lines > 2 * len(self._entries) + 100:
+                self._compact()
+            self._file = open(path, 'a', encoding='utf-8')
+        except OSError as e:
+            raise WatchFolderError(f"Could not open watch checkpoint {path}: {e}")
+
+    def _compact(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(temp_path, self.path)
+
+    def is_finished(self, path: str, signature) -> bool:
+        with self._lock:
+            entry = self._entries.get(path)
+        return entry is not None and signature is not None and [entry['size'], entry['mtime_ns']] == list(signature)
+
+    def output_of(self, path: str):
+        with self._lock:
+            entry = self._entries.get(path)
+        return entry.get('output') if entry else None
+
+    def record(self, path: str, signature, status: str, output: str = None, error: str = None):
+        """Records a finished file ('done' or 'failed') and flushes it to disk."""
+        entry = {'path': path, 'size': signature[0], 'mtime_ns': signature[1], 'status': status, 'output': output,
+                 'error': error, 'finished_at': time.time()}
+        with self._lock:
+            self._entries[path] = entry
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def entries(self) -> list:
+        with self._lock:
+            return list(self._entries.values())
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class _InotifyWatcher:
+    """Reports files created, written or moved into a directory (Linux inotify via ctypes)."""
+    def __init__(self, directory: str):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, f"inotify_add_watch failed for {directory}")
+        self.directory = directory
+
+    def wait(self, timeout: float) -> tuple:
+        """Returns (changed file names, rescan needed) after at most `timeout` seconds."""
+        names, rescan = set(), False
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return names, rescan
+        try:
+            data = os.read(self._fd, 1 << 16)
+        except BlockingIOError:
+            return names, rescan
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            if mask & _IN_Q_OVERFLOW:
+                rescan = True # Events were dropped (e.g. a burst of thousands of files)
+            elif length:
+                names.add(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+            offset += length
+        return names, rescan
+
+    def close(self):
+        os.close(self._fd)
+
+
+class _PollingWatcher:
+    """Fallback watcher: asks for a directory rescan every poll interval."""
+    def __init__(self, directory: str, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._last_scan = 0.0
+
+    def wait(self, timeout: float) -> tuple:
+        now = time.monotonic()
+        if now - self._last_scan >= self.poll_interval:
+            self._last_scan = now
+            return set(), True
+        time.sleep(min(timeout, self.poll_interval - (now - self._last_scan)))
+        return set(), False
+
+    def close(self):
+        pass
+
+
+class WatchFolder:
+    """
+    Converts media files as they appear in a directory.
+
+    New files are reported by inotify (or a periodic rescan where inotify is not
+    available), wait until their size and mtime stop changing for settle_seconds, and
+    are converted by a fixed pool of worker threads according to the first matching
+    rule. Finished files go into a checkpoint so a restart only converts new or changed
+    files. A burst of thousands of files is one queue of paths, not thousands of threads.
+    """
+    def __init__(self, directory: str, rules: list = None, output_dir: str = None, workers: int = 2, settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+                 checkpoint_path: str = None, use_inotify: bool = True, poll_interval: float = DEFAULT_POLL_INTERVAL, converter_factory=Converter, progress_callback=None):
+        """
+        Args:
+            directory: Directory to watch (not recursive).
+            rules: See match_rule. Defaults to converting MEDIA_PATTERNS to mp4.
+            output_dir: Where converted files go. Defaults to <directory>/converted.
+            workers: Conversions run at once.
+            settle_seconds: How long a file must stay unchanged before it is converted.
+            checkpoint_path: Checkpoint file. Defaults to CHECKPOINT_NAME in output_dir.
+            use_inotify: Use inotify where available; False always polls.
+            poll_interval: Seconds between rescans when polling.
+            converter_factory: Callable returning a Converter; each worker gets its own.
+            progress_callback: Optional callback(path, data) receiving the conversions'
+                progress dicts and 'watch_queued', 'watch_done' and 'watch_failed' updates.
+                Called from worker threads.
+
+        Raises:
+            WatchFolderError: If the directory does not exist or the checkpoint cannot be used.
+        """
+        if not os.path.isdir(directory):
+            raise WatchFolderError(f"Not a directory: {directory}")
+        self.directory = os.path.abspath(directory)
+        self.rules = rules or [{'pattern': MEDIA_PATTERNS, 'output_format': 'mp4'}]
+        self.output_dir = os.path.abspath(output_dir or os.path.join(self.directory, "converted"))
+        if os.path.normcase(os.path.realpath(self.output_dir)) == os.path.normcase(os.path.realpath(self.directory)):
+            # Every output would land in the watched folder and be converted again (clip_1, clip_1_1, ...)
+            raise WatchFolderError(f"The output directory must not be the watched directory: {self.directory}")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.workers = max(1, workers)
+        self.settle_seconds = settle_seconds
+        self.use_inotify = use_inotify
+        self.poll_interval = poll_interval
+        self.converter_factory = converter_factory
+        self.progress_callback = progress_callback
+        self.checkpoint = WatchCheckpoint(checkpoint_path or os.path.join(self.output_dir, CHECKPOINT_NAME))
+        self._pending = {} # path -> (signature, monotonic time it was last seen changing)
+        self._active = set() # Paths queued or converting
+        self._reserved = set() # Output paths of running conversions
+        self._ready = queue.Queue()
+        self._converters = []
+        self._threads = []
+        self._stop_flag = threading.Event()
+        self._lock = threading.Lock()
+        self._counts = {'done': 0, 'failed': 0}
+        self.watcher = None
+
+    def _emit(self, path, data):
+        if self.progress_callback:
+            self.progress_callback(path, data)
+
+    def _make_watcher(self):
+        if self.use_inotify and sys.platform.startswith("linux"):
+            try:
+                return _InotifyWatcher(self.directory)
+            except (OSError, AttributeError) as e:
+                print(f"Warning: inotify unavailable, polling {self.directory} instead: {e}")
+        return _PollingWatcher(self.directory, self.poll_interval)
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Scans the directory, then watches it with a watcher thread and the worker pool."""
+        self._stop_flag.clear()
+        self.watcher = self._make_watcher()
+        self._scan() # Files that arrived while nothing was watching
+        for i in range(self.workers):
+            converter = self.converter_factory()
+            self._converters.append(converter)
+            thread = threading.Thread(target=self._worker_loop, args=(converter,), daemon=True, name=f"watch-worker-{i}")
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._watch_loop, daemon=True, name="watch-folder")
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, wait: bool = True):
+        """Stops watching and aborts running conversions (they are redone on the next start)."""
+        self._stop_flag.set()
+        for converter in self._converters:
+            converter.stop_conversion()
+        for _ in range(self.workers):
+            self._ready.put(None) # Wake idle workers
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads, self._converters = [], []
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
+        if wait:
+            self.checkpoint.close()
+
+    def run_forever(self):
+        """Runs until interrupted (Ctrl+C)."""
+        self.start()
+        try:
+            while not self._stop_flag.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Waits until no file is pending, queued or converting. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._pending and not self._active:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'pending': len(self._pending), 'active': len(self._active), 'queued': self._ready.qsize(), **self._counts}
+
+    # --- Watching ---
+
+    def _consider(self, name: str):
+        path = os.path.join(self.directory, name)
+        if is_temporary(name) or match_rule(self.rules, name) is None:
+            return
+        signature = file_signature(path)
+        if signature is None:
+            return
+        with self._lock:
+            # Checked after _active: a worker records a finished file before it leaves _active
+            if path in self._active or self.checkpoint.is_finished(path, signature):
+                return
+            if path not in self._pending or self._pending[path][0] != signature:
+                self._pending[path] = (signature, time.monotonic())
+
+    def _scan(self):
+        try:
+            with os.scandir(self.directory) as entries:
+                names = [entry.name for entry in entries if entry.is_file()]
+        except OSError as e:
+            print(f"Warning: Could not scan {self.directory}: {e}")
+            return
+        for name in names:
+            self._consider(name)
+
+    def _settle(self):
+        """Queues pending files that have not changed for settle_seconds."""
+        now = time.monotonic()
+        with self._lock:
+            pending = list(self._pending.items())
+        for path, (signature, since) in pending:
+            current = file_signature(path)
+            with self._lock:
+                if path not in self._pending:
+                    continue
+                if current is None:
+                    del self._pending[path] # Deleted or renamed away
+                elif current != signature:
+                    self._pending[path] = (current, now)
+                elif now - since >= self.settle_seconds:
+                    del self._pending[path]
+                    self._active.add(path)
+                    self._ready.put(path)
+                    self._emit(path, {'status': 'watch_queued'})
+
+    def _watch_loop(self):
+        while not self._stop_flag.is_set():
+            try:
+                names, rescan = self.watcher.wait(_TICK_SECONDS)
+            except OSError as e:
+                print(f"Warning: Watching {self.directory} failed, polling instead: {e}")
+                self.watcher.close()
+                self.watcher = _PollingWatcher(self.directory, self.poll_interval)
+                continue
+            if rescan:
+                self._scan()
+            for name in names:
+                self._consider(name)
+            self._settle()
+
+    # --- Converting ---
+
+    def _reserve_output_path(self, path: str, output_format: str) -> str:
+        """Picks a free output path and reserves it until _release_output_path, so two workers never share one."""
+        base = os.path.splitext(os.path.basename(path))[0]
+        candidate = os.path.join(self.output_dir, f"{base}.{output_format.lower()}")
+        previous = self.checkpoint.output_of(path)
+        counter = 1
+        with self._lock:
+            # Taken by another running conversion, or already produced from another source
+            while candidate in self._reserved or (os.path.exists(candidate) and candidate != previous):
+                candidate = os.path.join(self.output_dir, f"{base}_{counter}.{output_format.lower()}")
+                counter += 1
+            self._reserved.add(candidate)
+        return candidate
+
+    def _release_output_path(self, output_file_path: str):
+        with self._lock:
+            self._reserved.discard(output_file_path)
+
+    def _worker_loop(self, converter):
+        while not self._stop_flag.is_set():
+            path = self._ready.get()
+            if path is None:
+                continue
+            try:
+                self._convert(converter, path)
+            finally:
+                with self._lock:
+                    self._active.discard(path)
+
+    def _convert(self, converter, path):
+        signature = file_signature(path)
+        rule = match_rule(self.rules, os.path.basename(path))
+        if signature is None or rule is None:
+            return
+        settings = {key: value for key, value in rule.items() if key not in ('pattern', 'skip')}
+        output_file_path = self._reserve_output_path(path, settings['output_format'])
+        try:
+            converter.convert_media(path, output_file_path, progress_callback=lambda data: self._emit(path, data), stop_event=self._stop_flag,
+                                    **settings)
+        except Exception as e:
+            if self._stop_flag.is_set():
+                return # Interrupted by stop(); not recorded, so it is redone next time
+            self.checkpoint.record(path, signature, 'failed', error=str(e))
+            with self._lock:
+                self._counts['failed'] += 1
+            self._emit(path, {'status': 'watch_failed', 'message': str(e)})
+            return
+        finally:
+            self._release_output_path(output_file_path)
+        if file_signature(path) != signature:
+            self._consider(os.path.basename(path)) # Changed while converting: do it again once it settles
+            return
+        self.checkpoint.record(path, signature, 'done', output=output_file_path)
+        with self._lock:
+            self._counts['done'] += 1
+        self._emit(path, {'status': 'watch_done', 'output_file_path': output_file_path})
+
+
+if __name__ == "__main__":
+    import argparse
+
+    defaults = load_watch_settings()
+    parser = argparse.ArgumentParser(description="Convert media files as they land in a folder.")
+    parser.add_argument('directory', nargs='?', default=defaults['directory'], help="Folder to watch (default: the download folder from settings.json)")
+    parser.add_argument('--format', default=defaults['output_format'], help="Output format for media files")
+    parser.add_argument('--preset', default=None, help="Encoder preset, e.g. 'fast'")
+    parser.add_argument('--output-dir', default=None, help="Where converted files go (default: <directory>/converted)")
+    parser.add_argument('--workers', type=int, default=2, help="Conversions run at once")
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE_SECONDS, help="Seconds a file must stay unchanged before converting")
+    parser.add_argument('--poll', action='store_true', help="Poll the folder instead of using inotify")
+    args = parser.parse_args()
+
+    rule = {'pattern': MEDIA_PATTERNS, 'output_format': args.format}
+    if args.preset:
+        rule['preset'] = args.preset
+
+    def console_progress_callback(path, data):
+        if data['status'].startswith('watch_'):
+            print(f"{data['status'][6:]}: {os.path.basename(path)} {data.get('output_file_path') or data.get('message') or ''}")
+
+    os.makedirs(args.directory, exist_ok=True)
+    watch = WatchFolder(args.directory, [rule], output_dir=args.output_dir, workers=args.workers, settle_seconds=args.settle,
+                        use_inotify=not args.poll, progress_callback=console_progress_callback)
+    print(f"Watching {watch.directory} -> {watch.output_dir} (Ctrl+C to stop)")
+    watch.run_forever()
@@ -26,6 +26,14 @@ if __name__ == "__main__" and __package__ is None:
 
 from src.core.downloader import Downloader, DownloadError
 from src.core.converter import Converter, ConversionError
+from src.core.media_probe import inspect_media, inspect_media_async
+from src.core.streaming_pipeline import StreamingPipeline
+from src.core.result_cache import get_result_cache
+from src.core.keyframe_index import get_keyframe_index
+from src.core.scrub_preview import ScrubPreviewEngine
+from src.core.frame_grab import grab_frame
+from src.core.job_queue import JobQueue, JobQueueError, JobRunner, JOB_EVENT_STATUSES, convert_for_job
+from src.core.ffmpeg_capabilities import get_ffmpeg_capabilities
 from . import theme 
 
 SETTINGS_FILE = "settings.json" 
@@ -81,7 +89,19 @@ class App(ctk.CTk):
 
         # --- Core components & UI Variables ---
         self.downloader = Downloader()
-        self.converter = Converter()
+        try: result_cache = get_result_cache()
+        except Exception as e: result_cache = None; self.update_status(f"Conversion result cache unavailable: {e}")
+        self.converter = Converter(result_cache=result_cache)
+        self.streaming_pipeline = StreamingPipeline(self.downloader, self.converter)
+        # Downloads and conversions go through a persistent queue, so work that was queued or running
+        # when the app closed (or crashed) resumes on the next start.
+        try:
+            self.job_queue = JobQueue(policy='sjf') # Quick jobs are not held up behind long encodes
+            # One runner per kind: a download and a conversion run side by side, while each kind stays on its single Downloader/Converter.
+            self.job_runner = JobRunner(self.job_queue, handlers={'download': self._run_download_job}, progress_callback=self._on_job_update, name="downloads", kinds=['download'])
+            self.conversion_runner = JobRunner(self.job_queue, handlers={'convert': self._run_convert_job}, progress_callback=self._on_job_update, name="conversions", kinds=['convert', 'download_convert'])
+        except Exception as e: self.job_queue = self.job_runner = self.conversion_runner = None; self.update_status(f"Job queue unavailable, running jobs directly: {e}")
+        self.download_job_id = self.conversion_job_id = None
         self.format_options = ["mp4", "mp3", "webm", "avi", "mov", "gif"] # Initialized before _load_settings
         self._load_settings() 
         for dir_var in [self.video_download_dir_var, self.image_download_dir_var]:
@@ -95,10 +115,14 @@ class App(ctk.CTk):
         self.converter_output_format_var = ctk.StringVar()
         self.download_thread = None
         self.conversion_thread = None
+        self.stream_convert_var = ctk.BooleanVar(value=False)
+        self.keep_download_var = ctk.BooleanVar(value=False)
         
         self.trim_start_seconds_var = ctk.DoubleVar(value=0.0)
         self.trim_end_seconds_var = ctk.DoubleVar(value=0.0)
         self.video_duration_seconds = 0.0
+        self.keyframe_index = None # (file path, KeyframeIndex) of the converter input, once built
+        self.scrub_preview = ScrubPreviewEngine() # Sprite-sheet slider previews, cached across files
         self.gif_fps_var = ctk.StringVar(value="10")
         self.gif_scale_width_var = ctk.StringVar(value="480")
 
@@ -138,6 +162,9 @@ class App(ctk.CTk):
         self.status_text.grid(row=2, column=0, columnspan=2, sticky="nsew", pady=(10,0))
             
         self.after_idle(lambda: self.update_status("Ready."))
+        self.after_idle(self._start_job_runner)
+        # Detect ffmpeg's encoders/filters/muxers (cached per binary) off the UI thread, before the first conversion needs them.
+        threading.Thread(target=get_ffmpeg_capabilities, daemon=True).start()
         self.after_idle(lambda: self.apply_theme(self.selected_theme_var.get()))
         self.after_idle(lambda: self.url_var.trace_add("write", self._on_url_changed))
         self.after_idle(lambda: self.default_format_var.trace_add("write", self._on_setting_changed))
@@ -183,6 +210,10 @@ class App(ctk.CTk):
         self.download_media_button.grid(row=1, column=0, pady=(20,10), sticky="w") 
         self.stop_download_button = ctk.CTkButton(self.tabview.tab("Media Download"), text="Stop Download", command=self._stop_download, state="disabled")
         self.stop_download_button.grid(row=1, column=0, pady=(20,10), padx=(150,0), sticky="w") 
+        stream_options_frame = ctk.CTkFrame(self.tabview.tab("Media Download"), fg_color="transparent")
+        stream_options_frame.grid(row=2, column=0, sticky="w")
+        ctk.CTkCheckBox(stream_options_frame, text="Convert while downloading (to default format)", variable=self.stream_convert_var).pack(side="left", padx=(0,10))
+        ctk.CTkCheckBox(stream_options_frame, text="Keep original download", variable=self.keep_download_var).pack(side="left")
 
     def _start_download_thread(self):
         url = self.url_var.get().strip()
@@ -195,13 +226,26 @@ class App(ctk.CTk):
         format_id_for_download = preferred_download_format
         status_msg = f"Selected stream: {selected_resolution_display_text}" if selected_resolution_display_text != "Auto (Best for selected format)" and preferred_download_format else "Auto stream selection (best quality)."
         self.update_status(status_msg)
-        self.download_thread = threading.Thread(target=self._download_and_convert_thread, args=(url, format_id_for_download, selected_resolution_display_text, False, True)) 
+        if self.stream_convert_var.get():
+            self.download_thread = threading.Thread(target=self._stream_convert_thread, args=(url, selected_resolution_display_text))
+        elif self.job_runner:
+            preferred_format_info = self._preferred_format_info(format_id_for_download, selected_resolution_display_text)
+            self.download_job_id = self.job_queue.submit('download', {'url': url, 'download_path': self.video_download_dir_var.get(), 'preferred_format_info': preferred_format_info})
+            return
+        else:
+            self.download_thread = threading.Thread(target=self._download_and_convert_thread, args=(url, format_id_for_download, selected_resolution_display_text, False, True)) 
         self.download_thread.daemon = True 
         self.download_thread.start()
 
     def _stop_download(self):
-        if self.download_thread and self.download_thread.is_alive():
+        if self.download_job_id is not None:
+            self.job_runner.cancel(self.download_job_id); self.download_job_id = None
+            self.update_status("Stopping download...")
+            self.download_media_button.configure(state='normal')
+            self.stop_download_button.configure(state='disabled')
+        elif self.download_thread and self.download_thread.is_alive():
             self.downloader.stop_download() 
+            if self.stream_convert_var.get(): self.converter.stop_conversion()
             self.update_status("Stopping download...")
             self.download_media_button.configure(state='normal')
             self.stop_download_button.configure(state='disabled')
@@ -276,9 +320,11 @@ class App(ctk.CTk):
         self.converter_threads_entry.grid(row=4, column=1, columnspan=2, pady=(5,10), sticky="ew")
         ctk.CTkLabel(options_area_frame, text="Preset (Video):").grid(row=5, column=0, padx=(0,10), pady=(5,10), sticky="w")
         self.converter_preset_var = ctk.StringVar(value="fast") 
-        self.converter_preset_options = ["ultrafast", "superfast", "fast", "medium", "slow", "slower", "veryslow"]
+        self.converter_preset_options = ["auto", "ultrafast", "superfast", "fast", "medium", "slow", "slower", "veryslow"]
         self.converter_preset_menu = ctk.CTkOptionMenu(options_area_frame, variable=self.converter_preset_var, values=self.converter_preset_options)
         self.converter_preset_menu.grid(row=5, column=1, columnspan=2, pady=(5,10), sticky="ew")
+        self.smart_cut_var = ctk.BooleanVar(value=True)
+        ctk.CTkCheckBox(options_area_frame, text="Smart cut trims (re-encode only the clip edges)", variable=self.smart_cut_var).grid(row=6, column=0, columnspan=3, pady=(5,10), sticky="w")
         self.video_preview_frame = ctk.CTkFrame(converter_main_frame, width=250, height=180, fg_color="gray25") 
         self.video_preview_frame.grid(row=0, column=1, sticky="nsew", padx=(0, 0), pady=(5,0)) 
         self.video_preview_frame.grid_propagate(False) 
@@ -415,6 +461,8 @@ class App(ctk.CTk):
             if self.vlc_media: self.vlc_media.release()
             if self.vlc_player: self.vlc_player.release()
             if self.vlc_instance: self.vlc_instance.release()
+        self.scrub_preview.cancel()
+        if self.job_runner: self.job_runner.stop(wait=False); self.conversion_runner.stop(wait=False) # Running jobs are handed back to the queue
         self.destroy()
 
     def _on_converter_format_changed(self, selected_format):
@@ -452,33 +500,53 @@ class App(ctk.CTk):
         if file_path and os.path.exists(file_path):
             self.update_status(f"Processing file: {os.path.basename(file_path)}...")
             self.play_video_button.configure(state="normal")
-            try:
-                probe = ffmpeg.probe(file_path)
-                video_stream = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
-                if video_stream and 'duration' in video_stream:
-                    self.video_duration_seconds = float(video_stream['duration'])
-                    if self.video_duration_seconds <= 0: self.video_duration_seconds = 1.0
-                else: self.video_duration_seconds = 100.0
-                self.trim_start_slider.configure(to=self.video_duration_seconds, state="normal")
-                self.trim_end_slider.configure(to=self.video_duration_seconds, state="normal")
-                self.trim_start_seconds_var.set(0.0)
-                self.trim_end_seconds_var.set(self.video_duration_seconds)
-                self.trim_start_slider.set(0.0)
-                self.trim_end_slider.set(self.video_duration_seconds)
-                self.trim_start_display_label.configure(text=self._seconds_to_hhmmss(0.0))
-                self.trim_end_display_label.configure(text=self._seconds_to_hhmmss(self.video_duration_seconds))
-                self.update_status(f"Video duration: {self._seconds_to_hhmmss(self.video_duration_seconds)}. Sliders enabled.")
-                threading.Thread(target=self._generate_video_thumbnail, args=(file_path, self.trim_start_seconds_var.get())).start()
-            except Exception as e:
-                self.update_status(f"Error processing video: {str(e)}. Sliders disabled.")
-                self._disable_trim_sliders()
+            # Probe off the Tk thread; results come back through after() and are dropped if
+            # the user picked another file in the meantime.
+            inspect_media_async(file_path,
+                                lambda info: self.after(0, lambda: self._on_converter_input_inspected(file_path, info)),
+                                lambda e: self.after(0, lambda: self._on_converter_input_inspect_failed(file_path, e)))
         else:
             if hasattr(self, 'preview_image_label'): self.after(0, lambda: self.preview_image_label.configure(image=None, text="No Video Selected"))
             self.preview_image_tk = None
+            self.keyframe_index = None
             self.play_video_button.configure(state="disabled")
             self._disable_trim_sliders()
             self.video_duration_seconds = 0.0
 
+    def _on_converter_input_inspected(self, file_path, info):
+        if file_path != self.converter_input_file_var.get(): return
+        self.video_duration_seconds = info['duration'] if info['duration'] > 0 else 100.0
+        self.trim_start_slider.configure(to=self.video_duration_seconds, state="normal")
+        self.trim_end_slider.configure(to=self.video_duration_seconds, state="normal")
+        self.trim_start_seconds_var.set(0.0)
+        self.trim_end_seconds_var.set(self.video_duration_seconds)
+        self.trim_start_slider.set(0.0)
+        self.trim_end_slider.set(self.video_duration_seconds)
+        self.trim_start_display_label.configure(text=self._seconds_to_hhmmss(0.0))
+        self.trim_end_display_label.configure(text=self._seconds_to_hhmmss(self.video_duration_seconds))
+        self.update_status(f"Video duration: {self._seconds_to_hhmmss(self.video_duration_seconds)}. Sliders enabled.")
+        threading.Thread(target=self._generate_video_thumbnail, args=(file_path, self.trim_start_seconds_var.get())).start()
+        if info['video_stream']:
+            threading.Thread(target=self._load_keyframe_index, args=(file_path,), daemon=True).start()
+            threading.Thread(target=self._prepare_scrub_preview, args=(file_path,), daemon=True).start()
+
+    def _prepare_scrub_preview(self, file_path):
+        # One ffmpeg pass renders the sprite sheet; slider drags are then served from memory.
+        try: self.scrub_preview.prepare(file_path)
+        except Exception as e: self.update_status(f"Scrub preview unavailable: {e}")
+
+    def _load_keyframe_index(self, file_path):
+        # One packet scan per file (cached next to the probe data); slider previews then seek straight to keyframes.
+        try: index = get_keyframe_index(file_path)
+        except Exception as e: self.update_status(f"Keyframe index unavailable: {e}"); return
+        self.after(0, lambda: setattr(self, 'keyframe_index', (file_path, index)) if file_path == self.converter_input_file_var.get() else None)
+
+    def _on_converter_input_inspect_failed(self, file_path, error):
+        if file_path != self.converter_input_file_var.get(): return
+        error_details = error.stderr.decode(errors='replace') if isinstance(error, ffmpeg.Error) and error.stderr else str(error)
+        self.update_status(f"Error processing video: {error_details}. Sliders disabled.")
+        self._disable_trim_sliders()
+
     def _disable_trim_sliders(self):
         self.trim_start_slider.configure(state="disabled", to=100)
         self.trim_end_slider.configure(state="disabled", to=100)
@@ -534,41 +602,20 @@ class App(ctk.CTk):
     def _generate_video_thumbnail(self, video_path, seek_time_seconds=None):
         try:
             max_width = self.video_preview_frame.winfo_width() - 10 
-            max_height = self.video_preview_frame.winfo_height() - 10
             thumbnail_width = min(240, max_width) if max_width > 0 else 240
-            thumbnail_height = -1 
+            info = inspect_media(video_path)
+            if not info['video_stream']: 
+                self.after(0, lambda: self.preview_image_label.configure(image=None, text="No Video Stream"))
+                return
             actual_seek_time = seek_time_seconds
             if seek_time_seconds is None:
-                probe = ffmpeg.probe(video_path)
-                video_stream = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
-                if not video_stream: 
-                    self.after(0, lambda: self.preview_image_label.configure(image=None, text="No Video Stream"))
-                    return
-                duration = float(video_stream.get('duration', 0))
+                duration = info['duration']
                 actual_seek_time = duration / 3 if duration > 0 else 1
-            
-            popen_kwargs = {}
-            if sys.platform == "win32":
-                popen_kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
-            
-            stream = ffmpeg.input(video_path, ss=actual_seek_time).output(
-                'pipe:', vframes=1, format='image2pipe', vcodec='mjpeg', 
-                vf=f'scale={thumbnail_width}:{thumbnail_height}'
-            )
-            cmd_args = stream.compile()
-            
-            process = subprocess.Popen(
-                cmd_args, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                **popen_kwargs
-            )
-            out, err = process.communicate()
-
-            if process.returncode != 0:
-                raise ffmpeg.Error(' '.join(cmd_args), out, err)
-
-            pil_image = Image.open(io.BytesIO(out))
+            elif self.keyframe_index and self.keyframe_index[0] == video_path:
+                actual_seek_time = self.keyframe_index[1].snap(seek_time_seconds, 'before') # Decodes a single keyframe
+
+            # Raw rgb24 straight into the image buffer: no JPEG encode/decode round trip.
+            pil_image = grab_frame(video_path, actual_seek_time, thumbnail_width, media_info=info).to_image()
             
             # Create and immediately store the CTkImage on the instance
             self.preview_image_tk = ctk.CTkImage(light_image=pil_image, dark_image=pil_image, 
@@ -582,16 +629,6 @@ class App(ctk.CTk):
                     self.preview_image_label.configure(image=self.preview_image_tk, text="")
             self.after(0, update_label)
             self.update_status(f"Thumbnail generated for {os.path.basename(video_path)}")
-        except ffmpeg.Error as e:
-            self.preview_image_tk = None # Clear the reference
-            error_details = e.stderr.decode(errors='replace') if e.stderr else str(e)
-            def update_label_error():
-                if hasattr(self, 'preview_image_label') and self.preview_image_label.winfo_exists():
-                    if not self.preview_image_label.winfo_ismapped():
-                        self.preview_image_label.grid()
-                    self.preview_image_label.configure(image=None, text="Preview Error")
-            self.after(0, update_label_error)
-            self.update_status(f"Thumbnail ffmpeg error: {error_details}")
         except Exception as e:
             self.preview_image_tk = None # Clear the reference
             def update_label_error():
@@ -622,11 +659,25 @@ class App(ctk.CTk):
         except ValueError: self.update_status("Invalid Threads value."); self.convert_file_button.configure(state="normal"); self.stop_conversion_button.configure(state="disabled"); return
         preset = self.converter_preset_var.get()
         if preset not in self.converter_preset_options: preset = 'fast'
+        if self.job_runner:
+            base, _ = os.path.splitext(os.path.basename(input_file))
+            output_dir = self.video_download_dir_var.get()
+            os.makedirs(output_dir, exist_ok=True)
+            output_file_path = self._get_unique_filepath(os.path.join(output_dir, f"{base}_converted.{output_format.lower()}"))
+            try:
+                self.conversion_job_id = self.job_queue.submit_convert({'input_file_path': input_file, 'output_file_path': output_file_path, 'output_format': output_format, 'threads': threads, 'preset': preset,
+                                                                        'start_time': start_time_str, 'end_time': end_time_str, 'gif_fps': gif_fps, 'gif_scale_width': gif_scale_width, 'smart_cut': self.smart_cut_var.get()})
+            except JobQueueError as e:
+                self.update_status(f"Conversion not queued: {e}"); self.convert_file_button.configure(state="normal"); self.stop_conversion_button.configure(state="disabled")
+            return
         self.conversion_thread = threading.Thread(target=self._conversion_worker_thread, args=(input_file, output_format, threads, preset, start_time_str, end_time_str, gif_fps, gif_scale_width))
         self.conversion_thread.daemon = True; self.conversion_thread.start()
 
     def _stop_conversion(self):
-        if self.conversion_thread and self.conversion_thread.is_alive():
+        if self.conversion_job_id is not None:
+            self.conversion_runner.cancel(self.conversion_job_id); self.conversion_job_id = None; self.update_status("Stopping conversion...")
+            self.convert_file_button.configure(state='normal'); self.stop_conversion_button.configure(state='disabled')
+        elif self.conversion_thread and self.conversion_thread.is_alive():
             self.converter.stop_conversion(); self.update_status("Stopping conversion...")
             self.convert_file_button.configure(state='normal'); self.stop_conversion_button.configure(state='disabled')
         else: self.update_status("No active conversion to stop.")
@@ -637,7 +688,7 @@ class App(ctk.CTk):
             output_dir = self.video_download_dir_var.get()
             os.makedirs(output_dir, exist_ok=True)
             output_file_path = self._get_unique_filepath(os.path.join(output_dir, f"{base}_converted.{output_format_ext.lower()}"))
-            converted_file = self.converter.convert_media(input_file_path, output_file_path, output_format_ext, threads=threads, preset=preset, progress_callback=self._gui_progress_hook, start_time=start_time, end_time=end_time, gif_fps=gif_fps, gif_scale_width=gif_scale_width)
+            converted_file = self.converter.convert_media(input_file_path, output_file_path, output_format_ext, threads=threads, preset=preset, progress_callback=self._gui_progress_hook, start_time=start_time, end_time=end_time, gif_fps=gif_fps, gif_scale_width=gif_scale_width, smart_cut=self.smart_cut_var.get())
             self.update_status(f"Successfully converted: {os.path.basename(converted_file)}")
         except Exception as e:
             self.update_status(f"Conversion Error: {type(e).__name__} - {str(e)}.")
@@ -659,7 +710,23 @@ class App(ctk.CTk):
             self.trim_end_display_label.configure(text=self._seconds_to_hhmmss(value))
         file_path = self.converter_input_file_var.get()
         if file_path and os.path.exists(file_path) and self.video_duration_seconds > 0:
-            threading.Thread(target=self._generate_video_thumbnail, args=(file_path, value)).start()
+            self._show_scrub_preview(file_path, value)
+
+    def _show_scrub_preview(self, file_path, seconds):
+        # The nearest sprite-sheet tile shows at once; the exact frame follows from the engine's
+        # single worker, which drops every request but the latest one.
+        tile = self.scrub_preview.preview(file_path, seconds)
+        if tile: self._show_preview_frame(file_path, tile)
+        max_width = self.video_preview_frame.winfo_width() - 10
+        self.scrub_preview.request_exact(file_path, seconds, width=min(240, max_width) if max_width > 0 else 240,
+                                         callback=lambda frame: self.after(0, lambda: self._show_preview_frame(file_path, frame)))
+
+    def _show_preview_frame(self, file_path, frame):
+        if file_path != self.converter_input_file_var.get() or not self.preview_image_label.winfo_exists(): return
+        pil_image = frame.to_image()
+        display_width = 240 # Sheet tiles are smaller than exact frames; show both at the same size
+        self.preview_image_tk = ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=(display_width, int(display_width * frame.height / frame.width)))
+        self.preview_image_label.configure(image=self.preview_image_tk, text="")
 
     def _on_end_trim_slider_changed(self, value):
         self.trim_end_display_label.configure(text=self._seconds_to_hhmmss(value))
@@ -747,13 +814,7 @@ class App(ctk.CTk):
         active_button = self.download_image_button if is_direct_image_download else (self.download_media_button if is_download_only else self.convert_file_button)
         download_target_dir = self.image_download_dir_var.get() if is_direct_image_download else self.video_download_dir_var.get()
         downloaded_file_path = output_file_path = None
-        preferred_format_info = {'format_id': target_container_format.lower()} if target_container_format else {}
-        if not is_direct_image_download and selected_resolution_display_text != "Auto (Best for selected format)":
-            selected_res_data = next((res for res in self.available_resolutions_data if res['display_text'] == selected_resolution_display_text), None)
-            if selected_res_data:
-                format_code = selected_res_data['id']
-                if selected_res_data['is_video_only'] and target_container_format and target_container_format.lower() != 'mp3': format_code += "+bestaudio"
-                preferred_format_info['format_code'] = format_code
+        preferred_format_info = self._preferred_format_info(target_container_format, None if is_direct_image_download else selected_resolution_display_text)
         try:
             os.makedirs(download_target_dir, exist_ok=True)
             downloaded_file_path = self.downloader.download_media(url, download_target_dir, preferred_format_info=preferred_format_info, progress_callback=self._gui_progress_hook)
@@ -769,6 +830,89 @@ class App(ctk.CTk):
             self.after(0, lambda: self.progress_bar.configure(mode='determinate'))
             self.after(0, lambda: self.progress_bar.set(1 if output_file_path and os.path.exists(output_file_path) else 0))
 
+    def _preferred_format_info(self, target_container_format, selected_resolution_display_text):
+        preferred_format_info = {'format_id': target_container_format.lower()} if target_container_format else {}
+        if selected_resolution_display_text and selected_resolution_display_text != "Auto (Best for selected format)":
+            selected_res_data = next((res for res in self.available_resolutions_data if res['display_text'] == selected_resolution_display_text), None)
+            if selected_res_data:
+                format_code = selected_res_data['id']
+                if selected_res_data['is_video_only'] and target_container_format and target_container_format.lower() != 'mp3': format_code += "+bestaudio"
+                preferred_format_info['format_code'] = format_code
+        return preferred_format_info
+
+    def _start_job_runner(self):
+        if not self.job_runner: return
+        resumed = self.job_queue.counts()['queued']
+        if resumed: self.update_status(f"Resuming {resumed} queued job(s) from the last session.")
+        self.job_runner.start(); self.conversion_runner.start()
+
+    def _run_download_job(self, context):
+        payload = context.payload
+        context.on_stop(self.downloader.stop_download)
+        os.makedirs(payload['download_path'], exist_ok=True)
+        path = self.downloader.download_media(payload['url'], payload['download_path'], preferred_format_info=payload.get('preferred_format_info'), progress_callback=context.progress, stop_event=context.stop_event)
+        if not (path and os.path.exists(path)): raise FileNotFoundError("Downloaded file not found.")
+        return {'output_file_path': path}
+
+    def _run_convert_job(self, context):
+        return convert_for_job(self.converter, context)
+
+    def _on_job_update(self, job, data):
+        # Called from the runner's worker thread: job progress goes to the usual hook, lifecycle updates to the status box.
+        status = data.get('status')
+        if status not in JOB_EVENT_STATUSES: self._gui_progress_hook(data); return
+        label = f"{job['kind'].capitalize()} job #{job['id']}"
+        if status == 'job_started':
+            if job['attempts'] > 1: self.update_status(f"{label}: attempt {job['attempts']} of {job['max_attempts']}.")
+            return
+        if status == 'job_failed' and data.get('will_retry'):
+            self.update_status(f"{label} failed, will retry: {data.get('message')}"); return
+        if status == 'job_done':
+            if job['kind'] == 'download': self.update_status(f"Download complete: {os.path.basename(data['result']['output_file_path'])}")
+        elif status == 'job_failed': self.update_status(f"{label} failed: {data.get('message')}")
+        elif status == 'job_cancelled': self.update_status(f"{label} cancelled.")
+        else: self.update_status(f"{label} will resume on the next start.")
+        def finish():
+            if job['kind'] == 'download' and self.download_job_id in (job['id'], None):
+                self.download_job_id = None
+                self.download_media_button.configure(state='normal'); self.stop_download_button.configure(state='disabled')
+            elif job['kind'] == 'convert' and self.conversion_job_id in (job['id'], None):
+                self.conversion_job_id = None
+                self.convert_file_button.configure(state='normal'); self.stop_conversion_button.configure(state='disabled')
+            if self.progress_bar.cget("mode") == 'indeterminate': self.progress_bar.stop()
+            self.progress_bar.configure(mode='determinate')
+            if status != 'job_done': self.progress_bar.set(0)
+        self.after(0, finish)
+
+    def _stream_convert_thread(self, url, selected_resolution_display_text):
+        output_format = self.default_format_var.get().lower()
+        output_dir = self.video_download_dir_var.get()
+        output_file_path = None
+        preferred_format_info = {}
+        if selected_resolution_display_text != "Auto (Best for selected format)":
+            selected_res_data = next((res for res in self.available_resolutions_data if res['display_text'] == selected_resolution_display_text), None)
+            # Video-only picks need "+bestaudio", as for downloads; resolve() then falls back to download-then-convert
+            if selected_res_data: preferred_format_info['format_code'] = selected_res_data['id'] + ("+bestaudio" if selected_res_data['is_video_only'] and output_format != 'gif' else "")
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            self.update_status(f"Resolving stream for {url}...")
+            info = self.streaming_pipeline.resolve(url, output_format, preferred_format_info)
+            title = re.sub(r'[\\/:*?"<>|]', '_', (info or {}).get('title') or "download")
+            output_file_path = self._get_unique_filepath(os.path.join(output_dir, f"{title}_converted.{output_format}"))
+            keep_download_path = self._get_unique_filepath(os.path.join(output_dir, f"{title}.{(info or {}).get('ext') or 'media'}")) if self.keep_download_var.get() else None
+            self.update_status(f"Downloading and converting to {output_format} at the same time...")
+            self.streaming_pipeline.run(url, output_file_path, output_format, keep_download_path=keep_download_path, preferred_format_info=preferred_format_info,
+                                        preset=self.converter_preset_var.get() if self.converter_preset_var.get() in self.converter_preset_options else 'ultrafast',
+                                        progress_callback=self._gui_progress_hook, info=info)
+        except Exception as e:
+            output_file_path = None
+            self.update_status(f"Error: {type(e).__name__} - {str(e)}.")
+        finally:
+            self.after(0, lambda: self.download_media_button.configure(state='normal'))
+            self.after(0, lambda: self.stop_download_button.configure(state='disabled'))
+            self.after(0, lambda: self.progress_bar.configure(mode='determinate'))
+            self.after(0, lambda: self.progress_bar.set(1 if output_file_path and os.path.exists(output_file_path) else 0))
+
     def update_status(self, message):
         def _update():
             if not hasattr(self, 'status_text') or not self.status_text.winfo_exists(): print(f"Status (GUI not ready): {message}"); return
@@ -819,7 +963,8 @@ class App(ctk.CTk):
         elif status == 'converting':
             if self.progress_bar.cget("mode") == 'indeterminate': self.progress_bar.stop()
             self.progress_bar.configure(mode='determinate') 
-            percentage, time_str, speed = data.get('percentage'), data.get('time_str', 'N/A'), data.get('speed', 'N/A')
+            percentage, time_str = data.get('percentage'), data.get('time_str') or 'N/A'
+            speed = f"{data['speed']:.2f}x" if isinstance(data.get('speed'), (int, float)) else 'N/A'
             if percentage is not None:
                 self.after(0, lambda p=percentage: self.progress_bar.set(float(p) / 100.0))
                 self.update_status(f"Converting: {percentage:.1f}% (Time: {time_str}, Speed: {speed})")
@@ -829,7 +974,11 @@ class App(ctk.CTk):
         elif status in ['finished', 'finished_conversion']:
             if self.progress_bar.cget("mode") == 'indeterminate': self.progress_bar.stop()
             self.progress_bar.configure(mode='determinate'); self.after(0, lambda: self.progress_bar.set(1))
-            if status == 'finished_conversion': self.update_status(f"Successfully converted: {os.path.basename(data.get('filename', ''))}")
+            if status == 'finished_conversion':
+                mode_note = {'remux': " (stream copy, no re-encode)", 'partial_remux': " (one stream copied)", 'cached': " (reused cached result)", 'smart_cut': " (smart cut, only the clip edges re-encoded)"}.get(data.get('mode'), "")
+                self.update_status(f"Successfully converted: {os.path.basename(data.get('filename', ''))}{mode_note}")
+        elif status == 'tuning':
+            self.update_status(data.get('message', "Auto-tuning encoder settings..."))
         elif status == 'error':
             if self.progress_bar.cget("mode") == 'indeterminate': self.progress_bar.stop()
             self.progress_bar.configure(mode='determinate'); self.after(0, lambda: self.progress_bar.set(0))
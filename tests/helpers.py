@@ -0,0 +1,86 @@
+"""Fakes shared by the tests: probe results, FFmpegProcess and subprocess.Popen stand-ins."""
+import io
+import threading
+from unittest.mock import MagicMock
+
+
+def media_info(vcodec='h264', acodec='aac', duration=60.0, width=None, height=None, bit_rate=None, path=None, **video_fields):
+    """
+    Returns an inspect_media() result for a source with one video and one audio stream.
+
+    Args:
+        vcodec, acodec: Codec names of the streams; None leaves the stream out.
+        duration: Length in seconds.
+        width, height: Video size, left out when None.
+        bit_rate: Container bitrate in bits per second, reported under probe['format'].
+        path: The source path, left out when None.
+        video_fields: Further video stream fields (e.g., pix_fmt='yuv420p').
+    """
+    video_stream = {'codec_type': 'video', 'codec_name': vcodec}
+    if width is not None:
+        video_stream['width'] = width
+    if height is not None:
+        video_stream['height'] = height
+    video_stream.update(video_fields)
+    info = {
+        'duration': duration,
+        'video_stream': video_stream if vcodec else None,
+        'audio_stream': {'codec_type': 'audio', 'codec_name': acodec} if acodec else None,
+        'probe': {'format': {'bit_rate': str(bit_rate)}} if bit_rate else {},
+    }
+    if path is not None:
+        info['path'] = path
+    return info
+
+
+class FakeFFmpegProcess:
+    """
+    Stands in for FFmpegProcess: records every command, creates the output file ffmpeg
+    would write and reports one progress update covering the command's -ss/-to span.
+    Commands without -to run to source_duration. Reset commands in setUp.
+    """
+    commands = []
+    lock = threading.Lock()
+    source_duration = 0.0
+    output_bytes = b"fake"
+
+    def __init__(self, cmd, stop_flag=None, stats_period=None, **kwargs):
+        self.cmd = cmd
+        with self.lock:
+            type(self).commands.append(cmd)
+
+    def run(self, progress_callback=None, total_duration_seconds=0):
+        if self.cmd[-1] not in ('-', 'pipe:1'):
+            with open(self.cmd[-1], 'wb') as f:
+                f.write(self.output_bytes)
+        if progress_callback:
+            start = float(self.cmd[self.cmd.index('-ss') + 1]) if '-ss' in self.cmd else 0.0
+            end = float(self.cmd[self.cmd.index('-to') + 1]) if '-to' in self.cmd else self.source_duration
+            progress_callback({'status': 'converting', 'time_seconds': end - start, 'speed': 2.0, 'percentage': None})
+
+    def kill(self):
+        pass
+
+
+def fake_popen(stdout="progress=end\n", stderr=None, returncode=0):
+    """
+    Returns a subprocess.Popen mock that has exited with returncode (None: still running).
+
+    Text stdout gives the text pipes FFmpegProcess reads; bytes stdout gives the binary
+    pipes of the rawvideo readers, with stderr also returned by communicate().
+    """
+    process = MagicMock()
+    if isinstance(stdout, bytes):
+        stderr = stderr or b""
+        process.stdout = io.BytesIO(stdout)
+        process.stderr = io.BytesIO(stderr)
+        process.communicate.return_value = (b"", stderr)
+    else:
+        process.stdout = io.StringIO(stdout)
+        process.stderr = io.StringIO(stderr or "")
+    process.stdin.buffer = io.BytesIO()
+    process.stdin.buffer.close = MagicMock() # Keep the written bytes readable
+    process.returncode = returncode
+    process.poll.return_value = returncode
+    process.pid = 4321
+    return process
@@ -0,0 +1,128 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import Converter, ConversionError
+from src.core.abr_ladder import build_ladder_command, fixed_gop_interval, parse_bitrate, plan_ladder
+from src.core.media_probe import ProbeCache
+from tests.helpers import media_info
+
+
+def source_info(vcodec='h264', height=1080):
+    return media_info(vcodec, width=height * 16 // 9, height=height)
+
+GOP_2S = [i * 2.0 for i in range(30)]
+
+
+class TestPlanLadder(unittest.TestCase):
+    def test_matching_source_copies_top_rung_on_its_gop(self):
+        rungs, segment_seconds, interval = plan_ladder(source_info(), keyframes=GOP_2S, segment_seconds=5.5)
+        self.assertEqual([(r['height'], r['mode']) for r in rungs], [(1080, 'copy'), (720, 'transcode'), (480, 'transcode'), (360, 'transcode')])
+        self.assertEqual(interval, 2.0)
+        self.assertEqual(segment_seconds, 6.0) # Whole GOPs
+
+    def test_no_copy_for_irregular_gop_other_codec_or_trim(self):
+        irregular = [0.0, 2.0, 2.5, 6.0]
+        self.assertIsNone(fixed_gop_interval(irregular))
+        for info, keyframes, trimmed in ((source_info(), irregular, False), (source_info('vp9'), GOP_2S, False), (source_info(), GOP_2S, True)):
+            rungs, segment_seconds, interval = plan_ladder(info, keyframes=keyframes, segment_seconds=4, trimmed=trimmed)
+            self.assertEqual(rungs[0]['mode'], 'transcode')
+            self.assertEqual((segment_seconds, interval), (4, 4))
+
+    def test_rungs_above_source_are_dropped(self):
+        rungs, _, _ = plan_ladder(source_info(height=720), keyframes=GOP_2S)
+        self.assertEqual([r['height'] for r in rungs], [720, 480, 360])
+        self.assertEqual(rungs[0]['mode'], 'copy')
+        rungs, _, _ = plan_ladder(source_info(height=240))
+        self.assertEqual([r['height'] for r in rungs], [240])
+
+    def test_audio_only_input_is_rejected(self):
+        with self.assertRaises(ConversionError):
+            plan_ladder({'duration': 1.0, 'video_stream': None, 'audio_stream': {'codec_name': 'aac'}})
+
+
+class TestLadderCommand(unittest.TestCase):
+    def test_hls_single_decode_with_aligned_keyframes(self):
+        rungs, segment_seconds, interval = plan_ladder(source_info('vp9'), segment_seconds=4)
+        cmd = build_ladder_command('in.webm', 'out', rungs, source_info('vp9'), formats=['hls'], segment_seconds=segment_seconds, keyframe_interval=interval)
+        self.assertEqual(cmd.count('-i'), 1)
+        graph = cmd[cmd.index('-filter_complex') + 1]
+        self.assertIn("[0:v:0]split=4[s0][s1][s2][s3]", graph)
+        self.assertIn("[s1]scale=-2:720[v1]", graph)
+        self.assertEqual(cmd.count('expr:gte(t,n_forced*4)'), 4)
+        self.assertEqual(cmd[cmd.index('-b:v:2') + 1], '1400k')
+        self.assertEqual(cmd[cmd.index('-sc_threshold') + 1], '0')
+        self.assertEqual(cmd[cmd.index('-c:a') + 1], 'copy')
+        self.assertEqual(cmd[cmd.index('-f') + 1], 'hls')
+        self.assertEqual(cmd[cmd.index('-var_stream_map') + 1],
+                         "v:0,agroup:audio v:1,agroup:audio v:2,agroup:audio v:3,agroup:audio a:0,agroup:audio,default:yes")
+        self.assertEqual(cmd[-1], os.path.join('out', 'stream_%v', 'playlist.m3u8'))
+
+    def test_dash_with_hls_playlists_and_copied_top_rung(self):
+        rungs, segment_seconds, interval = plan_ladder(source_info(), keyframes=GOP_2S)
+        cmd = build_ladder_command('in.mp4', 'out', rungs, source_info(), formats=['hls', 'dash'], segment_seconds=segment_seconds, keyframe_interval=interval)
+        self.assertEqual(cmd[cmd.index('-c:v:0') + 1], 'copy')
+        self.assertNotIn('-force_key_frames:v:0', cmd)
+        self.assertEqual(cmd[cmd.index('-force_key_frames:v:1') + 1], 'expr:gte(t,n_forced*2)')
+        self.assertEqual(cmd[cmd.index('-f') + 1], 'dash')
+        self.assertIn('-hls_playlist', cmd)
+        self.assertEqual(cmd[-1], os.path.join('out', 'manifest.mpd'))
+
+    def test_unknown_format_is_rejected(self):
+        rungs, _, _ = plan_ladder(source_info())
+        with self.assertRaises(ConversionError):
+            build_ladder_command('in.mp4', 'out', rungs, source_info(), formats=['smooth'])
+
+
+    def test_buffer_is_twice_the_bitrate_in_any_notation(self):
+        ladder = [{'height': 720, 'video_bitrate': '1500.5k'}, {'height': 480, 'video_bitrate': '1.2M'}, {'height': 360, 'video_bitrate': '800000'}]
+        rungs, _, _ = plan_ladder(source_info('vp9'), ladder=ladder)
+        cmd = build_ladder_command('in.webm', 'out', rungs, source_info('vp9'))
+        self.assertEqual([cmd[cmd.index(f'-bufsize:v:{i}') + 1] for i in range(3)], ['3001k', '2400k', '1600k'])
+
+    def test_invalid_bitrate_is_rejected(self):
+        self.assertEqual(parse_bitrate("2.5M"), 2500000)
+        for bad in ("fast", "12x", "-5k", "k", ""):
+            with self.assertRaises(ConversionError):
+                parse_bitrate(bad)
+        rungs, _, _ = plan_ladder(source_info('vp9'), ladder=[{'height': 720, 'video_bitrate': '2800k', 'max_bitrate': 'lots'}])
+        with self.assertRaises(ConversionError):
+            build_ladder_command('in.webm', 'out', rungs, source_info('vp9'))
+
+class TestConvertAbr(unittest.TestCase):
+    @patch('src.core.keyframe_index.get_keyframe_index')
+    @patch('src.core.converter.FFmpegProcess')
+    @patch('src.core.converter.inspect_media', return_value=source_info(height=720))
+    def test_progress_is_reported_per_rung(self, mock_inspect, mock_process, mock_index):
+        mock_index.return_value = MagicMock(times=GOP_2S)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_dir = os.path.join(temp_dir, "abr")
+
+            def fake_run(progress_callback=None, total_duration_seconds=0):
+                with open(os.path.join(output_dir, "stream_1", "segment_00001.m4s"), 'wb') as f:
+                    f.write(b"seg")
+                progress_callback({'status': 'converting', 'percentage': 50.0, 'progress': 'continue'})
+            mock_process.return_value.run.side_effect = fake_run
+
+            input_path = os.path.join(temp_dir, "in.mp4")
+            with open(input_path, 'wb') as f:
+                f.write(b"dummy")
+            updates = []
+            manifests = Converter(probe_cache=ProbeCache(db_path=None)).convert_abr(input_path, output_dir, progress_callback=updates.append)
+
+        self.assertEqual(manifests, {'hls': os.path.join(output_dir, 'master.m3u8')})
+        rungs = updates[0]['rungs']
+        self.assertEqual([(r['height'], r['mode'], r['segments']) for r in rungs], [(720, 'copy', 0), (480, 'transcode', 1), (360, 'transcode', 0)])
+        self.assertEqual(updates[-1]['status'], 'finished_conversion')
+        self.assertEqual(updates[-1]['modes'], ['copy', 'transcode', 'transcode'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import asyncio
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import textwrap
+from unittest import mock
+
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.async_converter import AsyncConverter
+from src.core.converter import ConversionError
+from src.core.media_probe import ProbeCache
+
+# Stands in for ffmpeg: prints two progress blocks, writes the output file (last argument),
+# and sleeps first when FAKE_FFMPEG_SLEEP is set, or fails when the input name contains "bad".
+FAKE_FFMPEG = textwrap.dedent(f"""\
+    #!{sys.executable}
+    import os, sys, time
+    time.sleep(float(os.environ.get('FAKE_FFMPEG_SLEEP', '0')))
+    if any('bad' in arg for arg in sys.argv):
+        sys.stderr.write('Invalid data found when processing input\\n')
+        sys.exit(1)
+    print('out_time_us=5000000\\nspeed=2.0x\\nprogress=continue', flush=True)
+    print('out_time_us=10000000\\nspeed=2.0x\\nprogress=end', flush=True)
+    open(sys.argv[-1], 'wb').write(b'converted')
+""")
+
+PROBE = {'format': {'duration': '10.0'}, 'streams': [{'codec_type': 'video', 'codec_name': 'vp9'}]}
+
+
+@unittest.skipIf(sys.platform == "win32", "uses a POSIX shebang script as ffmpeg")
+class TestAsyncConverter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        bin_dir = os.path.join(self.temp_dir, "bin")
+        os.makedirs(bin_dir)
+        fake = os.path.join(bin_dir, "ffmpeg")
+        with open(fake, 'w') as f:
+            f.write(FAKE_FFMPEG)
+        os.chmod(fake, os.stat(fake).st_mode | stat.S_IEXEC)
+        self.old_path = os.environ['PATH']
+        os.environ['PATH'] = bin_dir + os.pathsep + self.old_path
+        self.cache = ProbeCache(db_path=None)
+        # The fake cannot answer -encoders/-muxers; skip capability checks instead of querying it.
+        patcher = mock.patch('src.core.converter.get_ffmpeg_capabilities', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        os.environ['PATH'] = self.old_path
+        os.environ.pop('FAKE_FFMPEG_SLEEP', None)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _input(self, name="in.webm"):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(b"input")
+        self.cache.put(path, PROBE)
+        return path
+
+    def test_iter_progress_yields_updates_then_finishes(self):
+        input_path, output_path = self._input(), os.path.join(self.temp_dir, "out.mp4")
+
+        async def collect():
+            converter = AsyncConverter(probe_cache=self.cache)
+            return [update async for update in converter.iter_progress(input_path, output_path, "mp4")]
+
+        updates = asyncio.run(collect())
+        self.assertEqual([u.get('percentage') for u in updates[:2]], [50.0, 100.0])
+        self.assertEqual(updates[-1]['status'], 'finished_conversion')
+        self.assertTrue(os.path.exists(output_path))
+
+    def test_failure_and_many_jobs(self):
+        jobs = [{'input_file_path': self._input(f"in{i}.webm"), 'output_file_path': os.path.join(self.temp_dir, f"out{i}.mp4"), 'output_format': 'mp4'}
+                for i in range(3)]
+        jobs.append({'input_file_path': self._input("bad.webm"), 'output_file_path': os.path.join(self.temp_dir, "bad.mp4"), 'output_format': 'mp4'})
+
+        results = asyncio.run(AsyncConverter(max_concurrent=2, probe_cache=self.cache).convert_many(jobs))
+
+        self.assertEqual(results[:3], [job['output_file_path'] for job in jobs[:3]])
+        self.assertIsInstance(results[3], ConversionError)
+        self.assertIn("Invalid data", str(results[3]))
+
+    def test_timeout_and_cancel_kill_ffmpeg(self):
+        os.environ['FAKE_FFMPEG_SLEEP'] = '30'
+        input_path = self._input()
+
+        async def run():
+            converter = AsyncConverter(probe_cache=self.cache)
+            with self.assertRaises(ConversionError):
+                await converter.convert(input_path, os.path.join(self.temp_dir, "t.mp4"), "mp4", timeout=0.5)
+            task = asyncio.ensure_future(converter.convert(input_path, os.path.join(self.temp_dir, "c.mp4"), "mp4"))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(asyncio.wait_for(run(), 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
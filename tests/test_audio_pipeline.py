@@ -0,0 +1,172 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import shutil
+import tempfile
+import threading
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.audio_pipeline import AudioExtractor, build_audio_command
+from src.core.converter import ConversionError
+from tests.helpers import media_info
+
+AAC_VIDEO = media_info('h264', 'aac', duration=200.0)
+MP3_WITH_COVER = media_info('mjpeg', 'mp3', duration=180.0, disposition={'attached_pic': 1})
+
+
+class TestBuildAudioCommand(unittest.TestCase):
+    def test_matching_codec_is_copied_and_video_never_mapped(self):
+        cmd, plan = build_audio_command("in.mp4", "out.m4a", "m4a", AAC_VIDEO, bitrate="192k")
+        self.assertEqual(plan['mode'], 'remux')
+        self.assertEqual(cmd[cmd.index('-map') + 1], '0:a:0')
+        self.assertEqual(cmd.count('-map'), 1)
+        self.assertEqual(cmd[cmd.index('-c:a') + 1], 'copy')
+        self.assertNotIn('-b:a', cmd)
+        self.assertIn('-vn', cmd)
+        self.assertEqual(cmd[cmd.index('-f') + 1], 'ipod')
+        self.assertEqual(cmd[-1], "out.m4a")
+
+    def test_other_codec_or_trim_is_encoded(self):
+        cmd, plan = build_audio_command("in.mp4", "out.mp3", "mp3", AAC_VIDEO, bitrate="192k")
+        self.assertEqual(plan['mode'], 'transcode')
+        self.assertEqual(cmd[cmd.index('-c:a') + 1], 'libmp3lame')
+        self.assertEqual(cmd[cmd.index('-b:a') + 1], '192k')
+        self.assertEqual(cmd[cmd.index('-threads') + 1], '1')
+        _, trimmed = build_audio_command("in.mp4", "out.m4a", "m4a", AAC_VIDEO, start_time="00:00:10")
+        self.assertEqual(trimmed['mode'], 'transcode')
+
+    def test_cover_art_is_kept(self):
+        cmd, plan = build_audio_command("in.mp3", "out.mp3", "mp3", MP3_WITH_COVER)
+        self.assertEqual(plan['mode'], 'remux')
+        self.assertIn('0:v:0', cmd)
+        self.assertEqual(cmd[cmd.index('-c:v') + 1], 'copy')
+        self.assertNotIn('-vn', cmd)
+        cmd, _ = build_audio_command("in.mp3", "out.mp3", "mp3", MP3_WITH_COVER, keep_cover_art=False)
+        self.assertNotIn('0:v:0', cmd)
+
+    def test_no_audio_or_unknown_format_raises(self):
+        with self.assertRaises(ConversionError):
+            build_audio_command("in.mp4", "out.mp3", "mp3", {'duration': 1.0, 'video_stream': {}, 'audio_stream': None})
+        with self.assertRaises(ConversionError):
+            build_audio_command("in.mp4", "out.xyz", "xyz", AAC_VIDEO)
+
+
+class TestAudioExtractor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.inputs = []
+        for name in ("a.mp4", "b.mp4", "c.mp4"):
+            path = os.path.join(self.temp_dir, name)
+            with open(path, 'wb') as f:
+                f.write(b"data")
+            self.inputs.append(path)
+        self.output_dir = os.path.join(self.temp_dir, "out")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @patch('src.core.audio_pipeline.FFmpegProcess')
+    @patch('src.core.audio_pipeline.inspect_media', return_value=AAC_VIDEO)
+    def test_extract_many_runs_every_file_and_reports_failures(self, mock_inspect, mock_process):
+        commands = []
+        lock = threading.Lock()
+
+        def make_process(cmd, **kwargs):
+            with lock:
+                commands.append(cmd)
+            process = MagicMock()
+            if 'b.m4a' in cmd[-1]:
+                process.run.side_effect = ConversionError("broken")
+            else:
+                process.run.side_effect = lambda **kwargs: open(cmd[-1], 'wb').close()
+            return process
+        mock_process.side_effect = make_process
+        updates = []
+
+        extractor = AudioExtractor(max_workers=2, probe_cache="cache")
+        results = extractor.extract_many(self.inputs, self.output_dir, "m4a", progress_callback=updates.append)
+
+        self.assertEqual([path for path, _ in results], self.inputs)
+        self.assertEqual(results[0][1], os.path.join(self.output_dir, "a.m4a"))
+        self.assertIsInstance(results[1][1], ConversionError)
+        self.assertEqual(len(commands), 3)
+        self.assertTrue(all(call.kwargs['cache'] == "cache" for call in mock_inspect.call_args_list))
+        finished = [u for u in updates if u['status'] == 'finished_conversion']
+        self.assertEqual(len(finished), 2)
+        self.assertTrue(all(u['mode'] == 'remux' and u['total'] == 3 for u in finished))
+
+    @patch('src.core.audio_pipeline.FFmpegProcess')
+    @patch('src.core.audio_pipeline.inspect_media', return_value=AAC_VIDEO)
+    def test_existing_newer_outputs_are_skipped(self, mock_inspect, mock_process):
+        os.makedirs(self.output_dir)
+        done = os.path.join(self.output_dir, "a.m4a")
+        with open(done, 'wb') as f:
+            f.write(b"done")
+        os.utime(done, (os.path.getmtime(self.inputs[0]) + 10,) * 2)
+        updates = []
+
+        results = AudioExtractor(max_workers=1).extract_many(self.inputs, self.output_dir, "m4a", progress_callback=updates.append)
+
+        self.assertEqual(results[0][1], done)
+        self.assertEqual(mock_process.call_count, 2)
+        self.assertEqual([u['index'] for u in updates if u['status'] == 'skipped'], [0])
+
+    @patch('src.core.audio_pipeline.FFmpegProcess')
+    @patch('src.core.audio_pipeline.inspect_media', return_value=AAC_VIDEO)
+    def test_same_names_in_different_folders_do_not_collide(self, mock_inspect, mock_process):
+        inputs = []
+        for name in ("a/01 Intro.flac", "b/01 Intro.flac", "b/01 Intro.wav"):
+            path = os.path.join(self.temp_dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, 'wb').close()
+            inputs.append(path)
+        mock_process.side_effect = lambda cmd, **kwargs: MagicMock(**{'run.side_effect': lambda **kw: open(cmd[-1], 'wb').close()})
+
+        results = AudioExtractor(max_workers=2).extract_many(inputs, self.output_dir, "m4a", skip_existing=False)
+
+        self.assertEqual([output for _, output in results], [os.path.join(self.output_dir, "a", "01 Intro.m4a"),
+                                                             os.path.join(self.output_dir, "b", "01 Intro.m4a"),
+                                                             os.path.join(self.output_dir, "b", "01 Intro_1.m4a")])
+        self.assertTrue(all(os.path.exists(output) for _, output in results))
+
+    @patch('src.core.audio_pipeline.FFmpegProcess')
+    @patch('src.core.audio_pipeline.inspect_media', return_value=AAC_VIDEO)
+    def test_interrupted_extraction_leaves_no_output(self, mock_inspect, mock_process):
+        output_path = os.path.join(self.output_dir, "a.m4a")
+        def interrupted(**kwargs):
+            with open(mock_process.call_args.args[0][-1], 'wb') as f:
+                f.write(b"trunc")
+            raise KeyboardInterrupt
+        mock_process.return_value.run.side_effect = interrupted
+
+        with self.assertRaises(KeyboardInterrupt):
+            AudioExtractor().extract(self.inputs[0], output_path, "m4a")
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    @patch('src.core.audio_pipeline.FFmpegProcess')
+    @patch('src.core.audio_pipeline.inspect_media', return_value=AAC_VIDEO)
+    def test_extract_works_again_after_stop(self, mock_inspect, mock_process):
+        mock_process.side_effect = lambda cmd, **kwargs: MagicMock(**{'run.side_effect': lambda **kw: open(cmd[-1], 'wb').close()})
+        extractor = AudioExtractor()
+        extractor.stop()
+        output_path = extractor.extract(self.inputs[0], os.path.join(self.output_dir, "a.m4a"), "m4a")
+        self.assertTrue(os.path.exists(output_path))
+
+        stop_event = threading.Event()
+        stop_event.set()
+        with self.assertRaises(ConversionError):
+            extractor.extract(self.inputs[1], os.path.join(self.output_dir, "b.m4a"), "m4a", stop_event=stop_event)
+        self.assertEqual(mock_process.call_count, 1)
+
+    def test_missing_input_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            AudioExtractor().extract(os.path.join(self.temp_dir, "missing.mp4"), os.path.join(self.output_dir, "x.mp3"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.auto_tune import AutoTuner
+from src.core.converter import Converter, ConversionError
+from src.core.media_probe import ProbeCache
+from tests.helpers import media_info
+
+MEDIA_INFO = media_info('vp9', None, duration=120.0, height=1080)
+
+TRIAL_RESULTS = [
+    {'preset': 'ultrafast', 'threads': 4, 'fps': 400.0, 'kbps': 9000.0, 'ssim': 0.95},
+    {'preset': 'veryfast', 'threads': 4, 'fps': 250.0, 'kbps': 4000.0, 'ssim': 0.975},
+    {'preset': 'veryfast', 'threads': 8, 'fps': 310.0, 'kbps': 4000.0, 'ssim': 0.975},
+    {'preset': 'medium', 'threads': 8, 'fps': 120.0, 'kbps': 3000.0, 'ssim': 0.985},
+]
+
+
+class TestAutoTuner(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir_obj = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir_obj.name, "auto_tune.json")
+
+    def tearDown(self):
+        self.temp_dir_obj.cleanup()
+
+    def test_choose_fastest_candidate_meeting_quality(self):
+        self.assertEqual(AutoTuner.choose(TRIAL_RESULTS, target_ssim=0.97)['threads'], 8)
+        self.assertEqual(AutoTuner.choose(TRIAL_RESULTS, target_ssim=0.97)['preset'], 'veryfast')
+
+    def test_choose_respects_bitrate_cap(self):
+        self.assertEqual(AutoTuner.choose(TRIAL_RESULTS, target_ssim=None, max_kbps=3500)['preset'], 'medium')
+
+    def test_choose_falls_back_to_best_quality(self):
+        self.assertEqual(AutoTuner.choose(TRIAL_RESULTS, target_ssim=0.99)['preset'], 'medium')
+
+    @patch('src.core.auto_tune.inspect_media', return_value=MEDIA_INFO)
+    def test_decision_is_cached_across_instances(self, mock_inspect):
+        with patch.object(AutoTuner, 'run_trials', return_value=TRIAL_RESULTS) as mock_trials:
+            first = AutoTuner(cache_path=self.cache_path).tune("in.mkv", "mp4")
+            second = AutoTuner(cache_path=self.cache_path).tune("in.mkv", "mp4")
+        mock_trials.assert_called_once()
+        self.assertFalse(first['from_cache'])
+        self.assertTrue(second['from_cache'])
+        self.assertEqual(second['preset'], first['preset'])
+
+    @patch('src.core.auto_tune.inspect_media', return_value=MEDIA_INFO)
+    def test_unreadable_cache_is_measured_again(self, mock_inspect):
+        with open(self.cache_path, 'wb') as f:
+            f.write(b"\xff\xfe not json")
+        os.mkdir(self.cache_path + ".d") # A directory cannot be opened as the cache file
+        for cache_path in (self.cache_path, self.cache_path + ".d"):
+            with patch.object(AutoTuner, 'run_trials', return_value=TRIAL_RESULTS):
+                decision = AutoTuner(cache_path=cache_path).tune("in.mkv", "mp4")
+            self.assertFalse(decision['from_cache'])
+
+    @patch('src.core.auto_tune.inspect_media', return_value=MEDIA_INFO)
+    def test_encoders_without_presets_only_tune_threads(self, mock_inspect):
+        tuner = AutoTuner(cache_path=None, candidate_threads=(2, 4))
+        with patch.object(tuner, '_measure', return_value={'fps': 100.0, 'kbps': 1000.0, 'ssim': 0.99}) as mock_measure:
+            results = tuner.run_trials("in.mkv", 'libvpx-vp9', MEDIA_INFO)
+        self.assertEqual([(r['preset'], r['threads']) for r in results], [(None, 2), (None, 4)])
+        self.assertEqual(mock_measure.call_count, 2 * tuner.sample_count)
+
+    @patch('src.core.auto_tune.inspect_media', return_value=MEDIA_INFO)
+    def test_decisions_are_per_encoder(self, mock_inspect):
+        tuner = AutoTuner(cache_path=self.cache_path)
+        with patch.object(AutoTuner, 'run_trials', return_value=TRIAL_RESULTS) as mock_trials:
+            tuner.tune("in.mkv", "mp4")
+            decision = tuner.tune("in.mkv", "mp4", encoder='h264_nvenc')
+        self.assertFalse(decision['from_cache'])
+        self.assertEqual([c.args[1] for c in mock_trials.call_args_list], ['libx264', 'h264_nvenc'])
+
+    def test_audio_format_is_rejected(self):
+        with self.assertRaises(ConversionError):
+            AutoTuner(cache_path=None).tune("in.mkv", "mp3")
+
+
+class TestConvertMediaAutoPreset(unittest.TestCase):
+    @patch('src.core.converter.FFmpegProcess')
+    @patch('src.core.converter.inspect_media', return_value=MEDIA_INFO)
+    def test_auto_preset_uses_tuned_settings(self, mock_inspect, mock_process):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "in.mkv")
+            with open(input_path, 'wb') as f:
+                f.write(b"dummy")
+            converter = Converter(probe_cache=ProbeCache(db_path=None))
+            with patch.object(converter.get_auto_tuner(), 'tune', return_value={'preset': 'veryfast', 'threads': 6, 'from_cache': True}):
+                converter.convert_media(input_path, os.path.join(temp_dir, "out.mp4"), "mp4", preset='auto')
+        cmd = mock_process.call_args.args[0]
+        self.assertEqual(cmd[cmd.index('-preset') + 1], 'veryfast')
+        self.assertEqual(cmd[cmd.index('-threads') + 1], '6')
+
+    @patch('src.core.converter.FFmpegProcess')
+    @patch('src.core.converter.inspect_media', return_value=MEDIA_INFO)
+    def test_auto_preset_tunes_the_chosen_encoder(self, mock_inspect, mock_process):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "in.mkv")
+            with open(input_path, 'wb') as f:
+                f.write(b"dummy")
+            converter = Converter(probe_cache=ProbeCache(db_path=None))
+            with patch.object(converter, 'encoders_for', return_value=('h264_nvenc', 'aac')), \
+                    patch.object(converter.get_auto_tuner(), 'tune', return_value={'preset': None, 'threads': 4, 'from_cache': True}) as mock_tune:
+                converter.convert_media(input_path, os.path.join(temp_dir, "out.mp4"), "mp4", preset='auto')
+        self.assertEqual(mock_tune.call_args.kwargs['encoder'], 'h264_nvenc')
+
+
+if __name__ == '__main__':
+    unittest.main()
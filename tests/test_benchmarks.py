@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch
+import os
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from benchmarks.converter_bench import build_cases, compare_results, measure, run_case
+from benchmarks.media import source_command
+from src.core.gif_engine import DEFAULT_PALETTE_DIR
+
+
+class TestBenchmarkCases(unittest.TestCase):
+    def test_quick_profile_covers_formats_trim_and_threads(self):
+        cases = build_cases('quick')
+        names = [case['name'] for case in cases]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn('360p-10s/mp4/ultrafast/t1', names)
+        self.assertIn('360p-10s/mp4/ultrafast/t0', names)
+        self.assertIn('360p-10s/gif/t1', names)
+        self.assertIn('360p-10s/mp3', names)
+        trims = [case for case in cases if case.get('start_time')]
+        self.assertEqual(len(trims), 2)
+        self.assertTrue(any(case.get('smart_cut') for case in trims))
+
+    def test_source_command_is_offline_and_deterministic(self):
+        cmd = source_command("out.mp4", 640, 360, 30, 10)
+        self.assertEqual(cmd.count('lavfi'), 2)
+        self.assertIn('testsrc2=size=640x360:rate=30:duration=10', cmd)
+        self.assertEqual(cmd[cmd.index('-threads') + 1], '1')
+        self.assertIn('+bitexact', cmd)
+
+
+class TestBaselineComparison(unittest.TestCase):
+    BASELINE = {'results': [
+        {'name': 'a', 'status': 'ok', 'wall_seconds': 2.0, 'cpu_seconds': 4.0, 'peak_rss_kb': 100000},
+        {'name': 'b', 'status': 'ok', 'wall_seconds': 0.1, 'cpu_seconds': 0.1, 'peak_rss_kb': 1000},
+        {'name': 'c', 'status': 'ok', 'wall_seconds': 1.0, 'cpu_seconds': 1.0, 'peak_rss_kb': 1000},
+    ]}
+
+    def test_flags_growth_beyond_threshold_and_noise_floor(self):
+        results = [
+            {'name': 'a', 'status': 'ok', 'wall_seconds': 2.5, 'cpu_seconds': 4.1, 'peak_rss_kb': 100000},
+            {'name': 'b', 'status': 'ok', 'wall_seconds': 0.13, 'cpu_seconds': 0.1, 'peak_rss_kb': 1000}, # Within the noise floor
+            {'name': 'c', 'status': 'error', 'error': 'boom'},
+            {'name': 'new', 'status': 'ok', 'wall_seconds': 9.0},
+        ]
+        regressions = compare_results(results, self.BASELINE, threshold=0.10)
+        self.assertEqual([(r['name'], r['metric']) for r in regressions], [('a', 'wall_seconds'), ('c', 'status')])
+        self.assertEqual(regressions[0]['change'], 0.25)
+
+    @patch('benchmarks.converter_bench.run_isolated')
+    def test_measure_reports_median_run(self, mock_run):
+        mock_run.side_effect = [{'name': 'a', 'status': 'ok', 'wall_seconds': seconds} for seconds in (3.0, 1.0, 2.0)]
+        result = measure({'name': 'a'}, repeat=3)
+        self.assertEqual(result['wall_seconds'], 2.0)
+        self.assertEqual(result['runs'], 3)
+
+    def test_gif_cases_use_a_private_palette_directory(self):
+        seen = {}
+
+        def convert(converter, *args, **kwargs):
+            engine = converter.get_gif_engine()
+            seen['palette_dir'] = engine.palette_dir
+            self.assertTrue(os.path.isdir(engine.palette_dir))
+            self.assertIs(engine.probe_cache, converter.probe_cache)
+
+        case = build_cases('quick')[0]
+        case = dict(case, output_format='gif')
+        with patch('benchmarks.converter_bench.ensure_source', return_value="source.mkv"), \
+                patch('src.core.converter.Converter.convert_media', autospec=True, side_effect=convert):
+            run_case(case)
+        self.assertNotEqual(seen['palette_dir'], DEFAULT_PALETTE_DIR)
+        self.assertFalse(os.path.exists(seen['palette_dir']))
+
+
+if __name__ == '__main__':
+    unittest.main()
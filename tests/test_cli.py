@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import patch
+import io
+import os
+import json
+import tempfile
+import subprocess
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.cli import main, read_jobs
+from src.core.job_queue import JobQueueError, download_convert_payload
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def fake_convert(input_file_path, output_file_path, output_format, progress_callback=None, **options):
+    if 'bad' in input_file_path:
+        raise RuntimeError("Invalid data found when processing input")
+    progress_callback({'status': 'converting', 'percentage': 50.0})
+    with open(output_file_path, 'wb') as f:
+        f.write(b"converted")
+    return output_file_path
+
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _path(self, name, data=None):
+        path = os.path.join(self.temp_dir.name, name)
+        if data is not None:
+            with open(path, 'w') as f:
+                f.write(data)
+        return path
+
+    def _run(self, argv):
+        out = io.StringIO()
+        with patch('sys.stdout', out), patch('src.core.job_queue.Converter') as converter_class, \
+             patch('src.core.job_queue.Downloader') as downloader_class:
+            converter = converter_class.return_value
+            converter.convert_media.side_effect = fake_convert
+            converter.last_conversion = {'mode': 'cached'} # Keeps the cost model out of it
+            downloader_class.return_value.download_media.side_effect = lambda url, path, **kwargs: self._path("downloaded.webm", "media")
+            code = main(argv)
+        return code, [json.loads(line) for line in out.getvalue().splitlines()], converter
+
+    def test_make_payload_from_strings_and_dicts(self):
+        defaults = {'output_format': 'mp4', 'preset': None}
+        self.assertEqual(download_convert_payload("https://example.com/v", defaults), {'url': "https://example.com/v", 'output_format': 'mp4'})
+        self.assertEqual(download_convert_payload({'input_file_path': "a.mkv", 'output_format': 'mp3'}, defaults),
+                         {'input_file_path': os.path.abspath("a.mkv"), 'output_format': 'mp3'})
+        with self.assertRaises(JobQueueError):
+            download_convert_payload({'output_format': 'mp4'})
+
+    def test_read_jobs_skips_comments_and_reports_bad_lines(self):
+        urls = self._path("urls.txt", "# batch\nhttps://example.com/1\n\nhttps://example.com/2\n")
+        self.assertEqual(read_jobs(urls, jsonl=False), ["https://example.com/1", "https://example.com/2"])
+        jobs = self._path("jobs.jsonl", '{"url": "https://example.com/1"}\nnot json\n')
+        with self.assertRaisesRegex(ValueError, "jobs.jsonl:2"):
+            read_jobs(jobs, jsonl=True)
+
+    def test_batch_prints_json_progress_and_summary(self):
+        good = self._path("good.mkv", "media")
+        jobs = self._path("jobs.jsonl", json.dumps({'url': "https://example.com/v", 'output_format': 'mp3'}) + "\n"
+                          + json.dumps({'input_file_path': self._path("bad.mkv", "media")}) + "\n")
+        code, lines, converter = self._run([good, '--jobs', jobs, '--format', 'mp4', '--preset', 'fast', '-j', '2',
+                                            '--output-dir', os.path.join(self.temp_dir.name, "out")])
+
+        self.assertEqual(code, 1)
+        self.assertEqual(lines[0]['status'], 'queued')
+        self.assertEqual(lines[-1]['status'], 'summary')
+        self.assertEqual((lines[-1]['done'], lines[-1]['failed']), (2, 1))
+        progress = [line for line in lines if line['status'] == 'converting']
+        self.assertEqual(len(progress), 2)
+        self.assertTrue(all('job' in line and 'source' in line for line in progress))
+        outputs = sorted(os.path.basename(call.kwargs['output_file_path']) for call in converter.convert_media.call_args_list)
+        self.assertEqual(outputs, ["bad.mp4", "downloaded.mp3", "good.mp4"])
+        self.assertTrue(all(call.kwargs['preset'] == 'fast' for call in converter.convert_media.call_args_list))
+
+    def test_download_only_when_no_format(self):
+        code, lines, converter = self._run(["https://example.com/v"])
+        self.assertEqual(code, 0)
+        done = [line for line in lines if line['status'] == 'job_done']
+        self.assertEqual(done[0]['result']['output_file_path'], self._path("downloaded.webm"))
+        converter.convert_media.assert_not_called()
+
+    def test_no_jobs_is_a_usage_error(self):
+        code, lines, _ = self._run([])
+        self.assertEqual((code, lines[0]['status']), (2, 'error'))
+
+    def test_does_not_import_the_gui(self):
+        code = ("import sys, src.cli; "
+                "print([m for m in sys.modules if m.split('.')[0] in ('tkinter', '_tkinter', 'customtkinter', 'PIL', 'vlc', 'src')"
+                " and not m.startswith(('src.core', 'src.cli')) and m != 'src'])")
+        result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip(), "[]", result.stderr)
+
+    def test_does_not_import_unrelated_core_modules(self):
+        code = ("import sys, src.cli; "
+                "print([m for m in ('src.core.job_server', 'http.server', 'src.core.watch_folder', 'src.core.async_converter',"
+                " 'src.core.scrub_preview') if m in sys.modules])")
+        result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip(), "[]", result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
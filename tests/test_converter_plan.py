@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import patch
+import threading
+import os
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import Converter
+from src.core.media_probe import ProbeCache
+from tests.helpers import media_info
+
+
+class TestStreamPlan(unittest.TestCase):
+    def setUp(self):
+        self.converter = Converter(probe_cache=ProbeCache(db_path=None))
+
+    def test_h264_aac_to_mp4_is_remuxed(self):
+        plan = self.converter.plan_streams(media_info(), 'mp4')
+        self.assertEqual(plan, {'mode': 'remux', 'vcodec': 'copy', 'acodec': 'copy'})
+
+    def test_only_mismatching_stream_is_encoded(self):
+        plan = self.converter.plan_streams(media_info('h264', 'opus'), 'mp4')
+        self.assertEqual(plan, {'mode': 'partial_remux', 'vcodec': 'copy', 'acodec': 'aac'})
+
+    def test_vp9_opus_to_mp4_is_transcoded(self):
+        plan = self.converter.plan_streams(media_info('vp9', 'opus'), 'mp4')
+        self.assertEqual(plan['mode'], 'transcode')
+
+    def test_trim_and_opt_out_force_transcode(self):
+        self.assertEqual(self.converter.plan_streams(media_info(), 'mp4', trimmed=True)['mode'], 'transcode')
+        self.assertEqual(self.converter.plan_streams(media_info(), 'mp4', allow_stream_copy=False)['mode'], 'transcode')
+
+    def test_mp3_audio_is_copied_and_video_ignored(self):
+        plan = self.converter.plan_streams(media_info('h264', 'mp3'), 'mp3')
+        self.assertEqual(plan, {'mode': 'remux', 'vcodec': None, 'acodec': 'copy'})
+
+    def test_gif_is_never_copied(self):
+        self.assertEqual(self.converter.plan_streams(media_info('gif', None), 'gif')['mode'], 'transcode')
+
+    def test_build_command_uses_copy_without_preset(self):
+        cmd, plan = self.converter.build_command('in.mp4', 'out.mp4', 'mp4', threads=4, preset='slow', media_info=media_info())
+        self.assertEqual(plan['mode'], 'remux')
+        self.assertEqual(cmd[cmd.index('-vcodec') + 1], 'copy')
+        self.assertEqual(cmd[cmd.index('-acodec') + 1], 'copy')
+        self.assertNotIn('-preset', cmd)
+
+    def test_build_command_transcodes_without_probe(self):
+        cmd, plan = self.converter.build_command('in.mp4', 'out.webm', 'webm', preset='fast', media_info=None)
+        self.assertEqual(plan['mode'], 'transcode')
+        self.assertIn('libvpx-vp9', cmd)
+        self.assertIn('libopus', cmd)
+        self.assertEqual(cmd[cmd.index('-preset') + 1], 'fast')
+
+
+class TestConvertMediaReportsMode(unittest.TestCase):
+    @patch('src.core.converter.FFmpegProcess')
+    @patch('src.core.converter.inspect_media', return_value=media_info())
+    def test_finished_update_carries_mode(self, mock_inspect, mock_process):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "in.mp4")
+            with open(input_path, 'wb') as f:
+                f.write(b"dummy")
+            updates = []
+            converter = Converter(probe_cache=ProbeCache(db_path=None))
+            converter.convert_media(input_path, os.path.join(temp_dir, "out.mp4"), "mp4", progress_callback=updates.append)
+
+        self.assertEqual(updates[-1]['status'], 'finished_conversion')
+        self.assertEqual(updates[-1]['mode'], 'remux')
+        self.assertEqual(converter.last_conversion['mode'], 'remux')
+        self.assertIn('copy', mock_process.call_args.args[0])
+
+    @patch('src.core.converter.FFmpegProcess')
+    @patch('src.core.converter.inspect_media', return_value=media_info())
+    def test_stop_event_set_before_the_run_is_not_reset(self, mock_inspect, mock_process):
+        stop_event = threading.Event()
+        stop_event.set() # Cancelled just before convert_media cleared its own flag
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "in.mp4")
+            with open(input_path, 'wb') as f:
+                f.write(b"dummy")
+            with self.assertRaisesRegex(Exception, "stopped by user"):
+                Converter(probe_cache=ProbeCache(db_path=None)).convert_media(input_path, os.path.join(temp_dir, "out.mp4"), "mp4", stop_event=stop_event)
+        mock_process.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import patch
+import os
+import threading
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import ConversionError
+from src.core.converter_pool import ConverterPool
+
+
+def make_job(i, **extra):
+    job = {'input_file_path': f"in_{i}.mp4", 'output_file_path': f"out_{i}.mp3", 'output_format': 'mp3'}
+    job.update(extra)
+    return job
+
+
+class TestConverterPool(unittest.TestCase):
+    @patch('src.core.converter_pool.Converter.convert_media')
+    def test_thread_budget_is_split_across_workers(self, mock_convert):
+        mock_convert.side_effect = lambda **kwargs: kwargs['output_file_path']
+
+        with ConverterPool(max_workers=4, total_threads=32) as pool:
+            results = pool.run_batch([make_job(i) for i in range(6)])
+
+        self.assertEqual([r for _, r in results], [f"out_{i}.mp3" for i in range(6)])
+        self.assertEqual({c.kwargs['threads'] for c in mock_convert.call_args_list}, {8})
+
+    @patch('src.core.converter_pool.Converter.convert_media')
+    def test_explicit_job_threads_are_kept(self, mock_convert):
+        mock_convert.side_effect = lambda **kwargs: kwargs['output_file_path']
+
+        with ConverterPool(max_workers=2, total_threads=8) as pool:
+            pool.submit(make_job(0, threads=3)).result()
+
+        self.assertEqual(mock_convert.call_args.kwargs['threads'], 3)
+
+    @patch('src.core.converter_pool.Converter.convert_media')
+    def test_progress_stream_ends_with_terminal_status(self, mock_convert):
+        def fake_convert(progress_callback=None, **kwargs):
+            progress_callback({'status': 'converting', 'percentage': 50.0})
+            progress_callback({'status': 'finished_conversion', 'filename': kwargs['output_file_path']})
+            return kwargs['output_file_path']
+        mock_convert.side_effect = fake_convert
+
+        seen = []
+        with ConverterPool(max_workers=1, total_threads=2, progress_callback=lambda h, d: seen.append(d['status'])) as pool:
+            handle = pool.submit(make_job(0))
+            statuses = [d['status'] for d in handle.iter_progress(timeout=5)]
+
+        self.assertEqual(statuses, ['converting', 'finished_conversion'])
+        self.assertEqual(seen, statuses)
+        self.assertEqual(handle.latest_progress['status'], 'finished_conversion')
+
+    def test_cancel_pending_and_running_jobs(self):
+        started = threading.Event()
+
+        def blocking_convert(self_converter, **kwargs):
+            started.set()
+            self_converter._stop_flag.wait(5)
+            raise ConversionError("Conversion stopped by user.")
+
+        with patch('src.core.converter_pool.Converter.convert_media', autospec=True, side_effect=blocking_convert):
+            pool = ConverterPool(max_workers=1, total_threads=1)
+            running = pool.submit(make_job(0))
+            pending = pool.submit(make_job(1))
+            self.assertTrue(started.wait(5))
+
+            pending.cancel()
+            running.cancel()
+            pool.shutdown(wait=True)
+
+        with self.assertRaisesRegex(ConversionError, "stopped by user"):
+            running.result()
+        with self.assertRaisesRegex(ConversionError, "cancelled before it started"):
+            pending.result()
+        self.assertEqual(running.latest_progress['status'], 'cancelled')
+        self.assertEqual(pending.latest_progress['status'], 'cancelled')
+
+    @patch('src.core.converter_pool.Converter.convert_media')
+    def test_cancel_flag_is_passed_to_the_converter(self, mock_convert):
+        mock_convert.side_effect = lambda **kwargs: kwargs['output_file_path']
+        with ConverterPool(max_workers=1) as pool:
+            handle = pool.submit(make_job(0))
+            handle.result(timeout=5)
+        self.assertIs(mock_convert.call_args.kwargs['stop_event'], handle._cancel_flag)
+
+    def test_submit_rejects_incomplete_job(self):
+        with ConverterPool(max_workers=1) as pool:
+            with self.assertRaises(ValueError):
+                pool.submit({'input_file_path': 'in.mp4'})
+
+
+if __name__ == '__main__':
+    unittest.main()
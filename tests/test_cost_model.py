@@ -0,0 +1,59 @@
+import unittest
+import os
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.cost_model import CostModel
+from tests.helpers import media_info
+
+
+def source_info(vcodec='vp9', acodec='opus', duration=600.0):
+    return media_info(vcodec, acodec, duration, width=3840, height=2160, bit_rate=20_000_000, path='in.webm', avg_frame_rate='30/1')
+
+
+class TestCostModel(unittest.TestCase):
+    def setUp(self):
+        self.model = CostModel(db_path=None)
+
+    def tearDown(self):
+        self.model.close()
+
+    def test_4k_encode_costs_more_than_mp3_extraction(self):
+        encode = self.model.estimate(source_info(), {'output_format': 'mp4', 'preset': 'medium'})
+        extract = self.model.estimate(source_info(), {'output_format': 'mp3'})
+        self.assertEqual(encode['source'], 'prior')
+        self.assertGreater(encode['seconds'], 50 * extract['seconds'])
+        self.assertEqual(extract['output_bytes'], 16000 * 600)
+
+    def test_trim_preset_and_copy_change_the_estimate(self):
+        full = self.model.estimate(source_info(), {'output_format': 'mp4', 'preset': 'ultrafast'})
+        trimmed = self.model.estimate(source_info(), {'output_format': 'mp4', 'preset': 'ultrafast', 'start_time': '00:01:00', 'end_time': '00:02:00'})
+        slow = self.model.estimate(source_info(), {'output_format': 'mp4', 'preset': 'slow'})
+        self.assertAlmostEqual(trimmed['seconds'], full['seconds'] / 10, places=3)
+        self.assertAlmostEqual(slow['seconds'] / full['seconds'], 8.0, delta=0.2) # Audio encoding does not scale
+        remux = self.model.estimate(source_info(vcodec='h264', acodec='aac'), {'output_format': 'mp4'})
+        self.assertIn(':remux:', remux['key'])
+        self.assertEqual(remux['output_bytes'], 20_000_000 // 8 * 600)
+
+    def test_learns_from_recorded_runs(self):
+        settings = {'output_format': 'mp4', 'preset': 'fast'}
+        prior = self.model.estimate(source_info(), settings)
+        for _ in range(10):
+            self.model.record(source_info(), settings, prior['seconds'] * 3, prior['output_bytes'] // 2)
+        learned = self.model.estimate(source_info(), settings)
+        self.assertEqual((learned['source'], learned['samples']), ('learned', 10))
+        self.assertAlmostEqual(learned['seconds'], prior['seconds'] * 3, places=3)
+        self.assertAlmostEqual(learned['output_bytes'] / prior['output_bytes'], 0.5, places=3)
+        # Other profiles keep their prior
+        self.assertEqual(self.model.estimate(source_info(), {'output_format': 'mp3'})['source'], 'prior')
+        # Runs on shorter inputs of the same profile correct longer ones too
+        short = self.model.estimate(source_info(duration=60.0), settings)
+        self.assertAlmostEqual(short['seconds'] * 10, learned['seconds'], places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
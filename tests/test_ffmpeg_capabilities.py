@@ -0,0 +1,158 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import Converter, ConversionError
+from src.core.ffmpeg_capabilities import (FFmpegCapabilities, FFmpegCapabilitiesError, detect_capabilities, parse_encoders,
+                                          parse_filters, parse_muxers, parse_version, translate_preset)
+
+VERSION_OUTPUT = "ffmpeg version 6.1.1-3ubuntu5 Copyright (c) 2000-2023 the FFmpeg developers\nbuilt with gcc 13\n"
+ENCODERS_OUTPUT = """Encoders:
+ V..... = Video
+ A..... = Audio
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10 (codec h264)
+ V....D h264_nvenc           NVIDIA NVENC H.264 encoder (codec h264)
+ V....D mpeg4                MPEG-4 part 2
+ A....D aac                  AAC (Advanced Audio Coding)
+ A....D libvorbis            libvorbis (codec vorbis)
+ V....D gif                  GIF (Graphics Interchange Format)
+"""
+FILTERS_OUTPUT = """Filters:
+  T.. = Timeline support
+  ------
+ TSC scale             V->V       Scale the input video size and/or convert the image format.
+ ... split             V->N       Pass on the input to N video outputs.
+ ... fps               V->V       Force constant framerate.
+"""
+MUXERS_OUTPUT = """ File formats:
+ D. = Demuxing supported
+ .E = Muxing supported
+ ---
+  E mp4             MP4 (MPEG-4 Part 14)
+  E webm            WebM
+  E matroska        Matroska
+"""
+
+
+def capabilities(encoders=('libx264', 'aac', 'mpeg4', 'libmp3lame', 'libvpx-vp9', 'libopus', 'gif'), muxers=('mp4', 'mov', 'avi', 'webm', 'mp3', 'gif'),
+                 filters=('fps', 'scale', 'split', 'palettegen', 'paletteuse'), working_hardware=()):
+    return FFmpegCapabilities('/usr/bin/ffmpeg', '6.1.1', '6.1.1', {name: 'V' for name in encoders}, filters, muxers, working_hardware)
+
+
+class TestParsing(unittest.TestCase):
+    def test_listings(self):
+        self.assertEqual(parse_version(VERSION_OUTPUT), '6.1.1-3ubuntu5')
+        self.assertEqual(parse_encoders(ENCODERS_OUTPUT), {'libx264': 'V', 'h264_nvenc': 'V', 'mpeg4': 'V', 'aac': 'A', 'libvorbis': 'A', 'gif': 'V'})
+        self.assertEqual(parse_filters(FILTERS_OUTPUT), {'scale', 'split', 'fps'})
+        self.assertEqual(parse_muxers(MUXERS_OUTPUT), {'mp4', 'webm', 'matroska'})
+
+    def test_encoder_choice_and_presets(self):
+        caps = capabilities(encoders=('libx264', 'h264_nvenc', 'libvorbis'), working_hardware=('h264_nvenc',))
+        self.assertEqual(caps.choose_encoder('h264'), 'libx264')
+        self.assertEqual(caps.choose_encoder('h264', hardware=True), 'h264_nvenc')
+        self.assertEqual(caps.choose_encoder('opus'), 'libvorbis')
+        self.assertIsNone(caps.choose_encoder('vp9'))
+        self.assertEqual(translate_preset('h264_nvenc', 'ultrafast'), 'p1')
+        self.assertEqual(translate_preset('libx264', 'slow'), 'slow')
+        self.assertIsNone(translate_preset('h264_videotoolbox', 'fast'))
+
+
+class TestDetection(unittest.TestCase):
+    def fake_run(self, cmd, **kwargs):
+        outputs = {'-version': VERSION_OUTPUT, '-encoders': ENCODERS_OUTPUT, '-filters': FILTERS_OUTPUT, '-muxers': MUXERS_OUTPUT}
+        self.calls.append(cmd)
+        flag = next((arg for arg in cmd if arg in outputs), None)
+        return MagicMock(returncode=0 if flag else 1, stdout=outputs.get(flag, ""))
+
+    def test_results_are_cached_per_binary(self):
+        self.calls = []
+        with tempfile.TemporaryDirectory() as temp_dir:
+            binary = os.path.join(temp_dir, "ffmpeg")
+            with open(binary, 'w') as f:
+                f.write("#!/bin/sh\n")
+            cache_path = os.path.join(temp_dir, "caps.json")
+            with patch('src.core.ffmpeg_capabilities.shutil.which', side_effect=lambda name: binary if name == 'ffmpeg' else None), \
+                    patch('src.core.ffmpeg_capabilities.subprocess.run', side_effect=self.fake_run):
+                first = detect_capabilities(cache_path=cache_path)
+                count = len(self.calls)
+                second = detect_capabilities(cache_path=cache_path)
+                self.assertEqual(len(self.calls), count) # Served from the cache
+                os.utime(binary, (1, 1)) # A replaced binary is queried again
+                detect_capabilities(cache_path=cache_path)
+                self.assertGreater(len(self.calls), count)
+
+        self.assertEqual(first.version, '6.1.1-3ubuntu5')
+        self.assertEqual(second.encoders, first.encoders)
+        self.assertEqual(first.working_hardware, set()) # The NVENC test encode failed
+        self.assertTrue(any('h264_nvenc' in cmd for cmd in self.calls))
+
+    def test_missing_ffmpeg_raises(self):
+        with patch('src.core.ffmpeg_capabilities.shutil.which', return_value=None):
+            with self.assertRaises(FFmpegCapabilitiesError):
+                detect_capabilities(cache_path=None)
+
+
+class TestConverterChecks(unittest.TestCase):
+    def test_fallback_encoder_is_planned(self):
+        converter = Converter(capabilities=capabilities(encoders=('libx264', 'aac', 'libvpx-vp9', 'libvorbis')))
+        plan = converter.plan_streams(None, 'webm')
+        self.assertEqual((plan['vcodec'], plan['acodec']), ('libvpx-vp9', 'libvorbis'))
+
+    @patch('src.core.converter.FFmpegProcess')
+    @patch('src.core.converter.inspect_media')
+    def test_impossible_jobs_are_rejected_before_ffmpeg_runs(self, mock_inspect, mock_process):
+        mock_inspect.return_value = {'duration': 10.0, 'video_stream': {'codec_name': 'vp9'}, 'audio_stream': {'codec_name': 'opus'}, 'probe': {}}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "in.webm")
+            with open(input_path, 'wb') as f:
+                f.write(b"dummy")
+            no_mp4 = Converter(capabilities=capabilities(muxers=('webm',)))
+            with self.assertRaises(ConversionError):
+                no_mp4.convert_media(input_path, os.path.join(temp_dir, "out.mp4"), 'mp4')
+            mock_inspect.assert_not_called() # Rejected before probing
+
+            no_h264 = Converter(capabilities=capabilities(encoders=('aac',)))
+            with self.assertRaises(ConversionError) as raised:
+                no_h264.convert_media(input_path, os.path.join(temp_dir, "out.mp4"), 'mp4')
+            self.assertIn('libx264', str(raised.exception))
+
+            no_palette = Converter(capabilities=capabilities(filters=('fps', 'scale')))
+            with self.assertRaises(ConversionError):
+                no_palette.convert_media(input_path, os.path.join(temp_dir, "out.gif"), 'gif')
+        mock_process.assert_not_called()
+
+    @patch('src.core.converter.FFmpegProcess')
+    @patch('src.core.converter.inspect_media')
+    def test_multi_output_and_ladder_targets_are_checked(self, mock_inspect, mock_process):
+        mock_inspect.return_value = {'duration': 10.0, 'video_stream': {'codec_name': 'vp9', 'height': 1080}, 'audio_stream': {'codec_name': 'opus'}, 'probe': {}}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "in.webm")
+            with open(input_path, 'wb') as f:
+                f.write(b"dummy")
+            targets = [{'output_file_path': os.path.join(temp_dir, "out.webm"), 'output_format': 'webm'},
+                       {'output_file_path': os.path.join(temp_dir, "out.mp4"), 'output_format': 'mp4'}]
+            no_h264 = Converter(capabilities=capabilities(encoders=('libvpx-vp9', 'libopus', 'aac')))
+            with self.assertRaises(ConversionError) as raised:
+                no_h264.convert_multi(input_path, targets)
+            self.assertIn('libx264', str(raised.exception))
+
+            with self.assertRaises(ConversionError) as raised:
+                no_h264.convert_abr(input_path, os.path.join(temp_dir, "abr"), ladder=[{'height': 720, 'video_bitrate': '2800k'}])
+            self.assertIn("hls", str(raised.exception)) # No muxer either
+            with_hls = Converter(capabilities=capabilities(encoders=('aac',), muxers=('hls',)))
+            with self.assertRaises(ConversionError) as raised:
+                with_hls.convert_abr(input_path, os.path.join(temp_dir, "abr"), ladder=[{'height': 720, 'video_bitrate': '2800k'}])
+            self.assertIn('libx264', str(raised.exception))
+        mock_process.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
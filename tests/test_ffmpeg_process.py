@@ -0,0 +1,75 @@
+import unittest
+from unittest.mock import patch
+import os
+import threading
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import FFmpegProcess, ConversionError, parse_progress_block
+from tests.helpers import fake_popen
+
+PROGRESS_OUTPUT = (
+    "frame=50\nfps=25.00\nstream_0_0_q=28.0\nbitrate= 645.0kbits/s\ntotal_size=442368\n"
+    "out_time_us=2000000\nout_time_ms=2000000\nout_time=00:00:02.000000\ndup_frames=0\ndrop_frames=0\n"
+    "speed=1.01x\nprogress=continue\n"
+    "frame=100\nfps=25.00\ntotal_size=884736\nout_time_us=4000000\nout_time=00:00:04.000000\n"
+    "speed=N/A\nprogress=end\n"
+)
+
+
+class TestFFmpegProcess(unittest.TestCase):
+    def test_parse_progress_block(self):
+        progress = parse_progress_block({'frame': '137', 'fps': '25.0', 'total_size': 'N/A', 'out_time_us': '5480000',
+                                         'out_time': '00:00:05.480000', 'speed': '1.01x', 'progress': 'continue'}, 10.96)
+        self.assertEqual(progress['frame'], 137)
+        self.assertEqual(progress['out_time_us'], 5480000)
+        self.assertIsNone(progress['total_size'])
+        self.assertAlmostEqual(progress['speed'], 1.01)
+        self.assertAlmostEqual(progress['percentage'], 50.0)
+        self.assertEqual(progress['time_str'], "00:00:05")
+
+    @patch('src.core.converter.subprocess.Popen')
+    def test_run_reports_structured_progress(self, mock_popen):
+        mock_popen.return_value = fake_popen(PROGRESS_OUTPUT)
+        updates = []
+
+        FFmpegProcess(['ffmpeg', '-i', 'in.mp4', 'out.mp4'], stats_period=2).run(progress_callback=updates.append, total_duration_seconds=4)
+
+        cmd = mock_popen.call_args.args[0]
+        self.assertEqual(cmd[:7], ['ffmpeg', '-nostdin', '-nostats', '-progress', 'pipe:1', '-stats_period', '2'])
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(updates[0]['total_size'], 442368)
+        self.assertAlmostEqual(updates[0]['bitrate_kbits'], 645.0)
+        self.assertAlmostEqual(updates[0]['percentage'], 50.0)
+        self.assertIsNone(updates[1]['speed'])
+        self.assertEqual(updates[1]['progress'], 'end')
+
+    @patch('src.core.converter.subprocess.Popen')
+    def test_error_keeps_only_stderr_tail(self, mock_popen):
+        stderr = "".join(f"line {i}\n" for i in range(1000))
+        mock_popen.return_value = fake_popen("", stderr, returncode=1)
+        process = FFmpegProcess(['ffmpeg', '-i', 'in.mp4', 'out.mp4'], stderr_tail_lines=3)
+
+        with self.assertRaisesRegex(ConversionError, "return code 1"):
+            process.run()
+        self.assertEqual(process.stderr_tail, "line 997\nline 998\nline 999\n")
+
+    @patch('src.core.converter.subprocess.Popen')
+    def test_stop_flag_kills_process(self, mock_popen):
+        popen = fake_popen(PROGRESS_OUTPUT, returncode=None)
+        popen.poll.return_value = None
+        mock_popen.return_value = popen
+        stop_flag = threading.Event()
+        stop_flag.set()
+
+        with self.assertRaisesRegex(ConversionError, "stopped by user"):
+            FFmpegProcess(['ffmpeg', '-i', 'in.mp4', 'out.mp4'], stop_flag=stop_flag).run()
+        popen.kill.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest.mock import patch
+import os
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.frame_grab import FrameGrabError, RawFrame, display_size, grab_frame, scaled_size
+from tests.helpers import fake_popen, media_info
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    import PIL
+except ImportError:
+    PIL = None
+
+MEDIA_INFO = media_info(acodec=None, duration=10.0, width=1920, height=1080)
+
+
+class TestFrameSizes(unittest.TestCase):
+    def test_scaled_size_keeps_aspect_ratio(self):
+        self.assertEqual(scaled_size(MEDIA_INFO, 240), (240, 136))
+        self.assertEqual(scaled_size({'video_stream': {}}, 160), (160, 90))
+
+    def test_rotation_swaps_display_size(self):
+        rotated = {'video_stream': {'width': 1920, 'height': 1080, 'side_data_list': [{'rotation': -90}]}}
+        self.assertEqual(display_size(rotated), (1080, 1920))
+        tagged = {'video_stream': {'width': 1920, 'height': 1080, 'tags': {'rotate': '180'}}}
+        self.assertEqual(display_size(tagged), (1920, 1080))
+
+
+class TestGrabFrame(unittest.TestCase):
+    @patch('src.core.frame_grab.subprocess.Popen')
+    def test_reads_exactly_one_raw_frame(self, mock_popen):
+        mock_popen.return_value = fake_popen(b"\x07" * (240 * 136 * 3) + b"extra")
+        frame = grab_frame("in.mp4", 5.0, 240, media_info=MEDIA_INFO)
+        self.assertEqual(frame.size, (240, 136))
+        self.assertEqual(len(frame.data), 240 * 136 * 3)
+        cmd = mock_popen.call_args[0][0]
+        self.assertEqual(cmd[cmd.index('-f') + 1], 'rawvideo')
+        self.assertEqual(cmd[cmd.index('-pix_fmt') + 1], 'rgb24')
+        self.assertEqual(cmd[cmd.index('-vf') + 1], 'scale=240:136')
+        self.assertNotIn('-skip_frame', cmd)
+
+    @patch('src.core.frame_grab.subprocess.Popen')
+    def test_keyframe_mode_and_pixel_format(self, mock_popen):
+        mock_popen.return_value = fake_popen(b"\x00" * (16 * 10))
+        frame = grab_frame("in.mp4", 1.0, 16, pixel_format='gray', accurate=False, media_info={'video_stream': {'width': 16, 'height': 10}})
+        cmd = mock_popen.call_args[0][0]
+        self.assertEqual(cmd[cmd.index('-skip_frame') + 1], 'nokey')
+        self.assertEqual(frame.pixel_format, 'gray')
+
+    @patch('src.core.frame_grab.subprocess.Popen')
+    def test_ffmpeg_failure_raises(self, mock_popen):
+        mock_popen.return_value = fake_popen(b"", returncode=1, stderr=b"Invalid data found")
+        with self.assertRaisesRegex(FrameGrabError, "Invalid data found"):
+            grab_frame("in.mp4", 1.0, media_info=MEDIA_INFO)
+
+    def test_no_video_stream_raises(self):
+        with self.assertRaises(FrameGrabError):
+            grab_frame("in.mp3", 1.0, media_info={'video_stream': None})
+
+    def test_buffer_size_is_checked(self):
+        with self.assertRaises(FrameGrabError):
+            RawFrame(b"\x00" * 5, 2, 1)
+
+
+class TestRawFrameViews(unittest.TestCase):
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_to_array_shares_the_buffer(self):
+        data = bytearray(range(12))
+        array = RawFrame(data, 2, 2).to_array()
+        self.assertEqual(array.shape, (2, 2, 3))
+        data[0] = 99
+        self.assertEqual(array[0, 0, 0], 99)
+
+    @unittest.skipIf(PIL is None, "Pillow is not installed")
+    def test_to_image(self):
+        image = RawFrame(bytes(range(12)), 2, 2).to_image()
+        self.assertEqual((image.mode, image.size), ('RGB', (2, 2)))
+        self.assertEqual(image.getpixel((1, 0)), (3, 4, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
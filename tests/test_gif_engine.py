@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import Converter
+from src.core.gif_engine import GifEngine
+from src.core.media_probe import ProbeCache
+from tests.helpers import FakeFFmpegProcess, media_info
+
+
+@patch('src.core.gif_engine.FFmpegProcess', FakeFFmpegProcess)
+class TestGifEngine(unittest.TestCase):
+    def setUp(self):
+        FakeFFmpegProcess.commands = []
+        self.temp_dir_obj = tempfile.TemporaryDirectory()
+        self.temp_dir = self.temp_dir_obj.name
+        self.input_path = os.path.join(self.temp_dir, "clip.mp4")
+        with open(self.input_path, 'wb') as f:
+            f.write(b"dummy")
+        self.engine = GifEngine(palette_dir=os.path.join(self.temp_dir, "palettes"), chunk_seconds=20.0, max_workers=2)
+
+    def tearDown(self):
+        self.temp_dir_obj.cleanup()
+
+    def commands_with(self, needle):
+        return [c for c in FakeFFmpegProcess.commands if any(needle in str(part) for part in c)]
+
+    @patch('src.core.gif_engine.inspect_media', return_value=media_info(acodec=None, width=1920, height=1080, duration=10.0))
+    def test_palette_is_reused_when_only_dither_changes(self, mock_inspect):
+        out = os.path.join(self.temp_dir, "out.gif")
+        self.engine.render(self.input_path, out, fps=10, scale_width=480, dither='sierra2_4a')
+        self.engine.render(self.input_path, out, fps=10, scale_width=480, dither='bayer')
+
+        self.assertEqual(len(self.commands_with('palettegen')), 1)
+        self.assertEqual(len(self.commands_with('paletteuse')), 2)
+        self.assertIn('dither=bayer', ' '.join(self.commands_with('paletteuse')[-1]))
+        self.assertEqual((self.engine.palette_hits, self.engine.palette_misses), (1, 1))
+
+    @patch('src.core.gif_engine.inspect_media', return_value=media_info(acodec=None, width=1920, height=1080, duration=10.0))
+    def test_trim_change_generates_new_palette(self, mock_inspect):
+        out = os.path.join(self.temp_dir, "out.gif")
+        self.engine.render(self.input_path, out, start_time="00:00:01", end_time="00:00:05")
+        self.engine.render(self.input_path, out, start_time="00:00:02", end_time="00:00:05")
+        self.assertEqual(len(self.commands_with('palettegen')), 2)
+
+    @patch('src.core.gif_engine.inspect_media', return_value=media_info(acodec=None, width=1920, height=1080, duration=65.0))
+    def test_long_clip_is_rendered_in_chunks(self, mock_inspect):
+        out = os.path.join(self.temp_dir, "long.gif")
+        updates = []
+        self.engine.render(self.input_path, out, progress_callback=updates.append)
+
+        self.assertEqual(len(self.commands_with('paletteuse')), 3)
+        palette_inputs = {c[c.index('-i', c.index('-i') + 1) + 1] for c in self.commands_with('paletteuse')}
+        self.assertEqual(len(palette_inputs), 1) # One shared global palette
+        concat_cmd = FakeFFmpegProcess.commands[-1]
+        self.assertIn('concat', concat_cmd)
+        self.assertEqual(concat_cmd[-1], out)
+        self.assertEqual(updates[-1]['status'], 'finished_conversion')
+        self.assertFalse([n for n in os.listdir(self.temp_dir) if n.startswith('.gif_chunks_')])
+
+    def test_width_is_limited_for_large_sources(self):
+        engine = GifEngine(palette_dir=self.temp_dir, max_width=1280, max_pixels=640 * 360)
+        self.assertEqual(engine.limit_width(480, media_info(acodec=None, width=1920, height=1080, duration=10.0)), 480)
+        self.assertEqual(engine.limit_width(4000, media_info(acodec=None, width=1920, height=1080, duration=10.0)), 640)
+        self.assertEqual(engine.limit_width(-1, media_info(acodec=None, width=1000, height=100)), 1000)
+
+
+class TestConverterUsesGifEngine(unittest.TestCase):
+    def test_convert_media_delegates_gif(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "in.mp4")
+            with open(input_path, 'wb') as f:
+                f.write(b"dummy")
+            converter = Converter(probe_cache=ProbeCache(db_path=None))
+            with patch.object(converter.get_gif_engine(), 'render') as mock_render:
+                converter.convert_media(input_path, os.path.join(temp_dir, "out.gif"), "gif", gif_fps=12, gif_scale_width=320)
+        self.assertEqual(mock_render.call_args.kwargs['fps'], 12)
+        self.assertEqual(mock_render.call_args.kwargs['scale_width'], 320)
+        self.assertEqual(converter.last_conversion['vcodec'], 'gif')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,288 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import socket
+import tempfile
+import sqlite3
+import threading
+import subprocess
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.job_queue import JobQueue, JobQueueError, JobRunner, JobContext, convert_for_job, run_download_job
+from src.core.downloader import DownloadError
+from src.core.cost_model import CostModel
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "jobs.sqlite3")
+        self.queue = JobQueue(self.db_path, lease_seconds=30)
+
+    def tearDown(self):
+        self.queue.close()
+        self.temp_dir.cleanup()
+
+    def test_claims_by_priority_then_submission_order(self):
+        low = self.queue.submit('convert', {'n': 1})
+        high = self.queue.submit('convert', {'n': 2}, priority=5)
+        self.queue.submit('download', {'n': 3})
+        self.assertEqual(self.queue.claim('w1')['id'], high)
+        job = self.queue.claim('w1', kinds=['convert'])
+        self.assertEqual((job['id'], job['state'], job['attempts'], job['payload']), (low, 'running', 1, {'n': 1}))
+        self.assertIsNone(self.queue.claim('w1', kinds=['convert']))
+
+    def test_jobs_survive_reopening(self):
+        ids = self.queue.submit_many([{'kind': 'download', 'payload': {'url': f"https://example.com/{i}"}} for i in range(50)])
+        self.queue.close()
+        self.queue = JobQueue(self.db_path)
+        self.assertEqual(self.queue.counts()['queued'], 50)
+        self.assertEqual(self.queue.get(ids[-1])['payload']['url'], "https://example.com/49")
+
+    def test_unserialisable_payload_is_rejected(self):
+        with self.assertRaises(JobQueueError):
+            self.queue.submit('convert', {'callback': print})
+
+    def test_expired_lease_is_reclaimed(self):
+        job_id = self.queue.submit('convert', {})
+        self.queue.claim('w1')
+        self.assertIsNone(self.queue.claim('w2'))
+        with patch('src.core.job_queue.time.time', return_value=self.queue.get(job_id)['lease_expires'] + 1):
+            job = self.queue.claim('w2')
+        self.assertEqual((job['id'], job['worker'], job['attempts']), (job_id, 'w2', 2))
+        self.assertFalse(self.queue.heartbeat(job_id, 'w1'))
+        self.assertFalse(self.queue.complete(job_id, 'w1'))
+        self.assertTrue(self.queue.complete(job_id, 'w2', {'output_file_path': 'out.mp4'}))
+        self.assertEqual(self.queue.get(job_id)['result'], {'output_file_path': 'out.mp4'})
+
+    def test_failures_retry_with_backoff_until_attempts_run_out(self):
+        job_id = self.queue.submit('convert', {}, max_attempts=2)
+        self.queue.claim('w1')
+        self.assertTrue(self.queue.fail(job_id, 'w1', "boom"))
+        self.assertIsNone(self.queue.claim('w1')) # Backing off
+        job = self.queue.get(job_id)
+        with patch('src.core.job_queue.time.time', return_value=job['not_before'] + 1):
+            self.queue.claim('w1')
+        self.assertFalse(self.queue.fail(job_id, 'w1', "boom again"))
+        job = self.queue.get(job_id)
+        self.assertEqual((job['state'], job['error']), ('failed', "boom again"))
+        self.assertTrue(self.queue.retry(job_id))
+        self.assertEqual(self.queue.get(job_id)['attempts'], 0)
+
+    def test_recover_requeues_jobs_of_dead_processes(self):
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        orphan = self.queue.submit('convert', {})
+        live = self.queue.submit('convert', {})
+        self.queue.claim(f"{socket.gethostname()}:{dead.pid}:runner-0")
+        self.queue.claim(JobQueue.make_worker_id())
+        if sys.platform != "win32":
+            self.assertEqual(JobQueue(self.db_path).recover(), 0) # Opening the queue already recovered it
+            self.assertEqual(self.queue.get(orphan)['state'], 'queued')
+        self.assertEqual(self.queue.get(live)['state'], 'running')
+
+    def test_cancel_and_release(self):
+        queued = self.queue.submit('convert', {})
+        running = self.queue.submit('convert', {})
+        self.assertTrue(self.queue.cancel(queued))
+        job = self.queue.claim('w1')
+        self.assertEqual(job['id'], running)
+        self.assertTrue(self.queue.release(running, 'w1'))
+        self.assertEqual(self.queue.get(running)['attempts'], 0)
+        self.assertEqual(self.queue.purge(), 1)
+
+
+class TestScheduling(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "jobs.sqlite3")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def claim_order(self, queue):
+        order = []
+        while True:
+            job = queue.claim('w1')
+            if job is None:
+                return order
+            order.append(job['payload']['n'])
+
+    def test_shortest_job_first_with_aging(self):
+        queue = JobQueue(self.db_path, policy='sjf')
+        queue.submit('convert', {'n': 'long'}, estimated_seconds=3600)
+        queue.submit('convert', {'n': 'short'}, estimated_seconds=5)
+        queue.submit('download', {'n': 'unknown'})
+        queue.submit('convert', {'n': 'urgent'}, estimated_seconds=900, priority=1)
+        self.assertEqual(self.claim_order(queue), ['urgent', 'unknown', 'short', 'long'])
+        queue.close()
+
+        queue = JobQueue(os.path.join(self.temp_dir.name, "aging.sqlite3"), policy='sjf')
+        queue.submit('convert', {'n': 'long'}, estimated_seconds=600)
+        with patch('src.core.job_queue.time.time', return_value=queue.get(1)['created_at'] + 1000): # The long job has waited long enough
+            queue.submit('convert', {'n': 'short'}, estimated_seconds=60)
+            self.assertEqual(self.claim_order(queue), ['long', 'short'])
+        queue.close()
+
+    def test_deadline_orders_by_least_slack(self):
+        queue = JobQueue(self.db_path, policy='deadline')
+        queue.submit('convert', {'n': 'none'}, estimated_seconds=1)
+        queue.submit('convert', {'n': 'late'}, estimated_seconds=10, deadline=1000)
+        queue.submit('convert', {'n': 'tight'}, estimated_seconds=900, deadline=1200) # 300 s of slack
+        self.assertEqual(self.claim_order(queue), ['tight', 'late', 'none'])
+        queue.close()
+
+    def test_unknown_policy_is_rejected(self):
+        with self.assertRaises(JobQueueError):
+            JobQueue(self.db_path, policy='random')
+
+    def test_old_queue_files_are_migrated(self):
+        db = sqlite3.connect(self.db_path)
+        db.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL, state TEXT NOT NULL,"
+                   " priority INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, worker TEXT,"
+                   " lease_expires REAL, not_before REAL NOT NULL DEFAULT 0, created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+                   " finished_at REAL, result TEXT, error TEXT)")
+        db.execute("INSERT INTO jobs (kind, payload, state, max_attempts, created_at, updated_at) VALUES ('convert', '{}', 'queued', 3, 0, 0)")
+        db.commit()
+        db.close()
+        queue = JobQueue(self.db_path, policy='sjf')
+        job = queue.claim('w1')
+        self.assertEqual((job['id'], job['estimated_seconds'], job['deadline']), (1, None, None))
+        queue.close()
+
+    def test_submit_convert_estimates_and_checks_disk_space(self):
+        queue = JobQueue(self.db_path, policy='sjf')
+        model = CostModel(db_path=None)
+        info = {'path': 'in.mkv', 'duration': 600.0, 'video_stream': {'codec_name': 'vp9', 'width': 3840, 'height': 2160},
+                'audio_stream': {'codec_name': 'opus'}, 'probe': {}}
+        payload = {'input_file_path': 'in.mkv', 'output_file_path': os.path.join(self.temp_dir.name, 'out', 'in.mp4'), 'output_format': 'mp4'}
+        with patch('src.core.cost_model.inspect_media', return_value=info):
+            with patch('src.core.job_queue.shutil.disk_usage') as mock_usage:
+                mock_usage.return_value.free = 10 * 2**30
+                job_id = queue.submit_convert(payload, cost_model=model)
+                job = queue.get(job_id)
+                self.assertGreater(job['estimated_seconds'], 0)
+                self.assertEqual(queue.reserved_bytes(), job['estimated_bytes'])
+                mock_usage.return_value.free = job['estimated_bytes'] * 2 # Not enough once the first job's output is counted
+                with self.assertRaises(JobQueueError):
+                    queue.submit_convert(payload, cost_model=model)
+                mock_usage.return_value.free = 0
+                queue.submit_convert(payload, cost_model=model, check_disk_space=False)
+        model.close()
+        queue.close()
+
+
+class TestJobRunner(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.temp_dir.name, "jobs.sqlite3"), lease_seconds=30)
+
+    def tearDown(self):
+        self.queue.close()
+        self.temp_dir.cleanup()
+
+    def test_run_until_empty(self):
+        events = []
+        def echo(context):
+            context.progress({'status': 'converting', 'percentage': 50.0})
+            if context.payload.get('fail'):
+                raise RuntimeError("bad input")
+            return {'echo': context.payload['n']}
+
+        ok = self.queue.submit('echo', {'n': 1})
+        bad = self.queue.submit('echo', {'fail': True}, max_attempts=1)
+        runner = JobRunner(self.queue, handlers={'echo': echo}, progress_callback=lambda job, data: events.append((job['id'], data['status'])))
+        self.assertEqual(runner.run_until_empty(), 2)
+        self.assertEqual(self.queue.get(ok)['result'], {'echo': 1})
+        self.assertEqual(self.queue.get(bad)['state'], 'failed')
+        self.assertIn((ok, 'converting'), events)
+        self.assertIn((ok, 'job_done'), events)
+        self.assertIn((bad, 'job_failed'), events)
+
+    def test_cancel_stops_the_running_job(self):
+        started, events = threading.Event(), []
+        def blocking(context):
+            stop = threading.Event()
+            context.on_stop(stop.set)
+            started.set()
+            stop.wait(5)
+            raise RuntimeError("stopped")
+
+        job_id = self.queue.submit('block', {})
+        runner = JobRunner(self.queue, handlers={'block': blocking}, poll_interval=0.05,
+                           progress_callback=lambda job, data: events.append(data['status']))
+        runner.start()
+        self.assertTrue(started.wait(5))
+        self.assertTrue(runner.cancel(job_id))
+        runner.stop()
+        self.assertEqual(self.queue.get(job_id)['state'], 'cancelled')
+        self.assertIn('job_cancelled', events)
+
+    def test_stop_hands_running_jobs_back(self):
+        started = threading.Event()
+        def blocking(context):
+            started.set()
+            context.stop_event.wait(5)
+            raise RuntimeError("stopped")
+
+        job_id = self.queue.submit('block', {})
+        runner = JobRunner(self.queue, handlers={'block': blocking}, poll_interval=0.05)
+        runner.start()
+        self.assertTrue(started.wait(5))
+        runner.stop()
+        job = self.queue.get(job_id)
+        self.assertEqual((job['state'], job['attempts']), ('queued', 0))
+
+    def test_run_until_empty_ignores_jobs_of_other_kinds(self):
+        foreign = self.queue.submit('download', {})
+        mine = self.queue.submit('echo', {})
+        runner = JobRunner(self.queue, handlers={'echo': lambda context: {}}, poll_interval=0.05, kinds=['echo'])
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(count=runner.run_until_empty()), daemon=True)
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(result['count'], 1)
+        self.assertEqual((self.queue.get(mine)['state'], self.queue.get(foreign)['state']), ('done', 'queued'))
+        self.assertEqual(self.queue.counts(kinds=['download'])['queued'], 1)
+
+    def test_runner_only_claims_its_kinds(self):
+        done = threading.Event()
+        def echo(context):
+            done.set()
+            return {}
+
+        echo_id, other_id = self.queue.submit('echo', {}), self.queue.submit('other', {})
+        runner = JobRunner(self.queue, handlers={'echo': echo, 'other': echo}, poll_interval=0.05, kinds=['echo'])
+        runner.start()
+        self.assertTrue(done.wait(5))
+        runner.stop()
+        self.assertEqual(self.queue.get(echo_id)['state'], 'done')
+        self.assertEqual(self.queue.get(other_id)['state'], 'queued')
+
+    def test_convert_for_job_hands_the_stop_event_to_the_converter(self):
+        job_id = self.queue.submit('convert', {'input_file_path': "in.mkv", 'output_file_path': "out.mp4", 'output_format': 'mp4'})
+        context = JobContext(self.queue.get(job_id))
+        converter = MagicMock()
+        converter.last_conversion = {'mode': 'cached'}
+        convert_for_job(converter, context)
+        self.assertIs(converter.convert_media.call_args.kwargs['stop_event'], context.stop_event)
+
+    def test_download_job_stopped_before_it_starts_downloads_nothing(self):
+        job_id = self.queue.submit('download', {'url': "https://example.com/image.png", 'download_path': self.temp_dir.name})
+        context = JobContext(self.queue.get(job_id))
+        context.stop_event.set()
+        with patch('src.core.downloader.requests.get') as mock_get, patch('src.core.downloader.yt_dlp.YoutubeDL') as mock_ydl:
+            with self.assertRaises(DownloadError):
+                run_download_job(context)
+        mock_get.assert_not_called()
+        mock_ydl.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
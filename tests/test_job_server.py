@@ -0,0 +1,165 @@
+import unittest
+import os
+import json
+import threading
+import http.client
+import urllib.error
+import urllib.request
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.job_server import JobServer, EventHub
+
+
+def fake_job(context):
+    """Reports progress like a conversion; 'hold' jobs wait until released or stopped."""
+    payload = context.payload
+    context.progress({'status': 'converting', 'percentage': 50.0})
+    if payload.get('hold'):
+        while not RELEASE.wait(0.05) and not context.stopped():
+            pass
+        if context.stopped():
+            raise RuntimeError("Conversion stopped by user.")
+    if 'bad' in payload['input_file_path']:
+        raise RuntimeError("Invalid data found when processing input")
+    context.progress({'status': 'finished_conversion', 'percentage': 100.0})
+    return {'output_file_path': payload['input_file_path'] + ".mp4"}
+
+
+RELEASE = threading.Event()
+
+
+class TestJobServer(unittest.TestCase):
+    def setUp(self):
+        RELEASE.clear()
+        self.server = JobServer(port=0, concurrency=2, queue_path=None, handlers={'download_convert': fake_job})
+        self.server.runner.poll_interval = 0.05
+        self.server.start()
+        self.host, self.port = self.server.address
+
+    def tearDown(self):
+        RELEASE.set()
+        self.server.stop()
+
+    def _request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.server.url + path, data=data, method=method, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def _events(self, path, count=None):
+        """Reads the events of an event stream until it ends (or `count` arrived)."""
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        connection.request('GET', path)
+        response = connection.getresponse()
+        self.assertEqual(response.getheader('Content-Type'), "text/event-stream")
+        events = []
+        for line in response:
+            if line.startswith(b"data: "):
+                events.append(json.loads(line[6:]))
+                if count and len(events) == count:
+                    break
+        connection.close()
+        return events
+
+    def test_submit_status_and_job_events(self):
+        status, body = self._request('POST', "/jobs", {'input_file_path': "/media/a.mkv", 'output_format': 'mp4', 'hold': True})
+        self.assertEqual(status, 201)
+        job_id = body['ids'][0]
+        stream = {}
+        reader = threading.Thread(target=lambda: stream.update(events=self._events(f"/jobs/{job_id}/events")))
+        reader.start()
+        threading.Event().wait(0.3)
+        RELEASE.set()
+        reader.join(10)
+
+        statuses = [event['status'] for event in stream['events']]
+        self.assertEqual(statuses[-2:], ['finished_conversion', 'job_done'])
+        self.assertTrue(all(event['job'] == job_id for event in stream['events']))
+        status, job = self._request('GET', f"/jobs/{job_id}")
+        self.assertEqual((status, job['state'], job['result']['output_file_path']), (200, 'done', "/media/a.mkv.mp4"))
+        self.assertEqual(job['progress']['status'], 'job_done')
+        # A finished job's stream replays its last update and ends.
+        self.assertEqual([event['status'] for event in self._events(f"/jobs/{job_id}/events")], ['job_done'])
+
+    def test_batch_failure_and_listing(self):
+        status, body = self._request('POST', "/jobs", [{'input_file_path': "/media/a.mkv"}, {'input_file_path': "/media/bad.mkv", 'priority': 5}])
+        self.assertEqual(status, 201)
+        bad_id = body['ids'][1]
+        events = self._events(f"/jobs/{bad_id}/events")
+        self.assertEqual(events[-1]['status'], 'job_failed')
+        self.assertIn("Invalid data", events[-1]['message'])
+        status, listing = self._request('GET', "/jobs?state=failed")
+        self.assertEqual([job['id'] for job in listing['jobs']], [bad_id])
+        self.assertEqual(listing['counts']['failed'], 1)
+
+    def test_cancel_running_and_queued_jobs(self):
+        _, body = self._request('POST', "/jobs", [{'input_file_path': f"/media/{i}.mkv", 'hold': True} for i in range(3)])
+        running, _, queued = body['ids']
+        threading.Event().wait(0.3) # Two run (concurrency 2), one waits
+        self.assertEqual(self._request('DELETE', f"/jobs/{queued}"), (200, {'id': queued, 'cancelled': True}))
+        self.assertEqual(self._request('POST', f"/jobs/{running}/cancel", {}), (200, {'id': running, 'cancelled': True}))
+        self.assertEqual(self._events(f"/jobs/{running}/events")[-1]['status'], 'job_cancelled')
+        self.assertEqual(self._request('GET', f"/jobs/{queued}")[1]['state'], 'cancelled')
+        self.assertEqual(self._request('GET', f"/jobs/{running}")[1]['state'], 'cancelled')
+
+    def test_all_events_stream(self):
+        stream = {}
+        reader = threading.Thread(target=lambda: stream.update(events=self._events("/events", count=4)))
+        reader.start()
+        threading.Event().wait(0.2)
+        self._request('POST', "/jobs", {'input_file_path': "/media/a.mkv"})
+        reader.join(10)
+        self.assertEqual([event['status'] for event in stream['events']], ['job_started', 'converting', 'finished_conversion', 'job_done'])
+
+    def test_bad_requests(self):
+        self.assertEqual(self._request('POST', "/jobs", {'output_format': 'mp4'})[0], 400)
+        self.assertEqual(self._request('POST', "/jobs", {'input_file_path': "a.mkv", 'priority': "high"})[0], 400)
+        self.assertEqual(self._request('GET', "/jobs/999")[0], 404)
+        self.assertEqual(self._request('DELETE', "/jobs/999")[0], 404)
+        self.assertEqual(self._request('GET', "/jobs?state=bogus")[0], 400)
+        self.assertEqual(self._request('GET', "/nothing")[0], 404)
+
+    def _raw(self, method, path, headers, body=None):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        connection.request(method, path, body=body, headers=headers)
+        status = connection.getresponse().status
+        connection.close()
+        return status
+
+    def test_requests_from_other_sites_are_refused(self):
+        job = json.dumps({'input_file_path': "/media/a.mkv"})
+        own = f"localhost:{self.port}"
+        self.assertEqual(self._raw('POST', "/jobs", {'Content-Type': "text/plain"}, job), 415)
+        self.assertEqual(self._raw('POST', "/jobs", {'Content-Type': "application/x-www-form-urlencoded"}, job), 415)
+        self.assertEqual(self._raw('GET', "/jobs", {'Host': f"attacker.example:{self.port}"}), 403) # DNS rebinding
+        self.assertEqual(self._raw('GET', "/jobs", {'Host': "localhost:1"}), 403)
+        self.assertEqual(self._raw('POST', "/jobs", {'Host': own, 'Origin': "http://attacker.example", 'Content-Type': "application/json"}, job), 403)
+        self.assertEqual(self._raw('DELETE', "/jobs/1", {'Origin': "null"}), 403)
+        self.assertEqual(self._request('GET', "/jobs")[1]['jobs'], []) # Nothing got through
+        self.assertEqual(self._raw('GET', "/jobs", {'Host': own, 'Origin': f"http://{own}"}), 200)
+        self.assertEqual(self._raw('POST', "/jobs", {'Host': own, 'Content-Type': "application/json; charset=utf-8"}, job), 201)
+
+
+class TestEventHub(unittest.TestCase):
+    def test_slow_subscriber_keeps_newest_updates(self):
+        hub = EventHub(buffer=3)
+        everything, one_job = hub.subscribe(), hub.subscribe(job_id=2)
+        for i in range(5):
+            hub.publish({'job': 1, 'n': i})
+        hub.publish({'job': 2, 'n': 5})
+        self.assertEqual([everything.get_nowait()['n'] for _ in range(3)], [3, 4, 5])
+        self.assertEqual(one_job.get_nowait()['n'], 5)
+        hub.close()
+        self.assertIsNone(one_job.get_nowait())
+
+
+if __name__ == '__main__':
+    unittest.main()
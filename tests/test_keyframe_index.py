@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.keyframe_index import KeyframeIndex, KeyframeIndexError, get_keyframe_index
+from src.core.media_probe import ProbeCache
+
+PACKETS = "0.000000,48,K__\n0.040000,9000,___\n2.000000,100048,K__\nN/A,120000,K__\n4.000000,200048,K_\n5.960000,290000,___\n"
+
+
+class TestKeyframeIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = KeyframeIndex.from_packet_lines(PACKETS.splitlines(), duration=6.0, file_size=300048)
+
+    def test_parses_keyframes_and_positions(self):
+        self.assertEqual(list(self.index.times), [0.0, 2.0, 4.0])
+        self.assertEqual(list(self.index.positions), [48, 100048, 200048])
+        self.assertEqual(self.index.packet_count, 5)
+
+    def test_snap(self):
+        self.assertEqual(self.index.snap(2.9, 'before'), 2.0)
+        self.assertEqual(self.index.snap(2.1, 'after'), 4.0)
+        self.assertEqual(self.index.snap(3.1), 4.0)
+        self.assertEqual(self.index.snap(5.0, 'after'), 4.0) # Past the last keyframe
+        self.assertEqual(self.index.gop_bounds(4.5), (4.0, 6.0))
+
+    def test_byte_offset_interpolates(self):
+        self.assertEqual(self.index.byte_offset(1.0), 50048)
+        self.assertEqual(self.index.byte_offset(5.0), 250048)
+
+    def test_times_are_relative_to_the_container_start(self):
+        # MPEG-TS: packets start at 1.4 s, and ffprobe prints the format's start_time last
+        lines = "1.400000,188,K__\n3.400000,94000,K__\n5.400000,188000,K__\n7.360000,280000,___\n1.400000\n".splitlines()
+        index = KeyframeIndex.from_packet_lines(lines, file_size=300000)
+        self.assertEqual([round(t, 6) for t in index.times], [0.0, 2.0, 4.0])
+        self.assertAlmostEqual(index.duration, 5.96)
+        self.assertEqual(index.snap(2.1, 'before'), index.times[1]) # What -ss 2.0 seeks to
+        self.assertEqual(list(KeyframeIndex.from_packet_lines(lines, start_time=0.0).times), [1.4, 3.4, 5.4])
+
+    def test_round_trips_through_bytes(self):
+        restored = KeyframeIndex.from_bytes(self.index.to_bytes())
+        self.assertEqual(list(restored.times), list(self.index.times))
+        self.assertEqual(list(restored.positions), list(self.index.positions))
+        self.assertEqual((restored.duration, restored.file_size), (6.0, 300048))
+        with self.assertRaises(KeyframeIndexError):
+            KeyframeIndex.from_bytes(b"garbage")
+
+    @patch('src.core.keyframe_index.subprocess.run')
+    def test_index_is_persisted_with_probe_data(self, mock_run):
+        mock_run.return_value = MagicMock(returncode=0, stdout=PACKETS, stderr="")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            media_path = os.path.join(temp_dir, "in.mp4")
+            with open(media_path, 'wb') as f:
+                f.write(b"dummy")
+            db_path = os.path.join(temp_dir, "cache.sqlite3")
+            cache = ProbeCache(db_path=db_path)
+            get_keyframe_index(media_path, cache=cache)
+            cache.close()
+
+            reopened = ProbeCache(db_path=db_path)
+            index = get_keyframe_index(media_path, cache=reopened)
+            reopened.close()
+
+        mock_run.assert_called_once()
+        self.assertEqual(list(index.times), [0.0, 2.0, 4.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
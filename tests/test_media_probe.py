@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sqlite3
+import tempfile
+import threading
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.media_probe import ProbeCache, inspect_media, inspect_media_async
+
+SAMPLE_PROBE = {
+    'streams': [
+        {'index': 0, 'codec_type': 'video', 'codec_name': 'h264', 'duration': '12.5'},
+        {'index': 1, 'codec_type': 'audio', 'codec_name': 'aac'},
+    ],
+    'format': {'duration': '12.6'},
+}
+
+
+class TestProbeCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir_obj = tempfile.TemporaryDirectory()
+        self.temp_dir = self.temp_dir_obj.name
+        self.db_path = os.path.join(self.temp_dir, "probe_cache.sqlite3")
+        self.media_path = os.path.join(self.temp_dir, "clip.mp4")
+        with open(self.media_path, 'wb') as f:
+            f.write(b"dummy mp4 data")
+
+    def tearDown(self):
+        self.temp_dir_obj.cleanup()
+
+    @patch('src.core.media_probe.ffmpeg.probe', return_value=SAMPLE_PROBE)
+    def test_probe_is_cached_in_memory(self, mock_probe):
+        cache = ProbeCache(db_path=None)
+        self.assertEqual(cache.probe(self.media_path), SAMPLE_PROBE)
+        self.assertEqual(cache.probe(self.media_path), SAMPLE_PROBE)
+        mock_probe.assert_called_once_with(self.media_path)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    @patch('src.core.media_probe.ffmpeg.probe', return_value=SAMPLE_PROBE)
+    def test_probe_survives_restart(self, mock_probe):
+        first = ProbeCache(db_path=self.db_path)
+        first.probe(self.media_path)
+        first.close()
+
+        second = ProbeCache(db_path=self.db_path)
+        self.assertEqual(second.probe(self.media_path), SAMPLE_PROBE)
+        second.close()
+        mock_probe.assert_called_once()
+
+    @patch('src.core.media_probe.ffmpeg.probe', return_value=SAMPLE_PROBE)
+    def test_invalidate_and_clear_survive_a_locked_database(self, mock_probe):
+        cache = ProbeCache(db_path=self.db_path)
+        cache.probe(self.media_path)
+        real_db, cache._db = cache._db, MagicMock()
+        cache._db.execute.side_effect = sqlite3.OperationalError("database is locked")
+        cache.invalidate(self.media_path) # Must not raise into the caller
+        cache.clear()
+        self.assertIsNone(cache.get(self.media_path)) # The in-memory entry is gone all the same
+        cache._db = real_db
+        cache.close()
+
+    @patch('src.core.media_probe.ffmpeg.probe', return_value=SAMPLE_PROBE)
+    def test_modified_file_is_probed_again(self, mock_probe):
+        cache = ProbeCache(db_path=self.db_path)
+        cache.probe(self.media_path)
+        with open(self.media_path, 'ab') as f:
+            f.write(b"more data")
+        cache.probe(self.media_path)
+        cache.close()
+        self.assertEqual(mock_probe.call_count, 2)
+
+    @patch('src.core.media_probe.ffmpeg.probe', return_value=SAMPLE_PROBE)
+    def test_lru_evicts_oldest_entry(self, mock_probe):
+        cache = ProbeCache(db_path=None, max_memory_entries=1)
+        other_path = os.path.join(self.temp_dir, "other.mp4")
+        with open(other_path, 'wb') as f:
+            f.write(b"other")
+        cache.probe(self.media_path)
+        cache.probe(other_path)
+        cache.probe(self.media_path)
+        self.assertEqual(mock_probe.call_count, 3)
+
+    @patch('src.core.media_probe.ffmpeg.probe', return_value=SAMPLE_PROBE)
+    def test_inspect_media_summary(self, mock_probe):
+        info = inspect_media(self.media_path, cache=ProbeCache(db_path=None))
+        self.assertEqual(info['duration'], 12.5)
+        self.assertEqual(info['video_stream']['codec_name'], 'h264')
+        self.assertEqual(info['audio_stream']['codec_name'], 'aac')
+
+    @patch('src.core.media_probe.ffmpeg.probe', side_effect=RuntimeError("ffprobe failed"))
+    def test_inspect_media_async_reports_errors(self, mock_probe):
+        done = threading.Event()
+        errors = []
+        inspect_media_async(self.media_path, lambda info: done.set(),
+                            lambda e: (errors.append(e), done.set()), cache=ProbeCache(db_path=None))
+        self.assertTrue(done.wait(5))
+        self.assertIsInstance(errors[0], RuntimeError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import Converter, ConversionError
+from src.core.multi_output import build_multi_output_command
+from src.core.media_probe import ProbeCache
+from tests.helpers import media_info
+
+
+TARGETS = [
+    {'output_file_path': 'out.mp4', 'output_format': 'mp4'},
+    {'output_file_path': 'out.mp3', 'output_format': 'mp3'},
+    {'output_file_path': 'out.gif', 'output_format': 'gif', 'gif_fps': 8, 'gif_scale_width': 320},
+]
+
+
+class TestMultiOutputCommand(unittest.TestCase):
+    def setUp(self):
+        self.converter = Converter(probe_cache=ProbeCache(db_path=None))
+
+    def test_single_input_with_split_branches(self):
+        cmd, plans = build_multi_output_command(self.converter, 'in.webm', TARGETS, media_info('vp9', 'opus', duration=100.0), preset='fast')
+
+        self.assertEqual(cmd.count('-i'), 1)
+        graph = cmd[cmd.index('-filter_complex') + 1]
+        self.assertIn("[0:v:0]split=2[v0][v2]", graph)
+        self.assertIn("[0:a:0]asplit=2[a0][a1]", graph)
+        self.assertIn("[v2]fps=8,scale=320:-1:flags=lanczos", graph)
+        self.assertEqual(cmd[-1], 'out.gif')
+        self.assertEqual([p['mode'] for p in plans], ['transcode', 'transcode', 'transcode'])
+        mp3_args = cmd[cmd.index('out.mp4') + 1:cmd.index('out.mp3')]
+        self.assertEqual(mp3_args, ['-map', '[a1]', '-c:a', 'libmp3lame', '-threads', '8'])
+
+    def test_copyable_streams_are_mapped_from_input(self):
+        cmd, plans = build_multi_output_command(self.converter, 'in.mp4', TARGETS[:2], media_info('h264', 'aac', duration=100.0))
+        self.assertIn('[0:a:0]asplit=1[a1]', cmd[cmd.index('-filter_complex') + 1])
+        mp4_args = cmd[cmd.index('in.mp4') + 1:cmd.index('out.mp4')]
+        self.assertIn('0:v:0', mp4_args)
+        self.assertIn('0:a:0', mp4_args)
+        self.assertEqual(plans[0]['mode'], 'remux')
+        self.assertEqual(plans[1]['acodec'], 'libmp3lame')
+
+    def test_missing_audio_for_mp3_is_rejected(self):
+        with self.assertRaises(ConversionError):
+            build_multi_output_command(self.converter, 'in.mp4', TARGETS[1:2], media_info('vp9', None, duration=100.0))
+
+
+class TestConvertMulti(unittest.TestCase):
+    @patch('src.core.converter.FFmpegProcess')
+    @patch('src.core.converter.inspect_media', return_value=media_info('vp9', 'opus', duration=100.0))
+    def test_progress_is_reported_per_output(self, mock_inspect, mock_process):
+        def fake_run(progress_callback=None, total_duration_seconds=0):
+            progress_callback({'status': 'converting', 'percentage': 40.0, 'progress': 'continue'})
+        mock_process.return_value.run.side_effect = fake_run
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "in.webm")
+            with open(input_path, 'wb') as f:
+                f.write(b"dummy")
+            targets = [dict(t, output_file_path=os.path.join(temp_dir, t['output_file_path'])) for t in TARGETS]
+            updates = []
+            result = Converter(probe_cache=ProbeCache(db_path=None)).convert_multi(input_path, targets, progress_callback=updates.append)
+
+        self.assertEqual(result, [t['output_file_path'] for t in targets])
+        outputs = updates[0]['outputs']
+        self.assertEqual([o['percentage'] for o in outputs], [40.0, 40.0, None])
+        self.assertEqual(updates[-1]['status'], 'finished_conversion')
+        self.assertEqual(updates[-1]['filenames'], result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+from unittest.mock import patch, ANY
+import os
+import threading
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.resource_governor import ResourceGovernor, is_copy_command, limit_threads, requested_threads
+from src.core.converter import FFmpegProcess
+from src.core.downloader import Downloader
+from tests.helpers import fake_popen
+
+
+class TestCommandHelpers(unittest.TestCase):
+    def test_requested_and_limited_threads(self):
+        cmd = ['ffmpeg', '-i', 'in.mp4', '-c:v', 'libx264', '-threads', '8', 'out.mp4']
+        self.assertEqual(requested_threads(cmd, 4), 8)
+        self.assertEqual(requested_threads(['ffmpeg', '-i', 'in.mp4', 'out.mp4'], 4), 4)
+        self.assertEqual(limit_threads(cmd, 2)[-3:], ['-threads', '2', 'out.mp4'])
+        self.assertEqual(limit_threads(['ffmpeg', '-i', 'in.mp4', 'out.mp4'], 2), ['ffmpeg', '-i', 'in.mp4', '-threads', '2', 'out.mp4'])
+
+    def test_threads_are_counted_per_output_and_encoder(self):
+        multi = ['ffmpeg', '-y', '-i', 'in.mkv', '-filter_complex', '[0:v:0]split=3[v0][v1][v2]']
+        for i, name in enumerate(['a.mp4', 'b.webm', 'c.mp4']):
+            multi += ['-map', f'[v{i}]', '-c:v', 'libx264', '-c:a', 'aac', '-threads', '4', name]
+        self.assertEqual(requested_threads(multi, 16), 12)
+        ladder = ['ffmpeg', '-i', 'in.mkv', '-filter_complex', 'split=3[v0][v1][v2]']
+        for i in range(3):
+            ladder += ['-map', f'[v{i}]', f'-c:v:{i}', 'libx264']
+        ladder += ['-map', '0:a:0', '-c:a', 'copy', '-threads', '8', '-f', 'hls', '-var_stream_map', 'v:0 v:1 v:2', 'out/stream_%v.m3u8']
+        self.assertEqual(requested_threads(ladder, 16), 24)
+        copy_and_encode = ['ffmpeg', '-i', 'in.mkv', '-c', 'copy', '-threads', '4', 'a.mkv', '-c:v', 'libx264', '-threads', '4', 'b.mp4']
+        self.assertEqual(requested_threads(copy_and_encode, 16), 4)
+
+    def test_limit_threads_shares_the_grant_and_covers_every_output(self):
+        cmd = limit_threads(['ffmpeg', '-y', '-i', 'in.mkv', '-map', '0', 'a.mp4', '-map', '0', '-threads', '0', 'b.mkv'], 4)
+        self.assertEqual(cmd, ['ffmpeg', '-y', '-i', 'in.mkv', '-map', '0', '-threads', '2', 'a.mp4', '-map', '0', '-threads', '2', 'b.mkv'])
+        self.assertLessEqual(requested_threads(cmd, 16), 4)
+        ladder = ['ffmpeg', '-i', 'in.mkv', '-c:v:0', 'libx264', '-c:v:1', 'libx264', '-threads', '8', 'out.m3u8']
+        self.assertEqual(requested_threads(limit_threads(ladder, 6), 16), 6)
+
+    def test_is_copy_command(self):
+        self.assertTrue(is_copy_command(['ffmpeg', '-i', 'in.mkv', '-c:v', 'copy', '-c:a', 'copy', 'out.mp4']))
+        self.assertFalse(is_copy_command(['ffmpeg', '-i', 'in.mkv', '-c:v', 'copy', '-c:a', 'aac', 'out.mp4']))
+        self.assertFalse(is_copy_command(['ffmpeg', '-i', 'in.mkv', '-c', 'copy', '-vf', 'scale=320:-2', 'out.mp4']))
+        self.assertFalse(is_copy_command(['ffmpeg', '-i', 'in.mkv', 'out.mp4']))
+
+
+class TestResourceGovernor(unittest.TestCase):
+    def test_grants_at_most_what_is_free(self):
+        governor = ResourceGovernor(total_threads=8)
+        self.assertEqual(governor.acquire_threads(6), 6)
+        self.assertEqual(governor.acquire_threads(6), 2)
+        self.assertEqual(governor.acquire_threads(1, timeout=0.01), 0)
+        governor.release_threads(6)
+        self.assertEqual(governor.acquire_threads(8, minimum=8, timeout=0.01), 0) # Only 6 free
+        self.assertEqual(governor.stats()['threads_in_use'], 2)
+
+    def test_waiters_wake_on_release(self):
+        governor = ResourceGovernor(total_threads=2, max_disk_jobs=1)
+        governor.acquire_threads(2)
+        self.assertTrue(governor.acquire_disk())
+        granted = []
+        waiter = threading.Thread(target=lambda: granted.append(governor.acquire_threads(2)))
+        waiter.start()
+        governor.release_threads(2)
+        waiter.join(5)
+        self.assertEqual(granted, [2])
+        self.assertFalse(governor.acquire_disk(timeout=0.01))
+        governor.release_disk()
+        governor.release_threads(2)
+        with governor.reserve(threads=1, disk=True):
+            self.assertEqual(governor.stats()['disk_jobs_in_use'], 1)
+        self.assertEqual(governor.stats()['disk_jobs_in_use'], 0)
+
+    @patch('src.core.resource_governor.os.sched_setaffinity', create=True)
+    @patch('src.core.resource_governor.os.setpriority', create=True)
+    @patch('src.core.resource_governor.os.getpriority', return_value=0, create=True)
+    def test_apply_to_process(self, _, mock_setpriority, mock_setaffinity):
+        ResourceGovernor(nice=10, cpu_affinity=[0, 1]).apply_to_process(4321)
+        mock_setpriority.assert_called_once_with(ANY, 4321, 10)
+        mock_setaffinity.assert_called_once_with(4321, {0, 1})
+
+
+class TestGovernedLaunches(unittest.TestCase):
+    @patch('src.core.converter.subprocess.Popen')
+    def test_ffmpeg_threads_are_capped_and_returned(self, mock_popen):
+        governor = ResourceGovernor(total_threads=4)
+        governor.acquire_threads(3) # Another job holds most of the machine
+        mock_popen.return_value = fake_popen()
+        FFmpegProcess(['ffmpeg', '-i', 'in.mp4', '-c:v', 'libx264', '-threads', '8', 'out.mp4'], governor=governor).run()
+        cmd = mock_popen.call_args[0][0]
+        self.assertEqual(cmd[cmd.index('-threads') + 1], '1')
+        self.assertEqual(governor.stats()['threads_in_use'], 3)
+
+    @patch('src.core.converter.subprocess.Popen')
+    def test_copy_commands_take_a_disk_slot(self, mock_popen):
+        governor = ResourceGovernor(total_threads=4, max_disk_jobs=1)
+        seen = []
+        def popen(*args, **kwargs):
+            seen.append(governor.stats())
+            return fake_popen()
+        mock_popen.side_effect = popen
+        with patch.object(governor, 'apply_to_process') as mock_apply:
+            FFmpegProcess(['ffmpeg', '-i', 'in.mkv', '-c', 'copy', 'out.mp4'], governor=governor).run()
+        mock_apply.assert_called_once_with(4321)
+        self.assertEqual((seen[0]['disk_jobs_in_use'], seen[0]['threads_in_use']), (1, 1))
+        self.assertEqual(governor.stats()['disk_jobs_in_use'], 0)
+
+    def test_downloader_postprocessors_hold_a_slot(self):
+        governor = ResourceGovernor(total_threads=2, max_disk_jobs=1)
+        downloader = Downloader(governor=governor)
+        downloader._postprocessor_hook({'status': 'started', 'postprocessor': 'Merger'})
+        self.assertEqual(governor.stats()['disk_jobs_in_use'], 1)
+        downloader._postprocessor_hook({'status': 'started', 'postprocessor': 'MoveFiles'}) # Not ffmpeg
+        downloader._postprocessor_hook({'status': 'finished', 'postprocessor': 'Merger'})
+        self.assertEqual(governor.stats(), {'total_threads': 2, 'threads_in_use': 0, 'max_disk_jobs': 1, 'disk_jobs_in_use': 0, 'waiting': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from unittest.mock import patch
+import os
+import shutil
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import Converter
+from src.core.result_cache import ResultCache, canonical_plan
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ResultCache(cache_dir=os.path.join(self.temp_dir, "cache"), max_bytes=1000)
+        self.input_path = self._write("in.mp4", b"source bytes")
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, data):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_canonical_plan_ignores_paths_and_threads(self):
+        a = canonical_plan(['ffmpeg', '-i', 'in.mp4', '-threads', '8', '-y', 'a.mp4'], 'in.mp4', 'a.mp4')
+        b = canonical_plan(['/usr/bin/ffmpeg', '-i', 'in.mp4', '-threads', '2', 'b.mp4'], 'in.mp4', 'b.mp4')
+        self.assertEqual(a, b)
+        self.assertEqual(a, ['-i', '{input}', '{output}.mp4'])
+        self.assertNotEqual(a, canonical_plan(['ffmpeg', '-i', 'in.mp4', 'a.mov'], 'in.mp4', 'a.mov'))
+
+    def test_key_depends_on_content_and_plan(self):
+        cmd = ['ffmpeg', '-i', self.input_path, '-c:v', 'libx264', 'out.mp4']
+        key = self.cache.make_key(self.input_path, cmd, 'out.mp4')
+        copy_path = self._write("copy.mp4", b"source bytes")
+        self.assertEqual(key, self.cache.make_key(copy_path, ['ffmpeg', '-i', copy_path, '-c:v', 'libx264', 'other.mp4'], 'other.mp4'))
+        self.assertNotEqual(key, self.cache.make_key(self.input_path, cmd[:-1] + ['-crf', '20', 'out.mp4'], 'out.mp4'))
+        self._write("copy.mp4", b"changed bytes")
+        self.assertNotEqual(key, self.cache.make_key(copy_path, ['ffmpeg', '-i', copy_path, '-c:v', 'libx264', 'other.mp4'], 'other.mp4'))
+
+    def test_store_fetch_and_stats(self):
+        output_path = self._write("out.mp4", b"encoded")
+        self.assertIsNone(self.cache.fetch("k1", output_path))
+        self.cache.store("k1", output_path)
+
+        second_path = os.path.join(self.temp_dir, "out_1.mp4")
+        self.assertIn(self.cache.fetch("k1", second_path), ('reflink', 'hardlink', 'copy'))
+        with open(second_path, 'rb') as f:
+            self.assertEqual(f.read(), b"encoded")
+        stats = self.cache.stats()
+        self.assertEqual((stats['entries'], stats['total_bytes'], stats['hits'], stats['misses']), (1, 7, 1, 1))
+
+    def test_lru_eviction(self):
+        for name in ("a", "b", "c"):
+            self.cache.store(name, self._write(f"{name}.mp4", b"x" * 400))
+        self.assertIsNone(self.cache.fetch("a", os.path.join(self.temp_dir, "a_1.mp4")))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertIsNotNone(self.cache.fetch("c", os.path.join(self.temp_dir, "c_1.mp4")))
+
+    @patch('src.core.converter.FFmpegProcess')
+    @patch('src.core.converter.inspect_media', return_value={'duration': 10.0, 'video_stream': {'codec_name': 'vp9'}, 'audio_stream': None, 'probe': {}})
+    def test_converter_skips_ffmpeg_on_hit(self, mock_inspect, mock_process):
+        def fake_run(progress_callback=None, total_duration_seconds=0):
+            with open(mock_process.call_args.args[0][-1], 'wb') as f:
+                f.write(b"encoded")
+        mock_process.return_value.run.side_effect = fake_run
+        converter = Converter(result_cache=self.cache)
+
+        converter.convert_media(self.input_path, os.path.join(self.temp_dir, "out.mp4"), "mp4")
+        updates = []
+        second = converter.convert_media(self.input_path, os.path.join(self.temp_dir, "out_1.mp4"), "mp4", threads=2, progress_callback=updates.append)
+
+        self.assertEqual(mock_process.call_count, 1)
+        self.assertTrue(os.path.exists(second))
+        self.assertEqual(updates[-1]['mode'], 'cached')
+        self.assertEqual(converter.last_conversion['mode'], 'cached')
+
+    @patch('src.core.converter.FFmpegProcess')
+    @patch('src.core.converter.inspect_media', return_value={'duration': 10.0, 'video_stream': {'codec_name': 'h264'}, 'audio_stream': None, 'probe': {}})
+    def test_same_streams_in_another_container_are_cached_separately(self, mock_inspect, mock_process):
+        def fake_run(progress_callback=None, total_duration_seconds=0):
+            output_path = mock_process.call_args.args[0][-1]
+            with open(output_path, 'wb') as f:
+                f.write(output_path[-3:].encode())
+        mock_process.return_value.run.side_effect = fake_run
+        converter = Converter(result_cache=self.cache)
+
+        converter.convert_media(self.input_path, os.path.join(self.temp_dir, "out.mp4"), "mp4")
+        mov_path = converter.convert_media(self.input_path, os.path.join(self.temp_dir, "out.mov"), "mov")
+
+        self.assertEqual(mock_process.call_count, 2)
+        self.assertEqual(self.cache.stats()['entries'], 2)
+        with open(mov_path, 'rb') as f:
+            self.assertEqual(f.read(), b"mov")
+
+
+if __name__ == '__main__':
+    unittest.main()
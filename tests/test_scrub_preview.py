@@ -0,0 +1,109 @@
+import unittest
+from unittest.mock import patch
+import os
+import threading
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.scrub_preview import ScrubPreviewEngine, ScrubPreviewError, SpriteSheet
+from src.core.frame_grab import RawFrame
+from tests.helpers import fake_popen, media_info
+
+MEDIA_INFO = media_info(acodec=None, duration=100.0, width=640, height=360)
+
+
+def make_sheet_bytes(columns, rows, tile_width, tile_height):
+    """Sheet whose every pixel of tile i holds the byte value i."""
+    rows_data = []
+    for row in range(rows):
+        line = b"".join(bytes([row * columns + column]) * (tile_width * 3) for column in range(columns))
+        rows_data.append(line * tile_height)
+    return b"".join(rows_data)
+
+
+class TestSpriteSheet(unittest.TestCase):
+    def test_tile_crops_the_right_cell(self):
+        sheet = SpriteSheet(make_sheet_bytes(3, 2, 4, 2), 3, 2, 4, 2, duration=60.0)
+        self.assertEqual(bytes(sheet.tile(4).data), bytes([4]) * (4 * 2 * 3))
+        self.assertEqual(sheet.tile_index(0.0), 0)
+        self.assertEqual(sheet.tile_index(35.0), 3)
+        self.assertEqual(sheet.tile_index(999.0), 5)
+
+
+class TestScrubPreviewEngine(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.temp_dir.name, "input.mp4")
+        with open(self.input_path, 'wb') as f:
+            f.write(b"video")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @patch('src.core.scrub_preview.inspect_media', return_value=MEDIA_INFO)
+    @patch('src.core.frame_grab.subprocess.Popen')
+    def test_prepare_renders_one_sheet_and_serves_from_memory(self, mock_popen, _):
+        engine = ScrubPreviewEngine(columns=2, rows=2, tile_width=32)
+        mock_popen.return_value = fake_popen(make_sheet_bytes(2, 2, 32, 18))
+        self.assertIsNone(engine.preview(self.input_path, 10.0))
+
+        engine.prepare(self.input_path)
+        engine.prepare(self.input_path) # Cached
+        self.assertEqual(mock_popen.call_count, 1)
+        cmd = mock_popen.call_args[0][0]
+        self.assertIn('fps=4/100.000000,scale=32:18,tile=2x2', cmd)
+        self.assertEqual(cmd[cmd.index('-skip_frame') + 1], 'nokey')
+
+        frame = engine.preview(self.input_path, 80.0)
+        self.assertEqual(frame.size, (32, 18))
+        self.assertEqual(bytes(frame.data), bytes([3]) * (32 * 18 * 3))
+        self.assertEqual(mock_popen.call_count, 1)
+
+    @patch('src.core.scrub_preview.inspect_media', return_value=MEDIA_INFO)
+    @patch('src.core.frame_grab.subprocess.Popen')
+    def test_short_output_raises(self, mock_popen, _):
+        mock_popen.return_value = fake_popen(b"\x00" * 10)
+        with self.assertRaises(ScrubPreviewError):
+            ScrubPreviewEngine(columns=2, rows=2, tile_width=16).prepare(self.input_path)
+
+    def test_cache_is_bounded_by_bytes(self):
+        engine = ScrubPreviewEngine(max_cache_bytes=250)
+        for index in range(3):
+            engine._remember(('file', index), SpriteSheet(b"\x00" * 100, 1, 1, 1, 1, 1.0))
+        self.assertEqual(list(engine._sheets), [('file', 1), ('file', 2)])
+        self.assertEqual(engine._cache_bytes, 200)
+
+    def test_latest_exact_request_wins(self):
+        engine = ScrubPreviewEngine()
+        release = threading.Event()
+        started = threading.Event()
+        delivered, done = [], threading.Event()
+
+        def grab_frame(path, seconds, width, process_holder=None):
+            if seconds == 1.0: # The first request is still decoding while newer ones arrive
+                started.set()
+                release.wait(5)
+            return RawFrame(bytes([int(seconds)]) * 3, 1, 1)
+
+        def callback(frame):
+            delivered.append(frame.data[0])
+            done.set()
+
+        with patch.object(engine, 'grab_frame', side_effect=grab_frame):
+            engine.request_exact(self.input_path, 1.0, callback)
+            self.assertTrue(started.wait(5))
+            engine.request_exact(self.input_path, 2.0, callback)
+            engine.request_exact(self.input_path, 3.0, callback)
+            release.set()
+            self.assertTrue(done.wait(5))
+            engine._worker.join(0.2)
+        self.assertEqual(delivered, [3])
+
+
+if __name__ == '__main__':
+    unittest.main()
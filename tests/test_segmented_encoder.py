@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import ConversionError
+from src.core.segmented_encoder import SegmentedEncoder, choose_split_points
+from src.core.keyframe_index import KeyframeIndex
+from tests.helpers import FakeFFmpegProcess, media_info
+
+
+class FakeSegmentProcess(FakeFFmpegProcess):
+    source_duration = 600.0
+
+
+class TestSplitPoints(unittest.TestCase):
+    def test_split_points_snap_to_nearest_keyframe(self):
+        keyframes = [0.0, 95.0, 190.0, 310.0, 402.0, 500.0, 599.0]
+        self.assertEqual(choose_split_points(keyframes, 600.0, 3), [190.0, 402.0])
+
+    def test_duplicate_keyframes_are_dropped(self):
+        self.assertEqual(choose_split_points([0.0, 300.0], 600.0, 4), [300.0])
+
+
+class TestSegmentedEncoder(unittest.TestCase):
+    def setUp(self):
+        FakeFFmpegProcess.commands = []
+        self.temp_dir_obj = tempfile.TemporaryDirectory()
+        self.temp_dir = self.temp_dir_obj.name
+        self.input_path = os.path.join(self.temp_dir, "long.mkv")
+        with open(self.input_path, 'wb') as f:
+            f.write(b"dummy")
+        self.output_path = os.path.join(self.temp_dir, "out", "long.webm")
+
+    def tearDown(self):
+        self.temp_dir_obj.cleanup()
+
+    @patch('src.core.segmented_encoder.FFmpegProcess', FakeSegmentProcess)
+    @patch('src.core.segmented_encoder.get_keyframe_index', return_value=KeyframeIndex([float(t) for t in range(0, 600, 10)], [0] * 60))
+    @patch('src.core.segmented_encoder.inspect_media', return_value=media_info('h264', 'aac', duration=600.0))
+    def test_segments_are_encoded_and_concatenated(self, mock_inspect, mock_keyframes):
+        updates = []
+        encoder = SegmentedEncoder(max_workers=4, threads_per_segment=2)
+        result = encoder.encode(self.input_path, self.output_path, 'webm', preset='fast', progress_callback=updates.append)
+
+        self.assertEqual(result, self.output_path)
+        segment_cmds = [c for c in FakeFFmpegProcess.commands if '-ss' in c]
+        self.assertEqual(len(segment_cmds), 4)
+        self.assertEqual(sorted(c[c.index('-ss') + 1] for c in segment_cmds), ['0.000000', '150.000000', '300.000000', '450.000000'])
+        self.assertTrue(all(c[c.index('-c:v') + 1] == 'libvpx-vp9' and c[c.index('-threads') + 1] == '2' for c in segment_cmds))
+        concat_cmd = FakeFFmpegProcess.commands[-1]
+        self.assertIn('concat', concat_cmd)
+        self.assertEqual(concat_cmd[concat_cmd.index('-c') + 1], 'copy')
+        self.assertEqual(concat_cmd[-1], self.output_path)
+        self.assertAlmostEqual(max(u['percentage'] for u in updates if u['status'] == 'converting'), 100.0)
+        self.assertEqual(updates[-1]['status'], 'finished_conversion')
+        self.assertEqual(os.listdir(os.path.dirname(self.output_path)), ["long.webm"]) # Work dir cleaned up
+
+    @patch('src.core.segmented_encoder.FFmpegProcess', FakeSegmentProcess)
+    @patch('src.core.segmented_encoder.get_keyframe_index', return_value=KeyframeIndex([0.0, 300.0], [0] * 2))
+    @patch('src.core.segmented_encoder.inspect_media', return_value=media_info('vp9', 'opus', duration=600.0))
+    def test_auto_preset_is_resolved_before_segments_are_built(self, mock_inspect, mock_keyframes):
+        encoder = SegmentedEncoder(max_workers=2)
+        with patch.object(encoder.converter, 'get_auto_tuner') as mock_tuner:
+            mock_tuner.return_value.tune.return_value = {'preset': 'veryfast', 'threads': 8}
+            encoder.encode(self.input_path, self.output_path, 'mp4', preset='auto')
+            mock_tuner.return_value.tune.side_effect = RuntimeError("no trial")
+            encoder.encode(self.input_path, self.output_path, 'mp4', preset='auto')
+        presets = [c[c.index('-preset') + 1] for c in FakeFFmpegProcess.commands if '-ss' in c]
+        self.assertEqual(presets, ['veryfast', 'veryfast', 'ultrafast', 'ultrafast'])
+
+    @patch('src.core.segmented_encoder.inspect_media', return_value=media_info('h264', 'aac', duration=40.0))
+    def test_short_input_is_delegated_to_convert_media(self, mock_inspect):
+        encoder = SegmentedEncoder(max_workers=4)
+        with patch.object(encoder.converter, 'convert_media', return_value=self.output_path) as mock_convert:
+            encoder.encode(self.input_path, self.output_path, 'webm')
+        mock_convert.assert_called_once()
+
+    @patch('src.core.segmented_encoder.get_keyframe_index', return_value=KeyframeIndex([0.0, 150.0, 300.0, 450.0], [0] * 4))
+    @patch('src.core.segmented_encoder.inspect_media', return_value=media_info('vp9', None, duration=600.0))
+    def test_failed_segment_raises_conversion_error(self, mock_inspect, mock_keyframes):
+        class FailingProcess(FakeSegmentProcess):
+            def run(self, progress_callback=None, total_duration_seconds=0):
+                if self.cmd[self.cmd.index('-ss') + 1] == '300.000000':
+                    raise ConversionError("ffmpeg error (return code 1): boom")
+
+        with patch('src.core.segmented_encoder.FFmpegProcess', FailingProcess):
+            with self.assertRaisesRegex(ConversionError, "boom"):
+                SegmentedEncoder(max_workers=4).encode(self.input_path, self.output_path, 'mp4')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import Converter
+from src.core.smart_cut import SmartCutter, plan_smart_cut
+from src.core.keyframe_index import KeyframeIndex
+from src.core.media_probe import ProbeCache
+from tests.helpers import media_info
+
+KEYFRAMES = [0.0, 2.0, 4.0, 6.0, 8.0, 10.0]
+
+
+class TestPlanSmartCut(unittest.TestCase):
+    def test_boundary_gops_are_encoded(self):
+        self.assertEqual(plan_smart_cut(KEYFRAMES, 1.5, 9.0), [('encode', 1.5, 2.0), ('copy', 2.0, 8.0), ('encode', 8.0, 9.0)])
+
+    def test_keyframe_aligned_cut_is_all_copy(self):
+        self.assertEqual(plan_smart_cut(KEYFRAMES, 2.0, 8.0), [('copy', 2.0, 8.0)])
+
+    def test_clip_inside_one_gop_is_encoded(self):
+        self.assertEqual(plan_smart_cut(KEYFRAMES, 2.5, 3.5), [('encode', 2.5, 3.5)])
+
+
+class TestSmartCutter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.temp_dir.name, "in.mp4")
+        with open(self.input_path, 'wb') as f:
+            f.write(b"dummy")
+        self.output_path = os.path.join(self.temp_dir.name, "clip.mp4")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @patch('src.core.smart_cut.FFmpegProcess')
+    @patch('src.core.smart_cut.get_keyframe_index', return_value=KeyframeIndex(KEYFRAMES, [0] * len(KEYFRAMES)))
+    @patch('src.core.smart_cut.inspect_media', return_value=media_info(duration=12.0, pix_fmt='yuv420p', profile='High'))
+    def test_cut_encodes_edges_and_copies_middle(self, mock_inspect, mock_keyframes, mock_process):
+        updates = []
+        SmartCutter(probe_cache=ProbeCache(db_path=None)).cut(self.input_path, self.output_path, "mp4", start_time="00:00:01.5", end_time="00:00:09",
+                          preset="fast", progress_callback=updates.append)
+
+        cmds = [call.args[0] for call in mock_process.call_args_list]
+        self.assertEqual(len(cmds), 4)
+        self.assertIn('libx264', cmds[0])
+        self.assertIn('high', cmds[0])
+        self.assertEqual(cmds[1][cmds[1].index('-c:v') + 1], 'copy')
+        self.assertIn('libx264', cmds[2])
+        join = cmds[3]
+        self.assertEqual(join[join.index('-f') + 1], 'concat')
+        self.assertEqual(join[join.index('-c:a') + 1], 'aac')
+        self.assertEqual(join[-1], self.output_path)
+        self.assertEqual(updates[-1]['mode'], 'smart_cut')
+        self.assertAlmostEqual(updates[-1]['encoded_seconds'], 1.5)
+
+    @patch('src.core.smart_cut.get_keyframe_index')
+    @patch('src.core.smart_cut.inspect_media', return_value=media_info('vp9', duration=12.0, pix_fmt='yuv420p', profile='High'))
+    def test_uncopyable_source_falls_back_to_convert_media(self, mock_inspect, mock_keyframes):
+        cutter = SmartCutter(probe_cache=ProbeCache(db_path=None))
+        with patch.object(cutter.converter, 'convert_media', return_value=self.output_path) as mock_convert:
+            cutter.cut(self.input_path, self.output_path, "mp4", start_time="00:00:01", end_time="00:00:09")
+        mock_keyframes.assert_not_called()
+        self.assertEqual(mock_convert.call_args.kwargs['start_time'], "00:00:01")
+
+    def test_convert_media_delegates_trims_when_enabled(self):
+        converter = Converter(probe_cache=ProbeCache(db_path=None))
+        with patch('src.core.smart_cut.SmartCutter.cut', return_value=self.output_path) as mock_cut:
+            converter.convert_media(self.input_path, self.output_path, "mp4", start_time="00:00:01", smart_cut=True)
+        self.assertEqual(mock_cut.call_args.kwargs['start_time'], "00:00:01")
+
+
+if __name__ == '__main__':
+    unittest.main()
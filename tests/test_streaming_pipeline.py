@@ -0,0 +1,148 @@
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+
+import sys
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.converter import Converter, FFmpegProcess
+from src.core.downloader import DownloadError
+from src.core.streaming_pipeline import StreamingPipeline, media_info_from_format
+from src.core.media_probe import ProbeCache
+from tests.helpers import fake_popen
+
+FORMAT_INFO = {'url': 'https://cdn.example.com/v.webm', 'protocol': 'https', 'ext': 'webm', 'title': 'clip',
+               'vcodec': 'vp09.00.40.08', 'acodec': 'opus', 'duration': 12.0, 'http_headers': {'User-Agent': 'x'}}
+
+
+class FakeResponse:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.headers = {'content-length': str(sum(len(c) for c in chunks))}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=None):
+        return iter(self.chunks)
+
+
+class TestFFmpegProcessStdin(unittest.TestCase):
+    @patch('src.core.converter.subprocess.Popen')
+    def test_stdin_source_is_written_to_ffmpeg(self, mock_popen):
+        process = fake_popen()
+        mock_popen.return_value = process
+
+        FFmpegProcess(['ffmpeg', '-i', 'pipe:0', 'out.mkv'], stdin_source=[b"abc", b"def"]).run()
+
+        self.assertNotIn('-nostdin', mock_popen.call_args.args[0])
+        self.assertEqual(process.stdin.buffer.getvalue(), b"abcdef")
+
+    @patch('src.core.converter.subprocess.Popen')
+    def test_source_error_kills_ffmpeg_and_is_raised(self, mock_popen):
+        process = fake_popen()
+        process.poll.return_value = None # Still running when the source fails
+        mock_popen.return_value = process
+
+        def source():
+            yield b"abc"
+            raise DownloadError("Download stopped by user.")
+
+        with self.assertRaises(DownloadError):
+            FFmpegProcess(['ffmpeg', '-i', 'pipe:0', 'out.mkv'], stdin_source=source()).run()
+        process.kill.assert_called()
+
+
+class TestStreamingPipeline(unittest.TestCase):
+    def test_media_info_from_format_allows_stream_copy(self):
+        media_info = media_info_from_format({'vcodec': 'avc1.64001F', 'acodec': 'mp4a.40.2', 'duration': 5})
+        self.assertEqual(media_info['video_stream']['codec_name'], 'h264')
+        self.assertEqual(media_info['audio_stream']['codec_name'], 'aac')
+        self.assertEqual(Converter(probe_cache=ProbeCache(db_path=None)).plan_streams(media_info, 'mp4')['mode'], 'remux')
+        self.assertIsNone(media_info_from_format({'vcodec': 'none', 'acodec': 'opus'})['video_stream'])
+
+    @patch('src.core.streaming_pipeline.requests.get', return_value=FakeResponse([b"abc", b"", b"def"]))
+    @patch('src.core.streaming_pipeline.FFmpegProcess')
+    def test_run_pipes_download_into_ffmpeg(self, mock_process, mock_get):
+        fed = []
+        def fake_run(progress_callback=None, total_duration_seconds=0):
+            fed.extend(mock_process.call_args.kwargs['stdin_source'])
+            progress_callback({'status': 'converting', 'percentage': 100.0})
+        mock_process.return_value.run.side_effect = fake_run
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, "clip.webm")
+            keep_path = os.path.join(temp_dir, "original.webm")
+            updates = []
+            result = StreamingPipeline(converter=Converter(probe_cache=ProbeCache(db_path=None))).run("https://example.com/watch", output_path, "webm", keep_download_path=keep_path,
+                                             progress_callback=updates.append, info=dict(FORMAT_INFO))
+            with open(keep_path, 'rb') as f:
+                kept = f.read()
+
+        self.assertEqual(result, output_path)
+        self.assertEqual(fed, [b"abc", b"def"])
+        self.assertEqual(kept, b"abcdef")
+        cmd = mock_process.call_args.args[0]
+        self.assertEqual(cmd[cmd.index('-i') + 1], 'pipe:0')
+        self.assertEqual(updates[0]['downloaded_bytes'], 6)
+        self.assertEqual(updates[-1]['mode'], 'remux')
+        self.assertTrue(updates[-1]['streamed'])
+
+    @patch('src.core.streaming_pipeline.FFmpegProcess')
+    def test_failed_download_removes_truncated_output(self, mock_process):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_path = os.path.join(temp_dir, "clip.webm")
+            def fake_run(progress_callback=None, total_duration_seconds=0):
+                with open(output_path, 'wb') as f:
+                    f.write(b"partial")
+                raise DownloadError("Error downloading stream: connection reset")
+            mock_process.return_value.run.side_effect = fake_run
+            pipeline = StreamingPipeline(converter=Converter(probe_cache=ProbeCache(db_path=None)))
+            with self.assertRaises(DownloadError):
+                pipeline.run("https://example.com/watch", output_path, "webm", info=dict(FORMAT_INFO))
+            self.assertFalse(os.path.exists(output_path))
+        self.assertIs(mock_process.call_args.kwargs['stop_flag'], pipeline.converter.stop_flag)
+
+    def test_stop_state_goes_through_public_accessors(self):
+        pipeline = StreamingPipeline(converter=Converter(probe_cache=ProbeCache(db_path=None)))
+        pipeline.downloader.stop_download()
+        self.assertTrue(pipeline._stopped())
+        pipeline.downloader.reset_stop()
+        pipeline.converter.stop_conversion()
+        self.assertTrue(pipeline.converter.is_stopped())
+        pipeline.converter.reset_stop()
+        self.assertFalse(pipeline._stopped())
+
+    @patch('src.core.streaming_pipeline.yt_dlp.YoutubeDL')
+    def test_resolve_rejects_video_only_formats_unless_making_a_gif(self, mock_ydl):
+        video_only = dict(FORMAT_INFO, acodec='none')
+        mock_ydl.return_value.__enter__.return_value.extract_info.return_value = video_only
+        pipeline = StreamingPipeline(converter=Converter(probe_cache=ProbeCache(db_path=None)))
+        self.assertIsNone(pipeline.resolve("https://example.com/watch", "mp4", {'format_code': '137'}))
+        self.assertIs(pipeline.resolve("https://example.com/watch", "gif", {'format_code': '137'}), video_only)
+        mock_ydl.return_value.__enter__.return_value.extract_info.return_value = dict(FORMAT_INFO, requested_formats=[{}, {}])
+        self.assertIsNone(pipeline.resolve("https://example.com/watch", "mp4", {'format_code': '137+bestaudio'}))
+
+    @patch.object(StreamingPipeline, 'resolve', return_value=None)
+    def test_unpipeable_format_falls_back_and_removes_intermediate(self, mock_resolve):
+        pipeline = StreamingPipeline(converter=Converter(probe_cache=ProbeCache(db_path=None)))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            downloaded = os.path.join(temp_dir, "clip.mp4")
+            with open(downloaded, 'wb') as f:
+                f.write(b"data")
+            output_path = os.path.join(temp_dir, "clip_converted.mp3")
+            with patch.object(pipeline.downloader, 'download_media', return_value=downloaded), \
+                 patch.object(pipeline.converter, 'convert_media', return_value=output_path) as mock_convert:
+                result = pipeline.run("https://example.com/watch", output_path, "mp3")
+            self.assertFalse(os.path.exists(downloaded))
+
+        self.assertEqual(result, output_path)
+        self.assertEqual(mock_convert.call_args.args[:3], (downloaded, output_path, "mp3"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+if __name__ == "__main__" or __package__ is None: # For running a single test file
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    if project_root not in sys.path:
+        sys.path.insert(0, project_root)
+
+from src.core.watch_folder import WatchFolder, WatchFolderError, WatchCheckpoint, match_rule, is_temporary, file_signature
+
+
+class FakeConverter:
+    """Records conversions and writes the output file instead of running ffmpeg."""
+    calls = []
+    lock = threading.Lock()
+
+    def convert_media(self, input_file_path, output_file_path, output_format, progress_callback=None, **options):
+        if 'bad' in input_file_path:
+            raise RuntimeError("Invalid data found when processing input")
+        with self.lock:
+            FakeConverter.calls.append((input_file_path, output_file_path, output_format, options))
+        with open(output_file_path, 'wb') as f:
+            f.write(b"converted")
+        return output_file_path
+
+    def stop_conversion(self):
+        pass
+
+
+class TestRules(unittest.TestCase):
+    def test_first_matching_rule_wins(self):
+        rules = [{'pattern': '*.sample.*', 'skip': True}, {'pattern': ['*.mkv', '*.webm'], 'output_format': 'mp4', 'preset': 'fast'},
+                 {'pattern': '*.wav', 'output_format': 'mp3'}]
+        self.assertEqual(match_rule(rules, "Clip.MKV")['preset'], 'fast')
+        self.assertEqual(match_rule(rules, "song.wav")['output_format'], 'mp3')
+        self.assertIsNone(match_rule(rules, "clip.sample.mkv"))
+        self.assertIsNone(match_rule(rules, "notes.txt"))
+
+    def test_partial_downloads_are_ignored(self):
+        for name in ("video.mp4.part", "video.mp4.ytdl", ".hidden.mkv", "video.f137.mp4", "video.mp4.part-Frag3"):
+            self.assertTrue(is_temporary(name), name)
+        self.assertFalse(is_temporary("video.mp4"))
+
+
+class TestWatchCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "checkpoint.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_entries_survive_reopening_and_torn_lines(self):
+        checkpoint = WatchCheckpoint(self.path)
+        checkpoint.record("/in/a.mkv", (10, 100), 'done', output="/out/a.mp4")
+        checkpoint.close()
+        with open(self.path, 'a') as f:
+            f.write('{"path": "/in/b.mk') # Crash mid-write
+
+        checkpoint = WatchCheckpoint(self.path)
+        self.assertTrue(checkpoint.is_finished("/in/a.mkv", (10, 100)))
+        self.assertFalse(checkpoint.is_finished("/in/a.mkv", (11, 100))) # Changed since
+        self.assertEqual(checkpoint.output_of("/in/a.mkv"), "/out/a.mp4")
+        checkpoint.close()
+
+    def test_compacts_superseded_lines(self):
+        checkpoint = WatchCheckpoint(self.path)
+        for i in range(300):
+            checkpoint.record("/in/a.mkv", (i, i), 'done')
+        checkpoint.close()
+        WatchCheckpoint(self.path).close()
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+
+class TestWatchFolder(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.output_dir = os.path.join(self.temp_dir, "converted")
+        FakeConverter.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, name, data=b"media"):
+        path = os.path.join(self.temp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def _watch(self, **options):
+        rules = [{'pattern': '*.mkv', 'output_format': 'mp4', 'preset': 'fast'}, {'pattern': '*.wav', 'output_format': 'mp3'}]
+        options.setdefault('use_inotify', False)
+        return WatchFolder(self.temp_dir, rules, workers=2, settle_seconds=0.2, poll_interval=0.1, converter_factory=FakeConverter, **options)
+
+    def _run_until_idle(self, watch):
+        watch.start()
+        try:
+            self.assertTrue(watch.wait_idle(timeout=10))
+            return watch.stats()
+        finally:
+            watch.stop()
+
+    def test_converts_existing_and_new_files_by_rule(self):
+        self._write("a.mkv")
+        self._write("notes.txt")
+        self._write("b.mkv.part")
+        watch = self._watch()
+        watch.start()
+        try:
+            self._write("c.wav")
+            threading.Event().wait(0.3) # Until the next rescan has seen it
+            self.assertTrue(watch.wait_idle(timeout=10))
+            stats = watch.stats()
+        finally:
+            watch.stop()
+
+        converted = sorted((os.path.basename(i), os.path.basename(o), fmt, opts.get('preset')) for i, o, fmt, opts in FakeConverter.calls)
+        self.assertEqual(converted, [("a.mkv", "a.mp4", "mp4", "fast"), ("c.wav", "c.mp3", "mp3", None)])
+        self.assertEqual(stats['done'], 2)
+        self.assertTrue(all(opts['stop_event'].is_set() for *_, opts in FakeConverter.calls)) # stop() reaches every conversion
+
+    def test_waits_for_growing_files_to_settle(self):
+        path = self._write("growing.mkv")
+        watch = self._watch()
+        watch.settle_seconds = 0.5
+        watch.start()
+        try:
+            for i in range(5): # Keeps changing for longer than settle_seconds
+                threading.Event().wait(0.2)
+                with open(path, 'ab') as f:
+                    f.write(b"more")
+                self.assertEqual(FakeConverter.calls, [])
+            self.assertTrue(watch.wait_idle(timeout=10))
+        finally:
+            watch.stop()
+        self.assertEqual(len(FakeConverter.calls), 1)
+        self.assertTrue(watch.checkpoint.is_finished(path, file_signature(path)))
+
+    def test_restart_skips_finished_files(self):
+        self._write("a.mkv")
+        self._write("bad.mkv")
+        self.assertEqual(self._run_until_idle(self._watch())['failed'], 1)
+        self.assertEqual(len(FakeConverter.calls), 1)
+
+        FakeConverter.calls = []
+        self._write("b.mkv")
+        self._run_until_idle(self._watch())
+        self.assertEqual([os.path.basename(call[0]) for call in FakeConverter.calls], ["b.mkv"])
+
+    def test_name_collisions_get_unique_outputs(self):
+        os.makedirs(self.output_dir)
+        with open(os.path.join(self.output_dir, "a.mp4"), 'wb') as f:
+            f.write(b"someone else's")
+        self._write("a.mkv")
+        self._run_until_idle(self._watch())
+        self.assertEqual(os.path.basename(FakeConverter.calls[0][1]), "a_1.mp4")
+
+    def test_running_conversions_never_share_an_output(self):
+        watch = self._watch()
+        first = watch._reserve_output_path(self._write("clip.mkv"), 'mp4')
+        second = watch._reserve_output_path(self._write("clip.webm"), 'mp4') # Neither output exists yet
+        self.assertEqual([os.path.basename(first), os.path.basename(second)], ["clip.mp4", "clip_1.mp4"])
+        watch._release_output_path(first)
+        self.assertEqual(watch._reserve_output_path(self._write("clip.avi"), 'mp4'), first)
+        watch.checkpoint.close()
+
+    def test_output_dir_must_not_be_the_watched_directory(self):
+        with self.assertRaises(WatchFolderError):
+            self._watch(output_dir=self.temp_dir + os.sep)
+
+    def test_burst_uses_a_fixed_number_of_threads(self):
+        for i in range(500):
+            self._write(f"clip{i:03}.mkv")
+        before = threading.active_count()
+        watch = self._watch()
+        watch.start()
+        try:
+            self.assertLessEqual(threading.active_count() - before, 3) # Two workers and the watcher
+            self.assertTrue(watch.wait_idle(timeout=30))
+        finally:
+            watch.stop()
+        self.assertEqual(len(FakeConverter.calls), 500)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux-only")
+    def test_inotify_reports_new_files(self):
+        watch = self._watch(use_inotify=True)
+        watch.start()
+        try:
+            self._write("new.mkv")
+            threading.Event().wait(0.3)
+            self.assertTrue(watch.wait_idle(timeout=10))
+        finally:
+            watch.stop()
+        self.assertEqual([os.path.basename(call[0]) for call in FakeConverter.calls], ["new.mkv"])
+
+
+if __name__ == '__main__':
+    unittest.main()